@@ -0,0 +1,158 @@
+"""URL canonicalization for doc fetches.
+
+Sitemaps and hand-collected URL lists name the same page many ways:
+fragments, tracking params, trailing slashes, index.html, http vs https.
+canonicalize() folds those into one URL, the key pages are deduplicated and
+cached under. fetch_form() turns that key back into the URL to request,
+keeping plain http for servers that don't speak TLS.
+
+Some aliases only show up after a fetch -- a redirect to another path, or a
+<link rel="canonical"> in the page head. Those are recorded in a per-process
+alias map so later requests for the alias go straight to the target (and its
+cached doc) instead of fetching the page again.
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query params that never change page content
+TRACKING_PARAMS = frozenset({
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "ref_src",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+# Directory index documents, dropped from the end of a path
+INDEX_NAMES = ("index.html", "index.htm", "index.md", "index.php")
+
+# How much of a page is searched for <link rel="canonical">
+HEAD_SCAN_CHARS = 64 * 1024
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_LINK_TAG = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+_ATTR = re.compile(r"""([a-zA-Z_:][-\w:.]*)\s*=\s*("[^"]*"|'[^']*'|[^\s"'>]+)""")
+_HEAD_END = re.compile(r"</head\s*>|<body\b", re.IGNORECASE)
+
+
+def canonicalize(url: str) -> str:
+    """The canonical form of a page URL.
+
+    Lowercases scheme and host, upgrades http to https, drops default ports,
+    fragments, tracking params, index documents and trailing slashes, and
+    sorts the remaining query params. Non-http(s) URLs are returned as-is.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+    scheme = "https"
+
+    host = parts.hostname.lower().rstrip(".")
+    if port is not None and port not in _DEFAULT_PORTS.values():
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    last = path.rsplit("/", 1)[-1]
+    if last.lower() in INDEX_NAMES:
+        path = path[: -len(last)]
+    if len(path) > 1:
+        path = path.rstrip("/")
+    if not path:
+        path = "/"
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ""))
+
+
+def fetch_form(canonical: str, original: str) -> str:
+    """The URL to request for canonical, given the URL the caller asked for.
+
+    canonicalize() upgrades http to https so both spellings share one key,
+    but a plain-http server (localhost, an internal mirror) has to be
+    fetched over http, so an http original keeps its scheme.
+    """
+    if canonical.startswith("https://") and urlsplit(original.strip()).scheme.lower() == "http":
+        return "http://" + canonical[len("https://"):]
+    return canonical
+
+
+def same_site(a: str, b: str) -> bool:
+    """True if two URLs are on the same host (ignoring a www. prefix)."""
+    def host(u: str) -> str:
+        return re.sub(r"^www\.", "", (urlsplit(u).hostname or "").lower())
+    return host(a) == host(b) != ""
+
+
+def find_canonical(page: str, page_url: str) -> str | None:
+    """Canonical URL declared by an HTML page's <link rel="canonical">.
+
+    Only the head is searched. Relative hrefs resolve against page_url, and
+    targets on another host are ignored -- a page can't claim to be some
+    other site's doc.
+    """
+    head = page[:HEAD_SCAN_CHARS]
+    end = _HEAD_END.search(head)
+    if end:
+        head = head[: end.start()]
+    for tag in _LINK_TAG.findall(head):
+        attrs = {k.lower(): v.strip("\"'") for k, v in _ATTR.findall(tag)}
+        if "canonical" not in attrs.get("rel", "").lower().split():
+            continue
+        href = html.unescape(attrs.get("href", "")).strip()
+        if not href:
+            return None
+        target = canonicalize(urljoin(page_url, href))
+        if not same_site(target, page_url):
+            return None
+        return target
+    return None
+
+
+# {canonical alias: canonical target}
+_aliases: dict[str, str] = {}
+
+# Longest alias chain followed by resolve()
+_MAX_HOPS = 8
+
+
+def add_alias(alias: str, target: str) -> None:
+    """Record that alias is another name for target (both canonicalized)."""
+    alias, target = canonicalize(alias), canonicalize(target)
+    if alias == target or resolve(target) == alias:
+        return
+    _aliases[alias] = target
+
+
+def resolve(url: str) -> str:
+    """Canonicalize url and follow any known aliases to the page's real URL."""
+    url = canonicalize(url)
+    for _ in range(_MAX_HOPS):
+        target = _aliases.get(url)
+        if target is None:
+            break
+        url = target
+    return url
+
+
+def reset_aliases() -> None:
+    """Forget all learned aliases."""
+    _aliases.clear()
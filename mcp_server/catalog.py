@@ -0,0 +1,219 @@
+"""SQLite catalog of fetched docs under the raw docs directory.
+
+One WAL-mode database per docs base (.claude/docs/.catalog.db) holds a row per
+stored .md file: source URL, content hash, size, fetch time, HTTP validators,
+markdown source tier, library and (for local files) the source's mtime.
+Freshness checks, status counts and audits are indexed queries instead of
+walks over the docs tree.
+
+Older caches kept the same fields in a .meta.json sidecar next to each file.
+A newly created catalog backfills itself from the tree and removes the
+sidecars it imported.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from itertools import chain
+from pathlib import Path
+from typing import Any
+
+from mcp_server.doc_compression import ZST_SUFFIX
+
+log = logging.getLogger(__name__)
+
+CATALOG_NAME = ".catalog.db"
+
+# Legacy per-file metadata, replaced by the catalog
+SIDECAR_SUFFIX = ".meta.json"
+
+# Metadata keys stored as columns, in table order after path/library
+META_FIELDS = (
+    "url",
+    "fetched_at",
+    "content_hash",
+    "size_bytes",
+    "markdown_source",
+    "markdown_tokens",
+    "boilerplate_bytes",
+    "etag",
+    "last_modified",
+    "source_mtime",
+)
+
+# Columns added after the first release, created on open if missing
+_ADDED_COLUMNS = {"source_mtime": "REAL"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path              TEXT PRIMARY KEY,
+    library           TEXT NOT NULL,
+    url               TEXT,
+    fetched_at        TEXT,
+    content_hash      TEXT,
+    size_bytes        INTEGER NOT NULL DEFAULT 0,
+    markdown_source   TEXT,
+    markdown_tokens   INTEGER,
+    boilerplate_bytes INTEGER,
+    etag              TEXT,
+    last_modified     TEXT,
+    source_mtime      REAL
+);
+CREATE INDEX IF NOT EXISTS docs_library ON docs (library);
+CREATE INDEX IF NOT EXISTS docs_url ON docs (url);
+"""
+
+
+class DocCatalog:
+    """Index of the .md files stored under one docs base directory."""
+
+    def __init__(self, base: Path | str):
+        self.base = Path(base)
+        self.db_path = self.base / CATALOG_NAME
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open (creating if needed) the database. New catalogs backfill from disk."""
+        created = not self.db_path.exists()
+        self.base.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        have = {row[1] for row in conn.execute("PRAGMA table_info(docs)")}
+        for col, kind in _ADDED_COLUMNS.items():
+            if col not in have:
+                conn.execute(f"ALTER TABLE docs ADD COLUMN {col} {kind}")
+        self._conn = conn
+        if created:
+            n = self.migrate()
+            if n:
+                log.info("Catalog %s: imported %d existing docs", self.db_path, n)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def key(self, doc_path: Path | str) -> str | None:
+        """Catalog key for a doc path, or None if it lives outside this base."""
+        try:
+            rel = Path(doc_path).absolute().relative_to(self.base.absolute())
+        except ValueError:
+            return None
+        return rel.as_posix()
+
+    # -- rows ---------------------------------------------------------------
+
+    def put(self, doc_path: Path | str, meta: dict[str, Any]) -> None:
+        """Insert or replace the row for doc_path."""
+        key = self.key(doc_path)
+        if key is None:
+            raise ValueError(f"{doc_path} is outside {self.base}")
+        row = (key, key.split("/", 1)[0]) + tuple(meta.get(f) for f in META_FIELDS)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO docs (path, library, {', '.join(META_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(row))})",
+                row,
+            )
+
+    def get(self, doc_path: Path | str) -> dict[str, Any] | None:
+        """Metadata for doc_path, or None if it was never fetched."""
+        key = self.key(doc_path)
+        if key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(META_FIELDS)} FROM docs WHERE path = ?", (key,)
+            ).fetchone()
+        # Files found on disk without a sidecar have no fetch record
+        if row is None or row[1] is None:
+            return None
+        return {f: v for f, v in zip(META_FIELDS, row) if v is not None}
+
+    def remove(self, doc_path: Path | str) -> None:
+        key = self.key(doc_path)
+        if key is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs WHERE path = ?", (key,))
+
+    # -- queries ------------------------------------------------------------
+
+    def library_stats(self) -> dict[str, dict[str, int]]:
+        """{library: {"files": n, "bytes": total}} for every library with docs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT library, COUNT(*), SUM(size_bytes) FROM docs GROUP BY library"
+            ).fetchall()
+        return {lib: {"files": n, "bytes": total or 0} for lib, n, total in rows}
+
+    def paths(self, library: str) -> list[Path]:
+        """Stored doc files for a library, sorted by path."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM docs WHERE library = ? ORDER BY path", (library,)
+            ).fetchall()
+        return [self.base / p for (p,) in rows]
+
+    # -- migration ----------------------------------------------------------
+
+    def migrate(self, remove_sidecars: bool = True) -> int:
+        """Import every .md (or .md.zst) under the base, with its sidecar's metadata.
+
+        Files in the base directory itself aren't library docs and are
+        skipped. Returns the number of rows written.
+        """
+        rows = 0
+        stored = chain(self.base.rglob("*.md"), self.base.rglob(f"*.md{ZST_SUFFIX}"))
+        for f in sorted(stored):
+            # Compressed docs are cataloged under their plain .md path
+            md = f.with_name(f.name.removesuffix(ZST_SUFFIX))
+            rel = md.relative_to(self.base)
+            if len(rel.parts) < 2 or any(p.startswith(".") for p in rel.parts):
+                continue
+            sidecar = md.with_suffix(SIDECAR_SUFFIX)
+            meta: dict[str, Any] = {}
+            if sidecar.exists():
+                try:
+                    meta = json.loads(sidecar.read_text())
+                except (json.JSONDecodeError, OSError):
+                    meta = {}
+            try:
+                meta.setdefault("size_bytes", f.stat().st_size)
+            except OSError:
+                continue
+            self.put(md, meta)
+            rows += 1
+            if remove_sidecars and sidecar.exists():
+                sidecar.unlink()
+        return rows
+
+
+_catalogs: dict[str, DocCatalog] = {}
+
+
+def get_catalog(base: Path | str) -> DocCatalog:
+    """Shared catalog for a docs base, reopened if its database was deleted."""
+    key = str(Path(base).absolute())
+    cat = _catalogs.get(key)
+    if cat is not None and not cat.db_path.exists():
+        cat.close()
+        cat = None
+    if cat is None:
+        cat = DocCatalog(base)
+        cat.open()
+        _catalogs[key] = cat
+    return cat
+
+
+def close_catalogs() -> None:
+    """Close every open catalog connection."""
+    for cat in _catalogs.values():
+        cat.close()
+    _catalogs.clear()
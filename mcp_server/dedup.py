@@ -0,0 +1,238 @@
+"""Near-duplicate chunk detection for the ingest pipeline.
+
+Versioned and mirrored docs repeat the same text under many URLs
+(/v1/guide, /v2/guide, /latest/guide). Embedding every copy slows ingest and
+fills search results with the same passage. Before a chunk is embedded, its
+64-bit SimHash (over word shingles) is compared with the signatures already
+kept for that knowledge store; a chunk within NEAR_DUP_DISTANCE bits of one
+from another URL is skipped and recorded as a link to that canonical chunk.
+
+Signatures live in a small SQLite table in the docs base (.simhash.db), 8
+bytes per chunk. Lookups use banding: the signature is cut into
+NEAR_DUP_DISTANCE + 1 bands, and by pigeonhole two signatures within the
+distance agree exactly on at least one band, so only rows sharing a band
+are compared.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+DB_NAME = ".simhash.db"
+
+# Skip near-duplicate chunks during ingest (IngestPipeline(near_dup=...))
+NEAR_DUP_ENABLED = True
+
+# Chunks whose signatures differ in at most this many of 64 bits are
+# near-duplicates (3 bits is roughly 95% shingle overlap)
+NEAR_DUP_DISTANCE = 3
+
+# Chunks with fewer words than this are too short for a stable signature
+NEAR_DUP_MIN_WORDS = 24
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+BITS = 64
+_BANDS = NEAR_DUP_DISTANCE + 1
+_BAND_BITS = BITS // _BANDS
+
+_WORD = re.compile(r"\w+")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS signatures (
+    store  TEXT NOT NULL,
+    url    TEXT NOT NULL,
+    chunk  INTEGER NOT NULL,
+    sig    INTEGER NOT NULL,
+    {", ".join(f"b{i} INTEGER NOT NULL" for i in range(_BANDS))},
+    PRIMARY KEY (store, url, chunk)
+);
+{"".join(f"CREATE INDEX IF NOT EXISTS signatures_b{i} ON signatures (store, b{i});"
+         for i in range(_BANDS))}
+CREATE TABLE IF NOT EXISTS links (
+    store            TEXT NOT NULL,
+    url              TEXT NOT NULL,
+    chunk            INTEGER NOT NULL,
+    canonical_url    TEXT NOT NULL,
+    canonical_chunk  INTEGER NOT NULL,
+    distance         INTEGER NOT NULL,
+    PRIMARY KEY (store, url, chunk)
+);
+"""
+
+
+def simhash(text: str) -> int | None:
+    """64-bit SimHash of text's word shingles, or None if it is too short."""
+    words = _WORD.findall(text.lower())
+    if len(words) < NEAR_DUP_MIN_WORDS:
+        return None
+    shingles = Counter(" ".join(words[i:i + SHINGLE_SIZE])
+                       for i in range(len(words) - SHINGLE_SIZE + 1))
+    weights = [0] * BITS
+    for shingle, count in shingles.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit in range(BITS) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _bands(sig: int) -> list[int]:
+    mask = (1 << _BAND_BITS) - 1
+    return [sig >> (i * _BAND_BITS) & mask for i in range(_BANDS)]
+
+
+def _signed(sig: int) -> int:
+    # SQLite integers are signed 64-bit
+    return sig - (1 << BITS) if sig >= 1 << (BITS - 1) else sig
+
+
+def store_key(store: Any) -> str:
+    """Which store's signatures to use: the store's .mv2 path."""
+    path = getattr(store, "path", None)
+    return path if isinstance(path, str) else "default"
+
+
+class NearDupIndex:
+    """Chunk signatures per store, and the near-duplicate links found."""
+
+    def __init__(self, base: Path | str):
+        self.base = Path(base)
+        self.db_path = self.base / DB_NAME
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        self.base.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _nearest(self, store: str, url: str, sig: int) -> tuple[str, int, int] | None:
+        best = None
+        seen: set[tuple[str, int]] = set()
+        for i, band in enumerate(_bands(sig)):
+            rows = self._conn.execute(
+                f"SELECT url, chunk, sig FROM signatures WHERE store = ? AND b{i} = ?",
+                (store, band),
+            ).fetchall()
+            for other_url, chunk, other in rows:
+                if other_url == url or (other_url, chunk) in seen:
+                    continue
+                seen.add((other_url, chunk))
+                d = hamming(sig, other & ((1 << BITS) - 1))
+                if d <= NEAR_DUP_DISTANCE and (best is None or d < best[2]):
+                    best = (other_url, chunk, d)
+        return best
+
+    def check_page(self, store: str, url: str, texts: list[str]) -> list[tuple[str, int, int] | None]:
+        """Match a page's chunks against the store; record the new ones.
+
+        Returns one entry per chunk: (canonical url, chunk, distance) for a
+        near-duplicate of a chunk from another URL, else None. The page's
+        previous signatures and links are replaced, so re-ingesting a page
+        never matches itself. Duplicates are linked, not given signatures.
+        """
+        sigs = [simhash(t) for t in texts]
+        matches: list[tuple[str, int, int] | None] = []
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM signatures WHERE store = ? AND url = ?", (store, url))
+            self._conn.execute("DELETE FROM links WHERE store = ? AND url = ?", (store, url))
+            for chunk, sig in enumerate(sigs):
+                match = None if sig is None else self._nearest(store, url, sig)
+                matches.append(match)
+                if match is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?, ?, ?)",
+                        (store, url, chunk, *match))
+                elif sig is not None:
+                    self._conn.execute(
+                        f"INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?{', ?' * _BANDS})",
+                        (store, url, chunk, _signed(sig), *_bands(sig)))
+        return matches
+
+    def forget(self, store: str, urls: list[str]) -> None:
+        """Drop the signatures and links of pages that never made it into the store."""
+        with self._lock, self._conn:
+            for url in urls:
+                self._conn.execute(
+                    "DELETE FROM signatures WHERE store = ? AND url = ?", (store, url))
+                self._conn.execute("DELETE FROM links WHERE store = ? AND url = ?", (store, url))
+
+    def clear(self, store: str) -> int:
+        """Drop all of a store's signatures and links. Returns the rows removed."""
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM signatures WHERE store = ?", (store,)).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM links WHERE store = ?", (store,)).rowcount
+        return removed
+
+    def canonical(self, store: str, url: str, chunk: int = 0) -> tuple[str, int] | None:
+        """The (url, chunk) a skipped chunk duplicates, if it was skipped."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT canonical_url, canonical_chunk FROM links "
+                "WHERE store = ? AND url = ? AND chunk = ?",
+                (store, url, chunk),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def counts(self, store: str) -> dict[str, int]:
+        """{signatures, links} kept for a store."""
+        with self._lock:
+            sigs = self._conn.execute(
+                "SELECT COUNT(*) FROM signatures WHERE store = ?", (store,)).fetchone()[0]
+            links = self._conn.execute(
+                "SELECT COUNT(*) FROM links WHERE store = ?", (store,)).fetchone()[0]
+        return {"signatures": sigs, "links": links}
+
+
+_indexes: dict[str, NearDupIndex] = {}
+
+
+def get_near_dup_index(base: Path | str) -> NearDupIndex:
+    """Shared index for a docs base, reopened if its database was deleted."""
+    key = str(Path(base).absolute())
+    index = _indexes.get(key)
+    if index is not None and not index.db_path.exists():
+        index.close()
+        index = None
+    if index is None:
+        index = NearDupIndex(base)
+        index.open()
+        _indexes[key] = index
+    return index
+
+
+def clear_store(base: Path | str, store: str) -> int:
+    """Forget a deleted store's signatures, so re-ingesting its pages isn't
+    skipped as duplicates of chunks that are gone. Returns the rows removed."""
+    if not (Path(base) / DB_NAME).exists():
+        return 0
+    return get_near_dup_index(base).clear(store)
+
+
+def close_near_dup_indexes() -> None:
+    for index in _indexes.values():
+        index.close()
+    _indexes.clear()
@@ -0,0 +1,164 @@
+"""Optional zstd storage for raw docs under the docs base.
+
+A compressed doc is stored as <name>.md.zst next to where <name>.md would be.
+Pages up to DICT_MAX_PAGE bytes are compressed with a dictionary trained from
+their library's own docs -- doc pages of one site share most of their
+vocabulary and structure, which plain zstd can't exploit on a few KB of input.
+Dictionaries live in <base>/.zdicts/<library>/<dict_id>.zdict. Every frame
+records the id of the dictionary it was written with, so retraining never
+breaks reads of older files.
+
+Needs the zstandard package; available() reports whether it's installed.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+ZST_SUFFIX = ".zst"
+
+# zstd level for doc pages; writes are rare next to reads
+COMPRESS_LEVEL = 10
+
+# Dictionary size, and how many pages of a library are needed to train one
+DICT_SIZE = 32 * 1024
+DICT_MIN_SAMPLES = 16
+DICT_MAX_SAMPLES = 512
+
+# Larger pages compress well on their own
+DICT_MAX_PAGE = 64 * 1024
+
+DICT_DIRNAME = ".zdicts"
+
+# {dict dir: {dict_id: ZstdCompressionDict}}, newest last
+_dicts: dict[Path, dict[int, Any]] = {}
+
+# zstd contexts aren't thread-safe; each thread keeps its own per dict id
+_contexts = threading.local()
+
+
+def available() -> bool:
+    """True if the zstandard package can be imported."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compressed_path(doc_path: Path) -> Path:
+    """Where the compressed form of doc_path is stored."""
+    return doc_path.with_name(doc_path.name + ZST_SUFFIX)
+
+
+def _dict_dir(base: Path, library: str) -> Path:
+    return Path(base) / DICT_DIRNAME / library
+
+
+def _library_dicts(base: Path, library: str) -> dict[int, Any]:
+    """Dictionaries trained for a library, loaded once per process."""
+    d = _dict_dir(base, library)
+    dicts = _dicts.get(d)
+    if dicts is None:
+        import zstandard
+
+        dicts = {}
+        files = sorted(d.glob("*.zdict"), key=lambda p: p.stat().st_mtime) if d.is_dir() else []
+        for f in files:
+            zd = zstandard.ZstdCompressionDict(f.read_bytes())
+            dicts[zd.dict_id()] = zd
+        _dicts[d] = dicts
+    return dicts
+
+
+def has_dict(base: Path, library: str) -> bool:
+    return bool(_library_dicts(base, library))
+
+
+def train_dict(base: Path, library: str, samples: list[str]) -> int | None:
+    """Train and save a dictionary from sample pages. Returns its id.
+
+    Only pages small enough to use the dictionary are sampled. Returns None
+    when there are too few samples or zstd can't build a dictionary from them.
+    """
+    import zstandard
+
+    data = [s.encode() for s in samples if 0 < len(s.encode()) <= DICT_MAX_PAGE]
+    if len(data) < DICT_MIN_SAMPLES:
+        return None
+    try:
+        zd = zstandard.train_dictionary(DICT_SIZE, data[:DICT_MAX_SAMPLES])
+    except zstandard.ZstdError as exc:
+        log.warning("Dictionary training failed for %s: %s", library, exc)
+        return None
+    d = _dict_dir(base, library)
+    d.mkdir(parents=True, exist_ok=True)
+    (d / f"{zd.dict_id()}.zdict").write_bytes(zd.as_bytes())
+    dicts = _library_dicts(base, library)
+    dicts.pop(zd.dict_id(), None)
+    dicts[zd.dict_id()] = zd
+    return zd.dict_id()
+
+
+def _context(kind: str, zd: Any) -> Any:
+    """Cached ZstdCompressor/ZstdDecompressor for this thread and dictionary."""
+    import zstandard
+
+    cache = getattr(_contexts, kind, None)
+    if cache is None:
+        cache = {}
+        setattr(_contexts, kind, cache)
+    key = zd.dict_id() if zd is not None else 0
+    ctx = cache.get(key)
+    if ctx is None:
+        if kind == "c":
+            ctx = zstandard.ZstdCompressor(level=COMPRESS_LEVEL, dict_data=zd)
+        else:
+            ctx = zstandard.ZstdDecompressor(dict_data=zd)
+        cache[key] = ctx
+    return ctx
+
+
+def compress(base: Path | None, library: str | None, text: str) -> bytes:
+    """Compress a page, with the library's newest dictionary if it's small."""
+    data = text.encode()
+    zd = None
+    if base is not None and library and len(data) <= DICT_MAX_PAGE:
+        dicts = _library_dicts(base, library)
+        if dicts:
+            zd = next(reversed(dicts.values()))
+    return _context("c", zd).compress(data)
+
+
+def decompress(base: Path | None, library: str | None, data: bytes) -> str:
+    """Decompress a page written by compress().
+
+    Raises ValueError for a corrupt frame or one whose dictionary isn't on disk.
+    """
+    import zstandard
+
+    try:
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        zd = None
+        if dict_id:
+            if base is not None and library:
+                zd = _library_dicts(base, library).get(dict_id)
+            if zd is None:
+                raise ValueError(f"zstd dictionary {dict_id} for {library!r} not found")
+        raw = _context("d", zd).decompress(data)
+    except zstandard.ZstdError as exc:
+        raise ValueError(f"corrupt zstd frame: {exc}") from exc
+    return raw.decode("utf-8", errors="replace")
+
+
+def reset_cache() -> None:
+    """Forget loaded dictionaries (they're re-read from disk on next use)."""
+    _dicts.clear()
+    for kind in ("c", "d"):
+        if hasattr(_contexts, kind):
+            delattr(_contexts, kind)
@@ -19,6 +19,9 @@ IMAGE_NAME = "neo-research-sandbox"  # docker compose default: <project>-<servic
 BASE_URL = f"http://localhost:{CONTAINER_PORT}"
 HEALTH_INTERVAL = 30  # seconds
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Host directory shared with the sandbox, and where the sandbox sees it
+WORKSPACE_DIR = PROJECT_ROOT / "workspace"
+SANDBOX_WORKSPACE = "/workspace"
 
 
 @dataclass
@@ -31,6 +34,11 @@ class DockerManager:
     _bare_process: subprocess.Popen | None = field(default=None, init=False)
     _no_docker: bool = field(default=False, init=False)
 
+    @property
+    def bare(self) -> bool:
+        """True when the sandbox runs as a local subprocess instead of in Docker."""
+        return self._no_docker
+
     def _get_client(self) -> docker.DockerClient:
         if self._client is None:
             self._client = docker.from_env()
@@ -82,6 +90,7 @@ class DockerManager:
             cpu_quota=200000,
             dns=["0.0.0.0"],
             extra_hosts={"host.docker.internal": "host-gateway"},
+            volumes={str(WORKSPACE_DIR): {"bind": SANDBOX_WORKSPACE, "mode": "rw"}},
             healthcheck={
                 "test": ["CMD-SHELL", f"curl -f http://localhost:{CONTAINER_PORT}/health || exit 1"],
                 "interval": 30_000_000_000,
@@ -0,0 +1,415 @@
+"""Main-content extraction for fetched HTML and markdown.
+
+Two stages strip site chrome before pages are stored and indexed:
+
+1. extract_main_html() -- DOM pass over the raw HTML. Drops navigation,
+   sidebars, cookie banners and footers by tag, ARIA role and class/id
+   tokens, then picks the densest content subtree (<main>/<article> when
+   present, otherwise a readability-style paragraph score) and prunes
+   link-heavy blocks inside it.
+2. BoilerplateTracker -- markdown blocks that repeat across pages of the
+   same host ("Edit this page", copyright lines, version pickers) are
+   dropped once they've been seen on REPEAT_MIN_PAGES distinct pages.
+
+Both report roughly how many markdown bytes they removed so the fetcher can
+record the savings in page metadata. Only stdlib is used so extraction can run
+inside the fetcher's conversion worker processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+# Subtrees that never carry page content
+_DROP_TAGS = frozenset({
+    "script", "style", "noscript", "template", "svg", "iframe", "button",
+    "select", "form", "nav", "aside", "footer", "dialog",
+})
+
+_DROP_ROLES = frozenset({
+    "navigation", "banner", "contentinfo", "complementary", "search",
+    "dialog", "alertdialog", "menu", "menubar",
+})
+
+# class/id tokens that mark chrome (matched per token, so "sidebar-scrollbox"
+# matches but "main-content" doesn't)
+_DROP_TOKENS = frozenset({
+    "nav", "navbar", "navigation", "menu", "menubar", "sidebar", "footer",
+    "breadcrumb", "breadcrumbs", "cookie", "cookies", "consent", "gdpr",
+    "banner", "toc", "skip", "social", "share", "sharing", "pagination",
+    "pager", "feedback", "announcement", "advert", "ads", "newsletter",
+    "topbar", "masthead", "search",
+})
+
+_INVISIBLE_TAGS = frozenset({"script", "style", "template", "noscript"})
+
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+})
+
+# Tags whose text counts toward a container's content score
+_SCORED_TAGS = frozenset({"p", "pre", "td", "li", "dd", "blockquote", "code"})
+
+# Containers that can win the content-density contest
+_CANDIDATE_TAGS = frozenset({"div", "section", "article", "main", "td", "body"})
+
+# Link-heavy blocks inside the main subtree (inline TOCs, "see also" rails)
+LINK_DENSITY_MAX = 0.6
+_LINK_BLOCK_TAGS = frozenset({"ul", "ol", "menu"})
+
+# Blocks holding these are content however link-heavy (API reference pages)
+_CONTENT_MARKERS = frozenset({"pre", "code", "h1", "h2", "h3", "h4", "h5", "h6"})
+
+# If the chosen subtree holds less than this share of the page's text, the
+# choice is suspect -- fall back to the whole (pruned) body
+MIN_MAIN_RATIO = 0.2
+
+# Markdown blocks seen on this many pages of a host are boilerplate
+REPEAT_MIN_PAGES = 3
+
+# Longer blocks are content even if they repeat (shared intros, licences)
+REPEAT_MAX_BLOCK_CHARS = 400
+
+# Stripping more than this share of a page means it's a duplicate page,
+# not a page wrapped in chrome -- leave it for near-duplicate detection
+REPEAT_MAX_SHARE = 0.8
+
+# Per-host block fingerprints kept before singletons are evicted
+REPEAT_MAX_TRACKED = 5000
+
+# Hosts tracked at once (least recently used is dropped)
+REPEAT_MAX_HOSTS = 64
+
+
+# ---------------------------------------------------------------------------
+# DOM stage
+# ---------------------------------------------------------------------------
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag: str, attrs: list[tuple[str, str | None]], parent: _Node | None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: list[_Node | str] = []
+        self.parent = parent
+
+    def attr(self, name: str) -> str:
+        for k, v in self.attrs:
+            if k == name:
+                return v or ""
+        return ""
+
+
+class _TreeBuilder(HTMLParser):
+    """Tolerant HTML -> _Node tree. Unmatched end tags are ignored."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#root", [], None)
+        self._cur = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, attrs, self._cur)
+        self._cur.children.append(node)
+        if tag not in _VOID_TAGS:
+            self._cur = node
+
+    def handle_startendtag(self, tag, attrs):
+        self._cur.children.append(_Node(tag, attrs, self._cur))
+
+    def handle_endtag(self, tag):
+        node = self._cur
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self._cur = node.parent
+
+    def handle_data(self, data):
+        # Script/style bodies never reach the markdown; don't count them
+        if self._cur.tag not in _INVISIBLE_TAGS:
+            self._cur.children.append(data)
+
+
+def _is_chrome(node: _Node, in_content: bool) -> bool:
+    """Does this element look like navigation/banner/footer chrome?"""
+    if node.tag in _DROP_TAGS:
+        return True
+    # A <header> inside <article>/<main> usually holds the page title
+    if node.tag == "header" and not in_content:
+        return True
+    if node.attr("role").lower() in _DROP_ROLES:
+        return True
+    if node.attr("aria-hidden").lower() == "true":
+        return True
+    tokens = re.split(r"[\s_-]+", f"{node.attr('class')} {node.attr('id')}".lower())
+    return any(t in _DROP_TOKENS for t in tokens)
+
+
+def _text_len(node: _Node | str) -> int:
+    if isinstance(node, str):
+        return len(node.strip())
+    return sum(_text_len(c) for c in node.children)
+
+
+def _md_len(node: _Node | str) -> int:
+    """Approximate markdown size of a subtree: text plus link/image targets."""
+    if isinstance(node, str):
+        return _text_len(node)
+    extra = 0
+    if node.tag == "a" and node.attr("href"):
+        extra = len(node.attr("href")) + 4  # [](...)
+    elif node.tag == "img" and node.attr("src"):
+        extra = len(node.attr("src")) + 5 + len(node.attr("alt"))  # ![](...)
+    return extra + sum(_md_len(c) for c in node.children)
+
+
+def _link_text_len(node: _Node) -> int:
+    total = 0
+    for c in node.children:
+        if isinstance(c, _Node):
+            total += _text_len(c) if c.tag == "a" else _link_text_len(c)
+    return total
+
+
+def _prune(node: _Node, in_content: bool = False) -> None:
+    """Remove chrome subtrees in place."""
+    in_content = in_content or node.tag in ("main", "article")
+    kept: list[_Node | str] = []
+    for c in node.children:
+        if isinstance(c, _Node):
+            if _is_chrome(c, in_content):
+                continue
+            _prune(c, in_content)
+        kept.append(c)
+    node.children = kept
+
+
+def _prune_link_blocks(node: _Node) -> None:
+    """Drop link-dominated lists (inline TOCs, related-link rails)."""
+    kept: list[_Node | str] = []
+    for c in node.children:
+        if isinstance(c, _Node):
+            if c.tag in _LINK_BLOCK_TAGS and _link_ratio(c) > LINK_DENSITY_MAX \
+                    and _find(c, lambda n: n.tag in _CONTENT_MARKERS) is None:
+                continue
+            _prune_link_blocks(c)
+        kept.append(c)
+    node.children = kept
+
+
+def _find(node: _Node, pred) -> _Node | None:
+    for c in node.children:
+        if isinstance(c, _Node):
+            if pred(c):
+                return c
+            hit = _find(c, pred)
+            if hit is not None:
+                return hit
+    return None
+
+
+def _densest(root: _Node) -> _Node | None:
+    """Readability-style pick: paragraphs score their parent and grandparent."""
+    scores: dict[int, float] = {}
+    nodes: dict[int, _Node] = {}
+
+    def visit(node: _Node) -> None:
+        for c in node.children:
+            if not isinstance(c, _Node):
+                continue
+            if c.tag in _SCORED_TAGS:
+                text = _text_len(c)
+                if text >= 25:
+                    score = 1 + min(text / 100, 3) + sum(t.count(",") for t in _iter_text(c))
+                    parent = c.parent
+                    for weight in (1.0, 0.5):
+                        if parent is None:
+                            break
+                        if parent.tag in _CANDIDATE_TAGS:
+                            scores[id(parent)] = scores.get(id(parent), 0) + score * weight
+                            nodes[id(parent)] = parent
+                        parent = parent.parent
+            visit(c)
+
+    visit(root)
+    if not scores:
+        return None
+    best = max(scores, key=lambda k: scores[k] * (1 - _link_ratio(nodes[k])))
+    return nodes[best]
+
+
+def _link_ratio(node: _Node) -> float:
+    text = _text_len(node)
+    return _link_text_len(node) / text if text else 0.0
+
+
+def _iter_text(node: _Node):
+    for c in node.children:
+        if isinstance(c, str):
+            yield c
+        else:
+            yield from _iter_text(c)
+
+
+def _serialize(node: _Node | str, out: list[str]) -> None:
+    if isinstance(node, str):
+        out.append(html.escape(node, quote=False))
+        return
+    if node.tag != "#root":
+        attrs = "".join(
+            f' {k}="{html.escape(v, quote=True)}"' if v is not None else f" {k}"
+            for k, v in node.attrs
+        )
+        out.append(f"<{node.tag}{attrs}>")
+    for c in node.children:
+        _serialize(c, out)
+    if node.tag != "#root" and node.tag not in _VOID_TAGS:
+        out.append(f"</{node.tag}>")
+
+
+def extract_main_html(page: str) -> tuple[str, int]:
+    """Strip page chrome from an HTML document.
+
+    Returns (html, bytes_removed), where bytes_removed approximates the
+    markdown the dropped elements would have produced. Documents that fail
+    to parse, nest too deeply for the tree walks, or where extraction would
+    keep nothing, come back unchanged.
+    """
+    builder = _TreeBuilder()
+    try:
+        builder.feed(page)
+        builder.close()
+    except Exception:
+        return page, 0
+    try:
+        return _extract(builder.root, page)
+    except RecursionError:
+        return page, 0
+
+
+def _extract(root: _Node, page: str) -> tuple[str, int]:
+    body = _find(root, lambda n: n.tag == "body") or root
+    total = _text_len(body)
+    if not total:
+        return page, 0
+    before = _md_len(body)
+
+    _prune(body)
+    main = (
+        _find(body, lambda n: n.tag == "main" or n.attr("role").lower() == "main")
+        or _find(body, lambda n: n.tag == "article")
+        or _densest(body)
+        or body
+    )
+    if _text_len(main) < total * MIN_MAIN_RATIO:
+        main = body
+    _prune_link_blocks(main)
+    if not _text_len(main):
+        return page, 0
+
+    out: list[str] = []
+    # html2text takes the page title from <title>; keep it
+    title = _find(root, lambda n: n.tag == "title")
+    if title is not None:
+        _serialize(title, out)
+    _serialize(main, out)
+    return "".join(out), max(before - _md_len(main), 0)
+
+
+# ---------------------------------------------------------------------------
+# Repeated-block stage
+# ---------------------------------------------------------------------------
+
+
+def _split_blocks(markdown: str) -> list[str]:
+    """Split markdown on blank lines, keeping fenced code blocks whole."""
+    blocks: list[str] = []
+    current: list[str] = []
+    in_fence = False
+    for line in markdown.split("\n"):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _fingerprint(block: str) -> str:
+    normalized = re.sub(r"\s+", " ", block).strip().lower()
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+def _strippable(block: str) -> bool:
+    """Headings, code and long prose are never treated as boilerplate."""
+    stripped = block.lstrip()
+    if stripped.startswith(("#", "```", "~~~", "    ")):
+        return False
+    return len(block) <= REPEAT_MAX_BLOCK_CHARS
+
+
+class BoilerplateTracker:
+    """Learns which markdown blocks repeat across pages of the same host."""
+
+    def __init__(self, min_pages: int = REPEAT_MIN_PAGES):
+        self.min_pages = min_pages
+        # host -> block fingerprint -> the pages (by URL) it was seen on, up
+        # to min_pages of them
+        self._hosts: OrderedDict[str, dict[str, set[str]]] = OrderedDict()
+
+    def _pages(self, host: str) -> dict[str, set[str]]:
+        pages = self._hosts.get(host)
+        if pages is None:
+            pages = {}
+            self._hosts[host] = pages
+            while len(self._hosts) > REPEAT_MAX_HOSTS:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return pages
+
+    def strip(self, host: str, url: str, markdown: str) -> tuple[str, int]:
+        """Record this page's blocks and drop ones that are host-wide chrome.
+
+        Returns (markdown, bytes_removed). A block counts once per distinct
+        url, so fetching the same page again never makes its own text look
+        repeated. A page that is mostly repeated blocks is a duplicate
+        rather than chrome, so it's left intact.
+        """
+        blocks = _split_blocks(markdown)
+        pages = self._pages(host)
+
+        keep: list[str] = []
+        removed = 0
+        for block in blocks:
+            fp = _fingerprint(block)
+            seen = pages.setdefault(fp, set())
+            if len(seen) < self.min_pages:
+                seen.add(url)
+            if _strippable(block) and len(seen) >= self.min_pages:
+                removed += len(block.encode())
+                continue
+            keep.append(block)
+
+        if len(pages) > REPEAT_MAX_TRACKED:
+            for fp in [fp for fp, seen in pages.items() if len(seen) == 1]:
+                del pages[fp]
+
+        if not removed or removed > len(markdown.encode()) * REPEAT_MAX_SHARE:
+            return markdown, 0
+        return "\n\n".join(keep) + ("\n" if markdown.endswith("\n") else ""), removed
+
+    def reset(self) -> None:
+        self._hosts.clear()
@@ -1,25 +1,54 @@
 """Document fetching layer with dual storage (raw .md + .mv2 ingestion).
 
-Fetches documentation URLs, stores raw markdown files for human-readable cache,
-and ingests content into the KnowledgeStore for vector search.
+Fetches documentation URLs, stores raw markdown files for human-readable cache
+(tracked in the docs catalog), and ingests content into the KnowledgeStore for
+vector search.
 """
 
 from __future__ import annotations
 
 import asyncio
 import hashlib
+import inspect
 import json
 import logging
+import os
+import random
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable, Callable
 from urllib.parse import urlparse
 from xml.etree import ElementTree
 
 import httpx
 from mcp.server.fastmcp import Context
 
+from mcp_server import doc_compression
+from mcp_server.canonical import (
+    add_alias,
+    canonicalize,
+    fetch_form,
+    find_canonical,
+    resolve,
+    same_site,
+)
+from mcp_server.catalog import SIDECAR_SUFFIX, DocCatalog, get_catalog
+from mcp_server.doc_compression import compressed_path
+from mcp_server.extract import BoilerplateTracker, extract_main_html
+from mcp_server.journal import get_journal
+from mcp_server.ratelimit import (
+    MAX_BACKOFF,
+    THROTTLE_STATUSES,
+    HostPaused,
+    get_limiter,
+    parse_retry_after,
+)
+from mcp_server.scope import CrawlScope, apply_scope, describe_skipped
+
 log = logging.getLogger(__name__)
 
 # Raw docs land here: .claude/docs/{library}/{path}.md
@@ -28,8 +57,29 @@ DOCS_BASE = Path(".claude/docs")
 # How long cached files stay fresh (seconds)
 FRESHNESS_TTL = 7 * 24 * 3600  # 7 days
 
-# Rate limit delay between sitemap fetches (seconds)
-SITEMAP_RATE_LIMIT = 0.2
+# Sitemap crawls: concurrent fetches overall (per-host limits are adaptive,
+# see ratelimit.py), tries per URL, and the first retry delay in seconds
+CRAWL_WORKERS = 8
+CRAWL_MAX_ATTEMPTS = 4
+CRAWL_RETRY_BASE = 2.0
+
+MARKDOWN_NEW_HOST = "markdown.new"
+
+# Bodies this large (chars) or larger are converted in a worker process so
+# html2text doesn't stall the event loop; smaller ones convert inline
+CONVERT_INLINE_MAX = 16 * 1024
+
+# Upper bound on HTML->markdown worker processes
+CONVERT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Store raw docs zstd-compressed as .md.zst (needs the zstandard package)
+COMPRESS_DOCS = os.environ.get("RLM_COMPRESS_DOCS", "") not in ("", "0")
+
+# Strip nav/sidebars/footers from HTML before converting it to markdown
+EXTRACT_MAIN_CONTENT = True
+
+# How much of a body _looks_like_markdown inspects
+_SNIFF_CHARS = 4096
 
 # Sites known to block automated fetching
 BLOCKED_DOMAINS = frozenset({
@@ -97,8 +147,17 @@ def url_to_filepath(url: str) -> Path:
 
 
 def _meta_path(doc_path: Path) -> Path:
-    """Sidecar metadata path for a doc file."""
-    return doc_path.with_suffix(".meta.json")
+    """Sidecar metadata path for a doc file outside the catalog."""
+    return doc_path.with_suffix(SIDECAR_SUFFIX)
+
+
+def _catalog_for(doc_path: Path) -> DocCatalog | None:
+    """The catalog that tracks doc_path, or None if it's outside DOCS_BASE."""
+    try:
+        Path(doc_path).absolute().relative_to(DOCS_BASE.absolute())
+    except ValueError:
+        return None
+    return get_catalog(DOCS_BASE)
 
 
 def _content_hash(text: str) -> str:
@@ -106,7 +165,16 @@ def _content_hash(text: str) -> str:
 
 
 def read_meta(doc_path: Path) -> dict | None:
-    """Read the sidecar .meta.json, or None if missing/corrupt."""
+    """Read a doc's metadata, or None if missing/corrupt.
+
+    Docs under DOCS_BASE are looked up in the catalog; a sidecar .meta.json
+    is the fallback for files the catalog doesn't know about.
+    """
+    catalog = _catalog_for(doc_path)
+    if catalog is not None:
+        meta = catalog.get(doc_path)
+        if meta is not None:
+            return meta
     mp = _meta_path(doc_path)
     if not mp.exists():
         return None
@@ -118,8 +186,12 @@ def read_meta(doc_path: Path) -> dict | None:
 
 def write_meta(doc_path: Path, url: str, content: str,
                markdown_source: str = "html2text",
-               markdown_tokens: int | None = None) -> dict:
-    """Write sidecar metadata and return the metadata dict."""
+               markdown_tokens: int | None = None,
+               boilerplate_bytes: int | None = None,
+               etag: str | None = None,
+               last_modified: str | None = None,
+               source_mtime: float | None = None) -> dict:
+    """Record metadata for a doc (catalog row, or sidecar outside DOCS_BASE)."""
     meta = {
         "url": url,
         "fetched_at": datetime.now(timezone.utc).isoformat(),
@@ -129,6 +201,18 @@ def write_meta(doc_path: Path, url: str, content: str,
     }
     if markdown_tokens is not None:
         meta["markdown_tokens"] = markdown_tokens
+    if boilerplate_bytes:
+        meta["boilerplate_bytes"] = boilerplate_bytes
+    if etag:
+        meta["etag"] = etag
+    if last_modified:
+        meta["last_modified"] = last_modified
+    if source_mtime is not None:
+        meta["source_mtime"] = source_mtime
+    catalog = _catalog_for(doc_path)
+    if catalog is not None:
+        catalog.put(doc_path, meta)
+        return meta
     mp = _meta_path(doc_path)
     mp.parent.mkdir(parents=True, exist_ok=True)
     mp.write_text(json.dumps(meta, indent=2))
@@ -137,7 +221,7 @@ def write_meta(doc_path: Path, url: str, content: str,
 
 def is_fresh(doc_path: Path, ttl: float = FRESHNESS_TTL) -> bool:
     """Check if a cached doc file exists and its metadata is younger than ttl."""
-    if not doc_path.exists():
+    if not doc_exists(doc_path):
         return False
     meta = read_meta(doc_path)
     if meta is None:
@@ -151,15 +235,19 @@ def is_fresh(doc_path: Path, ttl: float = FRESHNESS_TTL) -> bool:
 
 
 def _looks_like_markdown(text: str) -> bool:
-    """Heuristic: does this text look like markdown rather than HTML?"""
-    if not text.strip():
+    """Heuristic: does this text look like markdown rather than HTML?
+
+    Only the head of the body is inspected, so the cost doesn't grow with
+    page size.
+    """
+    if not text or text.isspace():
         return False
     # If it starts with an HTML doctype or <html tag, it's HTML
-    stripped = text.strip()[:200].lower()
+    stripped = text[:_SNIFF_CHARS].lstrip()[:200].lower()
     if stripped.startswith("<!doctype") or stripped.startswith("<html"):
         return False
     # If more than 30% of lines start with HTML tags, probably HTML
-    lines = text.split("\n")[:50]
+    lines = text.split("\n", 50)[:50]
     html_lines = sum(1 for l in lines if re.match(r"^\s*<[a-z]", l.strip().lower()))
     if lines and html_lines / len(lines) > 0.3:
         return False
@@ -181,6 +269,62 @@ def html_to_markdown(html: str) -> str:
         return text.strip()
 
 
+def _markdown_from_body(text: str, main_only: bool = False) -> tuple[str, int]:
+    """Return (markdown, bytes_removed) for a response body.
+
+    HTML is converted, after stripping page chrome when main_only is set.
+    Module-level so it can be pickled into a conversion worker.
+    """
+    if _looks_like_markdown(text):
+        return text, 0
+    removed = 0
+    if main_only:
+        text, removed = extract_main_html(text)
+    return html_to_markdown(text), removed
+
+
+_convert_pool: ProcessPoolExecutor | None = None
+
+
+def _get_convert_pool() -> ProcessPoolExecutor:
+    """Lazily start the shared conversion pool."""
+    global _convert_pool
+    if _convert_pool is None:
+        _convert_pool = ProcessPoolExecutor(max_workers=CONVERT_MAX_WORKERS)
+    return _convert_pool
+
+
+def shutdown_convert_pool() -> None:
+    """Stop the conversion workers. No-op if the pool was never started."""
+    global _convert_pool
+    if _convert_pool is not None:
+        _convert_pool.shutdown(wait=False, cancel_futures=True)
+        _convert_pool = None
+
+
+async def convert_body(text: str, main_only: bool = False) -> tuple[str, int]:
+    """(markdown, bytes_removed) for a response body, off the event loop when large.
+
+    Bodies under CONVERT_INLINE_MAX convert inline -- the process hop costs
+    more than html2text does on a few KB. Larger ones go to the bounded
+    process pool. A broken pool (worker killed) falls back to inline.
+    """
+    if len(text) < CONVERT_INLINE_MAX:
+        return _markdown_from_body(text, main_only)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_convert_pool(), _markdown_from_body, text, main_only)
+    except BrokenProcessPool:
+        log.warning("Conversion pool broken, converting inline")
+        shutdown_convert_pool()
+        return _markdown_from_body(text, main_only)
+
+
+# Blocks repeated across pages of a host (footers, "edit this page" links)
+_boilerplate = BoilerplateTracker()
+
+
 def parse_sitemap_xml(xml_text: str) -> list[str]:
     """Extract all <loc> URLs from a sitemap XML string."""
     urls: list[str] = []
@@ -221,15 +365,162 @@ async def _ingest_to_store(store: Any, title: str, label: str, text: str, metada
         return False
 
 
+def _library_of(doc_path: Path) -> str | None:
+    """Library directory a doc under DOCS_BASE belongs to, else None."""
+    try:
+        rel = Path(doc_path).absolute().relative_to(DOCS_BASE.absolute())
+    except ValueError:
+        return None
+    return rel.parts[0] if len(rel.parts) > 1 else None
+
+
+def _stored_file(doc_path: Path) -> Path | None:
+    """The file actually holding doc_path: plain, compressed, or None."""
+    if doc_path.exists():
+        return doc_path
+    zpath = compressed_path(doc_path)
+    if zpath.exists():
+        return zpath
+    return None
+
+
+def doc_exists(doc_path: Path) -> bool:
+    """True if doc_path is stored, plain or compressed."""
+    return _stored_file(doc_path) is not None
+
+
+def read_doc(doc_path: Path) -> str:
+    """Read a stored doc, decompressing a .md.zst transparently.
+
+    Raises FileNotFoundError if neither form exists and ValueError if the
+    compressed form can't be decoded.
+    """
+    if doc_path.exists():
+        return doc_path.read_text(encoding="utf-8", errors="replace")
+    zpath = compressed_path(doc_path)
+    data = zpath.read_bytes()
+    return doc_compression.decompress(DOCS_BASE, _library_of(doc_path), data)
+
+
+_dict_attempted: set[str] = set()
+
+
+def _maybe_train_dict(library: str) -> None:
+    """Train the library's dictionary once it has enough cataloged pages."""
+    if library in _dict_attempted or doc_compression.has_dict(DOCS_BASE, library):
+        return
+    paths = get_catalog(DOCS_BASE).paths(library)
+    if len(paths) < doc_compression.DICT_MIN_SAMPLES:
+        return
+    _dict_attempted.add(library)
+    samples = []
+    for p in paths[:doc_compression.DICT_MAX_SAMPLES]:
+        try:
+            samples.append(read_doc(p))
+        except (OSError, ValueError):
+            continue
+    doc_compression.train_dict(DOCS_BASE, library, samples)
+
+
+def _write_doc(doc_path: Path, content: str, compress: bool) -> None:
+    """Write a doc in one form and remove any copy in the other."""
+    doc_path.parent.mkdir(parents=True, exist_ok=True)
+    library = _library_of(doc_path)
+    zpath = compressed_path(doc_path)
+    if compress and library and doc_compression.available():
+        _maybe_train_dict(library)
+        zpath.write_bytes(doc_compression.compress(DOCS_BASE, library, content))
+        doc_path.unlink(missing_ok=True)
+    else:
+        doc_path.write_text(content)
+        zpath.unlink(missing_ok=True)
+
+
 def _store_raw(doc_path: Path, content: str, url: str,
                markdown_source: str = "html2text",
-               markdown_tokens: int | None = None) -> dict:
-    """Write raw markdown file and sidecar metadata. Returns metadata dict."""
-    doc_path.parent.mkdir(parents=True, exist_ok=True)
-    doc_path.write_text(content)
+               markdown_tokens: int | None = None,
+               boilerplate_bytes: int | None = None,
+               etag: str | None = None,
+               last_modified: str | None = None,
+               source_mtime: float | None = None) -> dict:
+    """Write raw markdown file and its catalog metadata. Returns metadata dict.
+
+    With COMPRESS_DOCS set, docs under DOCS_BASE are stored as .md.zst.
+    """
+    _write_doc(doc_path, content, COMPRESS_DOCS)
     return write_meta(doc_path, url, content,
                       markdown_source=markdown_source,
-                      markdown_tokens=markdown_tokens)
+                      markdown_tokens=markdown_tokens,
+                      boilerplate_bytes=boilerplate_bytes,
+                      etag=etag,
+                      last_modified=last_modified,
+                      source_mtime=source_mtime)
+
+
+def migrate_storage(compress: bool = True, library: str | None = None) -> dict[str, Any]:
+    """Rewrite cataloged docs compressed (or back to plain markdown).
+
+    Trains missing library dictionaries first. Returns file counts, on-disk
+    bytes before and after, and read throughput through read_doc() (MB/s of
+    markdown) before and after.
+    """
+    if compress and not doc_compression.available():
+        raise RuntimeError("Compressed storage needs the zstandard package")
+    catalog = get_catalog(DOCS_BASE)
+    libraries = [library] if library else sorted(catalog.library_stats())
+
+    files = errors = dicts_trained = 0
+    disk_before = disk_after = text_bytes = 0
+    read_before = read_after = 0.0
+    for lib in libraries:
+        paths = [p for p in catalog.paths(lib) if doc_exists(p)]
+        if compress and not doc_compression.has_dict(DOCS_BASE, lib):
+            samples = []
+            for p in paths[:doc_compression.DICT_MAX_SAMPLES]:
+                try:
+                    samples.append(read_doc(p))
+                except (OSError, ValueError):
+                    continue
+            if doc_compression.train_dict(DOCS_BASE, lib, samples) is not None:
+                dicts_trained += 1
+
+        moved = []
+        for p in paths:
+            try:
+                disk = _stored_file(p).stat().st_size
+                start = time.perf_counter()
+                text = read_doc(p)
+                read_before += time.perf_counter() - start
+                _write_doc(p, text, compress)
+            except (OSError, ValueError) as exc:
+                log.warning("Skipping %s: %s", p, exc)
+                errors += 1
+                continue
+            disk_before += disk
+            disk_after += _stored_file(p).stat().st_size
+            text_bytes += len(text.encode())
+            files += 1
+            moved.append(p)
+
+        for p in moved:
+            start = time.perf_counter()
+            read_doc(p)
+            read_after += time.perf_counter() - start
+
+    def _mb_s(seconds: float) -> float:
+        return round(text_bytes / 1e6 / seconds, 1) if seconds else 0.0
+
+    return {
+        "action": "compress" if compress else "decompress",
+        "files": files,
+        "errors": errors,
+        "dicts_trained": dicts_trained,
+        "bytes_before": disk_before,
+        "bytes_after": disk_after,
+        "saved_pct": round(100 * (1 - disk_after / disk_before), 1) if disk_before else 0.0,
+        "read_mb_s_before": _mb_s(read_before),
+        "read_mb_s_after": _mb_s(read_after),
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -237,6 +528,60 @@ def _store_raw(doc_path: Path, content: str, url: str,
 # ---------------------------------------------------------------------------
 
 
+async def _limited_get(client: httpx.AsyncClient, url: str, **kwargs: Any) -> httpx.Response:
+    """GET through the host's limiter, feeding the outcome back into it.
+
+    Raises HostPaused without sending anything if the host is paused for
+    longer than MAX_INLINE_WAIT.
+    """
+    limiter = get_limiter(urlparse(url).hostname or "")
+    async with limiter.slot():
+        try:
+            resp = await client.get(url, **kwargs)
+        except httpx.TransportError:
+            limiter.record_failure()
+            raise
+        limiter.record_response(resp.status_code, resp.headers.get("retry-after"))
+    return resp
+
+
+def _error_result(doc_path: Path | None, error: str, *,
+                  retryable: bool = False, retry_after: float | None = None) -> dict[str, Any]:
+    return {"content": None, "doc_path": doc_path, "meta": None, "from_cache": False,
+            "error": error, "retryable": retryable, "retry_after": retry_after}
+
+
+def _throttled_result(doc_path: Path, url: str, resp: httpx.Response) -> dict[str, Any]:
+    return _error_result(
+        doc_path, f"HTTP {resp.status_code} fetching {url} (throttled)",
+        retryable=True, retry_after=parse_retry_after(resp.headers.get("retry-after")),
+    )
+
+
+# In-flight fetches by canonical URL, so concurrent requests for one page share a fetch
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _learn_alias(url: str, resp: httpx.Response, page_html: str | None = None) -> str:
+    """Canonical URL of the page behind resp, recording url as its alias.
+
+    A redirect to another path or a same-site <link rel="canonical"> in
+    page_html both make the target the page's real URL.
+    """
+    target = url
+    if resp.history:
+        final = canonicalize(str(resp.url))
+        if same_site(final, url):
+            target = final
+    if page_html:
+        declared = find_canonical(page_html, target)
+        if declared:
+            target = declared
+    if target != url:
+        add_alias(url, target)
+    return target
+
+
 async def fetch_url(
     client: httpx.AsyncClient,
     url: str,
@@ -250,7 +595,57 @@ async def fetch_url(
       2. markdown.new proxy
       3. Original URL + html2text conversion
 
-    Returns dict with keys: content, doc_path, meta, from_cache, error
+    The URL is canonicalized first (see canonical.py), so variants of a page
+    share one fetch and one cached doc; redirects and rel=canonical found
+    along the way are remembered as aliases. Concurrent calls for the same
+    page wait on the fetch already in flight. An http URL is still requested
+    over http (see fetch_form); only the key it's cached under is https.
+
+    Requests go through per-host adaptive limiters. A 429/503 from the origin
+    stops the cascade instead of trying the remaining tiers.
+
+    Returns dict with keys: content, doc_path, meta, from_cache, error,
+    canonical_url. Errors also carry retryable (transient: throttled, 5xx,
+    timeout, connection failure, host paused) and retry_after (seconds, if
+    known).
+    """
+    canonical = resolve(url)
+    while (pending := _inflight.get(canonical)) is not None:
+        try:
+            return dict(await asyncio.shield(pending))
+        except asyncio.CancelledError:
+            # Only retry if the shared fetch died, not if we were cancelled
+            if not pending.cancelled():
+                raise
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[canonical] = fut
+    try:
+        result = await finish_page(
+            await download_page(client, fetch_form(canonical, url), force=force))
+    except BaseException:
+        fut.cancel()
+        raise
+    else:
+        result.setdefault("canonical_url", canonical)
+        fut.set_result(result)
+    finally:
+        _inflight.pop(canonical, None)
+    return result
+
+
+async def download_page(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    force: bool = False,
+) -> dict[str, Any]:
+    """Network half of fetch_url's cascade, for an already-canonical URL.
+
+    Returns a finished result for cache hits and errors. Otherwise the
+    result's "download" holds the undecoded body and what the cascade
+    learned about it; finish_page converts and stores it. Splitting the two
+    lets a pipeline keep the network busy while pages convert.
     """
     parsed = urlparse(url)
     host = parsed.hostname or ""
@@ -258,14 +653,14 @@ async def fetch_url(
     # Check blocked domains
     base_host = re.sub(r"^(www|docs)\.", "", host)
     if base_host in BLOCKED_DOMAINS:
-        return {"content": None, "doc_path": None, "meta": None, "from_cache": False,
-                "error": f"Blocked domain: {base_host}. These sites block automated fetching."}
+        return _error_result(
+            None, f"Blocked domain: {base_host}. These sites block automated fetching.")
 
     doc_path = url_to_filepath(url)
 
     # Freshness check
     if not force and is_fresh(doc_path):
-        cached_content = doc_path.read_text()
+        cached_content = read_doc(doc_path)
         cached_meta = read_meta(doc_path)
         return {"content": cached_content, "doc_path": doc_path, "meta": cached_meta,
                 "from_cache": True, "error": None}
@@ -275,74 +670,399 @@ async def fetch_url(
     source_url = url
     markdown_source = "html2text"
     markdown_tokens = None
+    needs_convert = False
 
-    # Tier 1: Try Accept: text/markdown content negotiation
     try:
-        resp = await client.get(
-            url, timeout=15, follow_redirects=True,
-            headers={"Accept": "text/markdown"},
-        )
-        resp.raise_for_status()
-        ct = resp.headers.get("content-type", "")
-        if "text/markdown" in ct:
-            content = resp.text
-            markdown_source = "negotiated"
-            tok = resp.headers.get("x-markdown-tokens")
-            if tok:
-                markdown_tokens = int(tok)
-            source_url = url
-        elif _looks_like_markdown(resp.text):
-            content = resp.text
-            markdown_source = "negotiated"
-            source_url = url
-    except (httpx.HTTPError, httpx.TimeoutException, ValueError):
-        pass
-
-    # Tier 2: Try markdown.new proxy
-    if content is None:
+        # Tier 1: Try Accept: text/markdown content negotiation
         try:
-            proxy_url = f"https://markdown.new/{url}"
-            resp = await client.get(proxy_url, timeout=15, follow_redirects=True)
+            resp = await _limited_get(
+                client, url, timeout=15, follow_redirects=True,
+                headers={"Accept": "text/markdown"},
+            )
+            if resp.status_code in THROTTLE_STATUSES:
+                return _throttled_result(doc_path, url, resp)
             resp.raise_for_status()
-            proxy_text = resp.text
-            if proxy_text and _looks_like_markdown(proxy_text):
-                content = proxy_text
-                markdown_source = "markdown_new"
+            ct = resp.headers.get("content-type", "")
+            if "text/markdown" in ct:
+                content = resp.text
+                markdown_source = "negotiated"
                 tok = resp.headers.get("x-markdown-tokens")
                 if tok:
                     markdown_tokens = int(tok)
-                source_url = url
+                source_url = _learn_alias(url, resp)
+            elif _looks_like_markdown(resp.text):
+                content = resp.text
+                markdown_source = "negotiated"
+                source_url = _learn_alias(url, resp)
         except (httpx.HTTPError, httpx.TimeoutException, ValueError):
             pass
 
-    # Tier 3: Fall back to original URL + html2text
-    if content is None:
-        try:
-            resp = await client.get(url, timeout=15, follow_redirects=True)
-            resp.raise_for_status()
-            text = resp.text
-            if _looks_like_markdown(text):
-                content = text
-            else:
-                content = html_to_markdown(text)
-            markdown_source = "html2text"
-            source_url = url
-        except httpx.TimeoutException:
-            return {"content": None, "doc_path": doc_path, "meta": None, "from_cache": False,
-                    "error": f"Timeout fetching {url}"}
-        except httpx.HTTPStatusError as exc:
-            return {"content": None, "doc_path": doc_path, "meta": None, "from_cache": False,
-                    "error": f"HTTP {exc.response.status_code} fetching {url}"}
-        except httpx.HTTPError as exc:
-            return {"content": None, "doc_path": doc_path, "meta": None, "from_cache": False,
-                    "error": f"Connection error fetching {url}: {exc}"}
-
-    # Dual storage: raw file + metadata
+        # Tier 2: Try markdown.new proxy (skipped while the proxy is paused)
+        if content is None and not get_limiter(MARKDOWN_NEW_HOST).paused_for():
+            try:
+                proxy_url = f"https://{MARKDOWN_NEW_HOST}/{url}"
+                resp = await _limited_get(client, proxy_url, timeout=15, follow_redirects=True)
+                resp.raise_for_status()
+                proxy_text = resp.text
+                if proxy_text and _looks_like_markdown(proxy_text):
+                    content = proxy_text
+                    markdown_source = "markdown_new"
+                    tok = resp.headers.get("x-markdown-tokens")
+                    if tok:
+                        markdown_tokens = int(tok)
+                    source_url = url
+            except (httpx.HTTPError, httpx.TimeoutException, ValueError, HostPaused):
+                pass
+
+        # Tier 3: Fall back to original URL + html2text
+        if content is None:
+            try:
+                resp = await _limited_get(client, url, timeout=15, follow_redirects=True)
+                if resp.status_code in THROTTLE_STATUSES:
+                    return _throttled_result(doc_path, url, resp)
+                resp.raise_for_status()
+                source_url = _learn_alias(url, resp, resp.text)
+                content = resp.text
+                needs_convert = True
+                markdown_source = "html2text"
+            except httpx.TimeoutException:
+                return _error_result(doc_path, f"Timeout fetching {url}", retryable=True)
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                return _error_result(doc_path, f"HTTP {status} fetching {url}",
+                                     retryable=status >= 500)
+            except httpx.HTTPError as exc:
+                return _error_result(doc_path, f"Connection error fetching {url}: {exc}",
+                                     retryable=True)
+    except HostPaused as exc:
+        return _error_result(doc_path, f"Host paused fetching {url}: {exc}",
+                             retryable=True, retry_after=exc.retry_after)
+
+    # Validators from the origin (the proxy's describe its own response)
+    etag = last_modified = None
+    if markdown_source != "markdown_new":
+        etag = resp.headers.get("etag")
+        last_modified = resp.headers.get("last-modified")
+
+    # A redirect or rel=canonical means the doc belongs to its real URL
+    if source_url != url:
+        doc_path = url_to_filepath(source_url)
+
+    download = {
+        "body": content,
+        "needs_convert": needs_convert,
+        "host": host,
+        "source_url": source_url,
+        "markdown_source": markdown_source,
+        "markdown_tokens": markdown_tokens,
+        "etag": etag,
+        "last_modified": last_modified,
+    }
+    return {"content": None, "doc_path": doc_path, "meta": None, "from_cache": False,
+            "error": None, "canonical_url": canonicalize(source_url), "download": download}
+
+
+async def finish_page(result: dict[str, Any]) -> dict[str, Any]:
+    """CPU half of fetch_url: convert, strip and store a download_page result.
+
+    Results without a pending download (cache hits, errors) pass through.
+    """
+    download = result.get("download")
+    if download is None:
+        return result
+    content, stripped_bytes = download["body"], 0
+    if download["needs_convert"]:
+        content, stripped_bytes = await convert_body(content, main_only=EXTRACT_MAIN_CONTENT)
+
+    # Drop blocks this host repeats on every page
+    if EXTRACT_MAIN_CONTENT:
+        content, repeated = _boilerplate.strip(download["host"], download["source_url"], content)
+        stripped_bytes += repeated
+
+    # Dual storage: raw file + catalog metadata
+    doc_path = result["doc_path"]
+    source_url = download["source_url"]
     meta = _store_raw(doc_path, content, source_url,
-                      markdown_source=markdown_source,
-                      markdown_tokens=markdown_tokens)
+                      markdown_source=download["markdown_source"],
+                      markdown_tokens=download["markdown_tokens"],
+                      boilerplate_bytes=stripped_bytes,
+                      etag=download["etag"],
+                      last_modified=download["last_modified"])
     return {"content": content, "doc_path": doc_path, "meta": meta,
-            "from_cache": False, "error": None}
+            "from_cache": False, "error": None, "canonical_url": canonicalize(source_url)}
+
+
+async def fetch_many(
+    client: httpx.AsyncClient,
+    urls: list[str],
+    *,
+    force: bool = False,
+    on_result: Callable[[str, dict[str, Any]], Any] | None = None,
+    max_attempts: int = CRAWL_MAX_ATTEMPTS,
+    workers: int = CRAWL_WORKERS,
+    convert: bool = True,
+    stop: Callable[[], bool] | None = None,
+) -> dict[str, Any]:
+    """Fetch many URLs concurrently, requeueing transient failures.
+
+    Per-host politeness comes from the limiters in fetch_url; `workers` only
+    bounds the crawl as a whole. A retryable failure goes back on the queue
+    after max(Retry-After, exponential backoff) with +/-50% jitter, up to
+    max_attempts tries. on_result(url, result) -- sync or async -- is called
+    once per URL with its final result.
+
+    URLs that canonicalize to one page are fetched once; the extra spellings
+    are dropped and never reach on_result. A page that turns out to be
+    another page already fetched in this run (redirect or rel=canonical)
+    reaches on_result with result["duplicate"] set.
+
+    With convert=False pages are only downloaded (download_page) and
+    on_result gets results still to be passed through finish_page.
+
+    Once stop() returns True (e.g. a byte budget is spent) URLs not yet
+    started are dropped without reaching on_result; they're counted as
+    skipped.
+
+    Returns {fetched, failed, retried, duplicates, skipped, errors}.
+    """
+    stats: dict[str, Any] = {"fetched": 0, "failed": 0, "retried": 0,
+                             "duplicates": 0, "skipped": 0, "errors": []}
+    unique: dict[str, str] = {}
+    for u in urls:
+        unique.setdefault(resolve(u), u)
+    stats["duplicates"] = len(urls) - len(unique)
+    if not unique:
+        return stats
+
+    queue: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+    for u in unique.values():
+        queue.put_nowait((u, 1))
+    remaining = len(unique)
+    finished = asyncio.Event()
+    timers: set[asyncio.Task] = set()
+    delivered: set[str] = set()
+
+    async def requeue(url: str, attempt: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        queue.put_nowait((url, attempt))
+
+    async def worker() -> None:
+        nonlocal remaining
+        while True:
+            url, attempt = await queue.get()
+            if stop is not None and stop():
+                stats["skipped"] += 1
+                remaining -= 1
+                if remaining == 0:
+                    finished.set()
+                continue
+            try:
+                if convert:
+                    result = await fetch_url(client, url, force=force)
+                else:
+                    result = await download_page(client, fetch_form(resolve(url), url),
+                                                 force=force)
+            except Exception as exc:
+                log.warning("Fetch crashed for %s: %s", url, exc)
+                result = _error_result(None, f"{type(exc).__name__}: {exc}")
+
+            if result.get("error") and result.get("retryable") and attempt < max_attempts:
+                backoff = min(CRAWL_RETRY_BASE * 2 ** (attempt - 1), MAX_BACKOFF)
+                delay = max(result.get("retry_after") or 0.0, backoff)
+                delay *= random.uniform(0.5, 1.5)
+                stats["retried"] += 1
+                t = asyncio.create_task(requeue(url, attempt + 1, delay))
+                timers.add(t)
+                t.add_done_callback(timers.discard)
+                continue
+
+            if result.get("error"):
+                stats["failed"] += 1
+                stats["errors"].append(f"{url}: {result['error']}")
+            elif result.get("canonical_url") in delivered:
+                result["duplicate"] = True
+                stats["duplicates"] += 1
+            else:
+                delivered.add(result.get("canonical_url"))
+                stats["fetched"] += 1
+            if on_result is not None:
+                try:
+                    ret = on_result(url, result)
+                    if inspect.isawaitable(ret):
+                        await ret
+                except Exception as exc:
+                    log.warning("Result handler failed for %s: %s", url, exc)
+            remaining -= 1
+            if remaining == 0:
+                finished.set()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max(1, min(workers, len(unique))))]
+    try:
+        await finished.wait()
+    finally:
+        for t in (*tasks, *timers):
+            t.cancel()
+        await asyncio.gather(*tasks, *timers, return_exceptions=True)
+    return stats
+
+
+async def crawl_sitemap(
+    client: httpx.AsyncClient,
+    sitemap_url: str,
+    *,
+    force: bool = False,
+    store: Any = None,
+    on_page: Callable[[str, dict[str, Any]], Any] | None = None,
+    scope: CrawlScope | None = None,
+) -> dict[str, Any]:
+    """Fetch every page of a sitemap, journaled so an interrupted crawl resumes.
+
+    See crawl_job for how pages are scoped, ingested, resumed and counted.
+    """
+    async def list_pages() -> list[str]:
+        resp = await client.get(sitemap_url, timeout=30, follow_redirects=True)
+        resp.raise_for_status()
+        return parse_sitemap_xml(resp.text)
+
+    return await crawl_job(client, "sitemap", sitemap_url, list_pages,
+                           force=force, store=store, on_page=on_page, scope=scope)
+
+
+async def crawl_job(
+    client: httpx.AsyncClient,
+    kind: str,
+    source: str,
+    list_pages: Callable[[], Awaitable[list[str]]],
+    *,
+    force: bool = False,
+    store: Any = None,
+    on_page: Callable[[str, dict[str, Any]], Any] | None = None,
+    scope: CrawlScope | None = None,
+    titles: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    """Fetch every page listed by a source (a sitemap, an llms.txt), journaled.
+
+    list_pages() fetches and parses the source; an httpx error from it is
+    reported as the crawl's error. A scope (see scope.py) filters, dedups,
+    ranks and caps the listed URLs before they're journaled -- the journal
+    keeps that order -- using titles (url -> link text) if the source has
+    them; its byte budget stops the crawl once that many bytes are stored.
+
+    With a store, pages go through the staged IngestPipeline (pipeline.py)
+    and are acked in the journal once committed. Otherwise on_page(url,
+    result) -- sync or async -- ingests a fetched page and returns True once
+    it's stored; that acks the page. A job
+    left "running" by a previous process resumes without re-reading the
+    source: unacked pages are re-ingested from the docs cache and only
+    pending URLs are fetched. force=True always starts over.
+
+    Page URLs are journaled in canonical form, so spellings of one page
+    collapse to a single entry. A page that redirects to (or declares as
+    rel=canonical) one already fetched in this crawl is marked "duplicate"
+    and not passed to on_page.
+
+    Returns {fetched, failed, duplicates, retried, errors, total, bytes,
+    resumed, skipped, error}, plus pipeline stats when a store was given;
+    error is set only when the source itself couldn't be fetched. skipped
+    counts URLs left out by the scope (excluded, variants, over_budget,
+    over_bytes). Counts cover the whole job, including pages finished
+    before a resume (bytes and skipped only this run).
+    """
+    journal = get_journal(DOCS_BASE)
+    job_id = f"{kind}:{source}"
+    job = journal.get_job(job_id)
+    resumed = not force and job is not None and job["status"] == "running"
+    stats: dict[str, Any] = {"fetched": 0, "failed": 0, "duplicates": 0, "retried": 0,
+                             "errors": [], "total": 0, "bytes": 0, "resumed": resumed,
+                             "skipped": {}, "error": None}
+
+    if not resumed:
+        try:
+            urls = await list_pages()
+        except (httpx.HTTPError, httpx.TimeoutException) as exc:
+            stats["error"] = str(exc) or type(exc).__name__
+            return stats
+        if scope is not None:
+            urls, stats["skipped"] = apply_scope(urls, scope, titles)
+        if not urls:
+            return stats
+        # One entry per page, kept fetchable (an http page stays http)
+        pages: dict[str, str] = {}
+        for u in urls:
+            pages.setdefault(canonicalize(u), fetch_form(canonicalize(u), u))
+        journal.start(job_id, kind, source, list(pages.values()))
+    else:
+        log.info("Resuming crawl %s: %s", job_id, journal.counts(job_id))
+
+    size = 0
+
+    def mark(url: str, result: dict[str, Any]) -> bool:
+        """Journal a fetch result. True if the page still needs ingesting."""
+        nonlocal size
+        if result["error"]:
+            journal.mark(job_id, url, "failed", error=result["error"])
+            return False
+        if result.get("duplicate"):
+            journal.mark(job_id, url, "duplicate")
+            return False
+        journal.mark(job_id, url, "done")
+        size += (result.get("meta") or {}).get("size_bytes", 0)
+        return True
+
+    # Pages fetched before an interruption but never acked
+    replay: list[tuple[str, dict[str, Any]]] = []
+    for url in journal.unacked(job_id):
+        doc_path = url_to_filepath(url)
+        try:
+            content = read_doc(doc_path)
+        except (OSError, ValueError):
+            journal.mark(job_id, url, "pending")
+            continue
+        replay.append((url, {"content": content, "doc_path": doc_path,
+                             "meta": read_meta(doc_path), "from_cache": True, "error": None}))
+    pending = journal.urls(job_id, "pending")
+
+    def over_bytes() -> bool:
+        return scope is not None and scope.max_bytes is not None and size >= scope.max_bytes
+
+    if store is not None:
+        from mcp_server.pipeline import IngestPipeline
+
+        pipeline = IngestPipeline(client, store, force=force)
+        crawl = await pipeline.run(
+            pending, replay=replay,
+            on_fetched=mark, on_written=lambda url: journal.ack(job_id, url),
+            stop=over_bytes,
+        )
+        stats["pipeline"] = crawl["pipeline"]
+    else:
+        async def ingest(url: str, result: dict[str, Any]) -> None:
+            if on_page is None:
+                return
+            ok = on_page(url, result)
+            if inspect.isawaitable(ok):
+                ok = await ok
+            if ok:
+                journal.ack(job_id, url)
+
+        for url, result in replay:
+            await ingest(url, result)
+
+        async def on_result(url: str, result: dict[str, Any]) -> None:
+            if mark(url, result):
+                await ingest(url, result)
+
+        crawl = await fetch_many(client, pending, force=force, on_result=on_result,
+                                 stop=over_bytes)
+    journal.finish(job_id)
+    if crawl.get("skipped"):
+        stats["skipped"]["over_bytes"] = crawl["skipped"]
+
+    counts = journal.counts(job_id)
+    stats.update(fetched=counts["done"], failed=counts["failed"],
+                 duplicates=counts["duplicate"], total=counts["total"], bytes=size,
+                 retried=crawl["retried"], errors=crawl["errors"])
+    return stats
 
 
 # ---------------------------------------------------------------------------
@@ -393,54 +1113,41 @@ def register_fetcher_tools(mcp) -> None:
         return "\n".join(parts)
 
     @mcp.tool()
-    async def rlm_load_dir(glob_pattern: str, ctx: Context) -> str:
+    async def rlm_load_dir(
+        glob_pattern: str,
+        ctx: Context,
+        ignore: list[str] | None = None,
+        force: bool = False,
+    ) -> str:
         """Bulk-load local files matching a glob pattern into raw docs + knowledge store.
 
-        Example: rlm_load_dir("./docs/**/*.md")
-        """
-        base = Path.cwd()
-        matches = sorted(base.glob(glob_pattern))
-
-        if not matches:
-            return f"No files matched pattern: {glob_pattern}"
+        Files are read in parallel, chunked and ingested in batches. Files
+        unchanged since the last load (same mtime or content hash) are
+        skipped, as is anything matched by .gitignore files or the extra
+        gitignore-style `ignore` patterns.
 
-        store = _get_store(ctx)
-        loaded = 0
-        errors = []
-        total_bytes = 0
+        Example: rlm_load_dir("./docs/**/*.md", ignore=["drafts/", "*.tmp.md"])
 
-        for fpath in matches:
-            if not fpath.is_file():
-                continue
-            try:
-                content = fpath.read_text()
-            except (OSError, UnicodeDecodeError) as exc:
-                errors.append(f"{fpath}: {exc}")
-                continue
-
-            # Store as raw doc
-            # Use relative path as the "URL" for local files
-            rel = str(fpath.relative_to(base))
-            doc_path = DOCS_BASE / "local" / f"{rel}"
-            if not doc_path.suffix:
-                doc_path = doc_path.with_suffix(".md")
-            doc_path.parent.mkdir(parents=True, exist_ok=True)
-            doc_path.write_text(content)
-            meta = write_meta(doc_path, f"file://{fpath}", content)
-
-            # Ingest into knowledge store
-            await _ingest_to_store(
-                store,
-                title=str(fpath.name),
-                label="local",
-                text=content,
-                metadata=meta,
-            )
+        Args:
+            glob_pattern: Glob relative to the working directory
+            ignore: Extra gitignore-style patterns to skip
+            force: Reload files even if they're unchanged
+        """
+        from mcp_server.loader import load_dir
 
-            loaded += 1
-            total_bytes += len(content.encode())
+        stats = await load_dir(Path.cwd(), glob_pattern, _get_store(ctx),
+                               ignore=ignore or (), force=force)
+        if not stats["matched"]:
+            return f"No files matched pattern: {glob_pattern}"
 
+        loaded = stats["loaded"]
+        total_bytes = stats["bytes"]
+        errors = stats["errors"]
         parts = [f"Loaded {loaded} files ({total_bytes} bytes)"]
+        if stats["chunks"]:
+            parts.append(f"Ingested {stats['chunks']} chunks in {stats['batches']} batches")
+        if stats["unchanged"] or stats["ignored"]:
+            parts.append(f"Skipped {stats['unchanged']} unchanged, {stats['ignored']} ignored")
         if errors:
             parts.append(f"{len(errors)} errors:")
             for e in errors[:5]:
@@ -450,54 +1157,116 @@ def register_fetcher_tools(mcp) -> None:
         return "\n".join(parts)
 
     @mcp.tool()
-    async def rlm_fetch_sitemap(sitemap_url: str, ctx: Context, force: bool = False) -> str:
-        """Parse a sitemap.xml and fetch all listed pages.
-
-        Each page is stored as raw markdown + indexed in the knowledge store.
-        Rate-limited to ~5 requests/second.
+    async def rlm_fetch_repo(
+        repo: str,
+        ctx: Context,
+        patterns: list[str] | None = None,
+        ignore: list[str] | None = None,
+        archive: str | None = None,
+        force: bool = False,
+    ) -> str:
+        """Ingest a GitHub repository's docs from a single archive download.
+
+        Downloads the repo tarball once and streams through it without
+        extracting it. Markdown and reStructuredText files are kept as-is,
+        and Python files are reduced to their docstrings. Everything is
+        chunked and batch-ingested under the org-repo label. Files
+        unchanged since the last load are skipped.
+
+        Example: rlm_fetch_repo("pydantic/pydantic@main", patterns=["docs/**/*.md"])
+
+        Args:
+            repo: "org/repo", "org/repo@ref" or a github.com URL
+            patterns: Globs selecting files (default: **/*.md, **/*.mdx, **/*.rst, **/*.py)
+            ignore: gitignore-style patterns to skip (default: node_modules/, vendor/, ...)
+            archive: Path to a local .tar.gz to read instead of downloading
+            force: Re-ingest files even if they're unchanged
         """
+        from mcp_server.repo import fetch_repo
+
         app = ctx.request_context.lifespan_context
+        stats = await fetch_repo(app.http, repo, _get_store(ctx), archive=archive,
+                                 patterns=patterns, ignore=ignore, force=force)
+        if stats["error"]:
+            return f"Error: {stats['error']}"
+        if not stats["matched"]:
+            return f"No files in {stats['repo']} matched the selection"
 
-        # Fetch the sitemap itself
-        try:
-            resp = await app.http.get(sitemap_url, timeout=30, follow_redirects=True)
-            resp.raise_for_status()
-        except (httpx.HTTPError, httpx.TimeoutException) as exc:
-            return f"Error fetching sitemap: {exc}"
+        parts = [
+            f"Repo: {stats['repo']}@{stats['ref']} ({stats['archive_bytes']} byte archive)",
+            f"  Loaded {stats['loaded']} files ({stats['bytes']} bytes) as '{stats['label']}'",
+        ]
+        if stats["chunks"]:
+            parts.append(f"  Ingested {stats['chunks']} chunks in {stats['batches']} batches")
+        skipped = {"unchanged": stats["unchanged"], "too large": stats["too_large"],
+                   "without docstrings": stats["no_docs"]}
+        if any(skipped.values()):
+            parts.append("  Skipped " + ", ".join(f"{n} {why}" for why, n in skipped.items() if n))
+        errors = stats["errors"]
+        if errors:
+            parts.append(f"  {len(errors)} errors:")
+            for e in errors[:5]:
+                parts.append(f"    - {e}")
+            if len(errors) > 5:
+                parts.append(f"    ... and {len(errors) - 5} more")
+        return "\n".join(parts)
 
-        urls = parse_sitemap_xml(resp.text)
-        if not urls:
-            return f"No URLs found in sitemap at {sitemap_url}"
+    @mcp.tool()
+    async def rlm_fetch_sitemap(
+        sitemap_url: str,
+        ctx: Context,
+        force: bool = False,
+        max_pages: int | None = None,
+        max_bytes: int | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        dedup_variants: bool = False,
+        topic: str | None = None,
+    ) -> str:
+        """Parse a sitemap.xml and fetch all listed pages.
 
-        store = _get_store(ctx)
-        library = extract_library_name(sitemap_url)
-        fetched = 0
-        failed = 0
-        total_bytes = 0
-        errors: list[str] = []
-
-        for page_url in urls:
-            result = await fetch_url(app.http, page_url, force=force)
-
-            if result["error"]:
-                failed += 1
-                errors.append(f"{page_url}: {result['error']}")
-            else:
-                fetched += 1
-                size = (result["meta"] or {}).get("size_bytes", 0)
-                total_bytes += size
-
-                # Ingest into knowledge store
-                await _ingest_to_store(
-                    store,
-                    title=page_url,
-                    label=library,
-                    text=result["content"],
-                    metadata=result["meta"] or {},
-                )
-
-            # Rate limit between requests
-            await asyncio.sleep(SITEMAP_RATE_LIMIT)
+        Each page is stored as raw markdown + indexed in the knowledge store,
+        through a staged fetch/convert/chunk/embed/write pipeline whose
+        per-stage throughput is included in the output. Requests adapt to
+        each host's rate limits (429/503, Retry-After), and transient
+        failures are retried with backoff. Progress is journaled: if
+        a crawl is interrupted, calling this again resumes it (force=True
+        starts over). See rlm_crawl_status.
+
+        The crawl can be scoped: include/exclude path prefixes (e.g.
+        ["/docs"], ["/blog"]), one copy per page across languages and
+        versions (dedup_variants), a page and byte budget, and a topic to
+        fetch the most relevant pages first.
+
+        Args:
+            sitemap_url: URL of the sitemap.xml
+            force: Start over instead of resuming, and refetch cached pages
+            max_pages: Fetch at most this many pages
+            max_bytes: Stop once this many bytes of docs are stored
+            include: Only fetch pages under these path prefixes
+            exclude: Skip pages under these path prefixes
+            dedup_variants: Keep one language/version copy of each page
+            topic: Order pages by relevance to this topic
+        """
+        scope = None
+        if any((max_pages, max_bytes, include, exclude, dedup_variants, topic)):
+            scope = CrawlScope(max_pages=max_pages, max_bytes=max_bytes,
+                               include=tuple(include or ()), exclude=tuple(exclude or ()),
+                               dedup_variants=dedup_variants, topic=topic)
+        app = ctx.request_context.lifespan_context
+        crawl = await crawl_sitemap(app.http, sitemap_url, force=force, store=_get_store(ctx),
+                                    scope=scope)
+        if crawl["error"]:
+            return f"Error fetching sitemap: {crawl['error']}"
+        if not crawl["total"]:
+            if crawl["skipped"]:
+                return (f"No URLs left in sitemap at {sitemap_url} after scoping "
+                        f"({describe_skipped(crawl['skipped'])})")
+            return f"No URLs found in sitemap at {sitemap_url}"
+        fetched = crawl["fetched"]
+        failed = crawl["failed"]
+        total_bytes = crawl["bytes"]
+        errors: list[str] = crawl["errors"]
 
         parts = [
             f"Sitemap: {sitemap_url}",
@@ -505,6 +1274,19 @@ def register_fetcher_tools(mcp) -> None:
             f"  Pages failed: {failed}",
             f"  Total size: {total_bytes} bytes",
         ]
+        if crawl["resumed"]:
+            parts.insert(1, "  Resumed an interrupted crawl")
+        if crawl["duplicates"]:
+            parts.append(f"  Duplicates skipped: {crawl['duplicates']}")
+        if crawl["retried"]:
+            parts.append(f"  Retries: {crawl['retried']}")
+        if crawl["skipped"]:
+            parts.append(f"  Not fetched: {describe_skipped(crawl['skipped'])}")
+        if "pipeline" in crawl:
+            from mcp_server.pipeline import format_stats
+
+            parts.append("  Pipeline:")
+            parts.extend(f"    {line}" for line in format_stats(crawl["pipeline"]))
         if errors:
             parts.append("  Errors:")
             for e in errors[:10]:
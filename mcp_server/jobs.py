@@ -0,0 +1,196 @@
+"""Background research jobs.
+
+rlm_research used to run discovery, crawl and indexing inside one tool call,
+which blocked the agent, reported nothing and could outlive the client's
+tool timeout. Runs are now jobs on the server's event loop: each gets an id,
+at most MAX_RUNNING_JOBS run at once (the rest wait in submission order),
+and any of them can be cancelled. A job's runner reports progress by
+updating the job (phase, done/total); tools waiting on a job forward that as
+MCP progress notifications.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+# Jobs allowed to run at once; later submissions wait for a slot
+MAX_RUNNING_JOBS = 2
+
+# Finished jobs kept for rlm_research_status
+JOB_HISTORY = 50
+
+# How often a waiting tool re-reads a job's progress (seconds)
+PROGRESS_INTERVAL = 1.0
+
+FINISHED = frozenset({"done", "failed", "cancelled"})
+
+
+@dataclass
+class ResearchJob:
+    """One research run. done/total count pages; total is None until known."""
+
+    id: str
+    topic: str
+    status: str = "queued"
+    phase: str = "queued"
+    done: int = 0
+    total: int | None = None
+    result: str | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    # Called by the runner to refresh done/total (e.g. from the crawl journal)
+    poll: Callable[[], tuple[int, int | None]] | None = field(default=None, repr=False)
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def set_phase(self, phase: str, poll: Callable[[], tuple[int, int | None]] | None = None) -> None:
+        self.phase = phase
+        self.poll = poll
+
+    def progress(self) -> tuple[int, int | None]:
+        """Current (done, total), refreshed from the runner's poll if it has one."""
+        if self.poll is not None and not self.finished:
+            try:
+                self.done, self.total = self.poll()
+            except Exception as exc:
+                log.debug("Progress poll failed for %s: %s", self.id, exc)
+        return self.done, self.total
+
+    def describe(self) -> str:
+        """One-line status for tool output."""
+        done, total = self.progress()
+        line = f"{self.id} '{self.topic}' [{self.status}]"
+        if not self.finished:
+            line += f" {self.phase}"
+            if done or total:
+                line += f": {done}/{total if total is not None else '?'} pages"
+        elif self.status == "failed":
+            line += f": {self.error}"
+        return line
+
+
+class JobManager:
+    """Runs research jobs as tasks, at most max_running at once."""
+
+    def __init__(self, max_running: int = MAX_RUNNING_JOBS, history: int = JOB_HISTORY):
+        self.max_running = max_running
+        self.history = history
+        self._jobs: dict[str, ResearchJob] = {}
+        self._ids = itertools.count(1)
+        self._slots: asyncio.Semaphore | None = None
+
+    def submit(self, topic: str, run: Callable[[ResearchJob], Awaitable[str]]) -> ResearchJob:
+        """Start run(job) in the background; its return value becomes job.result."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        job = ResearchJob(id=f"r{next(self._ids)}", topic=topic)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        self._prune()
+        return job
+
+    async def _run(self, job: ResearchJob, run: Callable[[ResearchJob], Awaitable[str]]) -> None:
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                job.result = await run(job)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as exc:
+            log.exception("Research job %s failed", job.id)
+            job.status = "failed"
+            job.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            # Take a last reading before the poll is dropped
+            job.progress()
+            job.phase = job.status
+            job.poll = None
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> ResearchJob | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[ResearchJob]:
+        """All known jobs, newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def running(self) -> list[ResearchJob]:
+        return [j for j in self._jobs.values() if not j.finished]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. False if unknown or already finished."""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished or job.task is None:
+            return False
+        job.task.cancel()
+        if job.status == "queued":
+            # A task cancelled before it first runs never reaches _run's handlers
+            job.status = job.phase = "cancelled"
+            job.finished_at = time.time()
+        return True
+
+    async def wait(
+        self,
+        job: ResearchJob,
+        timeout: float,
+        on_progress: Callable[[ResearchJob], Awaitable[None]] | None = None,
+    ) -> bool:
+        """Wait up to timeout seconds for job to finish. True if it did.
+
+        on_progress(job) is awaited every PROGRESS_INTERVAL while waiting.
+        """
+        deadline = time.monotonic() + timeout
+        while not job.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.wait({job.task}, timeout=min(PROGRESS_INTERVAL, remaining))
+            if on_progress is not None and not job.finished:
+                try:
+                    await on_progress(job)
+                except Exception as exc:
+                    log.debug("Progress notification failed for %s: %s", job.id, exc)
+        return True
+
+    async def close(self) -> None:
+        """Cancel every unfinished job and wait for them to stop."""
+        tasks = [j.task for j in self.running() if j.task is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_manager: JobManager | None = None
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
+
+
+async def close_job_manager() -> None:
+    global _manager
+    if _manager is not None:
+        await _manager.close()
+        _manager = None
@@ -0,0 +1,196 @@
+"""Persistent crawl journal for sitemap and research runs.
+
+Each crawl is a job (e.g. "sitemap:<url>") with its frontier of URLs in the
+docs base's .journal.db. URLs move pending -> done/failed as fetches finish
+(or duplicate, for a page that turned out to be one already fetched),
+and done pages are acked once ingested into the knowledge store. If the
+server stops mid-crawl the job stays "running"; the next run of the same
+job skips the sitemap, re-ingests pages that were fetched but never acked,
+and fetches only what's still pending.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+JOURNAL_NAME = ".journal.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    started_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    job_id    TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    seq       INTEGER NOT NULL,
+    state     TEXT NOT NULL DEFAULT 'pending',
+    error     TEXT,
+    ingested  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, url)
+);
+CREATE INDEX IF NOT EXISTS urls_state ON urls (job_id, state);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class CrawlJournal:
+    """Job frontiers and per-URL progress for one docs base."""
+
+    def __init__(self, base: Path | str):
+        self.base = Path(base)
+        self.db_path = self.base / JOURNAL_NAME
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        self.base.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write(self, sql: str, args: tuple = ()) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(sql, args)
+
+    def _touch(self, job_id: str) -> None:
+        self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (_now(), job_id))
+
+    # -- jobs ---------------------------------------------------------------
+
+    def start(self, job_id: str, kind: str, source: str, urls: list[str]) -> None:
+        """Begin (or restart) a job with a fresh frontier. Duplicate URLs collapse."""
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM urls WHERE job_id = ?", (job_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, kind, source, status, started_at, updated_at) "
+                "VALUES (?, ?, ?, 'running', ?, ?)",
+                (job_id, kind, source, now, now),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (job_id, url, seq) VALUES (?, ?, ?)",
+                [(job_id, u, i) for i, u in enumerate(urls)],
+            )
+
+    def finish(self, job_id: str, status: str = "done") -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, _now(), job_id),
+            )
+
+    def get_job(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, source, status, started_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "kind", "source", "status", "started_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def jobs(self) -> list[dict[str, Any]]:
+        """Every job with its URL counts, most recently updated first."""
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(
+                "SELECT id FROM jobs ORDER BY updated_at DESC").fetchall()]
+        return [self.get_job(i) | self.counts(i) for i in ids]
+
+    def remove(self, job_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM urls WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    # -- urls ---------------------------------------------------------------
+
+    def urls(self, job_id: str, state: str = "pending") -> list[str]:
+        """URLs of a job in the given state, in frontier order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM urls WHERE job_id = ? AND state = ? ORDER BY seq",
+                (job_id, state),
+            ).fetchall()
+        return [u for (u,) in rows]
+
+    def unacked(self, job_id: str) -> list[str]:
+        """Fetched pages whose ingest was never acknowledged."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM urls WHERE job_id = ? AND state = 'done' AND ingested = 0 "
+                "ORDER BY seq",
+                (job_id,),
+            ).fetchall()
+        return [u for (u,) in rows]
+
+    def mark(self, job_id: str, url: str, state: str, error: str | None = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE urls SET state = ?, error = ? WHERE job_id = ? AND url = ?",
+                (state, error, job_id, url),
+            )
+            self._touch(job_id)
+
+    def ack(self, job_id: str, url: str) -> None:
+        """Record that a fetched page made it into the knowledge store."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE urls SET ingested = 1 WHERE job_id = ? AND url = ?", (job_id, url))
+            self._touch(job_id)
+
+    def counts(self, job_id: str) -> dict[str, int]:
+        """{total, pending, done, failed, duplicate, ingested} for a job."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*), SUM(ingested) FROM urls WHERE job_id = ? GROUP BY state",
+                (job_id,),
+            ).fetchall()
+        counts = {"total": 0, "pending": 0, "done": 0, "failed": 0, "duplicate": 0,
+                  "ingested": 0}
+        for state, n, ingested in rows:
+            counts[state] = n
+            counts["total"] += n
+            counts["ingested"] += ingested or 0
+        return counts
+
+
+_journals: dict[str, CrawlJournal] = {}
+
+
+def get_journal(base: Path | str) -> CrawlJournal:
+    """Shared journal for a docs base, reopened if its database was deleted."""
+    key = str(Path(base).absolute())
+    j = _journals.get(key)
+    if j is not None and not j.db_path.exists():
+        j.close()
+        j = None
+    if j is None:
+        j = CrawlJournal(base)
+        j.open()
+        _journals[key] = j
+    return j
+
+
+def close_journals() -> None:
+    for j in _journals.values():
+        j.close()
+    _journals.clear()
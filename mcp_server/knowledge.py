@@ -6,10 +6,12 @@ RAG Q&A, timeline retrieval, and incremental indexing.
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
 import logging
 import os
+import threading
 from typing import Any
 
 from mcp.server.fastmcp import Context
@@ -63,11 +65,34 @@ def _project_hash(project_path: str | None = None) -> str:
     return hashlib.sha256(path.encode()).hexdigest()[:16]
 
 
+class _PrecomputedEmbedder:
+    """Embedder that returns vectors computed ahead of time, by text.
+
+    Texts it wasn't given vectors for go to the wrapped embedder, as does
+    everything else (dimension, query embedding).
+    """
+
+    def __init__(self, embedder: Any, texts: list[str], vectors: list):
+        self._embedder = embedder
+        self._vectors = dict(zip(texts, vectors))
+
+    def embed_documents(self, texts: list[str]) -> list:
+        missing = [t for t in texts if t not in self._vectors]
+        if missing:
+            self._vectors.update(zip(missing, self._embedder.embed_documents(missing)))
+        return [self._vectors[t] for t in texts]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._embedder, name)
+
+
 class KnowledgeStore:
     """Per-project knowledge index backed by a memvid .mv2 file.
 
     Wraps memvid_sdk's create/use API. Falls back to lex-only mode
-    when sentence-transformers is unavailable.
+    when sentence-transformers is unavailable. Calls into the .mv2 file are
+    serialized by a lock, so searches can run (in threads) while a
+    background research job writes batches; they see what's committed.
     """
 
     def __init__(self, project_hash: str):
@@ -76,6 +101,7 @@ class KnowledgeStore:
         self.mem = None
         self._embedder = None
         self._embedder_checked = False
+        self._lock = threading.RLock()
 
     @property
     def embedder(self):
@@ -137,8 +163,9 @@ class KnowledgeStore:
             "text": text,
             "metadata": meta,
         }
-        frame_ids = self.mem.put_many([doc], embedder=self.embedder)
-        self.mem.commit()
+        with self._lock:
+            frame_ids = self.mem.put_many([doc], embedder=self.embedder)
+            self.mem.commit()
         return frame_ids
 
     def ingest_many(
@@ -146,6 +173,32 @@ class KnowledgeStore:
         docs: list[dict[str, Any]],
     ) -> list:
         """Batch-ingest documents. Each dict needs at least 'title' and 'text'."""
+        return self.put_embedded(docs)
+
+    def embed_texts(self, texts: list[str]) -> list | None:
+        """Embedding vectors for texts, or None in lex-only mode.
+
+        Lets callers embed off the write path and hand the vectors to
+        put_embedded later.
+        """
+        emb = self.embedder
+        if emb is None:
+            return None
+        return emb.embed_documents(texts)
+
+    def put_embedded(
+        self,
+        docs: list[dict[str, Any]],
+        vectors: list | None = None,
+        *,
+        commit: bool = True,
+    ) -> list:
+        """Add documents, reusing vectors from embed_texts (one per doc's text).
+
+        Documents without a vector are embedded here. With commit=False the
+        frames stay buffered until commit(), so several batches can share
+        one write.
+        """
         self._ensure_open()
         prepared = []
         for d in docs:
@@ -158,10 +211,21 @@ class KnowledgeStore:
                 "text": d["text"],
                 "metadata": meta,
             })
-        frame_ids = self.mem.put_many(prepared, embedder=self.embedder)
-        self.mem.commit()
+        embedder = self.embedder
+        if embedder is not None and vectors is not None:
+            embedder = _PrecomputedEmbedder(embedder, [d["text"] for d in prepared], vectors)
+        with self._lock:
+            frame_ids = self.mem.put_many(prepared, embedder=embedder)
+            if commit:
+                self.mem.commit()
         return frame_ids
 
+    def commit(self) -> None:
+        """Flush frames buffered by put_embedded(commit=False)."""
+        with self._lock:
+            if self.mem is not None:
+                self.mem.commit()
+
     def search(
         self,
         query: str,
@@ -198,7 +262,8 @@ class KnowledgeStore:
         else:
             kwargs["k"] = top_k
 
-        results = self.mem.find(effective_query, **kwargs)
+        with self._lock:
+            results = self.mem.find(effective_query, **kwargs)
         # Post-filter by thread before trimming
         if "hits" in results and thread is not None:
             results["hits"] = [
@@ -223,13 +288,14 @@ class KnowledgeStore:
         When thread is specified, post-filters returned hits by thread.
         """
         self._ensure_open()
-        result = self.mem.ask(
-            question,
-            k=top_k,
-            mode=mode,
-            context_only=context_only,
-            embedder=self.embedder,
-        )
+        with self._lock:
+            result = self.mem.ask(
+                question,
+                k=top_k,
+                mode=mode,
+                context_only=context_only,
+                embedder=self.embedder,
+            )
         if thread is not None and "hits" in result:
             result["hits"] = [
                 h for h in result["hits"]
@@ -318,7 +384,9 @@ def register_knowledge_tools(mcp) -> None:
         """
         try:
             store = get_store(project)
-            results = store.search(query, top_k=top_k, mode=mode, thread=thread)
+            # Off the event loop, so background research jobs keep running
+            results = await asyncio.to_thread(
+                store.search, query, top_k=top_k, mode=mode, thread=thread)
             hits = results.get("hits", [])
             if not hits:
                 return "No results found."
@@ -349,7 +417,8 @@ def register_knowledge_tools(mcp) -> None:
         """
         try:
             store = get_store(project)
-            result = store.ask(
+            result = await asyncio.to_thread(
+                store.ask,
                 question,
                 context_only=context_only,
                 top_k=top_k,
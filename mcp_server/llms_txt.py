@@ -0,0 +1,196 @@
+"""llms.txt / llms-full.txt support for doc discovery.
+
+Many docs sites publish an index for language models at the site root:
+
+    /llms.txt       markdown: a title, a summary, then sections of links
+                    ("- [Name](url): notes") to the pages worth reading
+    /llms-full.txt  the whole documentation concatenated into one markdown file
+
+llms-full.txt replaces a crawl of hundreds of pages with one request: it is
+fetched once, split back into pages at their top-level headings, and each
+page is ingested with its provenance (the file it came from, and the page's
+own URL where the file names one). llms.txt is treated like a sitemap: its
+links are crawled through the journaled crawl and ingest pipeline.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from mcp_server.canonical import canonicalize
+from mcp_server.fetcher import crawl_job, fetch_url
+from mcp_server.pipeline import IngestPipeline
+from mcp_server.scope import CrawlScope
+
+LLMS_FILE = "llms.txt"
+LLMS_FULL_FILE = "llms-full.txt"
+
+# Lines under a page title searched for the page's own URL
+SOURCE_SCAN_LINES = 5
+
+_LIST_ITEM = re.compile(r"^\s*[-*+]\s+")
+_LINK = re.compile(r"\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+[\"'][^)]*[\"'])?\s*\)")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_TITLE = re.compile(r"^#\s+(.+?)\s*#*\s*$")
+_SOURCE = re.compile(r"^\s*(?:source|url):\s*<?(https?://[^\s>]+)>?\s*$", re.IGNORECASE)
+
+
+def llms_urls(base: str) -> list[str]:
+    """The llms-full.txt and llms.txt URLs for a docs root."""
+    base = base.rstrip("/")
+    return [f"{base}/{LLMS_FULL_FILE}", f"{base}/{LLMS_FILE}"]
+
+
+def parse_llms_links(text: str, base_url: str) -> dict[str, str]:
+    """{page URL: link text} for an llms.txt file, in order, without duplicates.
+
+    Only links in list items count (the title and summary may link
+    elsewhere). Relative links resolve against base_url; non-http(s) links
+    are dropped.
+    """
+    links: dict[str, str] = {}
+    seen: set[str] = set()
+    for line in text.splitlines():
+        if not _LIST_ITEM.match(line):
+            continue
+        for title, href in _LINK.findall(line):
+            url = urljoin(base_url, href)
+            if urlsplit(url).scheme not in ("http", "https"):
+                continue
+            key = canonicalize(url)
+            if key not in seen:
+                seen.add(key)
+                links[url] = title
+    return links
+
+
+def parse_llms_txt(text: str, base_url: str) -> list[str]:
+    """Page URLs linked from an llms.txt file (see parse_llms_links)."""
+    return list(parse_llms_links(text, base_url))
+
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "page"
+
+
+def split_llms_full(text: str, source_url: str) -> list[dict[str, Any]]:
+    """Split an llms-full.txt back into its pages.
+
+    A page starts at each top-level "# Title" heading outside code fences.
+    A "Source: <url>" (or "URL: <url>") line just under the title gives the
+    page's own URL; otherwise it's source_url#<title-slug>. Text before the
+    first title becomes a page of its own. Returns [{title, url, text}].
+    """
+    pages: list[dict[str, Any]] = []
+    current: list[str] = []
+    title: str | None = None
+    in_fence = False
+
+    def flush() -> None:
+        body = "".join(current)
+        if body.strip():
+            pages.append({"title": title, "text": body})
+
+    for line in text.splitlines(keepends=True):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        m = None if in_fence else _TITLE.match(line)
+        if m:
+            flush()
+            current, title = [], m.group(1)
+        current.append(line)
+    flush()
+
+    slugs: dict[str, int] = {}
+    default_title = urlsplit(source_url).path.rsplit("/", 1)[-1] or source_url
+    for page in pages:
+        url = None
+        if page["title"] is None:
+            page["title"] = default_title
+        else:
+            for line in page["text"].splitlines()[1:SOURCE_SCAN_LINES + 1]:
+                m = _SOURCE.match(line)
+                if m:
+                    url = m.group(1)
+                    break
+        if url is None:
+            slug = _slug(page["title"])
+            n = slugs.get(slug, 0)
+            slugs[slug] = n + 1
+            url = f"{source_url}#{slug}" if n == 0 else f"{source_url}#{slug}-{n}"
+        page["url"] = url
+    return pages
+
+
+async def fetch_llms_full(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    force: bool = False,
+    store: Any = None,
+) -> dict[str, Any]:
+    """Fetch an llms-full.txt and ingest it page by page.
+
+    The file goes through fetch_url, so it is cached in the docs base like
+    any page. Pages are fed to the ingest pipeline's chunk stage with
+    metadata recording their provenance: url (the page), source (the
+    llms-full.txt), source_kind and page index.
+
+    Returns {pages, bytes, error}, plus pipeline stats when a store was given.
+    """
+    result = await fetch_url(client, url, force=force)
+    if result.get("error"):
+        return {"pages": 0, "bytes": 0, "error": result["error"]}
+    content = result.get("content") or ""
+    source = result.get("canonical_url") or url
+    pages = split_llms_full(content, source)
+    stats: dict[str, Any] = {"pages": len(pages), "bytes": len(content.encode()),
+                             "error": None}
+    if store is None or not pages:
+        return stats
+
+    fetched_at = (result.get("meta") or {}).get("fetched_at")
+    replay = [
+        (page["url"], {
+            "content": page["text"],
+            "doc_path": result.get("doc_path"),
+            "meta": {"url": page["url"], "title": page["title"], "source": source,
+                     "source_kind": "llms-full", "page": i, "fetched_at": fetched_at},
+            "from_cache": result.get("from_cache", False),
+            "error": None,
+        })
+        for i, page in enumerate(pages)
+    ]
+    run = await IngestPipeline(client, store, force=force).run([], replay=replay)
+    stats["pipeline"] = run["pipeline"]
+    return stats
+
+
+async def crawl_llms_txt(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    force: bool = False,
+    store: Any = None,
+    on_page: Callable[[str, dict[str, Any]], Any] | None = None,
+    scope: CrawlScope | None = None,
+) -> dict[str, Any]:
+    """Fetch every page an llms.txt links to, journaled like a sitemap crawl.
+
+    Link texts serve as page titles when a scope ranks the pages. Returns
+    crawl_job's stats.
+    """
+    titles: dict[str, str] = {}
+
+    async def list_pages() -> list[str]:
+        resp = await client.get(url, timeout=30, follow_redirects=True)
+        resp.raise_for_status()
+        titles.update(parse_llms_links(resp.text, url))
+        return list(titles)
+
+    return await crawl_job(client, "llms", url, list_pages, force=force, store=store,
+                           on_page=on_page, scope=scope, titles=titles)
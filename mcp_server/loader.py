@@ -0,0 +1,289 @@
+"""Incremental bulk loading of local files (rlm_load_dir).
+
+Matching files are read and hashed on a thread pool. Each one is compared
+with its catalog row (.claude/docs/local/...): if the source mtime is
+unchanged the file isn't even read, and if only the mtime moved the new
+mtime is recorded without re-ingesting. Changed files are chunked and
+ingested in batches; their raw copy and catalog row are written only after
+the batch is in the store, so a failed ingest is retried on the next load.
+
+Files ignored by .gitignore (the base directory's and any nested ones) or
+by extra ignore patterns are skipped, as are .git/ and the docs cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+from mcp_server import fetcher
+from mcp_server.doc_compression import ZST_SUFFIX
+from mcp_server.pipeline import chunk_markdown
+
+# Threads reading and hashing files
+LOAD_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# Chunks per ingest_many call
+LOAD_BATCH = 64
+
+# Always skipped, whatever the ignore files say
+ALWAYS_IGNORED = (".git/",)
+
+GITIGNORE = ".gitignore"
+
+
+def _translate(pattern: str) -> str:
+    """Regex body for one gitignore glob (no anchoring)."""
+    out: list[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """gitignore-style matcher rooted at a directory.
+
+    Supports comments, !negation, trailing-/ directory patterns, anchored
+    patterns (leading or inner /), *, ?, [...] and **. As in git, the last
+    matching rule wins, a file inside an ignored directory stays ignored,
+    and a nested .gitignore applies below its own directory.
+    """
+
+    def __init__(self, root: Path, patterns: Iterable[str] = (), gitignore: bool = True):
+        self.root = root.absolute()
+        self.gitignore = gitignore
+        # (directory the rule is relative to, regex, negated, directory-only)
+        self._rules: list[tuple[Path, re.Pattern, bool, bool]] = []
+        self._extra: list[tuple[Path, re.Pattern, bool, bool]] = []
+        self._loaded: set[Path] = set()
+        self._cache: dict[Path, bool] = {}
+        self._add(self._extra, list(ALWAYS_IGNORED) + list(patterns), self.root)
+
+    @staticmethod
+    def _add(rules: list, lines: Iterable[str], base: Path) -> None:
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            body = _translate(line.lstrip("/"))
+            regex = re.compile(f"^{body}$" if anchored else f"^(?:.*/)?{body}$")
+            rules.append((base, regex, negate, dir_only))
+
+    def _load_dir(self, directory: Path) -> None:
+        if directory in self._loaded:
+            return
+        self._loaded.add(directory)
+        if not self.gitignore:
+            return
+        f = directory / GITIGNORE
+        if f.is_file():
+            try:
+                self._add(self._rules, f.read_text(errors="replace").splitlines(), directory)
+            except OSError:
+                pass
+
+    def _match(self, rules: list, path: Path, is_dir: bool, state: bool) -> bool:
+        for base, regex, negate, dir_only in rules:
+            if dir_only and not is_dir:
+                continue
+            try:
+                rel = path.relative_to(base).as_posix()
+            except ValueError:
+                continue
+            if regex.match(rel):
+                state = not negate
+        return state
+
+    def _ignored_here(self, path: Path, is_dir: bool) -> bool:
+        state = self._match(self._rules, path, is_dir, False)
+        return self._match(self._extra, path, is_dir, state)
+
+    def ignored(self, path: Path) -> bool:
+        """True if path (a file under root) is ignored."""
+        path = path.absolute()
+        try:
+            parts = path.relative_to(self.root).parts
+        except ValueError:
+            return False
+        current = self.root
+        self._load_dir(current)
+        for part in parts[:-1]:
+            current = current / part
+            cached = self._cache.get(current)
+            if cached is None:
+                cached = self._ignored_here(current, True)
+                self._cache[current] = cached
+            if cached:
+                return True
+            self._load_dir(current)
+        return self._ignored_here(path, False)
+
+
+def _doc_path_for(fpath: Path, base: Path) -> Path:
+    rel = fpath.relative_to(base)
+    doc_path = fetcher.DOCS_BASE / "local" / rel
+    if not doc_path.suffix:
+        doc_path = doc_path.with_suffix(".md")
+    return doc_path
+
+
+def _scan(fpath: Path, doc_path: Path, force: bool) -> dict[str, Any]:
+    """Read and hash one file unless the catalog says it's unchanged. Runs in a thread."""
+    url = f"file://{fpath}"
+    try:
+        mtime = os.stat(fpath if fpath.exists() else fetcher.compressed_path(fpath)).st_mtime
+    except OSError as exc:
+        return {"status": "error", "error": f"{fpath}: {exc}"}
+    meta = None if force else fetcher.read_meta(doc_path)
+    if meta and meta.get("url") == url and meta.get("source_mtime") == mtime:
+        return {"status": "unchanged"}
+    try:
+        content = fetcher.read_doc(fpath)
+    except (OSError, UnicodeDecodeError, ValueError) as exc:
+        return {"status": "error", "error": f"{fpath}: {exc}"}
+    if meta and meta.get("url") == url and meta.get("content_hash") == fetcher._content_hash(content):
+        # Touched but identical: just remember the new mtime
+        catalog = fetcher._catalog_for(doc_path)
+        if catalog is not None:
+            catalog.put(doc_path, meta | {"source_mtime": mtime})
+        return {"status": "unchanged"}
+    return {"status": "changed", "content": content, "mtime": mtime, "url": url}
+
+
+async def load_dir(
+    base: Path,
+    pattern: str,
+    store: Any,
+    *,
+    ignore: Iterable[str] = (),
+    gitignore: bool = True,
+    force: bool = False,
+) -> dict[str, Any]:
+    """Load files under base matching a glob into raw docs and the store.
+
+    Returns {matched, loaded, unchanged, ignored, chunks, batches, bytes,
+    errors}. force=True reloads files even if they're unchanged.
+    """
+    stats: dict[str, Any] = {"matched": 0, "loaded": 0, "unchanged": 0, "ignored": 0,
+                             "chunks": 0, "batches": 0, "bytes": 0, "errors": []}
+    rules = IgnoreRules(base, ignore, gitignore=gitignore)
+    docs_dir = fetcher.DOCS_BASE.absolute()
+    files: dict[Path, Path] = {}
+    for fpath in sorted(base.glob(pattern)):
+        if not fpath.is_file():
+            continue
+        stats["matched"] += 1
+        if fpath.absolute().is_relative_to(docs_dir) or rules.ignored(fpath):
+            stats["ignored"] += 1
+            continue
+        # Compressed docs (e.g. from another cache) load as their .md
+        if fpath.name.endswith(ZST_SUFFIX):
+            fpath = fpath.with_name(fpath.name.removesuffix(ZST_SUFFIX))
+        files.setdefault(fpath, _doc_path_for(fpath, base))
+
+    if not files:
+        return stats
+
+    batch: list[tuple[Path, dict[str, Any], list[dict[str, Any]]]] = []
+    batch_chunks = 0
+
+    def store_files(items: list[tuple[Path, dict[str, Any], list]]) -> None:
+        for fpath, scan, _ in items:
+            fetcher._store_raw(files[fpath], scan["content"], scan["url"],
+                               source_mtime=scan["mtime"])
+
+    async def flush() -> None:
+        nonlocal batch, batch_chunks
+        items, batch, batch_chunks = batch, [], 0
+        if not items:
+            return
+        if store is not None:
+            docs = [d for _, _, chunks in items for d in chunks]
+            try:
+                await asyncio.to_thread(store.ingest_many, docs)
+            except Exception as exc:
+                stats["errors"].extend(f"{f}: ingest failed: {exc}" for f, _, _ in items)
+                return
+            stats["batches"] += 1
+            stats["chunks"] += len(docs)
+        await asyncio.to_thread(store_files, items)
+        stats["loaded"] += len(items)
+        stats["bytes"] += sum(len(scan["content"].encode()) for _, scan, _ in items)
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        futures = [
+            loop.run_in_executor(pool, _scan, fpath, doc_path, force)
+            for fpath, doc_path in files.items()
+        ]
+        for fut in asyncio.as_completed(futures):
+            scan = await fut
+            if scan["status"] == "unchanged":
+                stats["unchanged"] += 1
+                continue
+            if scan["status"] == "error":
+                stats["errors"].append(scan["error"])
+                continue
+            fpath = Path(scan["url"].removeprefix("file://"))
+            pieces = chunk_markdown(scan["content"])
+            chunks = [
+                {
+                    "title": fpath.name,
+                    "label": "local",
+                    "text": text,
+                    "metadata": {"url": scan["url"]} | ({"chunk": i} if len(pieces) > 1 else {}),
+                }
+                for i, text in enumerate(pieces)
+                if text.strip()
+            ]
+            batch.append((fpath, scan, chunks))
+            batch_chunks += len(chunks)
+            if batch_chunks >= LOAD_BATCH:
+                await flush()
+        await flush()
+    return stats
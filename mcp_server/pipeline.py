@@ -0,0 +1,467 @@
+"""Staged ingest pipeline: fetch -> convert -> chunk -> embed -> write.
+
+Each stage runs its own pool of workers and hands items to the next through a
+bounded queue, so the network keeps fetching while earlier pages convert and
+embed, and a slow stage applies backpressure instead of piling up pages in
+memory. The embed stage batches chunks into one embedder call; the write
+stage buffers several batches per store commit.
+
+    fetch    fetch_many(convert=False): cascade + per-host limits + retries
+    convert  finish_page: html2text (process pool for big pages), boilerplate, raw store
+    chunk    split pages into heading-aligned chunks, drop near-duplicates (dedup.py)
+    embed    KnowledgeStore.embed_texts per batch, in a thread
+    write    KnowledgeStore.put_embedded(commit=False) + periodic commit, one writer
+
+stats() reports per-stage counts, busy time, throughput and queue depths,
+live while the pipeline runs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import httpx
+
+from mcp_server import fetcher
+from mcp_server.dedup import NEAR_DUP_ENABLED, get_near_dup_index, store_key
+from mcp_server.fetcher import (
+    CRAWL_WORKERS,
+    _error_result,
+    extract_library_name,
+    fetch_many,
+    finish_page,
+)
+
+log = logging.getLogger(__name__)
+
+# Workers per stage (fetch defaults to the crawl's CRAWL_WORKERS). Conversion
+# of big pages already fans out to the process pool; embedding and writes
+# go through one store handle.
+CONVERT_WORKERS = 4
+CHUNK_WORKERS = 2
+EMBED_WORKERS = 1
+
+# Items each inter-stage queue holds before the producer waits
+QUEUE_SIZE = 64
+
+# Chunks per embedder call, and how long a partial batch waits for more (s)
+EMBED_BATCH = 32
+EMBED_MAX_WAIT = 0.05
+
+# Commit once this many chunks are buffered or this many seconds have passed
+COMMIT_EVERY = 128
+COMMIT_INTERVAL = 2.0
+
+# Pages longer than this (chars) are split at headings, then paragraphs
+CHUNK_MAX_CHARS = 8000
+
+STAGES = ("fetch", "convert", "chunk", "embed", "write")
+
+
+def _is_fence(line: str) -> bool:
+    return line.lstrip().startswith(("```", "~~~"))
+
+
+def _paragraphs(section: str) -> list[str]:
+    """Split a section on blank lines, keeping fenced code blocks whole."""
+    blocks: list[str] = []
+    current: list[str] = []
+    in_fence = False
+    for line in section.split("\n"):
+        if _is_fence(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def chunk_markdown(text: str, max_chars: int = CHUNK_MAX_CHARS) -> list[str]:
+    """Split markdown into chunks of at most ~max_chars, at heading boundaries.
+
+    Consecutive short sections are merged; a section that is too long on its
+    own is split between paragraphs. Lines inside fenced code blocks are
+    never taken for headings or paragraph breaks, so a fence that fits stays
+    in one chunk.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    sections: list[str] = []
+    current: list[str] = []
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if _is_fence(line):
+            in_fence = not in_fence
+        elif line.startswith("#") and current and not in_fence:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+
+    pieces: list[str] = []
+    for section in sections:
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        para = ""
+        for block in _paragraphs(section):
+            if para and len(para) + len(block) + 2 > max_chars:
+                pieces.append(para)
+                para = ""
+            para = f"{para}\n\n{block}" if para else block
+        if para:
+            pieces.append(para)
+
+    chunks: list[str] = []
+    for piece in pieces:
+        # Sections keep their trailing newline; paragraph pieces need one
+        sep = "" if not chunks or chunks[-1].endswith("\n") else "\n"
+        if chunks and len(chunks[-1]) + len(sep) + len(piece) <= max_chars:
+            chunks[-1] += sep + piece
+        else:
+            chunks.append(piece)
+    return [c for c in chunks if c.strip()]
+
+
+@dataclass
+class StageStats:
+    """Counters for one stage. busy is summed across the stage's workers."""
+
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    busy: float = 0.0
+    max_depth: int = 0
+    queue: asyncio.Queue | None = field(default=None, repr=False)
+
+    def snapshot(self, elapsed: float) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_sec": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "busy_s": round(self.busy, 3),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_depth,
+        }
+
+
+class IngestPipeline:
+    """Fetch pages and ingest them into a KnowledgeStore, one stage per resource.
+
+    on_fetched(url, result) is called once per URL after conversion (result
+    carries error or duplicate like fetch_many's); on_written(url) once its
+    chunks are committed to the store. Either may be sync or async.
+
+    With near_dup, chunks that nearly match one already in the store under
+    another URL are not embedded or written, only linked to it (dedup.py).
+    A page whose chunks are all duplicates counts as written.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        store: Any,
+        *,
+        force: bool = False,
+        fetch_workers: int = CRAWL_WORKERS,
+        convert_workers: int = CONVERT_WORKERS,
+        chunk_workers: int = CHUNK_WORKERS,
+        embed_workers: int = EMBED_WORKERS,
+        embed_batch: int = EMBED_BATCH,
+        commit_every: int = COMMIT_EVERY,
+        commit_interval: float = COMMIT_INTERVAL,
+        queue_size: int = QUEUE_SIZE,
+        near_dup: bool = NEAR_DUP_ENABLED,
+    ):
+        self.client = client
+        self.store = store
+        self.force = force
+        self.embed_batch = embed_batch
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.queue_size = queue_size
+        workers = (fetch_workers, convert_workers, chunk_workers, embed_workers, 1)
+        self._stages = {name: StageStats(max(1, n)) for name, n in zip(STAGES, workers)}
+        self.near_dup = near_dup
+        self.commits = 0
+        self.batches = 0
+        # Near-duplicate chunks skipped, their size, and pages skipped whole
+        self.dup_chunks = 0
+        self.dup_bytes = 0
+        self.dup_pages = 0
+        self._started = 0.0
+        self._finished = 0.0
+
+    # -- observability ------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        """Per-stage counters plus batch/commit totals. Safe to call mid-run."""
+        end = self._finished or time.monotonic()
+        elapsed = end - self._started if self._started else 0.0
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "batches": self.batches,
+            "commits": self.commits,
+            "near_duplicates": {"chunks": self.dup_chunks, "bytes": self.dup_bytes,
+                                "pages": self.dup_pages},
+            "stages": {name: st.snapshot(elapsed) for name, st in self._stages.items()},
+        }
+
+    async def _put(self, stage: str, item: Any) -> None:
+        st = self._stages[stage]
+        await st.queue.put(item)
+        st.max_depth = max(st.max_depth, st.queue.qsize())
+
+    # -- run ----------------------------------------------------------------
+
+    async def run(
+        self,
+        urls: list[str],
+        *,
+        replay: list[tuple[str, dict[str, Any]]] | None = None,
+        on_fetched: Callable[[str, dict[str, Any]], Any] | None = None,
+        on_written: Callable[[str], Any] | None = None,
+        stop: Callable[[], bool] | None = None,
+    ) -> dict[str, Any]:
+        """Fetch and ingest urls; replay (url, result) pairs skip to the chunk stage.
+
+        stop is passed to fetch_many: once it returns True no more URLs are
+        fetched. Returns fetch_many's {fetched, failed, retried, duplicates,
+        skipped, errors} plus written (pages committed) and pipeline (stats()).
+        """
+        self._started = time.monotonic()
+        self._finished = 0.0
+        self.dup_chunks = self.dup_bytes = self.dup_pages = 0
+        dedup = get_near_dup_index(fetcher.DOCS_BASE) if self.near_dup else None
+        key = store_key(self.store)
+        for name in STAGES[1:]:
+            self._stages[name].queue = asyncio.Queue(self.queue_size)
+        written: list[str] = []
+
+        async def notify(cb: Callable | None, *args: Any) -> None:
+            if cb is None:
+                return
+            try:
+                ret = cb(*args)
+                if inspect.isawaitable(ret):
+                    await ret
+            except Exception as exc:
+                log.warning("Pipeline callback failed for %s: %s", args[0], exc)
+
+        async def fetched(url: str, result: dict[str, Any]) -> None:
+            st = self._stages["fetch"]
+            if result.get("error"):
+                st.failed += 1
+            else:
+                st.processed += 1
+            await self._put("convert", (url, result))
+
+        async def convert_worker() -> None:
+            st = self._stages["convert"]
+            while (item := await st.queue.get()) is not None:
+                url, result = item
+                if result.get("error") is None and not result.get("duplicate"):
+                    t0 = time.monotonic()
+                    try:
+                        result = await finish_page(result)
+                        st.processed += 1
+                    except Exception as exc:
+                        log.warning("Convert failed for %s: %s", url, exc)
+                        result = _error_result(result.get("doc_path"),
+                                               f"{type(exc).__name__}: {exc}")
+                        st.failed += 1
+                    st.busy += time.monotonic() - t0
+                await notify(on_fetched, url, result)
+                if result.get("error") is None and not result.get("duplicate"):
+                    await self._put("chunk", (url, result))
+
+        async def chunk_worker() -> None:
+            st = self._stages["chunk"]
+            while (item := await st.queue.get()) is not None:
+                url, result = item
+                t0 = time.monotonic()
+                pieces = chunk_markdown(result["content"] or "")
+                meta = result.get("meta") or {}
+                docs = [
+                    {
+                        "title": url,
+                        "label": extract_library_name(url),
+                        "text": text,
+                        "metadata": meta if len(pieces) == 1 else meta | {"chunk": i},
+                    }
+                    for i, text in enumerate(pieces)
+                ]
+                if dedup is not None and docs:
+                    try:
+                        matches = await asyncio.to_thread(
+                            dedup.check_page, key, url, [d["text"] for d in docs])
+                    except Exception as exc:
+                        log.warning("Near-duplicate check failed for %s: %s", url, exc)
+                        matches = [None] * len(docs)
+                    dups = [d for d, m in zip(docs, matches) if m is not None]
+                    self.dup_chunks += len(dups)
+                    self.dup_bytes += sum(len(d["text"].encode()) for d in dups)
+                    if dups and len(dups) == len(docs):
+                        self.dup_pages += 1
+                        written.append(url)
+                        await notify(on_written, url)
+                    docs = [d for d, m in zip(docs, matches) if m is None]
+                st.busy += time.monotonic() - t0
+                st.processed += 1
+                if docs:
+                    await self._put("embed", (url, docs))
+
+        async def embed_worker() -> None:
+            st = self._stages["embed"]
+            done = False
+            while not done:
+                item = await st.queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                size = len(item[1])
+                deadline = time.monotonic() + EMBED_MAX_WAIT
+                while size < self.embed_batch:
+                    try:
+                        item = await asyncio.wait_for(
+                            st.queue.get(), max(deadline - time.monotonic(), 0))
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    batch.append(item)
+                    size += len(item[1])
+
+                docs = [d for _, page_docs in batch for d in page_docs]
+                t0 = time.monotonic()
+                try:
+                    vectors = await asyncio.to_thread(
+                        self.store.embed_texts, [d["text"] for d in docs])
+                except Exception as exc:
+                    # The write stage embeds (or goes lex-only) instead
+                    log.warning("Batch embedding failed, deferring to write: %s", exc)
+                    vectors = None
+                    st.failed += len(batch)
+                st.busy += time.monotonic() - t0
+                st.processed += len(batch)
+                self.batches += 1
+                await self._put("write", ([url for url, _ in batch], docs, vectors))
+
+        def forget(urls_out: list[str]) -> None:
+            # Chunks that never reached the store mustn't stand in for later copies
+            if dedup is not None:
+                try:
+                    dedup.forget(key, urls_out)
+                except Exception as exc:
+                    log.warning("Near-duplicate cleanup failed: %s", exc)
+
+        async def write_worker() -> None:
+            st = self._stages["write"]
+            pending: list[str] = []
+            buffered = 0
+            last_commit = time.monotonic()
+
+            async def commit() -> None:
+                nonlocal pending, buffered, last_commit
+                if pending:
+                    t0 = time.monotonic()
+                    try:
+                        await asyncio.to_thread(self.store.commit)
+                        self.commits += 1
+                        for url in pending:
+                            written.append(url)
+                            await notify(on_written, url)
+                        st.processed += len(pending)
+                    except Exception as exc:
+                        log.warning("Store commit failed: %s", exc)
+                        st.failed += len(pending)
+                        forget(pending)
+                    st.busy += time.monotonic() - t0
+                pending, buffered = [], 0
+                last_commit = time.monotonic()
+
+            while (item := await st.queue.get()) is not None:
+                urls_in, docs, vectors = item
+                t0 = time.monotonic()
+                try:
+                    await asyncio.to_thread(
+                        self.store.put_embedded, docs, vectors, commit=False)
+                    pending.extend(urls_in)
+                    buffered += len(docs)
+                except Exception as exc:
+                    log.warning("Store write failed for %d pages: %s", len(urls_in), exc)
+                    st.failed += len(urls_in)
+                    forget(urls_in)
+                st.busy += time.monotonic() - t0
+                if (buffered >= self.commit_every
+                        or time.monotonic() - last_commit >= self.commit_interval):
+                    await commit()
+            await commit()
+
+        stage_workers = {
+            "convert": convert_worker,
+            "chunk": chunk_worker,
+            "embed": embed_worker,
+            "write": write_worker,
+        }
+        tasks = {
+            name: [asyncio.create_task(fn()) for _ in range(self._stages[name].workers)]
+            for name, fn in stage_workers.items()
+        }
+        try:
+            for url, result in replay or []:
+                await self._put("chunk", (url, result))
+            crawl = await fetch_many(
+                self.client, urls, force=self.force, on_result=fetched,
+                workers=self._stages["fetch"].workers, convert=False, stop=stop,
+            )
+            # Drain stage by stage: one sentinel per worker of each stage
+            for name in STAGES[1:]:
+                for _ in tasks[name]:
+                    await self._stages[name].queue.put(None)
+                await asyncio.gather(*tasks[name])
+        finally:
+            for ts in tasks.values():
+                for t in ts:
+                    t.cancel()
+            await asyncio.gather(*(t for ts in tasks.values() for t in ts),
+                                 return_exceptions=True)
+            self._finished = time.monotonic()
+
+        stats = self.stats()
+        log.info("Ingest pipeline: %s", {
+            name: (s["processed"], s["per_sec"], s["max_queue_depth"])
+            for name, s in stats["stages"].items()
+        })
+        return crawl | {"written": len(written), "pipeline": stats}
+
+
+def format_stats(stats: dict[str, Any]) -> list[str]:
+    """One line per stage for tool output."""
+    lines = []
+    for name, s in stats["stages"].items():
+        lines.append(
+            f"{name:<8} {s['processed']:>5} done {s['failed']:>3} failed "
+            f"{s['per_sec']:>7}/s  busy {s['busy_s']}s  "
+            f"queue max {s['max_queue_depth']} (x{s['workers']} workers)"
+        )
+    lines.append(f"{stats['batches']} embed batches, {stats['commits']} commits "
+                 f"in {stats['elapsed_s']}s")
+    dups = stats.get("near_duplicates") or {}
+    if dups.get("chunks"):
+        lines.append(f"near-duplicates skipped: {dups['chunks']} chunks "
+                     f"({dups['bytes'] / 1024:.1f} KB), {dups['pages']} whole pages")
+    return lines
@@ -0,0 +1,188 @@
+"""Per-host adaptive rate limiting for doc fetches.
+
+Each host gets a HostLimiter that caps concurrent requests with AIMD: the
+limit grows by ~1 per limit's worth of successes and halves on 429/503.
+Throttle responses also pause the host -- for Retry-After when the server
+sends one, otherwise an exponential backoff. Consecutive server errors or
+connection failures trip a circuit breaker that pauses the host for a
+cooldown, then lets a single probe request through (half-open) before
+reopening the full limit.
+
+Limiters poll instead of using asyncio primitives so one registry works
+across event loops (the CLI scripts and tests each run their own).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator
+
+# Concurrent requests per host: starting point and bounds
+INITIAL_CONCURRENCY = 2.0
+MIN_CONCURRENCY = 1.0
+MAX_CONCURRENCY = 8.0
+
+# Pause after a throttle response without Retry-After (doubles per repeat)
+THROTTLE_BACKOFF = 1.0
+MAX_BACKOFF = 120.0
+
+# Retry-After values beyond this are clamped
+MAX_RETRY_AFTER = 600.0
+
+# Consecutive failures that open the breaker, and the first cooldown
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+MAX_BREAKER_COOLDOWN = 600.0
+
+# Callers wait out throttle pauses up to this long; longer ones (and any
+# open breaker) raise HostPaused so crawls can requeue instead of stalling
+MAX_INLINE_WAIT = 5.0
+
+# How often a saturated host is re-checked for a free slot
+_POLL_INTERVAL = 0.02
+
+# Status codes that mean "slow down" rather than "broken"
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class HostPaused(Exception):
+    """The host is paused for longer than the caller is willing to wait."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"{host} paused for {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    """AIMD concurrency limit, pause window and circuit breaker for one host."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.limit = INITIAL_CONCURRENCY
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.failures = 0
+        self.throttles = 0
+        self.breaker_open = False
+        self.cooldown = BREAKER_COOLDOWN
+
+    @property
+    def capacity(self) -> int:
+        """Requests allowed in flight right now (1 while half-open)."""
+        if self.breaker_open:
+            return 1
+        return max(int(self.limit), 1)
+
+    def paused_for(self) -> float:
+        """Seconds until the host accepts requests again (0 if it does now)."""
+        return max(self.paused_until - time.monotonic(), 0.0)
+
+    async def acquire(self, max_wait: float = MAX_INLINE_WAIT) -> None:
+        """Wait for a request slot. Raises HostPaused if the pause is too long."""
+        while True:
+            wait = self.paused_for()
+            if wait > max_wait or (wait > 0 and self.breaker_open):
+                raise HostPaused(self.host, wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            if self.in_flight < self.capacity:
+                self.in_flight += 1
+                return
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    def release(self) -> None:
+        self.in_flight = max(self.in_flight - 1, 0)
+
+    @asynccontextmanager
+    async def slot(self, max_wait: float = MAX_INLINE_WAIT) -> AsyncIterator[None]:
+        await self.acquire(max_wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_response(self, status: int, retry_after: str | None = None) -> None:
+        """Feed back an HTTP status: 429/503 throttle, 5xx fail, others succeed."""
+        if status in THROTTLE_STATUSES:
+            self.record_throttle(parse_retry_after(retry_after))
+        elif status >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self) -> None:
+        self.limit = min(self.limit + 1.0 / self.limit, MAX_CONCURRENCY)
+        self.failures = 0
+        self.throttles = 0
+        if self.breaker_open:
+            self.breaker_open = False
+            self.cooldown = BREAKER_COOLDOWN
+
+    def record_throttle(self, retry_after: float | None = None) -> None:
+        self.limit = max(self.limit / 2, MIN_CONCURRENCY)
+        self.throttles += 1
+        if retry_after is None:
+            retry_after = min(THROTTLE_BACKOFF * 2 ** (self.throttles - 1), MAX_BACKOFF)
+        self._pause(retry_after)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.breaker_open:
+            # Half-open probe failed: back off harder
+            self.cooldown = min(self.cooldown * 2, MAX_BREAKER_COOLDOWN)
+            self._pause(self.cooldown)
+        elif self.failures >= BREAKER_THRESHOLD:
+            self.breaker_open = True
+            self._pause(self.cooldown)
+
+    def _pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "paused_for": round(self.paused_for(), 1),
+            "breaker_open": self.breaker_open,
+        }
+
+
+_limiters: dict[str, HostLimiter] = {}
+
+
+def get_limiter(host: str) -> HostLimiter:
+    """Shared limiter for a host."""
+    limiter = _limiters.get(host)
+    if limiter is None:
+        limiter = HostLimiter(host)
+        _limiters[host] = limiter
+    return limiter
+
+
+def reset_limiters() -> None:
+    """Forget all host state."""
+    _limiters.clear()
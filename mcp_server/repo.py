@@ -0,0 +1,325 @@
+"""Bulk ingestion of a GitHub repository's docs from one archive (rlm_fetch_repo).
+
+Fetching a repo's docs page by page from raw.githubusercontent.com costs a
+request per file. Instead the repository tarball is downloaded once -- into
+a spooled temp file, never extracted -- and read member by member in
+streaming mode. Files matching the selection globs are kept: markdown and
+reStructuredText as-is, Python sources reduced to their docstrings. Those
+are chunked and ingested in batches under the repo's org-repo label, and
+stored as raw docs under .claude/docs/org-repo/.
+
+A local archive can stand in for the download (archive=...), which is also
+how the tests drive it.
+"""
+
+from __future__ import annotations
+
+import ast
+import asyncio
+import logging
+import re
+import tarfile
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Iterable, Iterator
+from urllib.parse import urlparse
+
+import httpx
+
+from mcp_server import fetcher
+from mcp_server.loader import _translate
+from mcp_server.pipeline import chunk_markdown
+from mcp_server.ratelimit import get_limiter
+
+log = logging.getLogger(__name__)
+
+# Files picked out of the archive unless the caller passes its own globs
+DEFAULT_REPO_PATTERNS = ("**/*.md", "**/*.mdx", "**/*.rst", "**/*.py")
+
+# Skipped whatever the selection says
+DEFAULT_REPO_IGNORE = ("node_modules/", "vendor/", ".github/", "site-packages/")
+
+# Archive members larger than this (bytes) are skipped
+REPO_MAX_FILE_BYTES = 1024 * 1024
+
+# Give up on archives larger than this (bytes)
+REPO_MAX_ARCHIVE_BYTES = 512 * 1024 * 1024
+
+# Archive bytes held in memory before the spool moves to a temp file
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Chunks per ingest_many call
+REPO_BATCH = 64
+
+ARCHIVE_URL = "https://api.github.com/repos/{org}/{repo}/tarball"
+
+
+def parse_repo(spec: str) -> tuple[str, str, str | None]:
+    """(org, repo, ref) from "org/repo", "org/repo@ref" or a github.com URL.
+
+    URLs may point at a tree: https://github.com/org/repo/tree/<ref>.
+    Raises ValueError for anything else.
+    """
+    spec = spec.strip()
+    ref = None
+    if "://" in spec:
+        parsed = urlparse(spec)
+        if parsed.hostname not in ("github.com", "www.github.com"):
+            raise ValueError(f"Not a GitHub repository URL: {spec}")
+        parts = parsed.path.strip("/").split("/")
+        if len(parts) >= 4 and parts[2] == "tree":
+            ref = "/".join(parts[3:])
+        parts = parts[:2]
+    else:
+        if "@" in spec:
+            spec, ref = spec.split("@", 1)
+        parts = spec.strip("/").split("/")
+    if len(parts) != 2 or not all(parts):
+        raise ValueError(f"Expected org/repo, got: {spec}")
+    org, repo = parts
+    return org, repo.removesuffix(".git"), ref or None
+
+
+def _compile(patterns: Iterable[str]) -> list[re.Pattern]:
+    """gitignore-style globs (see loader.IgnoreRules) as regexes over archive paths."""
+    regexes = []
+    for pattern in patterns:
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            continue
+        body = _translate(pattern.lstrip("/"))
+        if dir_only:
+            body += "/.*"
+        anchored = "/" in pattern
+        regexes.append(re.compile(f"^{body}$" if anchored else f"^(?:.*/)?{body}$"))
+    return regexes
+
+
+def extract_docstrings(source: str, path: str) -> str | None:
+    """Markdown made of a Python file's module, class and function docstrings.
+
+    Private names are skipped (dunder methods are kept). Returns None if the
+    file has no docstrings or doesn't parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    sections: list[str] = []
+    module_doc = ast.get_docstring(tree)
+    if module_doc:
+        sections.append(module_doc)
+
+    def public(name: str) -> bool:
+        return not name.startswith("_") or (name.startswith("__") and name.endswith("__"))
+
+    def visit(body: list[ast.stmt], prefix: str) -> None:
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and public(node.name):
+                doc = ast.get_docstring(node)
+                if doc:
+                    sections.append(f"## def {prefix}{node.name}({ast.unparse(node.args)})\n\n{doc}")
+            elif isinstance(node, ast.ClassDef) and public(node.name):
+                doc = ast.get_docstring(node)
+                if doc:
+                    sections.append(f"## class {prefix}{node.name}\n\n{doc}")
+                visit(node.body, f"{prefix}{node.name}.")
+
+    visit(tree.body, "")
+    if not sections:
+        return None
+    return f"# {path}\n\n" + "\n\n".join(sections) + "\n"
+
+
+def iter_archive(
+    fileobj: IO[bytes],
+    patterns: Iterable[str] = DEFAULT_REPO_PATTERNS,
+    ignore: Iterable[str] = DEFAULT_REPO_IGNORE,
+    stats: dict[str, Any] | None = None,
+) -> Iterator[tuple[str, str]]:
+    """Yield (path, markdown) for selected files of a tar(.gz) archive.
+
+    The archive is read sequentially (tarfile stream mode), so nothing is
+    extracted and members are visited once. The top-level directory GitHub
+    wraps a tarball in is dropped from paths. Only regular files are read,
+    and members with absolute paths or ".." parts are skipped so nothing is
+    stored outside the docs directory. Counters for matched, too
+    large and docstring-less files go into stats if given.
+    """
+    select, skip = _compile(patterns), _compile(ignore)
+    stats = stats if stats is not None else {}
+    for key in ("matched", "too_large", "no_docs"):
+        stats.setdefault(key, 0)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            parts = member.name.split("/", 1)
+            if len(parts) < 2 or not parts[1]:
+                continue
+            rel = PurePosixPath(parts[1])
+            if rel.is_absolute() or ".." in rel.parts:
+                log.warning("Skipping unsafe archive member: %s", member.name)
+                continue
+            path = rel.as_posix()
+            if not any(r.match(path) for r in select) or any(r.match(path) for r in skip):
+                continue
+            stats["matched"] += 1
+            if member.size > REPO_MAX_FILE_BYTES:
+                stats["too_large"] += 1
+                continue
+            f = tar.extractfile(member)
+            if f is None:
+                continue
+            text = f.read().decode("utf-8", errors="replace")
+            if path.endswith(".py"):
+                text = extract_docstrings(text, path)
+                if text is None:
+                    stats["no_docs"] += 1
+                    continue
+            if text.strip():
+                yield path, text
+
+
+async def download_archive(client: httpx.AsyncClient, url: str) -> IO[bytes]:
+    """Stream an archive into a spooled temp file (memory, then disk). Caller closes it.
+
+    Raises httpx errors, or ValueError past REPO_MAX_ARCHIVE_BYTES.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    limiter = get_limiter(urlparse(url).hostname or "")
+    try:
+        async with limiter.slot():
+            async with client.stream("GET", url, timeout=60, follow_redirects=True) as resp:
+                limiter.record_response(resp.status_code, resp.headers.get("retry-after"))
+                resp.raise_for_status()
+                size = 0
+                async for chunk in resp.aiter_bytes():
+                    size += len(chunk)
+                    if size > REPO_MAX_ARCHIVE_BYTES:
+                        raise ValueError(
+                            f"Archive larger than {REPO_MAX_ARCHIVE_BYTES} bytes: {url}")
+                    spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def _doc_path(label: str, path: str) -> Path:
+    # Non-markdown files keep their extension so foo.rst and foo.md don't collide
+    return fetcher.DOCS_BASE / label / (path if path.endswith(".md") else f"{path}.md")
+
+
+async def fetch_repo(
+    client: httpx.AsyncClient,
+    spec: str,
+    store: Any,
+    *,
+    archive: str | Path | None = None,
+    patterns: Iterable[str] | None = None,
+    ignore: Iterable[str] | None = None,
+    force: bool = False,
+) -> dict[str, Any]:
+    """Download a repo archive (or open a local one) and ingest its docs.
+
+    Files whose stored copy has the same content hash are skipped unless
+    force=True; the raw copy of a file is written only once its chunks are
+    in the store. Returns {repo, label, ref, archive_bytes, matched, loaded,
+    unchanged, too_large, no_docs, chunks, batches, bytes, errors, error};
+    error is set when the archive couldn't be fetched or read.
+    """
+    stats: dict[str, Any] = {"repo": spec, "label": None, "ref": None, "archive_bytes": 0,
+                             "matched": 0, "loaded": 0, "unchanged": 0, "too_large": 0,
+                             "no_docs": 0, "chunks": 0, "batches": 0, "bytes": 0,
+                             "errors": [], "error": None}
+    try:
+        org, repo, ref = parse_repo(spec)
+    except ValueError as exc:
+        stats["error"] = str(exc)
+        return stats
+    label = f"{org}-{repo}"
+    stats.update(repo=f"{org}/{repo}", label=label, ref=ref or "HEAD")
+    blob_base = f"https://github.com/{org}/{repo}/blob/{ref or 'HEAD'}"
+
+    try:
+        if archive is not None:
+            fileobj: IO[bytes] = open(archive, "rb")
+        else:
+            url = ARCHIVE_URL.format(org=org, repo=repo) + (f"/{ref}" if ref else "")
+            fileobj = await download_archive(client, url)
+    except (OSError, ValueError, httpx.HTTPError) as exc:
+        stats["error"] = f"{type(exc).__name__}: {exc}"
+        return stats
+
+    def select() -> list[tuple[str, str]]:
+        """Read the archive and keep changed files. Runs in a thread."""
+        fileobj.seek(0, 2)
+        stats["archive_bytes"] = fileobj.tell()
+        fileobj.seek(0)
+        changed = []
+        for path, text in iter_archive(fileobj, patterns or DEFAULT_REPO_PATTERNS,
+                                       DEFAULT_REPO_IGNORE if ignore is None else ignore,
+                                       stats):
+            meta = None if force else fetcher.read_meta(_doc_path(label, path))
+            if meta and meta.get("content_hash") == fetcher._content_hash(text):
+                stats["unchanged"] += 1
+                continue
+            changed.append((path, text))
+        return changed
+
+    try:
+        files = await asyncio.to_thread(select)
+    except (tarfile.TarError, OSError, EOFError) as exc:
+        stats["error"] = f"Unreadable archive: {exc}"
+        return stats
+    finally:
+        fileobj.close()
+
+    batch: list[tuple[str, str]] = []
+    batch_docs: list[dict[str, Any]] = []
+
+    def store_files(items: list[tuple[str, str]]) -> None:
+        for path, text in items:
+            fetcher._store_raw(_doc_path(label, path), text, f"{blob_base}/{path}",
+                               markdown_source="repo_archive")
+
+    async def flush() -> None:
+        nonlocal batch, batch_docs
+        items, docs, batch, batch_docs = batch, batch_docs, [], []
+        if not items:
+            return
+        if store is not None:
+            try:
+                await asyncio.to_thread(store.ingest_many, docs)
+            except Exception as exc:
+                stats["errors"].extend(f"{p}: ingest failed: {exc}" for p, _ in items)
+                return
+            stats["batches"] += 1
+            stats["chunks"] += len(docs)
+        await asyncio.to_thread(store_files, items)
+        stats["loaded"] += len(items)
+        stats["bytes"] += sum(len(text.encode()) for _, text in items)
+
+    for path, text in files:
+        pieces = chunk_markdown(text)
+        url = f"{blob_base}/{path}"
+        batch.append((path, text))
+        batch_docs.extend(
+            {
+                "title": url,
+                "label": label,
+                "text": piece,
+                "metadata": {"url": url, "repo": f"{org}/{repo}", "path": path,
+                             "ref": stats["ref"]} | ({"chunk": i} if len(pieces) > 1 else {}),
+            }
+            for i, piece in enumerate(pieces)
+            if piece.strip()
+        )
+        if len(batch_docs) >= REPO_BATCH:
+            await flush()
+    await flush()
+    return stats
@@ -1,13 +1,17 @@
 """Compound research tool and knowledge management MCP tools.
 
 Wires the memvid knowledge store into orchestration workflows:
-- rlm_research(topic) — find docs, fetch, index
+- rlm_research(topic) — find docs (llms.txt, sitemap or page), fetch, index,
+  as a background job
+- rlm_research_status() / rlm_research_cancel() — follow or stop research jobs
 - rlm_knowledge_status() — show what's indexed
 - rlm_knowledge_clear() — wipe the .mv2 index
+- rlm_crawl_status() — progress of journaled sitemap and llms.txt crawls
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -15,13 +19,21 @@ from typing import Any
 
 from mcp.server.fastmcp import Context
 
+from mcp_server.catalog import get_catalog
+from mcp_server.dedup import clear_store, store_key
 from mcp_server.fetcher import (
+    crawl_sitemap,
     extract_library_name,
     fetch_url,
-    parse_sitemap_xml,
+    read_doc,
     DOCS_BASE,
 )
+from mcp_server.jobs import ResearchJob, get_job_manager
+from mcp_server.journal import get_journal
 from mcp_server.knowledge import KnowledgeStore, get_store, _project_hash, _stores
+from mcp_server.llms_txt import crawl_llms_txt, fetch_llms_full, llms_urls
+from mcp_server.resolver import candidate_kind, discover_doc_root, get_resolution_cache
+from mcp_server.scope import CrawlScope, research_scope
 
 log = logging.getLogger(__name__)
 
@@ -64,20 +76,23 @@ def _resolve_doc_urls(topic: str) -> list[str]:
     """Map a topic name to likely documentation URLs.
 
     Checks the known mapping first, then falls back to common patterns
-    (docs.X.com, X.dev, X.readthedocs.io, docs.X.io).
+    (docs.X.com, X.dev, X.readthedocs.io, docs.X.io). Each root contributes
+    its llms-full.txt and llms.txt, listed ahead of the sitemaps.
     """
     topic_lower = topic.lower().strip()
 
     if topic_lower in KNOWN_DOCS:
         base = KNOWN_DOCS[topic_lower]
-        return [f"{base}/sitemap.xml", base]
+        return [*llms_urls(base), f"{base}/sitemap.xml", base]
 
-    return [
-        f"https://docs.{topic_lower}.com/sitemap.xml",
-        f"https://{topic_lower}.dev/sitemap.xml",
-        f"https://{topic_lower}.readthedocs.io/sitemap.xml",
-        f"https://docs.{topic_lower}.io/sitemap.xml",
+    roots = [
+        f"https://docs.{topic_lower}.com",
+        f"https://{topic_lower}.dev",
+        f"https://{topic_lower}.readthedocs.io",
+        f"https://docs.{topic_lower}.io",
     ]
+    llms = [u for root in roots for u in llms_urls(root)]
+    return llms + [f"{root}/sitemap.xml" for root in roots]
 
 
 # ---------------------------------------------------------------------------
@@ -85,10 +100,10 @@ def _resolve_doc_urls(topic: str) -> list[str]:
 # ---------------------------------------------------------------------------
 
 
-def _try_ingest(store: KnowledgeStore | None, url: str, result: dict[str, Any]) -> None:
-    """Ingest fetched content into the knowledge store, if available."""
+def _try_ingest(store: KnowledgeStore | None, url: str, result: dict[str, Any]) -> bool:
+    """Ingest fetched content into the knowledge store, if available. True on success."""
     if store is None or not result.get("content"):
-        return
+        return False
     try:
         store.ingest(
             title=url,
@@ -98,6 +113,8 @@ def _try_ingest(store: KnowledgeStore | None, url: str, result: dict[str, Any])
         )
     except Exception as exc:
         log.warning("Ingest failed for %s: %s", url, exc)
+        return False
+    return True
 
 
 async def _fetch_sitemap(
@@ -106,35 +123,58 @@ async def _fetch_sitemap(
     store: KnowledgeStore | None,
     *,
     force: bool = False,
+    scope: CrawlScope | None = None,
 ) -> dict[str, int]:
-    """Fetch a sitemap and all pages listed in it. Returns {fetched, failed}."""
-    import asyncio
+    """Fetch a sitemap and the pages listed in it. Returns {fetched, failed}.
 
-    try:
-        resp = await http_client.get(sitemap_url, timeout=30, follow_redirects=True)
-        resp.raise_for_status()
-    except Exception as exc:
-        log.warning("Sitemap fetch failed for %s: %s", sitemap_url, exc)
+    The crawl is journaled, so a run interrupted partway resumes from where
+    it stopped, and pages are ingested through the staged pipeline (see
+    crawl_sitemap). scope narrows and orders the pages (see scope.py).
+    """
+    crawl = await crawl_sitemap(http_client, sitemap_url, force=force, store=store, scope=scope)
+    if crawl["error"]:
+        log.warning("Sitemap fetch failed for %s: %s", sitemap_url, crawl["error"])
         return {"fetched": 0, "failed": 1}
+    return {"fetched": crawl["fetched"], "failed": crawl["failed"]}
 
-    urls = parse_sitemap_xml(resp.text)
-    if not urls:
-        return {"fetched": 0, "failed": 0}
 
-    fetched = 0
-    failed = 0
+async def _fetch_llms_txt(
+    http_client: Any,
+    llms_url: str,
+    store: KnowledgeStore | None,
+    *,
+    force: bool = False,
+    scope: CrawlScope | None = None,
+) -> dict[str, int]:
+    """Fetch the pages linked from an llms.txt. Returns {fetched, failed}."""
+    crawl = await crawl_llms_txt(http_client, llms_url, force=force, store=store, scope=scope)
+    if crawl["error"]:
+        log.warning("llms.txt fetch failed for %s: %s", llms_url, crawl["error"])
+        return {"fetched": 0, "failed": 1}
+    return {"fetched": crawl["fetched"], "failed": crawl["failed"]}
 
-    for page_url in urls:
-        result = await fetch_url(http_client, page_url, force=force)
-        if result.get("error"):
-            failed += 1
-        else:
-            fetched += 1
-            _try_ingest(store, page_url, result)
 
-        await asyncio.sleep(0.1)  # rate limit
+async def _fetch_llms_full(
+    http_client: Any,
+    llms_url: str,
+    store: KnowledgeStore | None,
+    *,
+    force: bool = False,
+) -> dict[str, int]:
+    """Fetch an llms-full.txt and ingest its pages. Returns {fetched, failed}."""
+    result = await fetch_llms_full(http_client, llms_url, force=force, store=store)
+    if result["error"]:
+        log.warning("llms-full.txt fetch failed for %s: %s", llms_url, result["error"])
+        return {"fetched": 0, "failed": 1}
+    return {"fetched": result["pages"], "failed": 0}
+
 
-    return {"fetched": fetched, "failed": failed}
+# How rlm_research fetches each kind of discovered doc root (pages: _fetch_single)
+_ROOT_FETCHERS = {
+    "llms-full": _fetch_llms_full,
+    "llms": _fetch_llms_txt,
+    "sitemap": _fetch_sitemap,
+}
 
 
 async def _fetch_single(
@@ -168,17 +208,116 @@ def _get_store_from_ctx(ctx: Context) -> KnowledgeStore | None:
 
 
 def _count_doc_sources() -> dict[str, int]:
-    """Count raw .md files per library under the docs base directory."""
-    sources: dict[str, int] = {}
+    """Count raw .md files per library, from the docs catalog."""
     docs_dir = Path(DOCS_BASE)
     if not docs_dir.exists():
-        return sources
-    for lib_dir in docs_dir.iterdir():
-        if lib_dir.is_dir():
-            files = list(lib_dir.glob("**/*.md"))
-            if files:
-                sources[lib_dir.name] = len(files)
-    return sources
+        return {}
+    stats = get_catalog(docs_dir).library_stats()
+    return {lib: info["files"] for lib, info in stats.items()}
+
+
+# ---------------------------------------------------------------------------
+# Research jobs
+# ---------------------------------------------------------------------------
+
+# Seconds rlm_research waits for its job before handing back the job id
+RESEARCH_WAIT = 20.0
+
+
+def _crawl_poll(crawl_id: str):
+    """Progress reader for a journaled crawl: (pages finished, pages listed)."""
+    journal = get_journal(Path(DOCS_BASE))
+
+    def poll() -> tuple[int, int | None]:
+        c = journal.counts(crawl_id)
+        return c["done"] + c["failed"] + c["duplicate"], c["total"] or None
+    return poll
+
+
+async def _research(
+    http_client: Any,
+    store: KnowledgeStore | None,
+    topic: str,
+    *,
+    refresh: bool = False,
+    job: ResearchJob | None = None,
+) -> str:
+    """Discover, fetch and index docs for a topic. Returns the tool's summary."""
+    def phase(name: str, poll=None) -> None:
+        if job is not None:
+            job.set_phase(name, poll)
+
+    phase("discovering")
+    doc_urls = _resolve_doc_urls(topic)
+    base = Path(DOCS_BASE)
+    root = await discover_doc_root(http_client, topic, doc_urls, base=base, refresh=refresh)
+    fetched = 0
+    failed = 0
+
+    fetch_root = _ROOT_FETCHERS.get(root["kind"])
+    if fetch_root is not None:
+        crawl_id = f"{root['kind']}:{root['url']}"
+        crawled = root["kind"] in ("sitemap", "llms")
+        phase(f"fetching {root['url']}", _crawl_poll(crawl_id) if crawled else None)
+        # Crawls skip blogs, duplicate language/version copies and anything
+        # past the budget, fetching the pages most relevant to the topic first
+        extra = {"scope": research_scope(topic)} if crawled else {}
+        result = await fetch_root(http_client, root["url"], store, force=False, **extra)
+        fetched += result.get("fetched", 0)
+        failed += result.get("failed", 0)
+    # A page root, or an index that yielded nothing: fetch pages directly
+    if fetched == 0 and root["url"] is not None:
+        pages = [root["url"]] if root["kind"] == "page" else [
+            u for u in doc_urls if candidate_kind(u) == "page"]
+        phase("fetching pages")
+        for url in pages:
+            result = await _fetch_single(http_client, url, store, force=False)
+            if result.get("ok"):
+                fetched += 1
+                break
+            failed += 1
+    if job is not None:
+        job.done = fetched + failed
+
+    if fetched == 0:
+        # Don't keep pointing future runs at a root that gave us nothing
+        if root["url"] is not None:
+            get_resolution_cache(base).remove(topic.lower().strip())
+        cached = " (cached result; pass refresh=True to probe again)" if root["cached"] else ""
+        return (
+            f"Could not fetch docs for '{topic}'. "
+            f"Tried {len(doc_urls)} URL patterns, all failed{cached}. "
+            f"You can manually fetch with rlm_fetch(url) if you know the doc URL."
+        )
+
+    via = f" from {root['url']}" if root["kind"] in ("llms-full", "llms") else ""
+    return (
+        f"Indexed {fetched} pages for '{topic}'{via}. "
+        f"{failed} failed. Use rlm_search to query."
+    )
+
+
+def _progress_reporter(ctx: Context):
+    """on_progress callback sending a job's progress as MCP notifications to ctx."""
+    async def report(job: ResearchJob) -> None:
+        done, total = job.progress()
+        await ctx.report_progress(done, total, f"{job.id} {job.phase}")
+    return report
+
+
+def _job_report(job: ResearchJob) -> str:
+    """Tool output for a job: its result once done, else where it stands."""
+    if job.status == "done":
+        return job.result
+    if job.status == "failed":
+        return f"Research job {job.id} for '{job.topic}' failed: {job.error}"
+    if job.status == "cancelled":
+        return f"Research job {job.id} for '{job.topic}' was cancelled."
+    return (
+        f"Research for '{job.topic}' continues in the background: {job.describe()}\n"
+        f"Follow it with rlm_research_status('{job.id}') or stop it with "
+        f"rlm_research_cancel('{job.id}'). rlm_search already sees pages indexed so far."
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -190,52 +329,97 @@ def register_research_tools(mcp) -> None:
     """Register research and knowledge management tools on the MCP server."""
 
     @mcp.tool()
-    async def rlm_research(topic: str, ctx: Context) -> str:
+    async def rlm_research(
+        topic: str,
+        ctx: Context,
+        refresh: bool = False,
+        wait: float = RESEARCH_WAIT,
+    ) -> str:
         """Research a topic: find docs, fetch them, index into the knowledge store.
 
-        Tries known doc URLs first, then common patterns (sitemap.xml, direct pages).
-        Results are indexed so you can query them with rlm_search afterwards.
+        Candidate doc URLs (known mapping, then common patterns) are probed
+        concurrently. An llms-full.txt is preferred (the whole docs in one
+        request), then an llms.txt (its linked pages are fetched), then a
+        sitemap, then a plain page. The discovered root is cached per topic,
+        so later runs skip discovery. Results are indexed so you can query
+        them with rlm_search afterwards.
+
+        The run is a background job. This call waits up to `wait` seconds,
+        sending progress notifications, and returns the result if the job
+        finished; otherwise it returns the job id. Use rlm_research_status
+        to follow the job and rlm_research_cancel to stop it. rlm_search
+        already sees pages indexed so far. A call for a topic whose job is
+        still running joins that job; with refresh, the job is cancelled and
+        started again.
 
         Args:
             topic: Library or topic name (e.g. "fastapi", "dspy", "memvid")
+            refresh: Ignore the cached doc root (or cached miss) and probe again
+            wait: Seconds to wait for the job before returning its id (0: don't wait)
         """
         app = ctx.request_context.lifespan_context
         store = _get_store_from_ctx(ctx)
+        manager = get_job_manager()
+
+        key = topic.lower().strip()
+        job = next((j for j in manager.running() if j.topic.lower().strip() == key), None)
+        if job is not None and refresh:
+            # It may have used the cached root; what it indexed so far is kept
+            manager.cancel(job.id)
+            await asyncio.wait({job.task}, timeout=5)
+            job = None
+        if job is None:
+            job = manager.submit(
+                topic, lambda job: _research(app.http, store, topic, refresh=refresh, job=job))
+        await manager.wait(job, wait, on_progress=_progress_reporter(ctx))
+        return _job_report(job)
 
-        doc_urls = _resolve_doc_urls(topic)
-        fetched = 0
-        failed = 0
-
-        for url in doc_urls:
-            if url.endswith("sitemap.xml"):
-                result = await _fetch_sitemap(
-                    app.http, url, store, force=False
-                )
-                fetched += result.get("fetched", 0)
-                failed += result.get("failed", 0)
-                # If sitemap worked, skip remaining URLs
-                if fetched > 0:
-                    break
-            else:
-                result = await _fetch_single(
-                    app.http, url, store, force=False
-                )
-                if result.get("ok"):
-                    fetched += 1
-                else:
-                    failed += 1
-
-        if fetched == 0:
-            return (
-                f"Could not fetch docs for '{topic}'. "
-                f"Tried {len(doc_urls)} URL patterns, all failed. "
-                f"You can manually fetch with rlm_fetch(url) if you know the doc URL."
-            )
+    @mcp.tool()
+    async def rlm_research_status(
+        ctx: Context,
+        job: str | None = None,
+        wait: float = 0.0,
+    ) -> str:
+        """Show research jobs: phase, pages done, and the result once finished.
 
-        return (
-            f"Indexed {fetched} pages for '{topic}'. "
-            f"{failed} failed. Use rlm_search to query."
-        )
+        Args:
+            job: Job id (default: list all jobs)
+            wait: Seconds to wait for the job to finish, with progress notifications
+        """
+        manager = get_job_manager()
+        if job is None:
+            jobs = manager.jobs()
+            if not jobs:
+                return "No research jobs."
+            lines = [f"Research jobs ({len(jobs)}, {len(manager.running())} active):"]
+            lines.extend(f"  {j.describe()}" for j in jobs)
+            return "\n".join(lines)
+
+        found = manager.get(job)
+        if found is None:
+            return f"No research job '{job}'."
+        if wait > 0:
+            await manager.wait(found, wait, on_progress=_progress_reporter(ctx))
+        return _job_report(found)
+
+    @mcp.tool()
+    async def rlm_research_cancel(job: str, ctx: Context) -> str:
+        """Cancel a queued or running research job.
+
+        Pages already indexed stay in the knowledge store, and an interrupted
+        sitemap or llms.txt crawl resumes if the topic is researched again.
+
+        Args:
+            job: Job id, as returned by rlm_research
+        """
+        manager = get_job_manager()
+        found = manager.get(job)
+        if found is None:
+            return f"No research job '{job}'."
+        if not manager.cancel(job):
+            return f"Job {job} already {found.status}."
+        await asyncio.wait({found.task}, timeout=5)
+        return f"Cancelled job {job} ('{found.topic}')."
 
     @mcp.tool()
     async def rlm_knowledge_status(
@@ -281,7 +465,9 @@ def register_research_tools(mcp) -> None:
         """Clear the knowledge store (.mv2 index) for a project.
 
         Closes the store, deletes the file, and resets the cache so the next
-        access creates a fresh index.
+        access creates a fresh index. The store's near-duplicate signatures
+        go too, or re-ingested pages would be skipped as copies of chunks
+        that no longer exist.
 
         Args:
             project: Project hash override (uses cwd-based hash if omitted)
@@ -295,6 +481,7 @@ def register_research_tools(mcp) -> None:
         if os.path.exists(path):
             os.remove(path)
             removed = True
+        clear_store(Path(DOCS_BASE), store_key(store))
 
         # Drop from singleton cache so next get_store() creates fresh
         _stores.pop(h, None)
@@ -325,20 +512,15 @@ def register_research_tools(mcp) -> None:
             return f"No docs directory at {docs_dir}"
 
         skip_dirs = {"plans", "ios-development", "visionos-development"}
+        catalog = get_catalog(docs_dir)
         topics: dict[str, dict] = {}
-        for lib_dir in sorted(docs_dir.iterdir()):
-            if not lib_dir.is_dir() or lib_dir.name.startswith("."):
-                continue
-            if lib_dir.name in skip_dirs:
+        for name, info in sorted(catalog.library_stats().items()):
+            if name.startswith(".") or name in skip_dirs:
                 continue
-            md_files = list(lib_dir.glob("**/*.md"))
-            if md_files:
-                total_bytes = sum(f.stat().st_size for f in md_files)
-                topics[lib_dir.name] = {
-                    "files": len(md_files),
-                    "size_kb": round(total_bytes / 1024, 1),
-                    "md_files": md_files,
-                }
+            topics[name] = {
+                "files": info["files"],
+                "size_kb": round(info["bytes"] / 1024, 1),
+            }
 
         if topic:
             t = topic.lower()
@@ -366,8 +548,11 @@ def register_research_tools(mcp) -> None:
         results = []
         for name, info in topics.items():
             docs = []
-            for md_file in info["md_files"]:
-                text = md_file.read_text(encoding="utf-8", errors="replace")
+            for md_file in catalog.paths(name):
+                try:
+                    text = read_doc(md_file)
+                except (OSError, ValueError):
+                    continue
                 if not text.strip():
                     continue
                 docs.append({
@@ -382,3 +567,34 @@ def register_research_tools(mcp) -> None:
 
         header = f"Re-indexed {total} files across {len(results)} topics:"
         return header + "\n" + "\n".join(results)
+
+    @mcp.tool()
+    async def rlm_crawl_status(ctx: Context, job: str | None = None) -> str:
+        """Show progress of journaled sitemap and llms.txt crawls.
+
+        A crawl still marked running was interrupted; fetching the same
+        sitemap (or researching the same topic) again resumes it.
+
+        Args:
+            job: Show only this job, by id or sitemap URL (default: all)
+        """
+        docs_dir = Path(DOCS_BASE)
+        if not docs_dir.exists():
+            return "No crawls recorded."
+        jobs = get_journal(docs_dir).jobs()
+        if job:
+            jobs = [j for j in jobs if job in (j["id"], j["source"])]
+            if not jobs:
+                return f"No crawl job '{job}'."
+        if not jobs:
+            return "No crawls recorded."
+
+        lines = [f"Crawl jobs ({len(jobs)}):"]
+        for j in jobs:
+            lines.append(f"  {j['id']} [{j['status']}]")
+            lines.append(
+                f"    {j['done']}/{j['total']} fetched, {j['failed']} failed, "
+                f"{j['pending']} pending, {j['ingested']} ingested"
+            )
+            lines.append(f"    updated {j['updated_at']}")
+        return "\n".join(lines)
@@ -0,0 +1,253 @@
+"""Doc-root discovery for rlm_research.
+
+A topic maps to a handful of guessed doc URLs: llms-full.txt and llms.txt
+files, sitemaps, and plain pages, preferred in that order. Instead of trying
+them one after another -- each miss can cost a full timeout -- every guess
+is probed at once with HEAD (or a one-byte range GET where HEAD isn't
+allowed). The first answer of the most preferred kind wins and the
+remaining probes are cancelled.
+
+Results, including "nothing found", are kept in a small SQLite cache in the
+docs base (.resolutions.db) with a TTL, so researching the same topic again
+skips discovery entirely.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.parse import urlparse
+
+import httpx
+
+from mcp_server.ratelimit import HostPaused, get_limiter
+
+log = logging.getLogger(__name__)
+
+CACHE_NAME = ".resolutions.db"
+
+# Per-probe timeout (seconds); the whole race is bounded by it too
+PROBE_TIMEOUT = 8.0
+
+# How long a discovered doc root, or a topic with none, stays cached
+POSITIVE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+
+# Candidate kinds, most preferred first: one file with all the docs, an
+# index of doc pages, a sitemap, a page
+KINDS = ("llms-full", "llms", "sitemap", "page")
+
+# HEAD answers that mean "try a GET instead"
+_HEAD_UNSUPPORTED = frozenset({403, 405, 501})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolutions (
+    topic        TEXT PRIMARY KEY,
+    url          TEXT,
+    kind         TEXT,
+    resolved_at  REAL NOT NULL,
+    expires_at   REAL NOT NULL
+);
+"""
+
+
+class ResolutionCache:
+    """topic -> discovered doc root (or a cached miss), with expiry."""
+
+    def __init__(self, base: Path | str):
+        self.base = Path(base)
+        self.db_path = self.base / CACHE_NAME
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        self.base.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get(self, topic: str) -> dict[str, Any] | None:
+        """{url, kind, resolved_at} for an unexpired entry; url is None for a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, kind, resolved_at, expires_at FROM resolutions WHERE topic = ?",
+                (topic,),
+            ).fetchone()
+        if row is None or row[3] <= time.time():
+            return None
+        return {"url": row[0], "kind": row[1], "resolved_at": row[2]}
+
+    def put(self, topic: str, url: str | None, kind: str | None, ttl: float) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions (topic, url, kind, resolved_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (topic, url, kind, now, now + ttl),
+            )
+
+    def remove(self, topic: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM resolutions WHERE topic = ?", (topic,))
+
+
+_caches: dict[str, ResolutionCache] = {}
+
+
+def get_resolution_cache(base: Path | str) -> ResolutionCache:
+    """Shared cache for a docs base, reopened if its database was deleted."""
+    key = str(Path(base).absolute())
+    cache = _caches.get(key)
+    if cache is not None and not cache.db_path.exists():
+        cache.close()
+        cache = None
+    if cache is None:
+        cache = ResolutionCache(base)
+        cache.open()
+        _caches[key] = cache
+    return cache
+
+
+def close_resolution_caches() -> None:
+    for cache in _caches.values():
+        cache.close()
+    _caches.clear()
+
+
+# ---------------------------------------------------------------------------
+# Probing
+# ---------------------------------------------------------------------------
+
+
+def candidate_kind(url: str) -> str:
+    """Which of KINDS a candidate doc URL is, going by its name."""
+    path = urlparse(url).path
+    if path.endswith("/llms-full.txt"):
+        return "llms-full"
+    if path.endswith("/llms.txt"):
+        return "llms"
+    if path.endswith(".xml"):
+        return "sitemap"
+    return "page"
+
+
+async def probe(client: httpx.AsyncClient, url: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """True if url answers 2xx -- for anything but a page, with something other than HTML.
+
+    Uses HEAD, falling back to a one-byte range GET for servers that refuse
+    HEAD. Goes through the host's rate limiter but never waits on a pause.
+    """
+    limiter = get_limiter(urlparse(url).hostname or "")
+    try:
+        async with limiter.slot(max_wait=0):
+            resp = await client.head(url, timeout=timeout, follow_redirects=True)
+            if resp.status_code in _HEAD_UNSUPPORTED:
+                resp = await client.get(url, timeout=timeout, follow_redirects=True,
+                                        headers={"Range": "bytes=0-0"})
+            limiter.record_response(resp.status_code, resp.headers.get("retry-after"))
+    except HostPaused:
+        return False
+    except Exception as exc:
+        log.debug("Probe failed for %s: %s", url, exc)
+        return False
+    if not 200 <= resp.status_code < 300:
+        return False
+    # Soft 404s: an HTML page where a sitemap or llms.txt should be
+    if candidate_kind(url) != "page" and "html" in resp.headers.get("content-type", ""):
+        return False
+    return True
+
+
+async def _race(tasks: dict[asyncio.Task, str], deadline: float) -> str | None:
+    """URL of the first of tasks to succeed before deadline (loop time), or None.
+
+    Tasks that already finished count even once the deadline has passed.
+    """
+    loop = asyncio.get_running_loop()
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, timeout=max(deadline - loop.time(), 0),
+            return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            return None
+        for t in done:
+            if t.result():
+                return tasks[t]
+    return None
+
+
+async def _cancel(tasks: Iterable[asyncio.Task]) -> None:
+    tasks = list(tasks)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def first_success(
+    client: httpx.AsyncClient,
+    urls: list[str],
+    timeout: float = PROBE_TIMEOUT,
+) -> str | None:
+    """Probe urls concurrently; return the first that succeeds and cancel the rest."""
+    if not urls:
+        return None
+    tasks = {asyncio.create_task(probe(client, u, timeout)): u for u in urls}
+    try:
+        return await _race(tasks, asyncio.get_running_loop().time() + timeout)
+    finally:
+        await _cancel(tasks)
+
+
+async def discover_doc_root(
+    client: httpx.AsyncClient,
+    topic: str,
+    candidates: list[str],
+    *,
+    base: Path,
+    refresh: bool = False,
+    timeout: float = PROBE_TIMEOUT,
+) -> dict[str, Any]:
+    """Find a topic's doc root among candidate URLs, via the resolution cache.
+
+    All candidates are probed at once. Kinds are then settled in KINDS
+    order: the first llms-full.txt to answer wins, else the first llms.txt,
+    and so on, so a preferred kind is never beaten by a faster lesser one
+    and the whole discovery is bounded by one probe timeout. Returns {url,
+    kind, cached}: url is None if nothing answered. refresh=True ignores
+    (and replaces) any cached entry.
+    """
+    key = topic.lower().strip()
+    cache = get_resolution_cache(base)
+    if not refresh:
+        hit = cache.get(key)
+        if hit is not None:
+            return {"url": hit["url"], "kind": hit["kind"], "cached": True}
+
+    by_kind: dict[str, dict[asyncio.Task, str]] = {kind: {} for kind in KINDS}
+    for url in candidates:
+        task = asyncio.create_task(probe(client, url, timeout))
+        by_kind[candidate_kind(url)][task] = url
+    deadline = asyncio.get_running_loop().time() + timeout
+    try:
+        for kind in KINDS:
+            url = await _race(by_kind[kind], deadline)
+            if url is not None:
+                cache.put(key, url, kind, POSITIVE_TTL)
+                return {"url": url, "kind": kind, "cached": False}
+    finally:
+        await _cancel(t for tasks in by_kind.values() for t in tasks)
+
+    cache.put(key, None, None, NEGATIVE_TTL)
+    return {"url": None, "kind": None, "cached": False}
@@ -0,0 +1,198 @@
+"""Scoping and ordering of crawl frontiers (sitemaps, llms.txt).
+
+A docs sitemap lists far more than docs: blog posts, release notes, and a
+copy of every page per language and per version. Before a crawl starts,
+apply_scope() narrows its URL list:
+
+  1. include/exclude path prefixes (matched against the path with any
+     language/version segments removed, so "/releases" also drops
+     "/en/5.0/releases/...")
+  2. variant dedup: of the copies of one page in several languages or
+     versions, keep one -- the preferred language, and stable/latest over
+     an unversioned path over the newest numbered version over dev builds
+  3. relevance ranking against the research topic from URL-path tokens and
+     link titles, so the most useful pages are fetched first
+  4. the page budget (max_pages)
+
+The byte budget (max_bytes) is enforced while crawling: once it is spent no
+further pages are fetched.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+# Languages recognised in a path's first two segments (ISO 639-1, with an
+# optional region: en, en-us, pt_BR, zh-hans)
+LANGUAGES = frozenset({
+    "ar", "bn", "cs", "da", "de", "el", "en", "es", "fa", "fi", "fr", "he", "hi",
+    "hu", "id", "it", "ja", "ko", "nb", "nl", "pl", "pt", "ro", "ru", "sv", "th",
+    "tr", "uk", "vi", "zh",
+})
+
+# Version-like path segments, looked for in a path's first three segments
+_VERSION = re.compile(r"^(?:v?\d+(?:\.\d+)*(?:\.x)?|stable|latest|dev|main|master|nightly|next)$")
+_PREFERRED_VERSIONS = ("stable", "latest")
+_DEV_VERSIONS = ("dev", "main", "master", "nightly", "next")
+
+# Path prefixes rlm_research leaves out by default
+DEFAULT_EXCLUDE = (
+    "/blog", "/news", "/releases", "/release-notes", "/changelog", "/community",
+    "/events", "/jobs", "/careers", "/tag", "/tags", "/category", "/author",
+)
+
+# Budgets for rlm_research crawls
+RESEARCH_MAX_PAGES = 300
+RESEARCH_MAX_BYTES = 50 * 1024 * 1024
+
+# Path tokens that suggest documentation, and ones that suggest anything but
+DOC_HINTS = frozenset({
+    "docs", "doc", "documentation", "guide", "guides", "tutorial", "tutorials",
+    "api", "reference", "ref", "quickstart", "start", "getting", "started",
+    "intro", "introduction", "usage", "howto", "manual", "concepts", "overview",
+    "install", "installation", "topics", "learn",
+})
+LOW_VALUE = frozenset({
+    "blog", "news", "release", "releases", "changelog", "press", "events",
+    "community", "careers", "jobs", "about", "legal", "privacy", "terms",
+    "sponsors", "showcase", "tag", "tags", "category", "author", "archive",
+})
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class CrawlScope:
+    """What part of a frontier to crawl, and in what order.
+
+    The defaults keep every URL in its original order. topic enables
+    relevance ranking; language is the preferred variant language.
+    """
+
+    max_pages: int | None = None
+    max_bytes: int | None = None
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    dedup_variants: bool = False
+    language: str = "en"
+    topic: str | None = None
+
+
+def research_scope(topic: str) -> CrawlScope:
+    """The scope rlm_research crawls with."""
+    return CrawlScope(max_pages=RESEARCH_MAX_PAGES, max_bytes=RESEARCH_MAX_BYTES,
+                      exclude=DEFAULT_EXCLUDE, dedup_variants=True, topic=topic)
+
+
+def _is_language(segment: str) -> bool:
+    return re.split(r"[-_]", segment.lower(), 1)[0] in LANGUAGES and len(segment) <= 7
+
+
+def split_variant(url: str) -> tuple[str, str | None, str | None]:
+    """(path without language/version segments, language, version) of a URL."""
+    parts = [p for p in urlsplit(url).path.split("/") if p]
+    language = version = None
+    kept = []
+    for i, part in enumerate(parts):
+        if language is None and i < 2 and _is_language(part):
+            language = part.lower().replace("_", "-")
+        elif version is None and i < 3 and _VERSION.match(part.lower()):
+            version = part.lower()
+        else:
+            kept.append(part)
+    return "/" + "/".join(kept), language, version
+
+
+def _variant_rank(language: str | None, version: str | None, preferred: str) -> tuple:
+    """Sort key: lower is the better copy of a page."""
+    lang_rank = 0 if language is None or language.split("-")[0] == preferred else 1
+    if version in _PREFERRED_VERSIONS:
+        ver_rank, numbers = 0, ()
+    elif version is None:
+        ver_rank, numbers = 1, ()
+    elif version in _DEV_VERSIONS:
+        ver_rank, numbers = 3, ()
+    else:
+        ver_rank = 2
+        numbers = tuple(-int(n) for n in re.findall(r"\d+", version))
+    return lang_rank, ver_rank, numbers
+
+
+def _matches(path: str, prefixes: tuple[str, ...]) -> bool:
+    for prefix in prefixes:
+        prefix = "/" + prefix.strip("/")
+        if prefix == "/" or path == prefix or path.startswith(prefix + "/"):
+            return True
+    return False
+
+
+def relevance(url: str, topic: str | None, title: str | None = None) -> float:
+    """Heuristic usefulness of a page for a topic, from its path and title."""
+    path, _, _ = split_variant(url)
+    tokens = _TOKEN.findall(path.lower())
+    terms = set(_TOKEN.findall(topic.lower())) if topic else set()
+    score = 0.0
+    score += 3.0 * sum(1 for t in tokens if t in terms)
+    if title:
+        score += 2.0 * len(terms & set(_TOKEN.findall(title.lower())))
+    if DOC_HINTS & set(tokens):
+        score += 2.0
+    if LOW_VALUE & set(tokens):
+        score -= 3.0
+    # Shallow pages are overviews; deep ones are details
+    score -= 0.3 * path.count("/")
+    return score
+
+
+def apply_scope(
+    urls: list[str],
+    scope: CrawlScope,
+    titles: dict[str, str] | None = None,
+) -> tuple[list[str], dict[str, int]]:
+    """Filter, dedup, rank and cap a frontier. Returns (urls, skipped counts).
+
+    Skipped counts are keyed excluded, variants and over_budget.
+    """
+    titles = titles or {}
+    skipped = {"excluded": 0, "variants": 0, "over_budget": 0}
+    kept: list[tuple[str, str, tuple]] = []
+    for url in urls:
+        raw_path = urlsplit(url).path or "/"
+        path, language, version = split_variant(url)
+        if scope.include and not (_matches(path, scope.include)
+                                  or _matches(raw_path, scope.include)):
+            skipped["excluded"] += 1
+            continue
+        if scope.exclude and (_matches(path, scope.exclude) or _matches(raw_path, scope.exclude)):
+            skipped["excluded"] += 1
+            continue
+        kept.append((url, path, _variant_rank(language, version, scope.language)))
+
+    if scope.dedup_variants:
+        best: dict[tuple[str, str], tuple[str, str, tuple]] = {}
+        for item in kept:
+            key = (urlsplit(item[0]).hostname or "", item[1])
+            if key not in best or item[2] < best[key][2]:
+                best[key] = item
+        chosen = {item[0] for item in best.values()}
+        skipped["variants"] = len(kept) - len(chosen)
+        kept = [item for item in kept if item[0] in chosen]
+
+    selected = [url for url, _, _ in kept]
+    if scope.topic is not None:
+        # sorted() is stable, so equally relevant pages keep frontier order
+        selected = sorted(selected, key=lambda u: -relevance(u, scope.topic, titles.get(u)))
+    if scope.max_pages is not None and len(selected) > scope.max_pages:
+        skipped["over_budget"] = len(selected) - scope.max_pages
+        selected = selected[: scope.max_pages]
+    return selected, skipped
+
+
+def describe_skipped(skipped: dict[str, Any]) -> str:
+    """"12 excluded, 40 language/version variants, ..." for tool output ('' if none)."""
+    labels = {"excluded": "excluded by path", "variants": "language/version variants",
+              "over_budget": "over the page budget", "over_bytes": "over the byte budget"}
+    return ", ".join(f"{skipped[k]} {label}" for k, label in labels.items() if skipped.get(k))
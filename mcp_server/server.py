@@ -11,13 +11,18 @@ import httpx
 from mcp.server.fastmcp import FastMCP
 
 from mcp_server.apple_docs import register_apple_docs_tools
+from mcp_server.catalog import close_catalogs
+from mcp_server.dedup import close_near_dup_indexes
 from mcp_server.docker_manager import BASE_URL, DockerManager
-from mcp_server.fetcher import register_fetcher_tools
+from mcp_server.fetcher import register_fetcher_tools, shutdown_convert_pool
+from mcp_server.jobs import close_job_manager
+from mcp_server.journal import close_journals
 from mcp_server.knowledge import KnowledgeStore, get_store, register_knowledge_tools
 from mcp_server.llm_callback import LLMCallbackServer, SANDBOX_TOOLS
 from mcp_server.research import register_research_tools
+from mcp_server.resolver import close_resolution_caches
 from mcp_server.session import SessionManager
-from mcp_server.sub_agent import inject_llm_stub, inject_tool_stubs
+from mcp_server.sub_agent import inject_llm_stub, inject_tool_stubs, set_session_setup
 from mcp_server.tools import register_tools
 
 log = logging.getLogger(__name__)
@@ -31,6 +36,7 @@ class AppContext:
     http: httpx.AsyncClient
     llm_callback: LLMCallbackServer
     knowledge_store: KnowledgeStore | None = None
+    session: SessionManager | None = None
 
 
 @asynccontextmanager
@@ -47,18 +53,20 @@ async def lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
 
         # Inject llm_query() into the sandbox so all rlm_exec calls can use it.
         # Pick the right callback URL based on whether we're in Docker or bare mode.
-        cb_url = callback.callback_url_local if manager._no_docker else callback.callback_url
+        cb_url = callback.callback_url_local if manager.bare else callback.callback_url
         sandbox_client = httpx.AsyncClient(base_url=BASE_URL, timeout=10)
         try:
             await inject_llm_stub(sandbox_client, cb_url)
             log.info("Injected llm_query() stub (callback → %s)", cb_url)
             # Wire tool handlers on the callback server then inject stubs into sandbox
             cb_base = (
-                callback.base_url_local if manager._no_docker else callback.base_url
+                callback.base_url_local if manager.bare else callback.base_url
             )
             callback.setup_tool_handlers(store, client)
             await inject_tool_stubs(sandbox_client, cb_base, SANDBOX_TOOLS)
             log.info("Injected tool stubs (callback base → %s)", cb_base)
+            # Sessions other tools create later (rlm_exec(session=...)) get them too
+            await set_session_setup(sandbox_client, cb_url, cb_base, SANDBOX_TOOLS)
         finally:
             await sandbox_client.aclose()
 
@@ -68,9 +76,11 @@ async def lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
         store.open()
         yield AppContext(
             manager=manager, http=client, llm_callback=callback,
-            knowledge_store=store,
+            knowledge_store=store, session=session,
         )
     finally:
+        # Stop research jobs before the store and HTTP client go away
+        await close_job_manager()
         # Save before tearing down the container
         try:
             await session.save()
@@ -81,6 +91,11 @@ async def lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
         except Exception:
             log.exception("Knowledge store close failed")
         await session.stop_auto_save()
+        shutdown_convert_pool()
+        close_catalogs()
+        close_journals()
+        close_resolution_caches()
+        close_near_dup_indexes()
         await callback.stop()
         await client.aclose()
         await manager.stop()
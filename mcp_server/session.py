@@ -1,17 +1,45 @@
-"""Session persistence: save/restore sandbox kernel state across restarts."""
+"""Session persistence: save/restore sandbox kernel state across restarts.
+
+Snapshots are incremental. The sandbox keeps a dill blob per variable (its
+checkpoint) and publishes a manifest of their sha256 digests; a save fetches
+only the blobs the host doesn't have yet and stores them content-addressed
+under SESSIONS_DIR/blobs, next to a small <session>.json manifest. A save is
+skipped entirely when the sandbox's checkpoint generation hasn't moved since
+the last one, so an idle session costs one small request per autosave.
+
+Blobs move as compressed frames (sandbox/frames.py, zstd when both sides
+have it) and are streamed between the socket and disk a chunk at a time,
+stored in the codec they arrived in. Timeouts apply per read or write, not
+to the whole transfer, so a multi-GB namespace isn't cut off.
+
+Each save that changed something is also kept as a generation: the last
+GENERATIONS_KEEP manifests per session, under SESSIONS_DIR/generations.
+Generations share blobs by content hash, so one costs only the variables
+that changed since the one before; rollback() brings any of them back.
+
+Restores unpickle every variable up front. With RLM_RESTORE_LAZY set, the
+sandbox keeps the blobs and unpickles each variable the first time a cell
+uses it, so startup doesn't pay for variables the agent never touches; a
+variable reached only through a container or an object's attributes isn't
+seen coming, so this is opt-in.
+"""
 
 from __future__ import annotations
 
 import asyncio
 import hashlib
+import json
 import logging
 import os
+import shutil
 import time
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
 import httpx
 
 from mcp_server.docker_manager import BASE_URL
+from sandbox import frames
 
 log = logging.getLogger(__name__)
 
@@ -19,6 +47,27 @@ SESSIONS_DIR = Path.home() / ".neo-research" / "sessions"
 AUTO_SAVE_INTERVAL = 300  # 5 minutes
 SNAPSHOT_EXPIRY_DAYS = 7
 
+# Content-addressed variable blobs shared by all manifests
+BLOBS_DIR = SESSIONS_DIR / "blobs"
+
+# Blob file suffix per codec
+_SUFFIX = {"zstd": ".zst", "zlib": ".zz", "none": ""}
+
+# Seconds allowed per read/write of a snapshot transfer; a restore's reply
+# waits for the last batch to unpickle, hence the longer read timeout
+SNAPSHOT_TIMEOUT = httpx.Timeout(60.0, read=300.0)
+
+# Snapshot generations kept per session for rollback
+GENERATIONS_KEEP = 10
+
+# Seconds a blob is kept after it was written or last found present. The
+# blob store is shared by every project's server, and another one's save
+# may be about to refer to a blob it just wrote or found.
+BLOB_GC_GRACE = 3600
+
+# Unpickle variables on first use instead of at restore
+RESTORE_LAZY = os.environ.get("RLM_RESTORE_LAZY", "") not in ("", "0")
+
 
 def _session_id(working_dir: str | None = None) -> str:
     """Deterministic session ID from the working directory path."""
@@ -27,45 +76,387 @@ def _session_id(working_dir: str | None = None) -> str:
 
 
 def _snapshot_path(session_id: str) -> Path:
+    """Whole-namespace snapshot written before snapshots were incremental."""
     return SESSIONS_DIR / f"{session_id}.pkl"
 
 
+def _manifest_path(session_id: str) -> Path:
+    return SESSIONS_DIR / f"{session_id}.json"
+
+
+def _generations_dir(session_id: str) -> Path:
+    return SESSIONS_DIR / "generations" / session_id
+
+
+def _generation_numbers(session_id: str) -> list[int]:
+    """The session's kept generations, oldest first."""
+    gen_dir = _generations_dir(session_id)
+    if not gen_dir.exists():
+        return []
+    return sorted(int(p.stem) for p in gen_dir.glob("*.json") if p.stem.isdigit())
+
+
+def _generation_path(session_id: str, number: int) -> Path:
+    return _generations_dir(session_id) / f"{number}.json"
+
+
+def _blob_path(digest: str, codec: str) -> Path:
+    return BLOBS_DIR / digest[:2] / (digest + _SUFFIX[codec])
+
+
+def _find_blob(digest: str) -> tuple[Path, str] | None:
+    """(path, codec) of a stored blob, whichever codec it was stored in."""
+    for codec in _SUFFIX:
+        path = _blob_path(digest, codec)
+        if path.exists():
+            return path, codec
+    return None
+
+
+def _claim_blob(digest: str) -> bool:
+    """True if the blob is stored; its mtime is refreshed so gc_blobs() keeps it
+    while the manifest that will refer to it is written."""
+    found = _find_blob(digest)
+    if found is None:
+        return False
+    try:
+        found[0].touch()
+    except OSError:
+        return False  # collected meanwhile
+    return True
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.rename(path)  # atomic on POSIX
+
+
+class _BlobWriter:
+    """Writes the frames of a /snapshot/blobs reply to BLOBS_DIR as they arrive."""
+
+    def __init__(self):
+        self.reader = frames.FrameReader()
+        self.blobs = 0
+        self.bytes = 0
+        self._file = None
+        self._tmp: Path | None = None
+        self._path: Path | None = None
+        self._sha = None
+
+    async def feed(self, data: bytes) -> None:
+        for kind, value in self.reader.feed(data):
+            if kind == "start":
+                self._path = _blob_path(value["key"], value["codec"])
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                self._tmp = self._path.with_name(self._path.name + ".tmp")
+                self._file = open(self._tmp, "wb")
+                # Uncompressed blobs are checked here; codecs carry their own checksums
+                self._sha = hashlib.sha256() if value["codec"] == "none" else None
+            elif kind == "data":
+                await asyncio.to_thread(self._file.write, value)
+                self.bytes += len(value)
+                if self._sha is not None:
+                    self._sha.update(value)
+            else:
+                self._file.close()
+                self._file = None
+                if self._sha is not None and self._sha.hexdigest() != value["key"]:
+                    log.warning("Snapshot blob %s arrived corrupted; not saved", value["key"][:12])
+                    self._tmp.unlink(missing_ok=True)
+                    continue
+                self._tmp.rename(self._path)  # atomic on POSIX
+                self.blobs += 1
+
+    def close(self) -> None:
+        """Finish the stream; a blob left half-written is discarded."""
+        if self._file is not None:
+            self._file.close()
+            self._tmp.unlink(missing_ok=True)
+            self._file = None
+        self.reader.close()
+
+
+async def _blob_frames(blobs: dict[str, tuple[Path, str]]):
+    """Stored blobs as frames keyed by variable name, read from disk a chunk at a time."""
+    for name, (path, codec) in blobs.items():
+        yield frames.header(name, codec)
+        with open(path, "rb") as f:
+            while data := await asyncio.to_thread(f.read, frames.CHUNK):
+                yield frames.chunk(data)
+        yield frames.END
+
+
+def gc_blobs() -> int:
+    """Delete blobs no manifest refers to. Returns the number removed.
+
+    Partial writes (.tmp) and blobs touched within BLOB_GC_GRACE are left
+    alone: a save in another process may not have written its manifest yet.
+    """
+    if not BLOBS_DIR.exists():
+        return 0
+    live: set[str] = set()
+    for manifest in [*SESSIONS_DIR.glob("*.json"), *SESSIONS_DIR.glob("generations/*/*.json")]:
+        try:
+            live.update(json.loads(manifest.read_text())["vars"].values())
+        except (OSError, ValueError, KeyError):
+            continue
+    removed = 0
+    cutoff = time.time() - BLOB_GC_GRACE
+    for blob in BLOBS_DIR.glob("*/*"):
+        if blob.name.endswith(".tmp") or blob.name.split(".")[0] in live:
+            continue
+        try:
+            if blob.stat().st_mtime > cutoff:
+                continue
+        except OSError:
+            continue
+        blob.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+@dataclass
+class SnapshotStats:
+    """What snapshots have cost this run, plus the sandbox's own serialization cost."""
+
+    saves: int = 0
+    skipped: int = 0  # autosaves with nothing new to save
+    blobs_written: int = 0
+    bytes_written: int = 0
+    last_save_seconds: float = 0.0
+    last_save_vars: int = 0
+    last_save_at: float | None = None
+    # From the sandbox manifest: total seconds and bytes spent pickling checkpoints
+    checkpoint_seconds: float = 0.0
+    checkpoint_bytes: int = 0
+
+
 class SessionManager:
     """Orchestrates saving/restoring kernel snapshots via the sandbox HTTP API."""
 
     def __init__(self, working_dir: str | None = None):
         self.session_id = _session_id(working_dir)
+        # Serializes save/restore/rollback, so autosave can't interleave with a rollback
+        self._lock = asyncio.Lock()
         self._save_task: asyncio.Task | None = None
+        # (epoch, generation) of the sandbox checkpoint last saved or restored
+        self._saved: tuple[str, int] | None = None
+        self.stats = SnapshotStats()
 
     async def save(self) -> bool:
-        """Ask the sandbox to serialize its namespace, then write to disk."""
+        """Save the variables that changed since the last save.
+
+        Returns True if the snapshot on disk is current (including when
+        there was nothing to save).
+        """
+        async with self._lock:
+            return await self._save()
+
+    async def _save(self, rollback_of: int | None = None, pin: int | None = None) -> bool:
+        """save(); a rollback marks its generation with rollback_of, and pins
+        the generation it's about to load so the ring can't drop it."""
+        started = time.perf_counter()
         try:
             async with httpx.AsyncClient() as client:
-                r = await client.post(f"{BASE_URL}/snapshot/save", timeout=30)
+                r = await client.get(f"{BASE_URL}/snapshot/manifest", timeout=30)
                 r.raise_for_status()
-                data = r.json()
+                manifest = r.json()
+                self.stats.checkpoint_seconds = manifest["cost"]["checkpoint_seconds"]
+                self.stats.checkpoint_bytes = manifest["cost"]["checkpoint_bytes"]
+                if (manifest["epoch"], manifest["generation"]) == self._saved:
+                    self.stats.skipped += 1
+                    # Still in use: keep the snapshot from expiring
+                    _manifest_path(self.session_id).touch(exist_ok=True)
+                    return True
+                missing = sorted({d for d in manifest["vars"].values() if not _claim_blob(d)})
+                writer = _BlobWriter()
+                if missing:
+                    async with client.stream(
+                        "POST", f"{BASE_URL}/snapshot/blobs",
+                        json={"digests": missing, "codecs": frames.available()},
+                        timeout=SNAPSHOT_TIMEOUT,
+                    ) as r:
+                        r.raise_for_status()
+                        try:
+                            async for data in r.aiter_bytes():
+                                await writer.feed(data)
+                        finally:
+                            writer.close()
         except Exception as e:
             log.warning("Snapshot save failed (HTTP): %s", e)
             return False
 
-        snapshot_b64 = data.get("snapshot")
-        if not snapshot_b64:
-            log.warning("Snapshot save returned no data")
-            return False
+        # Variables whose blob didn't arrive (changed meanwhile) wait for the next save
+        saved_vars = {k: d for k, d in manifest["vars"].items() if _find_blob(d)}
+        numbers = _generation_numbers(self.session_id)
+        number = numbers[-1] + 1 if numbers else 1
+        record = {"session": self.session_id, "epoch": manifest["epoch"],
+                  "generation": manifest["generation"], "number": number,
+                  "vars": saved_vars, "skipped": manifest["skipped"], "saved_at": time.time()}
+        if rollback_of is not None:
+            record["rollback_of"] = rollback_of
+        data = json.dumps(record).encode()
+        _write_atomic(_generation_path(self.session_id, number), data)
+        _write_atomic(_manifest_path(self.session_id), data)
+        for old in [n for n in [*numbers, number] if n != pin][:-GENERATIONS_KEEP]:
+            _generation_path(self.session_id, old).unlink(missing_ok=True)
+        _snapshot_path(self.session_id).unlink(missing_ok=True)
+        gc_blobs()
+        if len(saved_vars) == len(manifest["vars"]):
+            self._saved = (manifest["epoch"], manifest["generation"])
 
-        SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-        path = _snapshot_path(self.session_id)
-        tmp = path.with_suffix(".tmp")
-        tmp.write_text(snapshot_b64)
-        tmp.rename(path)  # atomic on POSIX
+        elapsed = time.perf_counter() - started
+        self.stats.saves += 1
+        self.stats.blobs_written += writer.blobs
+        self.stats.bytes_written += writer.bytes
+        self.stats.last_save_seconds = elapsed
+        self.stats.last_save_vars = len(saved_vars)
+        self.stats.last_save_at = time.time()
+        log.info("Saved session %s generation %d (%d vars, %d new blobs, %d bytes, "
+                 "%d skipped, %.2fs)", self.session_id, number, len(saved_vars), writer.blobs, writer.bytes,
+                 len(manifest["skipped"]), elapsed)
+        return True
+
+    async def restore(self, eager: bool | None = None) -> bool:
+        """Load the session's snapshot from disk into the sandbox.
+
+        Variables are loaded on first use unless eager (default: not RESTORE_LAZY).
+        """
+        if eager is None:
+            eager = not RESTORE_LAZY
+        path = _manifest_path(self.session_id)
+        if not path.exists():
+            return await self._restore_legacy()
+
+        age_days = (time.time() - path.stat().st_mtime) / 86400
+        if age_days > SNAPSHOT_EXPIRY_DAYS:
+            log.info("Snapshot for %s expired (%.1f days), removing", self.session_id, age_days)
+            path.unlink(missing_ok=True)
+            shutil.rmtree(_generations_dir(self.session_id), ignore_errors=True)
+            gc_blobs()
+            return False
 
-        saved = data.get("saved", [])
-        skipped = data.get("skipped", [])
-        log.info("Saved session %s (%d vars, %d skipped)", self.session_id, len(saved), len(skipped))
+        try:
+            record = json.loads(path.read_text())
+            names = record["vars"]
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("Corrupt snapshot manifest for %s: %s — removed", self.session_id, e)
+            path.unlink(missing_ok=True)
+            return False
+        async with self._lock:
+            data = await self._load(names, eager)
+        if data is None:
+            return False
+        log.info("Restored session %s (%d vars%s, %d failed)", self.session_id,
+                 len(data["restored"]), "" if eager else " deferred", len(data["failed"]))
         return True
 
-    async def restore(self) -> bool:
-        """Load snapshot from disk and send to sandbox for deserialization."""
+    async def _load(self, names: dict[str, str], eager: bool) -> dict | None:
+        """Send the blobs of {name: digest} to the sandbox; {restored, failed} or None."""
+        blobs = {}
+        for name, digest in names.items():
+            found = _find_blob(digest)
+            if found is None:
+                log.warning("Snapshot blob for %s is missing; not restored", name)
+            else:
+                blobs[name] = found
+        try:
+            async with httpx.AsyncClient() as client:
+                r = await client.post(f"{BASE_URL}/snapshot/vars",
+                                      params={"lazy": not eager},
+                                      content=_blob_frames(blobs), timeout=SNAPSHOT_TIMEOUT)
+                r.raise_for_status()
+                data = r.json()
+                r = await client.get(f"{BASE_URL}/snapshot/manifest", timeout=30)
+                r.raise_for_status()
+                manifest = r.json()
+        except Exception as e:
+            log.warning("Snapshot restore failed: %s — starting fresh", e)
+            return None
+
+        # What was just restored is what's on disk; don't save it straight back
+        if not data.get("failed") and len(blobs) == len(names):
+            self._saved = (manifest["epoch"], manifest["generation"])
+        return {"restored": data.get("restored", []), "failed": data.get("failed", [])}
+
+    def generations(self) -> list[dict]:
+        """The session's kept snapshot generations, newest first.
+
+        Each is {generation, saved_at, vars, bytes, new_bytes}, plus
+        rollback_of for one written by a rollback. bytes is what its blobs
+        take on disk; new_bytes only counts blobs the generation before it
+        didn't have, i.e. what keeping it costs.
+        """
+        result = []
+        previous: set[str] = set()
+        for number in _generation_numbers(self.session_id):
+            try:
+                record = json.loads(_generation_path(self.session_id, number).read_text())
+            except (OSError, ValueError):
+                continue
+            digests = set(record["vars"].values())
+            sizes = {d: f[0].stat().st_size for d in digests if (f := _find_blob(d))}
+            info = {"generation": number, "saved_at": record["saved_at"],
+                    "vars": len(record["vars"]), "bytes": sum(sizes.values()),
+                    "new_bytes": sum(n for d, n in sizes.items() if d not in previous)}
+            if "rollback_of" in record:
+                info["rollback_of"] = record["rollback_of"]
+            result.append(info)
+            previous = digests
+        return result[::-1]
+
+    async def rollback(self, generation: int, eager: bool | None = None) -> dict:
+        """Put the sandbox back to a kept generation.
+
+        The current state is saved first, so the rollback can be undone by
+        rolling back to that generation. Variables the generation doesn't
+        have are deleted; the rest are replaced by its values. The result is
+        saved as a new generation. Variables that couldn't be pickled then
+        either are left alone. Returns {generation, restored, failed,
+        deleted} or {error}.
+        """
+        if eager is None:
+            eager = not RESTORE_LAZY
+        path = _generation_path(self.session_id, generation)
+        try:
+            record = json.loads(path.read_text())
+        except (OSError, ValueError):
+            kept = _generation_numbers(self.session_id)
+            return {"error": f"no generation {generation} (kept: {kept or 'none'})"}
+        names = record["vars"]
+        keep = {*names, *record.get("skipped", [])}
+
+        async with self._lock:
+            if not await self._save(pin=generation):
+                return {"error": "could not save the current state first"}
+            try:
+                async with httpx.AsyncClient() as client:
+                    r = await client.get(f"{BASE_URL}/snapshot/manifest", timeout=30)
+                    r.raise_for_status()
+                    current = r.json()
+                    extra = sorted({*current["vars"], *current["skipped"]} - keep)
+                    if extra:
+                        r = await client.post(f"{BASE_URL}/exec",
+                                              json={"code": f"del {', '.join(extra)}"},
+                                              timeout=30)
+                        r.raise_for_status()
+            except Exception as e:
+                log.warning("Rollback failed: %s", e)
+                return {"error": f"sandbox unreachable: {e}"}
+            data = await self._load(names, eager)
+            if data is None:
+                return {"error": "loading the generation into the sandbox failed"}
+            # Rolled-back state becomes the latest snapshot
+            self._saved = None
+            await self._save(rollback_of=generation)
+        log.info("Rolled session %s back to generation %d (%d vars, %d deleted)",
+                 self.session_id, generation, len(data["restored"]), len(extra))
+        return {"generation": generation, **data, "deleted": extra}
+
+    async def _restore_legacy(self) -> bool:
+        """Load a whole-namespace .pkl snapshot from before incremental snapshots."""
         path = _snapshot_path(self.session_id)
         if not path.exists():
             log.info("No snapshot for session %s, starting fresh", self.session_id)
@@ -102,6 +493,19 @@ class SessionManager:
         log.info("Restored session %s (%d vars)", self.session_id, len(restored))
         return True
 
+    def status(self) -> dict:
+        """Snapshot stats plus what's on disk for this session."""
+        info = asdict(self.stats)
+        path = _manifest_path(self.session_id)
+        if path.exists():
+            record = json.loads(path.read_text())
+            info["vars"] = len(record["vars"])
+            found = [_find_blob(d) for d in set(record["vars"].values())]
+            info["snapshot_bytes"] = sum(f[0].stat().st_size for f in found if f)
+            info["saved_at"] = record["saved_at"]
+        info["generations"] = self.generations()
+        return info
+
     def start_auto_save(self) -> None:
         """Kick off a background loop that saves every AUTO_SAVE_INTERVAL seconds."""
         if self._save_task and not self._save_task.done():
@@ -131,8 +535,12 @@ class SessionManager:
             return 0
         removed = 0
         cutoff = time.time() - (SNAPSHOT_EXPIRY_DAYS * 86400)
-        for f in SESSIONS_DIR.glob("*.pkl"):
+        for f in [*SESSIONS_DIR.glob("*.pkl"), *SESSIONS_DIR.glob("*.json")]:
             if f.stat().st_mtime < cutoff:
                 f.unlink()
                 removed += 1
+                if f.suffix == ".json":
+                    shutil.rmtree(_generations_dir(f.stem), ignore_errors=True)
+        if removed:
+            gc_blobs()
         return removed
@@ -18,11 +18,21 @@ DEFAULT_SUB_LM = "anthropic/claude-haiku-4-5-20251001"
 
 
 class SandboxInterpreter:
-    """CodeInterpreter that routes code to the sandbox container's /exec endpoint."""
+    """CodeInterpreter that routes code to the sandbox container's /exec endpoint.
 
-    def __init__(self, base_url: str = "http://localhost:8080", timeout: float = 60):
+    With a session, code runs in that session's own kernel namespace instead
+    of the shared default one.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8080",
+        timeout: float = 60,
+        session: str | None = None,
+    ):
         self.base_url = base_url
         self.timeout = timeout
+        self.session = session
         self._client: httpx.AsyncClient | None = None
 
     async def execute(self, code: str, variables: dict[str, Any] | None = None) -> str:
@@ -57,7 +67,8 @@ class SandboxInterpreter:
 
     async def __aenter__(self) -> SandboxInterpreter:
         self._client = httpx.AsyncClient(
-            base_url=self.base_url, timeout=self.timeout
+            base_url=self.base_url, timeout=self.timeout,
+            params={"session": self.session} if self.session else None,
         )
         return self
 
@@ -83,7 +94,12 @@ async def inject_llm_stub(client: httpx.AsyncClient, callback_url: str) -> None:
     Uses urllib.request (stdlib, always available) to call back to the
     host-side callback endpoint. API keys never enter the container.
     """
-    stub_code = (
+    resp = await client.post("/exec", json={"code": _llm_stub_code(callback_url)})
+    resp.raise_for_status()
+
+
+def _llm_stub_code(callback_url: str) -> str:
+    return (
         "import urllib.request as _llm_urllib\n"
         "import json as _llm_json\n"
         "import concurrent.futures as _llm_futures\n"
@@ -109,8 +125,6 @@ async def inject_llm_stub(client: httpx.AsyncClient, callback_url: str) -> None:
         "    with _llm_futures.ThreadPoolExecutor(max_workers=_workers) as _pool:\n"
         "        return list(_pool.map(_safe_query, prompts))\n"
     )
-    resp = await client.post("/exec", json={"code": stub_code})
-    resp.raise_for_status()
 
 
 async def inject_tool_stubs(
@@ -129,6 +143,11 @@ async def inject_tool_stubs(
         callback_base_url: Base URL of the host callback server (no trailing /)
         tools: Mapping of sandbox function name -> MCP tool name (from SANDBOX_TOOLS)
     """
+    resp = await client.post("/exec", json={"code": _tool_stubs_code(callback_base_url, tools)})
+    resp.raise_for_status()
+
+
+def _tool_stubs_code(callback_base_url: str, tools: dict[str, str]) -> str:
     tool_call_url = f"{callback_base_url}/tool_call"
 
     # Build one stub per tool and emit them in a single /exec call
@@ -173,8 +192,21 @@ async def inject_tool_stubs(
             "",
         ]
 
-    stub_code = "\n".join(stub_lines)
-    resp = await client.post("/exec", json={"code": stub_code})
+    return "\n".join(stub_lines)
+
+
+async def set_session_setup(
+    client: httpx.AsyncClient,
+    callback_url: str,
+    callback_base_url: str,
+    tools: dict[str, str],
+) -> None:
+    """Have the sandbox inject both kinds of stubs into every session it creates.
+
+    Sessions that already exist are not touched; inject them directly.
+    """
+    code = _llm_stub_code(callback_url) + "\n" + _tool_stubs_code(callback_base_url, tools)
+    resp = await client.put("/session/setup", json={"code": code})
     resp.raise_for_status()
 
 
@@ -202,11 +234,13 @@ async def run_sub_agent(
     sandbox_url: str = "http://localhost:8080",
     sub_lm_model: str = DEFAULT_SUB_LM,
     callback_server: Any = None,
+    session: str | None = None,
 ) -> dict[str, Any]:
     """Execute a DSPy RLM sub-agent.
 
     Returns dict with 'result' (output fields) and 'trajectory' (step trace).
     If callback_server is provided, a 'usage' key is added with per-run token stats.
+    session selects the sandbox kernel the sub-agent's code runs in.
     """
     from mcp_server.signatures import validate_signature, resolve_signature
 
@@ -219,7 +253,7 @@ async def run_sub_agent(
 
     sub_lm = dspy.LM(sub_lm_model)
 
-    async with SandboxInterpreter(sandbox_url) as interpreter:
+    async with SandboxInterpreter(sandbox_url, session=session) as interpreter:
         try:
             rlm = dspy.RLM(
                 signature,
@@ -2,50 +2,155 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import time
+import uuid
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Awaitable, Callable
 
 import httpx
 from mcp.server.fastmcp import Context
 
-from mcp_server.docker_manager import BASE_URL
+from mcp_server.docker_manager import BASE_URL, SANDBOX_WORKSPACE, WORKSPACE_DIR
 
 if TYPE_CHECKING:
     from mcp_server.server import AppContext
 
 
+# Sandbox kernel session used unless a tool call names another one
+DEFAULT_SESSION = "default"
+
+# Minimum seconds between progress notifications while a cell streams output
+PROGRESS_INTERVAL = 1.0
+
+# Bytes per chunk when streaming a file to the sandbox's /upload
+UPLOAD_CHUNK = 1024 * 1024
+
+# Largest page of a variable rlm_get returns (bytes of JSON)
+GET_MAX_BYTES = 64 * 1024
+
+
 def _ctx(ctx: Context) -> AppContext:
     return ctx.request_context.lifespan_context
 
 
-async def _post_exec(app: AppContext, code: str, timeout: int = 30) -> dict:
+def _session_params(session: str) -> dict[str, str] | None:
+    return {"session": session} if session != DEFAULT_SESSION else None
+
+
+async def _post_exec(
+    app: AppContext, code: str, timeout: int = 30, session: str = DEFAULT_SESSION
+) -> dict:
     """POST /exec to the sandbox container using the shared HTTP client."""
     await app.manager.ensure_running()
     r = await app.http.post(
         f"{BASE_URL}/exec",
         json={"code": code, "timeout": timeout},
+        params=_session_params(session),
         timeout=timeout + 5,
     )
     r.raise_for_status()
     return r.json()
 
 
+async def _stream_exec(
+    app: AppContext, code: str, timeout: int = 30, session: str = DEFAULT_SESSION,
+    on_output: Callable[[str, str], Awaitable[None]] | None = None,
+) -> dict:
+    """POST /exec/stream, passing output chunks to on_output; returns the result event."""
+    await app.manager.ensure_running()
+    streamed = []
+    async with app.http.stream(
+        "POST",
+        f"{BASE_URL}/exec/stream",
+        json={"code": code, "timeout": timeout},
+        params=_session_params(session),
+        timeout=timeout + 5,
+    ) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            kind = event.pop("type")
+            if kind == "result":
+                return event
+            streamed.append(event["text"])
+            if on_output is not None:
+                await on_output(kind, event["text"])
+    # The connection dropped before the result; return what was streamed
+    return {"output": "".join(streamed), "stderr": "output stream ended early", "vars": []}
+
+
+def _progress_forwarder(ctx: Context) -> Callable[[str, str], Awaitable[None]]:
+    """on_output callback reporting output volume and the last line as MCP progress."""
+    chars = 0
+    last_sent = 0.0
+
+    async def forward(stream: str, text: str) -> None:
+        nonlocal chars, last_sent
+        chars += len(text)
+        now = time.monotonic()
+        if now - last_sent < PROGRESS_INTERVAL:
+            return
+        last_sent = now
+        lines = text.strip().splitlines()
+        await ctx.report_progress(chars, None, lines[-1][:200] if lines else None)
+    return forward
+
+
 def register_tools(mcp) -> None:
     """Register all sandbox tools on the MCP server instance."""
 
     @mcp.tool()
-    async def rlm_exec(code: str, ctx: Context, timeout: int = 30) -> str:
-        """Execute Python code in the sandbox and return output."""
+    async def rlm_exec(
+        code: str, ctx: Context, timeout: int = 30, session: str = DEFAULT_SESSION
+    ) -> str:
+        """Execute Python code in the sandbox and return output.
+
+        Each session has its own namespace and worker process; use separate
+        sessions to run independent work in parallel. Output is reported as
+        progress while the cell runs; long output is truncated, and
+        rlm_output pages through the rest.
+        """
         app = _ctx(ctx)
-        data = await _post_exec(app, code, timeout)
+        data = await _stream_exec(app, code, timeout, session, _progress_forwarder(ctx))
         parts = []
         if data.get("output"):
             parts.append(data["output"])
         if data.get("stderr"):
             parts.append(f"[stderr] {data['stderr']}")
+        if data.get("truncated"):
+            parts.append(f"[output truncated; rlm_output(\"{data['output_id']}\") "
+                         f"returns the rest]")
         return "\n".join(parts) if parts else "(no output)"
 
+    @mcp.tool()
+    async def rlm_output(
+        output_id: str, ctx: Context, stream: str = "stdout", offset: int = 0,
+        limit: int = 32000,
+    ) -> str:
+        """Page through the full output of a cell whose rlm_exec output was truncated.
+
+        stream is "stdout" or "stderr"; offset and limit are in characters.
+        """
+        app = _ctx(ctx)
+        await app.manager.ensure_running()
+        r = await app.http.get(
+            f"{BASE_URL}/output/{output_id}",
+            params={"stream": stream, "offset": offset, "limit": limit},
+            timeout=10,
+        )
+        if r.status_code == 404:
+            return f"Error: no output {output_id} (only a session's latest cells are kept)"
+        r.raise_for_status()
+        data = r.json()
+        end = data["offset"] + len(data["text"])
+        footer = f"[chars {data['offset']}-{end} of {data['total']}"
+        footer += f"; next: offset={end}]" if data["more"] else "]"
+        return f"{data['text']}\n{footer}"
+
     # Paths the srt sandbox also blocks — defense-in-depth
     DENY_PATHS = [
         Path.home() / ".ssh",
@@ -55,49 +160,105 @@ def register_tools(mcp) -> None:
     ]
 
     @mcp.tool()
-    async def rlm_load(path: str, var_name: str, ctx: Context) -> str:
-        """Read a file from the host filesystem and inject it into the sandbox."""
+    async def rlm_load(
+        path: str, var_name: str, ctx: Context, session: str = DEFAULT_SESSION,
+        mode: str = "text", encoding: str = "utf-8",
+    ) -> str:
+        """Load a host file into a sandbox variable.
+
+        mode is "text" (str), "bytes", or "mmap" (a read-only memory map whose
+        pages are read on first use). Files under workspace/ are bound in
+        place; others are streamed to the sandbox once, never as source code.
+        """
         host_path = Path(path).expanduser().resolve()
         if any(host_path.is_relative_to(d) for d in DENY_PATHS):
             return f"Error: access denied — {host_path} is in a restricted directory"
-        if not host_path.exists():
+        if not host_path.is_file():
             return f"Error: file not found: {host_path}"
-        content = host_path.read_text()
-        escaped = json.dumps(content)
-        code = f"{var_name} = {escaped}"
         app = _ctx(ctx)
-        data = await _post_exec(app, code)
-        if data.get("stderr"):
-            return f"Error loading: {data['stderr']}"
-        return f"Loaded {host_path.name} into `{var_name}` ({len(content)} chars)"
+        await app.manager.ensure_running()
+        params = {"session": session} if session != DEFAULT_SESSION else {}
+        bind = {"var": var_name, "mode": mode, "encoding": encoding}
+
+        # The sandbox can see the file already: hand over the path, no copy
+        if app.manager.bare:
+            shared = str(host_path)
+        elif host_path.is_relative_to(WORKSPACE_DIR.resolve()):
+            shared = f"{SANDBOX_WORKSPACE}/{host_path.relative_to(WORKSPACE_DIR.resolve())}"
+        else:
+            shared = None
+
+        if shared is not None:
+            r = await app.http.post(f"{BASE_URL}/bind", json={"path": shared, **bind},
+                                    params=params, timeout=None)
+        else:
+            async def chunks():
+                with open(host_path, "rb") as f:
+                    while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK):
+                        yield chunk
+
+            r = await app.http.post(f"{BASE_URL}/upload", content=chunks(),
+                                    params={**params, **bind}, timeout=None)
+        data = r.json()
+        if r.status_code != 200:
+            return f"Error loading: {data.get('error') or data.get('detail')}"
+        how = "bound in place" if shared is not None else "uploaded"
+        return (f"Loaded {host_path.name} into `{var_name}` as {data['type']} "
+                f"({data['size']} bytes, {how})")
 
     @mcp.tool()
-    async def rlm_get(name: str, ctx: Context, query: str | None = None) -> str:
-        """Get a variable's value from the sandbox. Optionally run a query expression."""
+    async def rlm_get(
+        name: str, ctx: Context, query: str | None = None, session: str = DEFAULT_SESSION,
+        offset: int = 0, limit: int | None = None, columns: list[str] | None = None,
+    ) -> str:
+        """Get a variable's value from the sandbox. Optionally run a query expression.
+
+        Large values come back a page at a time: offset and limit count rows
+        of a DataFrame, array or Arrow table, items of a list or dict, or
+        characters of a string. columns selects table columns or dict keys.
+        """
         app = _ctx(ctx)
         await app.manager.ensure_running()
 
         if query:
-            data = await _post_exec(app, query)
+            data = await _post_exec(app, query, session=session)
             output = data.get("output", "")
             if data.get("stderr"):
                 output += f"\n[stderr] {data['stderr']}"
             return output or "(no output)"
 
-        r = await app.http.get(f"{BASE_URL}/var/{name}", timeout=10)
+        params = {**(_session_params(session) or {}), "offset": offset,
+                  "max_bytes": GET_MAX_BYTES}
+        if limit is not None:
+            params["limit"] = limit
+        if columns:
+            params["columns"] = ",".join(columns)
+        r = await app.http.get(f"{BASE_URL}/var/{name}", params=params, timeout=10)
         r.raise_for_status()
         data = r.json()
 
         if data.get("error"):
             return f"Error: {data['error']}"
-        return json.dumps(data.get("value"), indent=2, default=str)
+        parts = []
+        if data.get("preview"):
+            preview = data["preview"]
+            parts.append(f"[{preview['kind']} shape={tuple(preview['shape'])}]")
+        parts.append(json.dumps(data.get("value"), indent=2, default=str))
+        if data.get("truncated"):
+            parts.append("[value truncated; use rlm_get with query= to inspect parts of it]")
+        if data.get("length") is not None:
+            end = data["next_offset"] if data["next_offset"] is not None else data["length"]
+            footer = f"[{data['offset']}-{end} of {data['length']}"
+            footer += f"; next: offset={end}]" if data["next_offset"] is not None else "]"
+            parts.append(footer)
+        return "\n".join(parts)
 
     @mcp.tool()
-    async def rlm_vars(ctx: Context) -> str:
+    async def rlm_vars(ctx: Context, session: str = DEFAULT_SESSION) -> str:
         """List all variables in the sandbox."""
         app = _ctx(ctx)
         await app.manager.ensure_running()
-        r = await app.http.get(f"{BASE_URL}/vars", timeout=10)
+        r = await app.http.get(f"{BASE_URL}/vars", params=_session_params(session), timeout=10)
         r.raise_for_status()
         var_list = r.json()
 
@@ -114,20 +275,41 @@ def register_tools(mcp) -> None:
         max_iterations: int = 10,
         max_llm_calls: int = 30,
     ) -> str:
-        """Run a DSPy RLM sub-agent with the given signature and inputs."""
-        from mcp_server.sub_agent import run_sub_agent
+        """Run a DSPy RLM sub-agent with the given signature and inputs.
+
+        The sub-agent runs in a kernel session of its own, so several can run
+        in parallel without touching each other's (or the main) namespace.
+        """
+        from mcp_server.llm_callback import SANDBOX_TOOLS
+        from mcp_server.sub_agent import inject_llm_stub, inject_tool_stubs, run_sub_agent
 
         app = _ctx(ctx)
         await app.manager.ensure_running()
 
-        result = await run_sub_agent(
-            signature=signature,
-            inputs=inputs,
-            max_iterations=max_iterations,
-            max_llm_calls=max_llm_calls,
-            sandbox_url=BASE_URL,
-            callback_server=app.llm_callback,
-        )
+        session = f"sub-{uuid.uuid4().hex[:12]}"
+        cb = app.llm_callback
+        local = app.manager.bare
+        inject_client = httpx.AsyncClient(base_url=BASE_URL, timeout=10,
+                                          params={"session": session})
+        try:
+            await inject_llm_stub(inject_client, cb.callback_url_local if local else cb.callback_url)
+            await inject_tool_stubs(inject_client, cb.base_url_local if local else cb.base_url,
+                                    SANDBOX_TOOLS)
+            result = await run_sub_agent(
+                signature=signature,
+                inputs=inputs,
+                max_iterations=max_iterations,
+                max_llm_calls=max_llm_calls,
+                sandbox_url=BASE_URL,
+                callback_server=cb,
+                session=session,
+            )
+        finally:
+            try:
+                await inject_client.delete(f"/session/{session}")
+            except httpx.HTTPError:
+                pass
+            await inject_client.aclose()
 
         if result.get("error"):
             return f"Error: {result['error']}"
@@ -184,17 +366,18 @@ def register_tools(mcp) -> None:
         return "\n".join(lines)
 
     @mcp.tool()
-    async def rlm_reset(ctx: Context) -> str:
+    async def rlm_reset(ctx: Context, session: str = DEFAULT_SESSION) -> str:
         """Reset the sandbox kernel, clearing all state."""
         from mcp_server.sub_agent import inject_llm_stub
 
         app = _ctx(ctx)
-        data = await _post_exec(app, "get_ipython().reset(new_session=True)")
+        data = await _post_exec(app, "get_ipython().reset(new_session=True)", session=session)
 
         # Re-inject llm_query() since reset clears the namespace
         cb = app.llm_callback
-        cb_url = cb.callback_url_local if app.manager._no_docker else cb.callback_url
-        inject_client = httpx.AsyncClient(base_url=BASE_URL, timeout=10)
+        cb_url = cb.callback_url_local if app.manager.bare else cb.callback_url
+        inject_client = httpx.AsyncClient(base_url=BASE_URL, timeout=10,
+                                          params=_session_params(session))
         try:
             await inject_llm_stub(inject_client, cb_url)
         finally:
@@ -203,3 +386,49 @@ def register_tools(mcp) -> None:
         if data.get("stderr"):
             return f"Reset with warnings: {data['stderr']}"
         return "Sandbox reset."
+
+    @mcp.tool()
+    async def rlm_snapshot_status(ctx: Context) -> str:
+        """Show what saving the sandbox session costs: saves, skips, bytes and timings."""
+        app = _ctx(ctx)
+        if app.session is None:
+            return "Session snapshots are not enabled."
+        s = app.session.status()
+        lines = [
+            f"Saves: {s['saves']} ({s['skipped']} skipped, nothing had changed)",
+            f"Written: {s['blobs_written']} blobs, {s['bytes_written']:,} bytes",
+            f"Last save: {s['last_save_vars']} vars in {s['last_save_seconds']:.2f}s",
+            f"Sandbox pickling: {s['checkpoint_seconds']:.2f}s, "
+            f"{s['checkpoint_bytes']:,} bytes since start",
+        ]
+        if "vars" in s:
+            lines.append(f"On disk: {s['vars']} vars, {s['snapshot_bytes']:,} bytes")
+        if s["generations"]:
+            lines.append("Generations (newest first; rlm_rollback(generation) restores one):")
+        for g in s["generations"]:
+            saved = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(g["saved_at"]))
+            note = f", rollback to {g['rollback_of']}" if "rollback_of" in g else ""
+            lines.append(f"  {g['generation']}: {saved}, {g['vars']} vars, "
+                         f"{g['bytes']:,} bytes ({g['new_bytes']:,} new){note}")
+        return "\n".join(lines)
+
+    @mcp.tool()
+    async def rlm_rollback(generation: int, ctx: Context) -> str:
+        """Put the sandbox back to a saved snapshot generation (see rlm_snapshot_status).
+
+        The current state is saved as a generation first, so a rollback can be
+        undone the same way. Variables the generation doesn't have are deleted.
+        """
+        app = _ctx(ctx)
+        if app.session is None:
+            return "Session snapshots are not enabled."
+        result = await app.session.rollback(generation)
+        if "error" in result:
+            return f"Rollback failed: {result['error']}"
+        lines = [f"Rolled back to generation {generation}: "
+                 f"{len(result['restored'])} variables restored"]
+        if result["deleted"]:
+            lines.append(f"Deleted: {', '.join(result['deleted'])}")
+        if result["failed"]:
+            lines.append(f"Could not restore: {', '.join(result['failed'])}")
+        return "\n".join(lines)
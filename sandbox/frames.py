@@ -0,0 +1,168 @@
+"""Framed, compressed blob transport for session snapshots.
+
+A stream is a sequence of frames. Each frame is a JSON header line
+({"key": ..., "codec": ...}) followed by length-prefixed chunks (8-byte
+big-endian length, then the bytes) and a zero-length chunk to end it. Chunk
+data is the blob compressed with the frame's codec as one stream, so a blob
+is compressed and decompressed a chunk at a time and never needs a second
+full copy, and a stored compressed blob can be sent as is.
+
+Codecs: "zstd" (needs the zstandard package, which the sandbox image
+installs), "zlib" and "none". The host imports this module too; it has no
+dependencies beyond the standard library.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from collections.abc import Iterable, Iterator
+
+# Bytes of blob compressed (or read from disk) per chunk
+CHUNK = 1024 * 1024
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 1
+
+_LEN = struct.Struct(">Q")
+
+
+def available() -> list[str]:
+    """Codecs this process can use, best first."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return ["zlib", "none"]
+    return ["zstd", "zlib", "none"]
+
+
+def pick_codec(accepted: Iterable[str]) -> str:
+    """The best codec both sides have."""
+    accepted = set(accepted)
+    return next((c for c in available() if c in accepted), "none")
+
+
+def _compressor(codec: str):
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, write_checksum=True).compressobj()
+    if codec == "zlib":
+        return zlib.compressobj(ZLIB_LEVEL)
+    if codec == "none":
+        return None
+    raise ValueError(f"unknown codec: {codec}")
+
+
+def _decompressor(codec: str):
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj()
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if codec == "none":
+        return None
+    raise ValueError(f"unknown codec: {codec}")
+
+
+def header(key: str, codec: str) -> bytes:
+    return json.dumps({"key": key, "codec": codec}).encode() + b"\n"
+
+
+def chunk(data: bytes) -> bytes:
+    return _LEN.pack(len(data)) + data
+
+
+END = _LEN.pack(0)
+
+
+def encode(key: str, data: bytes, codec: str) -> Iterator[bytes]:
+    """One frame: data compressed with codec, a CHUNK of input at a time."""
+    yield header(key, codec)
+    comp = _compressor(codec)
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK):
+        part = view[start:start + CHUNK]
+        out = bytes(part) if comp is None else comp.compress(part)
+        if out:
+            yield chunk(out)
+    if comp is not None:
+        tail = comp.flush()
+        if tail:
+            yield chunk(tail)
+    yield END
+
+
+def decompress(codec: str, parts: list[bytes]) -> bytes:
+    """A frame's chunks back to the blob; raises ValueError if they're corrupt."""
+    decomp = _decompressor(codec)
+    if decomp is None:
+        return b"".join(parts)
+    try:
+        out = [decomp.decompress(p) for p in parts]
+        if codec == "zlib":
+            out.append(decomp.flush())
+            if not decomp.eof:
+                raise ValueError("truncated zlib stream")
+        elif not decomp.eof:
+            raise ValueError("truncated zstd stream")
+    except Exception as e:  # zlib.error, zstandard.ZstdError, truncation
+        raise ValueError(f"corrupt {codec} blob: {e}") from e
+    return b"".join(out)
+
+
+class FrameReader:
+    """Incremental frame parser: feed() bytes as they arrive, get events back.
+
+    Events are ("start", header dict), ("data", bytes) and ("end", header dict).
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._header: dict | None = None
+        self._need: int | None = None  # bytes of the current chunk still to come
+
+    def feed(self, data: bytes) -> list[tuple[str, object]]:
+        self._buf += data
+        events: list[tuple[str, object]] = []
+        while True:
+            if self._header is None:
+                end = self._buf.find(b"\n")
+                if end < 0:
+                    return events
+                self._header = json.loads(bytes(self._buf[:end]))
+                del self._buf[:end + 1]
+                events.append(("start", self._header))
+            elif self._need is None:
+                if len(self._buf) < _LEN.size:
+                    return events
+                (self._need,) = _LEN.unpack(self._buf[:_LEN.size])
+                del self._buf[:_LEN.size]
+                if self._need == 0:
+                    events.append(("end", self._header))
+                    self._header = self._need = None
+            else:
+                if len(self._buf) < self._need:
+                    return events
+                events.append(("data", bytes(self._buf[:self._need])))
+                del self._buf[:self._need]
+                self._need = None
+
+    def frames(self, data: bytes) -> list[tuple[str, str, list[bytes]]]:
+        """Feed data; return the frames it completed as (key, codec, chunks)."""
+        done = []
+        for kind, value in self.feed(data):
+            if kind == "start":
+                self._parts: list[bytes] = []
+            elif kind == "data":
+                self._parts.append(value)
+            else:
+                done.append((value["key"], value["codec"], self._parts))
+        return done
+
+    def close(self) -> None:
+        """Raise ValueError if the stream stopped inside a frame."""
+        if self._header is not None or self._buf:
+            raise ValueError("stream ended inside a frame")
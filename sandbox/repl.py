@@ -1,90 +1,1660 @@
-"""IPython kernel manager for the sandbox container."""
+"""IPython kernel manager for the sandbox container.
 
+Cells run in a worker process that owns the IPython shell and its
+namespace; Kernel, in the server process, supervises it over a pipe. A cell
+that runs past its timeout is interrupted (SIGINT, so it sees a
+KeyboardInterrupt), and if it hasn't stopped INTERRUPT_GRACE seconds later
+the worker is killed. A fresh worker is forked from a forkserver that has
+IPython preloaded, and the namespace is restored from the last checkpoint.
+
+The checkpoint is a dict of per-variable dill blobs kept in the server
+process. After replying to each cell the worker re-serializes the variables
+that were rebound or may have been mutated in place (any name can reach a
+mutable value, so all of those), and sends only the blobs whose sha256
+differs from the one the supervisor holds. Values that can't be pickled are
+left out; a blob over CHECKPOINT_MAX_VAR_BYTES is written to a file under
+CHECKPOINT_DIR as it is pickled, and the checkpoint keeps a reference to it.
+The supervisor applies that checkpoint before its next request to the
+worker, so pickling never counts against a cell's timeout.
+
+Cell output is streamed: the worker sends stdout/stderr to the supervisor in
+chunks as the cell runs, which forwards them to an on_output callback (the
+server's streaming /exec). The reply keeps the first OUTPUT_CAP characters
+of each stream; longer output is spilled to a file that read_output() pages
+through, so a cell printing megabytes never ends up in one response.
+
+A restored snapshot can be deferred (Kernel.load_vars(lazy=True)): its blobs
+go into the checkpoint and the worker only gets a placeholder per variable.
+A cell that names a placeholder, or a function or class whose code reads it
+as a global, first fetches its blob from the supervisor and unpickles it, as
+does a get_var() of one, so restoring costs nothing in the worker until a
+variable is used.
+
+Each session (an ID chosen by the client) gets its own Kernel, so parallel
+runs neither share a namespace nor a core. KernelPool caps the number of
+live workers; a worker idle for KERNEL_IDLE_TIMEOUT is stopped, and its
+session is restarted from the checkpoint on next use. KernelPool.setup is
+code run in each new session before its first request (the host's
+llm_query() and tool stubs).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import datetime
+import enum
+import hashlib
 import io
+import itertools
 import json
-import contextlib
+import logging
+import math
+import mmap
+import multiprocessing
+import numbers
+import os
+import pathlib
+import re
+import reprlib
+import signal
+import sys
+import tempfile
 import threading
+import time
+import types
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+import dill
 from IPython.core.interactiveshell import InteractiveShell
 
+log = logging.getLogger(__name__)
+
+# Seconds a timed-out cell gets to stop after SIGINT before the worker is killed
+INTERRUPT_GRACE = 2.0
+
+# Seconds allowed for requests other than /exec (vars, snapshots, ...)
+OP_TIMEOUT = 30.0
+
+# Variables pickling to more than this are checkpointed to a file rather
+# than held in memory (bytes)
+CHECKPOINT_MAX_VAR_BYTES = 64 * 1024 * 1024
+
+# Where those files go
+CHECKPOINT_DIR = Path(tempfile.gettempdir()) / "sandbox-checkpoint"
+
+# Seconds a worker may take to checkpoint after a cell before it is restarted
+CHECKPOINT_TIMEOUT = 300.0
+
+# Live worker processes at once (one per active session)
+MAX_KERNELS = int(os.environ.get("SANDBOX_MAX_KERNELS", max(2, os.cpu_count() or 1)))
+
+# Seconds a session's worker may sit idle before it is stopped
+KERNEL_IDLE_TIMEOUT = float(os.environ.get("SANDBOX_KERNEL_IDLE_TIMEOUT", 600))
+
+# Seconds a stopped session's checkpoint is kept before the session is forgotten
+SESSION_EXPIRY = 24 * 3600
+
+DEFAULT_SESSION = "default"
+
+# Characters of stdout (and of stderr) returned with a cell's result; the
+# rest is spilled to disk
+OUTPUT_CAP = int(os.environ.get("SANDBOX_OUTPUT_CAP", 32 * 1024))
+
+# Where spilled output goes, and how many spilled cells each session keeps
+SPILL_DIR = Path(tempfile.gettempdir()) / "sandbox-output"
+SPILL_KEEP = 16
+
+# The worker sends buffered output once it holds this many characters, or
+# after STREAM_INTERVAL seconds
+STREAM_CHUNK = 8192
+STREAM_INTERVAL = 0.2
+
+STREAMS = ("stdout", "stderr")
+
+# How bind_file() exposes a file: a bytes object, a read-only mmap (pages
+# are read on first touch), or str decoded with the given encoding
+BIND_MODES = ("bytes", "mmap", "text")
+
+# Seconds allowed for binding a file (reading a large one takes a while)
+BIND_TIMEOUT = 300.0
+
+# get_var pages: items (or table rows) per page unless a limit is given, and
+# the most bytes a page may encode to
+VAR_PAGE_SIZE = 1000
+VAR_MAX_BYTES = int(os.environ.get("SANDBOX_VAR_MAX_BYTES", 1024 * 1024))
+
+# /vars summaries: at most this many characters; sized objects of unknown
+# types longer than SUMMARY_MAX_LEN are described by type and length only
+SUMMARY_CHARS = 100
+SUMMARY_MAX_LEN = 10_000
+
+# get_var encodings besides JSON: raw bytes/text, NumPy .npy, Arrow IPC stream
+VAR_ENCODINGS = ("json", "raw", "npy", "arrow")
+
+# Identifiers in a cell, to find which deferred variables it uses
+_NAME_RE = re.compile(r"[A-Za-z_]\w*")
+
+# Names that let a cell reach variables without naming them; a cell using
+# any of these loads every deferred variable first
+_DYNAMIC_NAMES = frozenset({"globals", "locals", "vars", "eval", "exec", "who", "whos"})
+
+# Values that can only change by being rebound, so an unchanged id() means
+# an unchanged value. Not classes or functions: their attributes can change.
+# Modules pickle by reference, so re-pickling one would show nothing new.
+_IMMUTABLE = (int, float, complex, str, bytes, bool, type(None), frozenset, range,
+              types.BuiltinFunctionType, types.ModuleType)
+
+
+class KernelRestarted(RuntimeError):
+    """The worker was killed or died and has been replaced."""
+
+
+class PoolExhausted(RuntimeError):
+    """Every worker slot is taken by a session that is running a request."""
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+
+class _StreamSender:
+    """Buffers a running cell's output and sends it to the supervisor in chunks.
+
+    Writes can come from threads the cell started, so sends are locked; a
+    background thread flushes output that sits in the buffer too long.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.active = False
+        self._lock = threading.Lock()
+        self._buf = {name: [] for name in STREAMS}
+        self._size = 0
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def write(self, stream: str, text: str) -> None:
+        with self._lock:
+            if not self.active:
+                # A thread left running by an earlier cell; nobody is listening
+                (sys.__stdout__ if stream == "stdout" else sys.__stderr__).write(text)
+                return
+            self._buf[stream].append(text)
+            self._size += len(text)
+            if self._size >= STREAM_CHUNK:
+                self._flush()
+
+    def _flush(self) -> None:
+        for name in STREAMS:
+            if self._buf[name]:
+                self.conn.send(("stream", name, "".join(self._buf[name])))
+                self._buf[name] = []
+        self._size = 0
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(STREAM_INTERVAL)
+            with self._lock:
+                if self.active and self._size:
+                    self._flush()
+
+    def start(self) -> None:
+        with self._lock:
+            self.active = True
+
+    def finish(self) -> None:
+        """Send what's buffered; later writes no longer go to the supervisor."""
+        with self._lock:
+            self._flush()
+            self.active = False
+
+
+class _StreamFile(io.TextIOBase):
+    """sys.stdout/sys.stderr stand-in feeding a _StreamSender."""
+
+    def __init__(self, sender: _StreamSender, name: str):
+        self.sender = sender
+        self.name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self.sender.write(self.name, text)
+        return len(text)
+
+
+# ---------------------------------------------------------------------------
+# Variable paging
+# ---------------------------------------------------------------------------
+
+
+class _PageError(ValueError):
+    pass
+
+
+def _kind(v: Any) -> str:
+    """What get_var pages over: rows of a table, items, characters, or nothing."""
+    t = type(v)
+    module, name = t.__module__.split(".")[0], t.__name__
+    if module == "pandas" and name in ("DataFrame", "Series"):
+        return name.lower()
+    if module == "numpy" and name == "ndarray":
+        return "ndarray"
+    if module == "pyarrow" and name in ("Table", "RecordBatch"):
+        return "arrow"
+    if isinstance(v, (str, bytes, bytearray, memoryview, mmap.mmap)):
+        return "chars"
+    if isinstance(v, dict):
+        return "dict"
+    if isinstance(v, (list, tuple, range, set, frozenset)):
+        return "items"
+    return "scalar"
+
+
+def _preview(v: Any, kind: str) -> dict | None:
+    """Shape and types of tabular and array values."""
+    if kind == "dataframe":
+        return {"kind": kind, "shape": list(v.shape), "columns": [str(c) for c in v.columns],
+                "dtypes": {str(c): str(d) for c, d in v.dtypes.items()}}
+    if kind == "series":
+        return {"kind": kind, "shape": list(v.shape), "dtype": str(v.dtype),
+                "name": None if v.name is None else str(v.name)}
+    if kind == "ndarray":
+        return {"kind": kind, "shape": list(v.shape), "dtype": str(v.dtype)}
+    if kind == "arrow":
+        return {"kind": kind, "shape": [v.num_rows, v.num_columns],
+                "schema": {f.name: str(f.type) for f in v.schema}}
+    return None
+
+
+def _project(v: Any, kind: str, columns: list[str]) -> Any:
+    """Keep only the named columns (or dict keys)."""
+    if kind == "dataframe":
+        missing = [c for c in columns if c not in v.columns]
+        if missing:
+            raise _PageError(f"no such columns: {', '.join(missing)}")
+        return v[columns]
+    if kind == "arrow":
+        try:
+            return v.select(columns)
+        except KeyError as e:
+            raise _PageError(f"no such columns: {e}") from e
+    if kind == "dict":
+        return {k: v[k] for k in columns if k in v}
+    raise _PageError(f"columns apply to tables and dicts, not {type(v).__name__}")
+
+
+def _length(v: Any, kind: str) -> int:
+    return v.num_rows if kind == "arrow" else len(v)
+
+
+def _slice(v: Any, kind: str, start: int, stop: int) -> Any:
+    if kind in ("dataframe", "series"):
+        return v.iloc[start:stop]
+    if kind == "arrow":
+        return v.slice(start, stop - start)
+    if kind == "dict":
+        return dict(itertools.islice(v.items(), start, stop))
+    if isinstance(v, (set, frozenset)):
+        return list(itertools.islice(v, start, stop))
+    return v[start:stop]
+
+
+def _finite(obj: Any) -> Any:
+    """Replace NaN and infinities, which JSON can't carry, with None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k if isinstance(k, (str, int, float, bool, type(None))) else repr(k): _finite(x)
+                for k, x in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(x) for x in obj]
+    return obj
+
+
+def _json_page(page: Any, kind: str) -> tuple[Any, int]:
+    """A page as JSON-ready Python values, and its encoded size."""
+    if kind == "dataframe":
+        value = page.to_dict(orient="records")
+    elif kind == "series":
+        value = page.tolist()
+    elif kind == "ndarray":
+        value = page.tolist()
+    elif kind == "arrow":
+        value = page.to_pylist()
+    elif isinstance(page, (bytes, bytearray, memoryview, mmap.mmap)):
+        value = repr(bytes(page))
+    elif isinstance(page, range):
+        value = list(page)
+    else:
+        value = page
+    try:
+        return value, len(json.dumps(value, allow_nan=False))
+    except (TypeError, ValueError):
+        text = json.dumps(_finite(value), default=repr)
+        return json.loads(text), len(text)
+
+
+def _binary_page(page: Any, kind: str, encoding: str) -> tuple[bytes, str]:
+    """A page as (bytes, media type) in a binary encoding."""
+    if encoding == "raw":
+        if isinstance(page, str):
+            return page.encode(), "text/plain; charset=utf-8"
+        if isinstance(page, (bytes, bytearray, memoryview, mmap.mmap)):
+            return bytes(page), "application/octet-stream"
+        raise _PageError("raw encoding is for str and bytes-like values")
+    if encoding == "npy":
+        if kind != "ndarray":
+            raise _PageError("npy encoding is for NumPy arrays")
+        import numpy as np
+
+        buf = io.BytesIO()
+        np.save(buf, page, allow_pickle=False)
+        return buf.getvalue(), "application/x-npy"
+    if encoding == "arrow":
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise _PageError("arrow encoding needs pyarrow in the sandbox") from e
+        if kind == "arrow":
+            table = page
+        elif kind == "dataframe":
+            table = pa.Table.from_pandas(page, preserve_index=False)
+        elif kind in ("series", "ndarray", "items"):
+            values = page.tolist() if kind != "items" else list(page)
+            table = (pa.Table.from_pylist(values) if values and all(isinstance(x, dict) for x in values)
+                     else pa.table({"value": values}))
+        else:
+            raise _PageError("arrow encoding is for tables, arrays and lists")
+        buf = io.BytesIO()
+        with pa.ipc.new_stream(buf, table.schema) as writer:
+            writer.write_table(table)
+        return buf.getvalue(), "application/vnd.apache.arrow.stream"
+    raise _PageError(f"encoding must be one of {', '.join(VAR_ENCODINGS)}")
+
+
+def page_value(v: Any, offset: int = 0, limit: int | None = None,
+               columns: list[str] | None = None, max_bytes: int = VAR_MAX_BYTES,
+               encoding: str = "json") -> dict:
+    """One page of a value, kept under max_bytes once encoded.
+
+    Tables, arrays and sequences page by row or item, strings and bytes by
+    character. The reply has "value" (JSON encoding) or "data" and
+    "media_type" (binary encodings); "preview" describes tabular and array
+    values; "length", "offset" and "next_offset" are added when the caller
+    paged or the value didn't fit. A page that can't be made small enough
+    is replaced by a cut-off repr with "truncated" set.
+    """
+    kind = _kind(v)
+    if columns:
+        v = _project(v, kind, columns)
+    meta: dict[str, Any] = {}
+    preview = _preview(v, kind)
+    if preview is not None:
+        meta["preview"] = preview
+
+    if kind == "scalar":
+        if encoding != "json":
+            raise _PageError(f"{type(v).__name__} values only have a JSON encoding")
+        value, size = _json_page(v, kind)
+        if size > max_bytes:
+            return {"value": repr(v)[:max_bytes], "truncated": True, **meta}
+        return {"value": value, **meta}
+
+    length = _length(v, kind)
+    offset = max(0, offset)
+    count = limit if limit is not None else (max_bytes if kind == "chars" else VAR_PAGE_SIZE)
+    count = max(0, min(count, length - offset))
+    while True:
+        page = _slice(v, kind, offset, offset + count)
+        if encoding == "json":
+            value, size = _json_page(page, kind)
+        else:
+            data, media_type = _binary_page(page, kind, encoding)
+            size = len(data)
+        if size <= max_bytes or count <= 1:
+            break
+        # Shrink the page in proportion to the overshoot
+        count = max(1, min(count - 1, count * max_bytes // size))
+
+    result: dict[str, Any] = {}
+    if size > max_bytes:
+        if encoding != "json":
+            raise _PageError(f"one row encodes to {size} bytes, over max_bytes={max_bytes}")
+        result["value"] = repr(page)[:max_bytes]
+        result["truncated"] = True
+    elif encoding == "json":
+        result["value"] = value
+    else:
+        result["data"], result["media_type"] = data, media_type
+    end = offset + count
+    if limit is not None or offset or end < length:
+        result.update(length=length, offset=offset, next_offset=end if end < length else None)
+    return {**result, **meta}
+
+
+# ---------------------------------------------------------------------------
+# Variable summaries
+# ---------------------------------------------------------------------------
+
+
+class _SummaryRepr(reprlib.Repr):
+    """Bounded repr: containers show a few items, and arrays and tables show
+    their shape instead of their contents."""
 
-class Kernel:
     def __init__(self):
-        self.shell = InteractiveShell.instance()
+        super().__init__()
+        self.maxstring = self.maxother = SUMMARY_CHARS
+        self.maxlong = SUMMARY_CHARS
 
-    def execute(self, code: str, timeout: int = 30) -> dict:
-        """Run code in IPython, capture stdout/stderr, return results."""
-        stdout_buf = io.StringIO()
-        stderr_buf = io.StringIO()
-        result_container = [None]
-        error_container = [None]
+    def repr_ndarray(self, x, level):
+        return f"ndarray shape={x.shape} dtype={x.dtype}"
 
-        def _run():
-            try:
-                with contextlib.redirect_stdout(stdout_buf), contextlib.redirect_stderr(stderr_buf):
-                    result_container[0] = self.shell.run_cell(code, store_history=False)
-            except Exception as e:
-                error_container[0] = e
+    def repr_DataFrame(self, x, level):
+        cols = self.repr1(list(map(str, x.columns)), level - 1)
+        return f"DataFrame shape={x.shape} columns={cols}"
 
-        thread = threading.Thread(target=_run)
-        thread.start()
-        thread.join(timeout=timeout)
+    def repr_Series(self, x, level):
+        return f"Series len={len(x)} dtype={x.dtype} name={x.name!r}"
 
-        if thread.is_alive():
-            # Timeout — thread is stuck; we can't forcibly kill it,
-            # but we report the timeout and move on.
-            return {
-                "output": stdout_buf.getvalue(),
-                "stderr": f"Execution timed out after {timeout}s",
-                "vars": [],
-            }
+    def repr_Table(self, x, level):
+        if type(x).__module__.startswith("pyarrow"):
+            return f"Table shape={x.shape} columns={self.repr1(x.column_names, level - 1)}"
+        return self.repr_instance(x, level)
+
+    def repr_bytes(self, x, level):
+        if len(x) <= self.maxstring:
+            return repr(x)
+        return repr(x[:self.maxstring])[:-1] + "...'"
+
+    def repr_mmap(self, x, level):
+        return f"mmap len={len(x)}"
+
+    # reprlib sorts sets and dicts before cutting them short; show the
+    # first items in iteration order instead
+
+    def repr_set(self, x, level):
+        if not x:
+            return "set()"
+        return self._repr_iterable(x, level, "{", "}", self.maxset)
+
+    def repr_frozenset(self, x, level):
+        if not x:
+            return "frozenset()"
+        return self._repr_iterable(x, level, "frozenset({", "})", self.maxset)
+
+    def repr_dict(self, x, level):
+        if not x:
+            return "{}"
+        if level <= 0:
+            return "{...}"
+        pieces = [f"{self.repr1(k, level - 1)}: {self.repr1(x[k], level - 1)}"
+                  for k in itertools.islice(x, self.maxdict)]
+        if len(x) > self.maxdict:
+            pieces.append("...")
+        return "{" + ", ".join(pieces) + "}"
+
+    def repr_instance(self, x, level):
+        # Don't let an arbitrary __repr__ build a huge string
+        if hasattr(x, "__len__") and _big(x):
+            return f"<{type(x).__name__} len={len(x)}>"
+        cls = type(x)
+        if dataclasses.is_dataclass(x) and not isinstance(x, type):
+            names = [f.name for f in dataclasses.fields(x) if f.repr]
+            return self._fields(x, names, level)
+        if isinstance(x, tuple) and hasattr(x, "_fields"):
+            return self._fields(x, x._fields, level)
+        # Subclasses (Counter, OrderedDict, ...) get their base's bounded form
+        for base in (dict, list, tuple, set, frozenset):
+            if isinstance(x, base):
+                inner = getattr(self, "repr_" + base.__name__)(x, level)
+                return self._cut(f"{cls.__name__}({inner})")
+        # Library objects may format all their data; only call reprs known
+        # to be cheap, and those of classes the session defined itself
+        if (cls.__repr__ is object.__repr__ or isinstance(x, _CHEAP_REPR)
+                or cls.__module__ == "__main__"):
+            return super().repr_instance(x, level)
+        return f"<{cls.__module__}.{cls.__qualname__} object>"
+
+    def _fields(self, x, names, level) -> str:
+        if level <= 0:
+            return f"{type(x).__name__}(...)"
+        fields = ", ".join(f"{k}={self.repr1(getattr(x, k, None), level - 1)}" for k in names)
+        return self._cut(f"{type(x).__name__}({fields})")
+
+    def _cut(self, s: str) -> str:
+        if len(s) <= self.maxother:
+            return s
+        return s[:self.maxother - 3] + "..."
+
+
+# Types whose repr is short whatever the value
+_CHEAP_REPR = (numbers.Number, bool, type(None), datetime.date, datetime.time,
+               datetime.timedelta, datetime.timezone, pathlib.PurePath, uuid.UUID,
+               enum.Enum, range, slice, type, types.FunctionType,
+               types.BuiltinFunctionType, types.MethodType, types.ModuleType)
+
+
+def _len(x: Any) -> int | None:
+    try:
+        return len(x) if isinstance(x, (str, bytes, tuple, frozenset, range)) else None
+    except Exception:
+        return None
+
+
+def _big(x: Any) -> bool:
+    try:
+        return len(x) > SUMMARY_MAX_LEN
+    except Exception:
+        return False
+
+
+_summary_repr = _SummaryRepr()
+
+
+def summarize(v: Any) -> str:
+    """A short description of a value, at bounded cost whatever its size."""
+    try:
+        summary = _summary_repr.repr(v)
+    except Exception as e:
+        summary = f"<{type(v).__name__}: repr failed: {type(e).__name__}>"
+    if len(summary) > SUMMARY_CHARS:
+        summary = summary[:SUMMARY_CHARS - 3] + "..."
+    # Say how much was left out
+    if isinstance(v, (str, bytes)):
+        shown = _summary_repr.maxstring
+    elif isinstance(v, (list, tuple, dict, set, frozenset)):
+        shown = _summary_repr.maxlist
+    else:
+        return summary
+    if len(v) > shown:
+        summary += f" (len={len(v)})"
+    return summary
+
+
+class _VarBlobs(dict):
+    """A snapshot as {name: dill bytes}: each variable is pickled once, and
+    one that fails to load doesn't take the others with it."""
+
+
+@dataclasses.dataclass(frozen=True)
+class _FileRef:
+    """Checkpoint stand-in for a variable bound to a file: rebinding is cheaper
+    than pickling the contents, and an mmap can't be pickled at all."""
+
+    path: str
+    mode: str
+    encoding: str
+
+
+class _Deferred:
+    """Placeholder for a restored variable whose blob hasn't been loaded yet."""
+
+    __slots__ = ("name", "size")
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"<{self.name}: not loaded ({self.size} bytes)>"
+
+
+@dataclasses.dataclass(frozen=True)
+class _Spilled:
+    """Checkpoint blob too big to hold in memory, in a file under CHECKPOINT_DIR."""
+
+    path: str
+    size: int
+    digest: str
+
+    def map(self) -> Any:
+        """The blob as a read-only mmap (a bytes-like object)."""
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _SpillWriter:
+    """dill.dump() target that keeps up to CHECKPOINT_MAX_VAR_BYTES in memory,
+    then moves to a file under CHECKPOINT_DIR."""
+
+    def __init__(self):
+        self._buf: io.BytesIO | None = io.BytesIO()
+        self._file = None
+        self._path = ""
+        self._size = 0
+        self._sha = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        if self._buf is not None and self._size + len(data) > CHECKPOINT_MAX_VAR_BYTES:
+            CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+            fd, self._path = tempfile.mkstemp(dir=CHECKPOINT_DIR, suffix=".pkl")
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buf.getbuffer())
+            self._buf = None
+        (self._file or self._buf).write(data)
+        self._size += len(data)
+        self._sha.update(data)
+        return len(data)
+
+    def result(self) -> bytes | _Spilled:
+        if self._file is None:
+            return self._buf.getvalue()
+        self._file.close()
+        return _Spilled(self._path, self._size, self._sha.hexdigest())
+
+    def digest(self) -> str:
+        return self._sha.hexdigest()
+
+    def discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self._path)
+
+
+def _dump(value: Any) -> tuple[bytes | _Spilled, str]:
+    """Pickle value for the checkpoint, spilling to disk past
+    CHECKPOINT_MAX_VAR_BYTES. Returns the blob and its sha256."""
+    out = _SpillWriter()
+    try:
+        dill.dump(value, out)
+    except BaseException:
+        out.discard()
+        raise
+    return out.result(), out.digest()
+
+
+def _load(data: bytes | _Spilled) -> Any:
+    if isinstance(data, _Spilled):
+        with open(data.path, "rb") as f:
+            return dill.load(f)
+    return dill.loads(data)
+
+
+def _digest(data: bytes | _Spilled) -> str:
+    return data.digest if isinstance(data, _Spilled) else hashlib.sha256(data).hexdigest()
 
-        if error_container[0] is not None:
-            return {
-                "output": stdout_buf.getvalue(),
-                "stderr": f"{type(error_container[0]).__name__}: {error_container[0]}",
-                "vars": [],
-            }
 
-        result = result_container[0]
-        output = stdout_buf.getvalue()
+def _blob_size(data: bytes | _Spilled) -> int:
+    return data.size if isinstance(data, _Spilled) else len(data)
+
+
+def _remove_blob(data: bytes | _Spilled | None) -> None:
+    if isinstance(data, _Spilled):
+        with contextlib.suppress(OSError):
+            os.unlink(data.path)
+
+
+def _global_names(value: Any, namespace: dict) -> set[str]:
+    """Global names read by the code of value, if it is a function, method or
+    class defined in namespace, or an instance of such a class."""
+    if not isinstance(value, (type, types.FunctionType, types.MethodType)):
+        value = type(value)
+    if isinstance(value, types.MethodType):
+        value = value.__func__
+    funcs = [value]
+    if isinstance(value, type):
+        funcs = []
+        for cls in value.__mro__:
+            for attr in vars(cls).values():
+                if isinstance(attr, (staticmethod, classmethod)):
+                    attr = attr.__func__
+                if isinstance(attr, property):
+                    funcs.extend((attr.fget, attr.fset, attr.fdel))
+                else:
+                    funcs.append(attr)
+    names: set[str] = set()
+    for fn in funcs:
+        if isinstance(fn, types.FunctionType) and fn.__globals__ is namespace:
+            codes = [fn.__code__]
+            while codes:
+                code = codes.pop()
+                names.update(code.co_names)
+                codes.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    return names
+
+
+def _read_file(ref: _FileRef) -> Any:
+    if ref.mode == "mmap":
+        with open(ref.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""  # an empty file can't be mapped
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with open(ref.path, "rb") as f:
+        data = f.read()
+    return data.decode(ref.encoding) if ref.mode == "text" else data
+
+
+class _Worker:
+    """The shell and namespace, living in the worker process."""
+
+    def __init__(self, conn=None):
+        self.shell = InteractiveShell.instance()
+        self.conn = conn
+        self.sender = _StreamSender(conn) if conn is not None else None
+        self.running = False
+        # name -> id() of the value at the last checkpoint
+        self._checkpointed: dict[str, int] = {}
+        # name -> sha256 of the blob the supervisor holds for it
+        self._sent: dict[str, str] = {}
+        # name -> (file it was bound to, id() of the bound value)
+        self._bound: dict[str, tuple[_FileRef, int]] = {}
+        # name -> placeholder of a variable restored but not loaded yet
+        self._deferred: dict[str, _Deferred] = {}
+        # Bumped whenever code or a restore may have changed values in place
+        self.exec_count = 0
+        # name -> (id, exec_count, (type, len), summary); see get_vars()
+        self._summaries: dict[str, tuple[int, int, tuple, str]] = {}
+
+    def _user_items(self):
+        hidden = self.shell.user_ns_hidden
+        return [(k, v) for k, v in self.shell.user_ns.items()
+                if not k.startswith("_") and k not in hidden]
+
+    def execute(self, code: str) -> dict:
+        """Run code in IPython, streaming stdout/stderr; return the variable names.
+
+        Output, including the result's repr and the error line, goes to the
+        supervisor as stream messages (see _StreamSender) before the reply.
+        The checkpoint follows the reply (see _worker_main).
+        """
+        sender = self.sender
+        stdout, stderr = _StreamFile(sender, "stdout"), _StreamFile(sender, "stderr")
+        result = None
+        self._load_used(set(_NAME_RE.findall(code)))
+        self.exec_count += 1
+        sender.start()
+        self.running = True
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                result = self.shell.run_cell(code, store_history=False)
+        except BaseException as e:
+            self.running = False
+            stderr.write(f"{type(e).__name__}: {e}")
+        finally:
+            self.running = False
 
         # If the cell produced a result value (e.g. an expression), append its repr
         if result is not None and result.result is not None:
-            output += repr(result.result)
+            stdout.write(repr(result.result))
 
-        # Collect stderr — IPython may route tracebacks there
-        stderr = stderr_buf.getvalue()
+        # IPython may route tracebacks to either stream; add the bare error to stderr
         if result is not None and not result.success and result.error_in_exec:
             exc = result.error_in_exec
-            stderr += f"{type(exc).__name__}: {exc}"
+            stderr.write(f"{type(exc).__name__}: {exc}")
+        sender.finish()
 
-        var_names = [k for k in self.shell.user_ns if not k.startswith("_") and k not in self.shell.user_ns_hidden]
+        return {"vars": [k for k, _ in self._user_items()]}
 
-        return {"output": output, "stderr": stderr, "vars": var_names}
+    def checkpoint(self) -> dict:
+        """Blobs for variables changed since the last checkpoint, and names gone.
+
+        Every variable that may have changed is pickled again; one whose blob
+        comes out the same as the one the supervisor holds is left out.
+        """
+        blobs: dict[str, bytes | _Spilled] = {}
+        items = self._user_items()
+        started = time.perf_counter()
+        pickled = 0
+        for k, v in items:
+            if self._checkpointed.get(k) == id(v) and (
+                    isinstance(v, (_Deferred, mmap.mmap)) or isinstance(v, _IMMUTABLE)):
+                continue
+            bound = self._bound.get(k)
+            try:
+                if bound is not None and bound[1] == id(v):
+                    data = dill.dumps(bound[0])
+                    digest = _digest(data)
+                else:
+                    self._bound.pop(k, None)
+                    data, digest = _dump(v)
+            except Exception:
+                # Drop any stale copy rather than restore an old value later
+                self._checkpointed.pop(k, None)
+                self._sent.pop(k, None)
+                blobs[k] = b""
+                continue
+            self._checkpointed[k] = id(v)
+            pickled += _blob_size(data)
+            if self._sent.get(k) == digest:
+                _remove_blob(data)
+                continue
+            blobs[k] = data
+            self._sent[k] = digest
+        names = {k for k, _ in items}
+        dropped = [k for k in self._checkpointed if k not in names]
+        for k in dropped:
+            del self._checkpointed[k]
+            self._sent.pop(k, None)
+            self._bound.pop(k, None)
+            self._deferred.pop(k, None)
+        cost = {"seconds": time.perf_counter() - started, "bytes": pickled}
+        return {"checkpoint": blobs, "dropped": dropped, "cost": cost}
+
+    def load_checkpoint(self, blobs: dict[str, bytes | _Spilled]) -> dict:
+        self.exec_count += 1
+        restored, failed = [], []
+        for k, data in blobs.items():
+            try:
+                value = _load(data)
+                if isinstance(value, _FileRef):
+                    ref, value = value, _read_file(value)
+                    self._bound[k] = (ref, id(value))
+            except Exception as e:
+                log.warning("Checkpoint restore failed for %s: %s", k, e)
+                failed.append(k)
+                continue
+            self.shell.user_ns[k] = value
+            self._checkpointed[k] = id(value)
+            self._sent[k] = _digest(data)
+            restored.append(k)
+        return {"restored": restored, "failed": failed}
+
+    def defer(self, sizes: dict[str, int]) -> dict:
+        """Put placeholders in the namespace for variables the supervisor holds
+        blobs of ({name: blob size}); each is loaded on first use."""
+        self.exec_count += 1
+        for k, size in sizes.items():
+            placeholder = _Deferred(k, size)
+            self.shell.user_ns[k] = placeholder
+            self._deferred[k] = placeholder
+            self._checkpointed[k] = id(placeholder)
+            self._bound.pop(k, None)
+        return {"deferred": list(sizes)}
+
+    def _load_used(self, names: set[str]) -> None:
+        """Load the deferred variables code naming names may use.
+
+        That is those it names, and those read as globals by the session's
+        functions and classes it names (following them, and loading them
+        first if they are deferred too); all of them if it names globals()
+        or the like.
+        """
+        seen: set[str] = set()
+        while names and self._deferred:
+            if names & _DYNAMIC_NAMES:
+                self._load_deferred(list(self._deferred))
+                return
+            seen |= names
+            self._load_deferred([k for k in self._deferred if k in names])
+            reached: set[str] = set()
+            for k in names:
+                reached |= _global_names(self.shell.user_ns.get(k), self.shell.user_ns)
+            names = reached - seen
+
+    def _load_deferred(self, names: list[str]) -> None:
+        """Fetch the blobs of still-deferred variables from the supervisor and load them."""
+        pending = []
+        for k in names:
+            placeholder = self._deferred.pop(k, None)
+            if placeholder is not None and self.shell.user_ns.get(k) is placeholder:
+                pending.append(k)
+        if not pending:
+            return
+        self.conn.send(("need", pending))
+        result = self.load_checkpoint(self.conn.recv())
+        for k in set(pending) - set(result["restored"]):
+            # Leave a NameError rather than the placeholder; the next
+            # checkpoint reports the variable dropped
+            log.warning("Deferred variable %s could not be loaded", k)
+            self.shell.user_ns.pop(k, None)
 
     def get_vars(self) -> list[dict]:
-        """Return metadata about all user-defined variables."""
+        """Return metadata about all user-defined variables.
+
+        Summaries are cached by id(); a mutable value's summary is kept only
+        while no code has run since, an immutable one's while its type and
+        length match (ids of freed objects get reused).
+        """
         result = []
-        for k, v in self.shell.user_ns.items():
-            if k.startswith("_") or k in self.shell.user_ns_hidden:
+        cache = {}
+        for k, v in self._user_items():
+            if isinstance(v, _Deferred):
+                result.append({"name": k, "type": "not loaded",
+                               "summary": f"{v.size} bytes, loaded on first use"})
                 continue
-            s = repr(v)
-            if len(s) > 100:
-                s = s[:97] + "..."
-            result.append({"name": k, "type": type(v).__name__, "summary": s})
+            entry = self._summaries.get(k)
+            if entry is not None and entry[0] == id(v) and (
+                    entry[1] == self.exec_count
+                    or isinstance(v, _IMMUTABLE) and entry[2] == (type(v), _len(v))):
+                summary = entry[3]
+            else:
+                summary = summarize(v)
+            cache[k] = (id(v), self.exec_count, (type(v), _len(v)), summary)
+            result.append({"name": k, "type": type(v).__name__, "summary": summary})
+        self._summaries = cache
         return result
 
-    def get_var(self, name: str) -> dict:
-        """Return a single variable's value, JSON-safe when possible."""
+    def get_var(self, name: str, **paging: Any) -> dict:
+        """Return (a page of) a variable's value; see page_value()."""
         if name not in self.shell.user_ns or name in self.shell.user_ns_hidden:
             return {"error": "not found"}
-        v = self.shell.user_ns[name]
+        self._load_deferred([name])
+        if name not in self.shell.user_ns:
+            return {"error": "not found"}
         try:
-            json.dumps(v)
-            return {"value": v}
-        except (TypeError, ValueError):
-            return {"value": repr(v)}
+            return page_value(self.shell.user_ns[name], **paging)
+        except _PageError as e:
+            return {"error": str(e)}
 
-    def reset(self):
+    def reset(self) -> None:
         """Clear all state."""
         self.shell.reset(new_session=True)
+        self.exec_count += 1
+        self._bound.clear()
+        self._deferred.clear()
+        # The supervisor drops its checkpoint too
+        self._checkpointed.clear()
+        self._sent.clear()
+
+    def bind_file(self, name: str, path: str, mode: str = "text",
+                  encoding: str = "utf-8") -> dict:
+        """Bind a variable to a file's contents without going through the parser."""
+        if not name.isidentifier():
+            return {"error": f"invalid variable name: {name!r}"}
+        if mode not in BIND_MODES:
+            return {"error": f"mode must be one of {', '.join(BIND_MODES)}"}
+        ref = _FileRef(os.path.abspath(path), mode, encoding)
+        try:
+            value = _read_file(ref)
+        except (OSError, UnicodeDecodeError, LookupError) as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        self.exec_count += 1
+        self.shell.user_ns[name] = value
+        self._bound[name] = (ref, id(value))
+        return {"name": name, "type": type(value).__name__, "size": os.path.getsize(ref.path),
+                "length": len(value), **self.checkpoint()}
+
+    def snapshot_save(self) -> dict:
+        """Serialize the user namespace via dill: {data, saved, skipped}."""
+        blobs = _VarBlobs()
+        skipped = []
+        self._load_deferred(list(self._deferred))
+        for k, v in self._user_items():
+            try:
+                blobs[k] = dill.dumps(v)
+            except Exception:
+                skipped.append(k)
+                log.warning("Skipped non-serializable var: %s (%s)", k, type(v).__name__)
+        return {"data": dill.dumps(blobs), "saved": list(blobs), "skipped": skipped}
+
+    def snapshot_restore(self, data: bytes) -> dict:
+        """Restore the user namespace from dill bytes: {restored} or {error}."""
+        try:
+            namespace: dict = dill.loads(data)
+        except Exception as e:
+            log.warning("Failed to deserialize snapshot: %s", e)
+            return {"error": f"corrupt snapshot: {e}", "restored": []}
+        if isinstance(namespace, _VarBlobs):
+            result = self.load_checkpoint(dict(namespace))
+            # The supervisor hasn't seen these blobs; checkpoint them afresh
+            for k in result["restored"]:
+                self._checkpointed.pop(k, None)
+                self._sent.pop(k, None)
+            if not result["failed"]:
+                del result["failed"]
+            return result
+        self.exec_count += 1
+        for k, v in namespace.items():
+            self.shell.user_ns[k] = v
+        return {"restored": list(namespace)}
+
+
+def _worker_main(conn) -> None:
+    """Serve (op, args) requests from the supervisor until the pipe closes."""
+    worker = _Worker(conn)
+
+    def interrupt(signum, frame):
+        # Only a running cell is interrupted; a late SIGINT is ignored
+        if worker.running:
+            raise KeyboardInterrupt
+
+    signal.signal(signal.SIGINT, interrupt)
+    ops = {
+        "execute": worker.execute,
+        "vars": worker.get_vars,
+        "var": lambda name, paging: worker.get_var(name, **paging),
+        "reset": worker.reset,
+        "snapshot_save": worker.snapshot_save,
+        "snapshot_restore": worker.snapshot_restore,
+        "checkpoint": worker.checkpoint,
+        "bind_file": worker.bind_file,
+        "load_checkpoint": worker.load_checkpoint,
+        "defer": worker.defer,
+    }
+    while True:
+        try:
+            op, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = ("ok", ops[op](*args))
+        except BaseException as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        conn.send(reply)
+        if op == "execute" and reply[0] == "ok":
+            # After the reply, so the cell's timeout doesn't cover pickling
+            try:
+                msg = ("checkpoint", worker.checkpoint())
+            except BaseException as e:
+                msg = ("error", f"{type(e).__name__}: {e}")
+            conn.send(msg)
+
+
+# ---------------------------------------------------------------------------
+# Supervisor
+# ---------------------------------------------------------------------------
+
+
+class _CellOutput:
+    """A cell's streamed output: the first OUTPUT_CAP characters of each
+    stream in memory, everything in a spill file once that cap is passed."""
+
+    def __init__(self, on_output: Callable[[str, str], None] | None = None):
+        self.on_output = on_output
+        self.inline = {name: [] for name in STREAMS}
+        self.size = dict.fromkeys(STREAMS, 0)
+        self.output_id: str | None = None
+        self._files: dict[str, Any] = {}
+
+    def write(self, stream: str, text: str) -> None:
+        if self.on_output is not None:
+            try:
+                self.on_output(stream, text)
+            except Exception:
+                log.warning("Output callback failed", exc_info=True)
+        kept = self.size[stream]
+        if stream not in self._files and kept + len(text) > OUTPUT_CAP:
+            self._spill(stream)
+        if kept < OUTPUT_CAP:
+            self.inline[stream].append(text[:OUTPUT_CAP - kept])
+        if stream in self._files:
+            self._files[stream].write(text)
+        self.size[stream] = kept + len(text)
+
+    def note(self, text: str) -> None:
+        """Add a line to stderr (timeouts, restarts)."""
+        self.write("stderr", ("\n" if self.size["stderr"] else "") + text)
+
+    def _spill(self, stream: str) -> None:
+        if self.output_id is None:
+            self.output_id = uuid.uuid4().hex
+            SPILL_DIR.mkdir(parents=True, exist_ok=True)
+        f = open(_output_path(self.output_id, stream), "w", encoding="utf-8")
+        f.write("".join(self.inline[stream]))
+        self._files[stream] = f
+
+    def result(self) -> dict:
+        """{output, stderr, truncated, output_id} for the reply."""
+        for f in self._files.values():
+            f.close()
+        return {
+            "output": "".join(self.inline["stdout"]),
+            "stderr": "".join(self.inline["stderr"]),
+            "truncated": self.output_id is not None,
+            "output_id": self.output_id,
+        }
+
+
+def _output_path(output_id: str, stream: str) -> Path:
+    if stream not in STREAMS or not output_id.isalnum():
+        raise ValueError(f"no such output: {output_id}/{stream}")
+    return SPILL_DIR / f"{output_id}.{stream}"
+
+
+def _remove_output(output_id: str) -> None:
+    for stream in STREAMS:
+        _output_path(output_id, stream).unlink(missing_ok=True)
+
+
+def read_output(output_id: str, stream: str = "stdout", offset: int = 0,
+                limit: int = OUTPUT_CAP) -> dict:
+    """Page through a cell's spilled output by character offset.
+
+    Returns {text, offset, total, more}. A stream that never passed the cap
+    was not spilled and reads as empty; an unknown output_id raises KeyError.
+    """
+    path = _output_path(output_id, stream)
+    if not path.exists():
+        if not any(_output_path(output_id, s).exists() for s in STREAMS):
+            raise KeyError(output_id)
+        return {"text": "", "offset": 0, "total": 0, "more": False}
+    full = path.read_text(encoding="utf-8")
+    offset = max(0, offset)
+    text = full[offset:offset + max(0, limit)]
+    return {"text": text, "offset": offset, "total": len(full),
+            "more": offset + len(text) < len(full)}
+
+
+def _context():
+    ctx = multiprocessing.get_context("forkserver")
+    # Workers fork from a server that has already imported IPython and dill
+    ctx.set_forkserver_preload(["sandbox.repl"])
+    return ctx
+
+
+class Kernel:
+    """Runs cells in a supervised worker process; see the module docstring.
+
+    Calls are serialized: the worker runs one request at a time. The worker
+    is started on first use, and again after stop(). setup is run as a cell
+    when the first worker starts; later ones get its results from the
+    checkpoint.
+    """
+
+    def __init__(self, session: str = DEFAULT_SESSION, setup: str = ""):
+        self.session = session
+        self._setup = setup
+        self._ctx = _context()
+        self._lock = threading.RLock()
+        self._proc = None
+        self._conn = None
+        self._checkpoint: dict[str, bytes | _Spilled] = {}
+        # name -> sha256 of its checkpoint blob, and names left out as unpicklable
+        self._digests: dict[str, str] = {}
+        self._unpicklable: set[str] = set()
+        # Bumped whenever the checkpoint changes; with epoch, tells a snapshot
+        # taker whether anything changed since its last save
+        self.generation = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self.checkpoint_seconds = 0.0
+        self.checkpoint_bytes = 0
+        self._spills: list[str] = []
+        # Set while the worker owes the checkpoint it takes after a cell
+        self._checkpoint_pending = False
+        self.restarts = 0
+        self.last_used = time.monotonic()
+
+    # -- worker lifecycle ---------------------------------------------------
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None
+
+    @property
+    def busy(self) -> bool:
+        """True while another thread is running a request on this kernel."""
+        if self._claim():
+            self._release()
+            return False
+        return True
+
+    def _claim(self) -> bool:
+        """Take the kernel for this thread if no request is running (see KernelPool)."""
+        return self._lock.acquire(blocking=False)
+
+    def _release(self) -> None:
+        self._lock.release()
+
+    def _spawn(self) -> None:
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        proc.start()
+        child.close()
+        self._proc, self._conn = proc, parent
+
+    def _kill(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+        if self._proc is not None and self._proc.is_alive():
+            self._proc.kill()
+        if self._proc is not None:
+            self._proc.join(5)
+        self._proc = self._conn = None
+        self._checkpoint_pending = False
+
+    def _ensure(self) -> None:
+        self.last_used = time.monotonic()
+        if self._proc is None:
+            self._start()
+            if self._setup:
+                setup, self._setup = self._setup, ""
+                result = self.execute(setup)
+                if result["stderr"]:
+                    log.warning("Setup of session %s: %s", self.session, result["stderr"])
+                self._settle()
+
+    def _settle(self) -> str | None:
+        """Wait for the checkpoint the worker takes after a cell, and apply it.
+
+        If the worker dies or hangs first, it is restarted from the previous
+        checkpoint; returns a note saying so.
+        """
+        if not self._checkpoint_pending:
+            return None
+        self._checkpoint_pending = False
+        try:
+            if not self._conn.poll(CHECKPOINT_TIMEOUT):
+                restored = self._restart(
+                    f"checkpoint did not finish within {CHECKPOINT_TIMEOUT}s")
+                return (f"Checkpoint timed out after {CHECKPOINT_TIMEOUT}s; kernel restarted "
+                        f"from the one before ({len(restored)} variables restored)")
+            status, result = self._conn.recv()
+        except (EOFError, OSError) as e:
+            restored = self._restart(f"worker died while checkpointing: {e}")
+            return (f"Kernel died while checkpointing; restarted from the checkpoint "
+                    f"before ({len(restored)} variables restored)")
+        if status == "checkpoint":
+            self._apply_checkpoint(result)
+        else:
+            log.warning("Checkpoint after cell failed for %s: %s", self.session, result)
+        return None
+
+    def start(self) -> None:
+        """Start the worker now (restoring the checkpoint) if it isn't running."""
+        with self._lock:
+            self._settle()
+            self._ensure()
+
+    def _restart(self, reason: str) -> list[str]:
+        """Replace the worker and restore the checkpoint. Returns restored names."""
+        log.warning("Restarting kernel worker for %s: %s", self.session, reason)
+        self._kill()
+        self.restarts += 1
+        return self._start()
+
+    def _start(self) -> list[str]:
+        """Start a worker and load the checkpoint into it. Returns restored names."""
+        self._spawn()
+        if not self._checkpoint:
+            return []
+        self._conn.send(("load_checkpoint", (self._checkpoint,)))
+        if not self._conn.poll(OP_TIMEOUT):
+            log.error("Checkpoint restore timed out; starting empty")
+            self._checkpoint, self._digests = {}, {}
+            self.generation += 1
+            self._kill()
+            self._spawn()
+            return []
+        status, result = self._conn.recv()
+        if status != "ok":
+            log.error("Checkpoint restore failed: %s", result)
+            return []
+        for k in result["failed"]:
+            self._forget(k)
+        if result["failed"]:
+            self.generation += 1
+        return result["restored"]
+
+    def _request(self, op: str, *args: Any, timeout: float = OP_TIMEOUT) -> Any:
+        """Send one request and wait for its reply; restart the worker if it fails."""
+        with self._lock:
+            lost = self._settle()
+            if lost:
+                raise KernelRestarted(lost)
+            self._ensure()
+            try:
+                self._conn.send((op, args))
+                while True:
+                    if not self._conn.poll(timeout):
+                        self._restart(f"{op} did not answer within {timeout}s")
+                        raise KernelRestarted(f"{op} timed out; kernel restarted")
+                    msg = self._conn.recv()
+                    if msg[0] != "need":
+                        break
+                    self._send_deferred(msg[1])
+                status, result = msg
+            except (EOFError, OSError, BrokenPipeError) as e:
+                self._restart(f"worker died during {op}: {e}")
+                raise KernelRestarted(f"kernel died during {op}; restarted") from e
+        if status != "ok":
+            raise RuntimeError(result)
+        return result
+
+    def _send_deferred(self, names: list[str]) -> None:
+        """Answer a worker's request for the blobs of deferred variables."""
+        self._conn.send({k: self._checkpoint[k] for k in names if k in self._checkpoint})
+
+    def _apply_checkpoint(self, reply: dict) -> None:
+        blobs = reply.pop("checkpoint", {})
+        dropped = reply.pop("dropped", [])
+        cost = reply.pop("cost", None)
+        if cost:
+            self.checkpoint_seconds += cost["seconds"]
+            self.checkpoint_bytes += cost["bytes"]
+        # A variable re-pickled to the same bytes isn't a change
+        changed = False
+        for k, data in blobs.items():
+            if data:
+                digest = _digest(data)
+                changed = changed or self._digests.get(k) != digest
+                old = self._checkpoint.get(k)
+                if old != data:
+                    _remove_blob(old)
+                self._checkpoint[k] = data
+                self._digests[k] = digest
+                self._unpicklable.discard(k)
+            else:
+                changed = changed or k in self._checkpoint or k not in self._unpicklable
+                self._forget(k)
+                self._unpicklable.add(k)
+        for k in dropped:
+            changed = changed or k in self._checkpoint or k in self._unpicklable
+            self._forget(k)
+            self._unpicklable.discard(k)
+        if changed:
+            self.generation += 1
+
+    def _forget(self, name: str) -> None:
+        _remove_blob(self._checkpoint.pop(name, None))
+        self._digests.pop(name, None)
+
+    def stop(self) -> None:
+        """Stop the worker, keeping the checkpoint to restart from."""
+        with self._lock:
+            self._settle()
+            self._kill()
+
+    close = stop
+
+    # -- API ----------------------------------------------------------------
+
+    def execute(self, code: str, timeout: int = 30,
+                on_output: Callable[[str, str], None] | None = None) -> dict:
+        """Run code in IPython, capture stdout/stderr, return results.
+
+        on_output(stream, text) is called with each chunk of output as the
+        cell produces it. The reply holds the first OUTPUT_CAP characters of
+        each stream; if there was more, "truncated" is set and the full text
+        is kept under "output_id" for read_output().
+
+        On timeout the cell is interrupted, then the worker is killed and
+        restarted from the last checkpoint if the interrupt doesn't stop it.
+        Output streamed before that is kept either way.
+        """
+        out = _CellOutput(on_output)
+        with self._lock:
+            lost = self._settle()
+            if lost:
+                out.note(lost)
+            self._ensure()
+            try:
+                reply = self._execute(code, timeout, out)
+            except (EOFError, OSError) as e:
+                restored = self._restart(f"worker died: {e}")
+                out.note(f"Kernel died ({str(e) or 'worker exited'}); restarted "
+                         f"from the last checkpoint ({len(restored)} variables restored)")
+                reply = {"vars": restored}
+            return self._finish(out, reply)
+
+    def _execute(self, code: str, timeout: float, out: _CellOutput) -> dict:
+        """Send a cell and relay its stream messages until the reply comes."""
+        self._conn.send(("execute", (code,)))
+        deadline = time.monotonic() + timeout
+        interrupted = False
+        while True:
+            if not self._conn.poll(max(0.0, deadline - time.monotonic())):
+                if interrupted:
+                    restored = self._restart(f"cell ignored interrupt after {timeout}s")
+                    out.note(f"Execution timed out after {timeout}s; kernel "
+                             f"restarted from the last checkpoint "
+                             f"({len(restored)} variables restored)")
+                    return {"vars": restored}
+                os.kill(self._proc.pid, signal.SIGINT)
+                interrupted = True
+                deadline = time.monotonic() + INTERRUPT_GRACE
+                continue
+            msg = self._conn.recv()
+            if msg[0] == "stream":
+                out.write(msg[1], msg[2])
+                continue
+            if msg[0] == "need":
+                self._send_deferred(msg[1])
+                continue
+            status, reply = msg
+            if status != "ok":
+                out.write("stderr", reply)
+                return {"vars": []}
+            self._checkpoint_pending = True
+            if interrupted:
+                out.note(f"Execution timed out after {timeout}s (interrupted)")
+            return reply
+
+    def _finish(self, out: _CellOutput, reply: dict) -> dict:
+        reply.update(out.result())
+        if out.output_id:
+            self._spills.append(out.output_id)
+            while len(self._spills) > SPILL_KEEP:
+                _remove_output(self._spills.pop(0))
+        return reply
+
+    def discard_output(self) -> None:
+        """Delete this session's spilled output."""
+        for output_id in self._spills:
+            _remove_output(output_id)
+        self._spills.clear()
+
+    def discard(self) -> None:
+        """Delete this session's spilled output and its checkpoint, files included."""
+        self.discard_output()
+        with self._lock:
+            for data in self._checkpoint.values():
+                _remove_blob(data)
+            self._checkpoint.clear()
+            self._digests.clear()
+
+    def get_vars(self) -> list[dict]:
+        """Return metadata about all user-defined variables."""
+        return self._request("vars")
+
+    def get_var(self, name: str, offset: int = 0, limit: int | None = None,
+                columns: list[str] | None = None, max_bytes: int = VAR_MAX_BYTES,
+                encoding: str = "json") -> dict:
+        """Return a variable's value, or a page of it; see page_value()."""
+        return self._request("var", name, {"offset": offset, "limit": limit, "columns": columns,
+                                           "max_bytes": max_bytes, "encoding": encoding})
+
+    def reset(self):
+        """Clear all state."""
+        self._request("reset")
+        with self._lock:
+            for data in self._checkpoint.values():
+                _remove_blob(data)
+            self._checkpoint.clear()
+            self._digests.clear()
+            self._unpicklable.clear()
+            self.generation += 1
+
+    def bind_file(self, name: str, path: str, mode: str = "text",
+                  encoding: str = "utf-8") -> dict:
+        """Bind a variable to a file in the worker's filesystem, as bytes, mmap or text.
+
+        Returns {name, type, size, length} or {error}. A restarted worker
+        rebinds the file instead of restoring a pickled copy.
+        """
+        result = self._request("bind_file", name, path, mode, encoding, timeout=BIND_TIMEOUT)
+        if "error" not in result:
+            with self._lock:
+                self._apply_checkpoint(result)
+        return result
+
+    def manifest(self) -> dict:
+        """What an incremental snapshot of this session would hold, from the checkpoint.
+
+        {epoch, generation, vars: {name: sha256}, skipped, bytes, cost}. If
+        epoch and generation match a previous manifest, nothing changed.
+        No request is sent to the worker, but a checkpoint it is still
+        taking after a cell is waited for.
+        """
+        with self._lock:
+            self._settle()
+            return {
+                "epoch": self.epoch,
+                "generation": self.generation,
+                "vars": dict(self._digests),
+                "skipped": sorted(self._unpicklable),
+                "bytes": sum(_blob_size(b) for b in self._checkpoint.values()),
+                "cost": {"checkpoint_seconds": round(self.checkpoint_seconds, 6),
+                         "checkpoint_bytes": self.checkpoint_bytes},
+            }
+
+    def blobs(self, digests: list[str]) -> dict[str, bytes]:
+        """Checkpoint blobs by sha256; digests no longer in the checkpoint are left out.
+
+        A blob spilled to disk comes back as a read-only mmap of its file.
+        """
+        wanted = set(digests)
+        with self._lock:
+            self._settle()
+            return {self._digests[k]: data.map() if isinstance(data, _Spilled) else data
+                    for k, data in self._checkpoint.items()
+                    if self._digests.get(k) in wanted}
+
+    def checkpoint(self) -> None:
+        """Bring the checkpoint up to date now (see _Worker.checkpoint)."""
+        result = self._request("checkpoint", timeout=CHECKPOINT_TIMEOUT)
+        with self._lock:
+            self._apply_checkpoint(result)
+
+    def load_vars(self, blobs: dict[str, bytes], lazy: bool = False) -> dict:
+        """Load per-variable dill blobs (as in a manifest) into the namespace.
+
+        Returns {restored, failed}; a blob that fails to load doesn't stop
+        the others. The blobs become the checkpoint as they are. With lazy,
+        nothing is unpickled yet: the worker gets placeholders that load on
+        first use, and a blob that turns out broken then is dropped.
+        """
+        if lazy:
+            self._request("defer", {k: len(b) for k, b in blobs.items()})
+            with self._lock:
+                self._apply_checkpoint({"checkpoint": blobs})
+            return {"restored": list(blobs), "failed": []}
+        result = self._request("load_checkpoint", blobs, timeout=BIND_TIMEOUT)
+        with self._lock:
+            restored = result["restored"]
+            self._apply_checkpoint({"checkpoint": {k: blobs[k] for k in restored}})
+        return result
+
+    def snapshot_save(self) -> dict:
+        """dill bytes of the user namespace: {data, saved, skipped}."""
+        return self._request("snapshot_save")
+
+    def snapshot_restore(self, data: bytes) -> dict:
+        """Load dill bytes into the namespace: {restored} or {error, restored}."""
+        result = self._request("snapshot_restore", data)
+        if "error" not in result:
+            # Checkpoint the restored values too
+            self.checkpoint()
+        return result
+
+
+class KernelPool:
+    """One Kernel per session, with at most max_kernels live workers.
+
+    Starting a session's worker when the pool is full stops the least
+    recently used idle one; if every live worker is busy, PoolExhausted is
+    raised. evict_idle() stops workers idle for idle_timeout seconds and
+    forgets sessions stopped for SESSION_EXPIRY.
+    """
+
+    def __init__(self, max_kernels: int = MAX_KERNELS, idle_timeout: float = KERNEL_IDLE_TIMEOUT):
+        self.max_kernels = max(1, max_kernels)
+        self.idle_timeout = idle_timeout
+        # Code run in each session created from now on, before its first request
+        self.setup = ""
+        self._kernels: dict[str, Kernel] = {}
+        # Sessions holding a slot while their worker starts outside the lock,
+        # and sessions whose worker is being stopped outside it
+        self._starting: set[str] = set()
+        self._stopping: set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, session: str = DEFAULT_SESSION) -> Kernel:
+        """The session's kernel, with a worker slot reserved for it.
+
+        The slot is reserved (and an idle worker claimed for stopping) under
+        the pool lock; starting and stopping workers happen outside it, so a
+        slow checkpoint reload doesn't hold up other sessions or /health. A
+        worker that is being stopped doesn't count as running: a slot is
+        reserved for the session and its worker restarted once the stop ends.
+        """
+        victim = None
+        with self._lock:
+            kernel = self._kernels.get(session)
+            if kernel is None:
+                kernel = self._kernels[session] = Kernel(session, self.setup)
+            kernel.last_used = time.monotonic()
+            if (kernel.alive and session not in self._stopping) or session in self._starting:
+                # A starting worker is waited for by the kernel's own lock
+                return kernel
+            live = [k for k in self._kernels.values()
+                    if k is not kernel and (k.alive or k.session in self._starting)]
+            if len(live) >= self.max_kernels:
+                idle = sorted((k for k in live if k.alive and k.session not in self._stopping),
+                              key=lambda k: k.last_used)
+                victim = next((k for k in idle if k._claim()), None)
+                if victim is None:
+                    raise PoolExhausted(
+                        f"All {self.max_kernels} kernels are busy; try again shortly")
+                log.info("Stopping idle kernel %s to make room for %s", victim.session, session)
+                self._stopping.add(victim.session)
+            self._starting.add(session)
+        try:
+            if victim is not None:
+                self._stop_claimed(victim)
+            # Waits on the kernel's lock if its worker is still being stopped
+            kernel.start()
+        finally:
+            with self._lock:
+                self._starting.discard(session)
+        return kernel
+
+    def evict_idle(self) -> list[str]:
+        """Stop idle workers and forget long-stopped sessions. Returns stopped sessions."""
+        now = time.monotonic()
+        claimed = []
+        with self._lock:
+            for session, kernel in list(self._kernels.items()):
+                if session in self._starting or session in self._stopping or not kernel._claim():
+                    continue
+                idle = now - kernel.last_used
+                if kernel.alive and idle >= self.idle_timeout:
+                    self._stopping.add(session)
+                    claimed.append(kernel)
+                    continue
+                if not kernel.alive and idle >= SESSION_EXPIRY:
+                    del self._kernels[session]
+                    kernel.discard()
+                kernel._release()
+        for kernel in claimed:
+            self._stop_claimed(kernel)
+        return [k.session for k in claimed]
+
+    def _stop_claimed(self, kernel: Kernel) -> None:
+        try:
+            kernel.stop()
+        finally:
+            with self._lock:
+                self._stopping.discard(kernel.session)
+            kernel._release()
+
+    def remove(self, session: str) -> bool:
+        """Stop a session's worker and drop its state. False if unknown."""
+        with self._lock:
+            kernel = self._kernels.pop(session, None)
+        if kernel is None:
+            return False
+        kernel.stop()
+        kernel.discard()
+        return True
+
+    def sessions(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            kernels = list(self._kernels.values())
+        return [{"session": k.session, "alive": k.alive, "busy": k.busy,
+                 "idle_s": round(now - k.last_used, 1), "restarts": k.restarts}
+                for k in kernels]
+
+    def close(self) -> None:
+        with self._lock:
+            kernels = list(self._kernels.values())
+            self._kernels.clear()
+        for kernel in kernels:
+            kernel.stop()
+            kernel.discard()
@@ -1,20 +1,72 @@
-"""FastAPI server wrapping the IPython kernel."""
+"""FastAPI server wrapping the IPython kernels.
 
+Every endpoint takes a session query parameter (default "default"); each
+session has its own namespace in its own worker process (see repl.KernelPool).
+PUT /session/setup sets code run in every session created afterwards, before
+its first request.
+
+/exec/stream runs a cell like /exec but answers with newline-delimited JSON:
+{"type": "stdout"|"stderr", "text"} events as the cell prints, then one
+{"type": "result", ...} event shaped like the /exec response. Output past
+repl.OUTPUT_CAP is left out of the result and paged through GET /output.
+
+Files reach a session without going through the parser: POST /upload streams
+the request body to UPLOAD_DIR and binds a variable to it, and POST /bind
+binds a file already visible to the sandbox (the shared /workspace mount, or
+any path when the server runs on the host).
+"""
+
+import asyncio
 import base64
+import json
 import logging
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any
 
-import dill
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from sandbox.repl import Kernel
+from sandbox import frames
+from sandbox.repl import (
+    DEFAULT_SESSION,
+    OUTPUT_CAP,
+    VAR_MAX_BYTES,
+    Kernel,
+    KernelPool,
+    PoolExhausted,
+    read_output,
+)
 
 log = logging.getLogger(__name__)
 
 app = FastAPI()
-kernel = Kernel()
+pool = KernelPool()
+
+# Shared with the host (docker-compose mounts ./workspace here)
+WORKSPACE = Path(os.environ.get("SANDBOX_WORKSPACE") or (
+    "/workspace" if Path("/workspace").is_dir()
+    else Path(__file__).resolve().parent.parent / "workspace"))
+
+# Uploaded files, one directory per session
+UPLOAD_DIR = WORKSPACE / ".uploads"
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def _kernel(session: str) -> Kernel:
+    try:
+        return pool.get(session)
+    except PoolExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
 
 
 # -- Models --
@@ -28,6 +80,19 @@ class ExecResponse(BaseModel):
     output: str
     stderr: str
     vars: list[str]
+    truncated: bool = False
+    output_id: str | None = None
+
+
+class SetupRequest(BaseModel):
+    code: str
+
+
+class BindRequest(BaseModel):
+    path: str
+    var: str
+    mode: str = "text"
+    encoding: str = "utf-8"
 
 
 class VarInfo(BaseModel):
@@ -39,59 +104,165 @@ class VarInfo(BaseModel):
 class VarValue(BaseModel):
     value: Any = None
     error: str | None = None
+    preview: dict | None = None
+    length: int | None = None
+    offset: int | None = None
+    next_offset: int | None = None
+    truncated: bool = False
 
 
 # -- Routes --
 
 @app.post("/exec", response_model=ExecResponse)
-def exec_code(req: ExecRequest):
-    result = kernel.execute(req.code, timeout=req.timeout or 30)
+def exec_code(req: ExecRequest, session: str = DEFAULT_SESSION):
+    result = _kernel(session).execute(req.code, timeout=req.timeout or 30)
     return ExecResponse(**result)
 
 
+@app.post("/exec/stream")
+def exec_stream(req: ExecRequest, session: str = DEFAULT_SESSION):
+    kernel = _kernel(session)
+    events: queue.Queue = queue.Queue()
+
+    def run():
+        try:
+            result = kernel.execute(req.code, timeout=req.timeout or 30,
+                                    on_output=lambda stream, text: events.put(
+                                        {"type": stream, "text": text}))
+            events.put({"type": "result", **ExecResponse(**result).model_dump()})
+        except Exception as e:
+            log.warning("Streaming exec failed: %s", e)
+            events.put({"type": "result", "output": "", "stderr": f"{type(e).__name__}: {e}",
+                        "vars": [], "truncated": False, "output_id": None})
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def ndjson():
+        while True:
+            event = events.get()
+            yield json.dumps(event) + "\n"
+            if event["type"] == "result":
+                return
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.get("/output/{output_id}")
+def get_output(output_id: str, stream: str = "stdout", offset: int = 0,
+               limit: int = OUTPUT_CAP):
+    """Page through a cell's full output by character offset."""
+    try:
+        return read_output(output_id, stream, offset, limit)
+    except (KeyError, ValueError):
+        return JSONResponse(status_code=404, content={"error": "unknown output"})
+
+
+def _bind(kernel: Kernel, var: str, path: str, mode: str, encoding: str):
+    result = kernel.bind_file(var, path, mode, encoding)
+    if "error" in result:
+        return JSONResponse(status_code=400, content={"error": result["error"]})
+    return {"var": var, "path": path, "mode": mode, "type": result["type"],
+            "size": result["size"], "length": result["length"]}
+
+
+@app.post("/upload")
+async def upload(request: Request, var: str, mode: str = "text", encoding: str = "utf-8",
+                 session: str = DEFAULT_SESSION):
+    """Stream the raw request body to a file and bind var to it."""
+    if not var.isidentifier():
+        return JSONResponse(status_code=400, content={"error": f"invalid variable name: {var!r}"})
+    kernel = await run_in_threadpool(_kernel, session)
+    target_dir = UPLOAD_DIR / _UNSAFE.sub("_", session)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target_dir, prefix=f".{var}-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+        # Replace rather than overwrite: an mmap of the old upload stays valid
+        path = target_dir / var
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return await run_in_threadpool(_bind, kernel, var, str(path), mode, encoding)
+
+
+@app.post("/bind")
+def bind(req: BindRequest, session: str = DEFAULT_SESSION):
+    """Bind a variable to a file the sandbox can already read, without copying it."""
+    return _bind(_kernel(session), req.var, req.path, req.mode, req.encoding)
+
+
 @app.get("/vars", response_model=list[VarInfo])
-def list_vars():
-    return [VarInfo(**v) for v in kernel.get_vars()]
+def list_vars(session: str = DEFAULT_SESSION):
+    return [VarInfo(**v) for v in _kernel(session).get_vars()]
 
 
 @app.get("/var/{name}", response_model=VarValue)
-def get_var(name: str):
-    result = kernel.get_var(name)
-    return VarValue(**result)
+def get_var(name: str, offset: int = 0, limit: int | None = None, columns: str | None = None,
+            max_bytes: int = VAR_MAX_BYTES, encoding: str = "json",
+            session: str = DEFAULT_SESSION):
+    """A variable's value, paged by row/item/character (see repl.page_value).
+
+    columns is a comma-separated projection for tables and dicts. With a
+    binary encoding (raw, npy, arrow) the body is the encoded page and the
+    rest of the reply is JSON in the X-Var-Meta header.
+    """
+    result = _kernel(session).get_var(
+        name, offset=offset, limit=limit, max_bytes=max_bytes, encoding=encoding,
+        columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None)
+    if "data" in result:
+        data, media_type = result.pop("data"), result.pop("media_type")
+        return Response(content=data, media_type=media_type,
+                        headers={"X-Var-Meta": json.dumps(result)})
+    # Already JSON-safe and size-checked; skip response-model validation
+    return JSONResponse(content=result)
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # The host polls this regularly, which doubles as the idle-eviction tick
+    pool.evict_idle()
+    sessions = pool.sessions()
+    return {"status": "ok", "kernels": sum(s["alive"] for s in sessions),
+            "max_kernels": pool.max_kernels,
+            "kernel_restarts": sum(s["restarts"] for s in sessions)}
+
+
+# -- Session endpoints --
+
+@app.get("/sessions")
+def list_sessions():
+    return pool.sessions()
+
+
+@app.put("/session/setup")
+def set_session_setup(req: SetupRequest):
+    pool.setup = req.code
+    return {"bytes": len(req.code)}
+
+
+@app.delete("/session/{session}")
+def delete_session(session: str):
+    if not pool.remove(session):
+        return JSONResponse(status_code=404, content={"error": "unknown session"})
+    shutil.rmtree(UPLOAD_DIR / _UNSAFE.sub("_", session), ignore_errors=True)
+    return {"removed": session}
 
 
 # -- Snapshot endpoints --
 
 @app.post("/snapshot/save")
-def snapshot_save():
+def snapshot_save(session: str = DEFAULT_SESSION):
     """Serialize user namespace via dill, return base64-encoded bytes."""
-    ns = kernel.shell.user_ns
-    hidden = kernel.shell.user_ns_hidden
-    serializable = {}
-    skipped = []
-
-    for k, v in ns.items():
-        if k.startswith("_") or k in hidden:
-            continue
-        try:
-            dill.dumps(v)
-            serializable[k] = v
-        except Exception:
-            skipped.append(k)
-            log.warning("Skipped non-serializable var: %s (%s)", k, type(v).__name__)
-
-    data = dill.dumps(serializable)
-    encoded = base64.b64encode(data).decode("ascii")
-    return {"snapshot": encoded, "saved": list(serializable.keys()), "skipped": skipped}
+    result = _kernel(session).snapshot_save()
+    encoded = base64.b64encode(result["data"]).decode("ascii")
+    return {"snapshot": encoded, "saved": result["saved"], "skipped": result["skipped"]}
 
 
 @app.post("/snapshot/restore")
-def snapshot_restore(payload: dict):
+def snapshot_restore(payload: dict, session: str = DEFAULT_SESSION):
     """Restore user namespace from base64-encoded dill bytes."""
     encoded = payload.get("snapshot")
     if not encoded:
@@ -99,17 +270,119 @@ def snapshot_restore(payload: dict):
 
     try:
         data = base64.b64decode(encoded)
-        namespace: dict = dill.loads(data)
     except Exception as e:
-        log.warning("Failed to deserialize snapshot: %s", e)
+        log.warning("Failed to decode snapshot: %s", e)
         return JSONResponse(
             status_code=400,
             content={"error": f"corrupt snapshot: {e}", "restored": []},
         )
 
-    restored = []
-    for k, v in namespace.items():
-        kernel.shell.user_ns[k] = v
-        restored.append(k)
+    result = _kernel(session).snapshot_restore(data)
+    if "error" in result:
+        return JSONResponse(status_code=400, content=result)
+    return {"restored": result["restored"]}
+
+
+# -- Incremental snapshots --
+#
+# The checkpoint already holds one dill blob per variable, so an incremental
+# snapshot is read from it without touching the worker. Blobs travel as
+# compressed frames (see sandbox/frames.py) in both directions.
+
+# Threads decompressing restored blobs while the rest of the body arrives
+RESTORE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Decompressed bytes handed to the worker per load request
+RESTORE_BATCH_BYTES = 64 * 1024 * 1024
+
+_restore_pool = ThreadPoolExecutor(RESTORE_WORKERS, thread_name_prefix="restore")
+
+
+class BlobsRequest(BaseModel):
+    digests: list[str]
+    codecs: list[str] = ["none"]
+
 
-    return {"restored": restored}
+@app.get("/snapshot/manifest")
+def snapshot_manifest(session: str = DEFAULT_SESSION):
+    """{epoch, generation, vars: {name: sha256}, skipped, bytes, cost}; see Kernel.manifest."""
+    return _kernel(session).manifest()
+
+
+@app.post("/snapshot/blobs")
+def snapshot_blobs(req: BlobsRequest, session: str = DEFAULT_SESSION):
+    """Checkpoint blobs by sha256, as frames keyed by digest in the best shared codec."""
+    blobs = _kernel(session).blobs(req.digests)
+    codec = frames.pick_codec(req.codecs)
+
+    def stream():
+        for digest, data in blobs.items():
+            yield from frames.encode(digest, data, codec)
+
+    return StreamingResponse(stream(), media_type="application/octet-stream",
+                             headers={"X-Codec": codec})
+
+
+@app.post("/snapshot/vars")
+async def snapshot_load_vars(request: Request, session: str = DEFAULT_SESSION,
+                             lazy: bool = False):
+    """Load frames of per-variable blobs, keyed by name, into the namespace.
+
+    Frames are decompressed on RESTORE_WORKERS threads as they arrive and
+    loaded in batches while the rest of the body streams in. A variable
+    whose blob is corrupt or fails to unpickle is reported in "failed"
+    without stopping the others.
+
+    With lazy, variables are only unpickled when first used (see
+    Kernel.load_vars); a blob that decompresses but won't unpickle fails
+    then rather than here.
+    """
+    kernel = await run_in_threadpool(_kernel, session)
+    loop = asyncio.get_running_loop()
+    reader = frames.FrameReader()
+    decoding: list[tuple[str, asyncio.Future]] = []
+    batch: dict[str, bytes] = {}
+    restored: list[str] = []
+    failed: list[str] = []
+    loading: asyncio.Task | None = None
+
+    async def load(blobs: dict[str, bytes], previous: asyncio.Task | None) -> None:
+        if previous is not None:
+            await previous
+        try:
+            result = await run_in_threadpool(kernel.load_vars, blobs, lazy)
+        except Exception as e:
+            log.warning("Loading %d snapshot vars failed: %s", len(blobs), e)
+            failed.extend(blobs)
+            return
+        restored.extend(result["restored"])
+        failed.extend(result["failed"])
+
+    async def collect(wait: bool) -> None:
+        nonlocal batch, loading
+        while decoding and (wait or decoding[0][1].done()):
+            name, future = decoding.pop(0)
+            try:
+                batch[name] = await future
+            except ValueError as e:
+                log.warning("Snapshot var %s not restored: %s", name, e)
+                failed.append(name)
+            if sum(map(len, batch.values())) >= RESTORE_BATCH_BYTES:
+                loading = asyncio.create_task(load(batch, loading))
+                batch = {}
+
+    try:
+        async for data in request.stream():
+            for name, codec, parts in reader.frames(data):
+                decoding.append((name, loop.run_in_executor(
+                    _restore_pool, frames.decompress, codec, parts)))
+            await collect(wait=False)
+        reader.close()
+    except ValueError as e:
+        log.warning("Snapshot stream broken: %s", e)
+    await collect(wait=True)
+    if batch:
+        loading = asyncio.create_task(load(batch, loading))
+    if loading is not None:
+        await loading
+    return {"restored": restored, "failed": failed}
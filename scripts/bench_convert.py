@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark HTML->markdown conversion: inline vs the fetcher's process pool.
+
+Converts every page in the fixture set, first serially on the event loop and
+then through fetcher.convert_body(), while a ticker task measures how long the
+event loop stays blocked. Pages are replayed --rounds times to simulate a
+concurrent crawl.
+
+Usage:
+    python3 scripts/bench_convert.py [--fixtures tests/fixtures/docs_html] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp_server import fetcher  # noqa: E402
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "docs_html"
+
+
+async def _ticker(stop: asyncio.Event, stalls: list[float], interval: float = 0.005) -> None:
+    """Record how late each tick fires -- the event loop's worst-case stall."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        stalls.append(loop.time() - start - interval)
+
+
+async def _run(pages: list[str], *, pooled: bool) -> tuple[float, float]:
+    """Convert all pages concurrently. Returns (wall seconds, max stall seconds)."""
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, stalls))
+
+    start = time.perf_counter()
+    if pooled:
+        await asyncio.gather(*(fetcher.convert_body(p, main_only) for p in pages))
+    else:
+        for p in pages:
+            fetcher._markdown_from_body(p, main_only)
+            await asyncio.sleep(0)
+    wall = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    return wall, max(stalls, default=0.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    files = sorted(args.fixtures.glob("*.html"))
+    if not files:
+        sys.exit(f"No .html fixtures in {args.fixtures}")
+
+    print(f"Fixtures: {len(files)} pages from {args.fixtures}")
+    print(f"Inline threshold: {fetcher.CONVERT_INLINE_MAX:,} chars, "
+          f"workers: {fetcher.CONVERT_MAX_WORKERS}")
+    print()
+    print(f"{'page':45} {'size':>10} {'inline ms':>10} {'route':>7}")
+    for f in files:
+        html = f.read_text(encoding="utf-8")
+        start = time.perf_counter()
+        fetcher._markdown_from_body(html, fetcher.EXTRACT_MAIN_CONTENT)
+        ms = (time.perf_counter() - start) * 1000
+        route = "inline" if len(html) < fetcher.CONVERT_INLINE_MAX else "pool"
+        print(f"{f.name:45} {len(html):>10,} {ms:>10.1f} {route:>7}")
+
+    pages = [f.read_text(encoding="utf-8") for f in files] * args.rounds
+    total_mb = sum(len(p) for p in pages) / 1e6
+
+    # Warm the pool so worker start-up isn't billed to the first run
+    asyncio.run(fetcher.convert_body("x" * fetcher.CONVERT_INLINE_MAX))
+
+    async def both() -> list[tuple[str, float, float]]:
+        results = []
+        for label, pooled in (("inline", False), ("pool", True)):
+            wall, stall = await _run(pages, pooled=pooled)
+            results.append((label, wall, stall))
+        return results
+
+    try:
+        results = asyncio.run(both())
+    finally:
+        fetcher.shutdown_convert_pool()
+
+    print()
+    print(f"{len(pages)} conversions, {total_mb:.1f} MB of HTML")
+    print(f"{'mode':8} {'wall s':>8} {'pages/s':>9} {'MB/s':>7} {'max loop stall ms':>18}")
+    for label, wall, stall in results:
+        print(f"{label:8} {wall:>8.2f} {len(pages) / wall:>9.1f} "
+              f"{total_mb / wall:>7.2f} {stall * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ Usage:
     knowledge audit --reindex          # re-ingest local docs into store
     knowledge audit --refetch          # re-fetch from source URLs
     knowledge audit --topic fastapi    # limit to one topic
+    knowledge compress                 # store raw docs as zstd .md.zst
+    knowledge compress --decompress    # back to plain .md
 """
 
 from __future__ import annotations
@@ -187,29 +189,25 @@ def cmd_ask(args: argparse.Namespace) -> None:
 
 def cmd_audit(args: argparse.Namespace) -> None:
     """Audit previously researched topics. Optionally re-index or re-fetch."""
-    from mcp_server.fetcher import DOCS_BASE, extract_library_name
+    from mcp_server.catalog import get_catalog
+    from mcp_server.fetcher import DOCS_BASE, extract_library_name, read_doc
 
     docs_dir = Path(DOCS_BASE)
     if not docs_dir.exists():
         print(json.dumps({"error": f"Docs directory not found: {docs_dir}"}))
         sys.exit(1)
 
-    # Discover topics: each subdirectory with .md files is a topic
+    # Discover topics: each library in the docs catalog is a topic
+    catalog = get_catalog(docs_dir)
     topics: dict[str, dict] = {}
     skip_dirs = {"plans", "ios-development", "visionos-development"}
-    for lib_dir in sorted(docs_dir.iterdir()):
-        if not lib_dir.is_dir() or lib_dir.name.startswith("."):
+    for name, info in sorted(catalog.library_stats().items()):
+        if name.startswith(".") or name in skip_dirs:
             continue
-        if lib_dir.name in skip_dirs:
-            continue
-        md_files = list(lib_dir.glob("**/*.md"))
-        if md_files:
-            total_bytes = sum(f.stat().st_size for f in md_files)
-            topics[lib_dir.name] = {
-                "files": len(md_files),
-                "size_kb": round(total_bytes / 1024, 1),
-                "path": str(lib_dir),
-            }
+        topics[name] = {
+            "files": info["files"],
+            "size_kb": round(info["bytes"] / 1024, 1),
+        }
 
     if not topics:
         print(json.dumps({"topics": [], "message": "No researched topics found"}))
@@ -242,11 +240,12 @@ def cmd_audit(args: argparse.Namespace) -> None:
         total_ingested = 0
         results = []
         for name, info in topics.items():
-            lib_dir = Path(info["path"])
-            md_files = sorted(lib_dir.glob("**/*.md"))
             docs = []
-            for md_file in md_files:
-                text = md_file.read_text(encoding="utf-8", errors="replace")
+            for md_file in catalog.paths(name):
+                try:
+                    text = read_doc(md_file)
+                except (OSError, ValueError):
+                    continue
                 if not text.strip():
                     continue
                 docs.append({
@@ -323,6 +322,21 @@ def cmd_audit(args: argparse.Namespace) -> None:
         return
 
 
+def cmd_compress(args: argparse.Namespace) -> None:
+    """Convert the raw docs cache to (or from) zstd-compressed storage."""
+    from mcp_server.fetcher import DOCS_BASE, migrate_storage
+
+    if not Path(DOCS_BASE).exists():
+        print(json.dumps({"error": f"Docs directory not found: {DOCS_BASE}"}))
+        sys.exit(1)
+    try:
+        result = migrate_storage(compress=not args.decompress, library=args.topic)
+    except RuntimeError as exc:
+        print(json.dumps({"error": str(exc)}))
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+
 def cmd_status(args: argparse.Namespace) -> None:
     """Show knowledge store status."""
     h = args.project or _project_hash()
@@ -397,6 +411,14 @@ def main() -> None:
     _add_project_arg(p_audit)
     p_audit.set_defaults(func=cmd_audit)
 
+    # compress
+    p_compress = sub.add_parser("compress", help="Migrate the raw docs cache to zstd storage")
+    p_compress.add_argument("--decompress", action="store_true",
+                            help="Rewrite compressed docs as plain .md instead")
+    p_compress.add_argument("--topic", default=None,
+                            help="Limit to a single topic (default: all)")
+    p_compress.set_defaults(func=cmd_compress)
+
     args = parser.parse_args()
     args.func(args)
 
@@ -0,0 +1,102 @@
+"""Tests for URL canonicalization and the alias map. No network required."""
+
+from __future__ import annotations
+
+import pytest
+
+from mcp_server.canonical import (
+    add_alias,
+    canonicalize,
+    fetch_form,
+    find_canonical,
+    reset_aliases,
+    resolve,
+    same_site,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_aliases():
+    reset_aliases()
+    yield
+    reset_aliases()
+
+
+class TestCanonicalize:
+    @pytest.mark.parametrize("variant", [
+        "https://docs.example.com/guide",
+        "https://docs.example.com/guide/",
+        "http://docs.example.com/guide",
+        "HTTPS://Docs.Example.COM/guide",
+        "https://docs.example.com:443/guide",
+        "https://docs.example.com/guide#install",
+        "https://docs.example.com/guide/index.html",
+        "https://docs.example.com/guide?utm_source=x&utm_medium=y",
+        "https://docs.example.com//guide",
+    ])
+    def test_variants_collapse(self, variant):
+        assert canonicalize(variant) == "https://docs.example.com/guide"
+
+    def test_root(self):
+        assert canonicalize("http://example.com") == "https://example.com/"
+        assert canonicalize("https://example.com/index.html") == "https://example.com/"
+
+    def test_meaningful_query_kept_and_sorted(self):
+        assert (canonicalize("https://x.dev/api?v=2&lang=py&gclid=abc")
+                == "https://x.dev/api?lang=py&v=2")
+
+    def test_custom_port_kept(self):
+        assert canonicalize("http://localhost:8000/a/") == "https://localhost:8000/a"
+
+    def test_fetch_form_keeps_plain_http(self):
+        key = canonicalize("http://localhost:8000/a/")
+        assert fetch_form(key, "http://localhost:8000/a/") == "http://localhost:8000/a"
+        assert fetch_form(key, "https://localhost:8000/a") == key
+
+    def test_non_http_untouched(self):
+        assert canonicalize("file:///tmp/a.md") == "file:///tmp/a.md"
+        assert canonicalize("not a url") == "not a url"
+
+    def test_same_site(self):
+        assert same_site("https://www.a.com/x", "https://a.com/y")
+        assert not same_site("https://a.com/x", "https://b.com/x")
+
+
+class TestFindCanonical:
+    def test_relative_href(self):
+        page = '<html><head><link rel="canonical" href="/docs/v2/guide/"></head><body></body>'
+        assert (find_canonical(page, "https://x.dev/docs/latest/guide")
+                == "https://x.dev/docs/v2/guide")
+
+    def test_attribute_order_and_quotes(self):
+        page = "<head><link href='https://x.dev/a?utm_source=q' rel='Canonical'></head>"
+        assert find_canonical(page, "https://x.dev/b") == "https://x.dev/a"
+
+    def test_cross_site_ignored(self):
+        page = '<head><link rel="canonical" href="https://mirror.other.com/a"></head>'
+        assert find_canonical(page, "https://x.dev/a") is None
+
+    def test_body_links_ignored(self):
+        page = '<head></head><body><link rel="canonical" href="/elsewhere"></body>'
+        assert find_canonical(page, "https://x.dev/a") is None
+
+    def test_other_rel_ignored(self):
+        page = '<head><link rel="stylesheet" href="/s.css"></head>'
+        assert find_canonical(page, "https://x.dev/a") is None
+
+
+class TestAliases:
+    def test_resolve_follows_chain(self):
+        add_alias("https://x.dev/old", "https://x.dev/mid")
+        add_alias("https://x.dev/mid/", "https://x.dev/new")
+        assert resolve("http://x.dev/old#top") == "https://x.dev/new"
+
+    def test_cycle_not_recorded(self):
+        add_alias("https://x.dev/a", "https://x.dev/b")
+        add_alias("https://x.dev/b", "https://x.dev/a")
+        assert resolve("https://x.dev/a") == "https://x.dev/b"
+        assert resolve("https://x.dev/b") == "https://x.dev/b"
+
+    def test_self_alias_ignored(self):
+        add_alias("https://x.dev/a/", "https://x.dev/a")
+        assert resolve("https://x.dev/a") == "https://x.dev/a"
@@ -0,0 +1,150 @@
+"""Tests for the SQLite docs catalog.
+
+Each test gets its own docs base under tmp_path. No network required.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+
+import pytest
+
+from mcp_server.catalog import (
+    CATALOG_NAME,
+    DocCatalog,
+    close_catalogs,
+    get_catalog,
+)
+
+
+@pytest.fixture()
+def base(tmp_path):
+    b = tmp_path / "docs"
+    b.mkdir()
+    yield b
+    close_catalogs()
+
+
+def _meta(url: str, size: int = 5) -> dict:
+    return {
+        "url": url,
+        "fetched_at": "2026-01-01T00:00:00+00:00",
+        "content_hash": "sha256:abc",
+        "size_bytes": size,
+        "markdown_source": "html2text",
+    }
+
+
+class TestRows:
+    def test_put_and_get(self, base):
+        cat = get_catalog(base)
+        doc = base / "fastapi" / "tutorial.md"
+        meta = _meta("https://fastapi.tiangolo.com/tutorial") | {"etag": '"v1"'}
+        cat.put(doc, meta)
+        assert cat.get(doc) == meta
+
+    def test_get_missing(self, base):
+        assert get_catalog(base).get(base / "nope" / "x.md") is None
+
+    def test_outside_base(self, base, tmp_path):
+        cat = get_catalog(base)
+        assert cat.get(tmp_path / "elsewhere.md") is None
+        with pytest.raises(ValueError):
+            cat.put(tmp_path / "elsewhere.md", _meta("https://x"))
+
+    def test_replace_and_remove(self, base):
+        cat = get_catalog(base)
+        doc = base / "lib" / "a.md"
+        cat.put(doc, _meta("https://a", size=1))
+        cat.put(doc, _meta("https://a", size=9))
+        assert cat.get(doc)["size_bytes"] == 9
+        cat.remove(doc)
+        assert cat.get(doc) is None
+
+    def test_wal_mode(self, base):
+        get_catalog(base)
+        conn = sqlite3.connect(base / CATALOG_NAME)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+
+class TestQueries:
+    def test_library_stats_and_paths(self, base):
+        cat = get_catalog(base)
+        cat.put(base / "fastapi" / "index.md", _meta("https://f/", size=100))
+        cat.put(base / "fastapi" / "deep" / "tut.md", _meta("https://f/tut", size=50))
+        cat.put(base / "dspy" / "api.md", _meta("https://d/api", size=7))
+
+        assert cat.library_stats() == {
+            "fastapi": {"files": 2, "bytes": 150},
+            "dspy": {"files": 1, "bytes": 7},
+        }
+        assert cat.paths("fastapi") == [
+            base / "fastapi" / "deep" / "tut.md",
+            base / "fastapi" / "index.md",
+        ]
+
+
+class TestMigration:
+    def test_imports_sidecars_and_bare_files(self, base):
+        lib = base / "react"
+        lib.mkdir()
+        (lib / "hooks.md").write_text("# Hooks")
+        meta = _meta("https://react.dev/hooks", size=7)
+        (lib / "hooks.meta.json").write_text(json.dumps(meta))
+        (lib / "notes.md").write_text("hand written")
+        (base / "README.md").write_text("not a library doc")
+
+        cat = get_catalog(base)
+
+        assert cat.get(lib / "hooks.md") == meta
+        assert not (lib / "hooks.meta.json").exists()
+        # Counted, but without a fetch record
+        assert cat.get(lib / "notes.md") is None
+        assert cat.library_stats() == {"react": {"files": 2, "bytes": 7 + 12}}
+
+    def test_corrupt_sidecar_imported_as_bare(self, base):
+        lib = base / "lib"
+        lib.mkdir()
+        (lib / "a.md").write_text("abc")
+        (lib / "a.meta.json").write_text("not json{{{")
+        cat = get_catalog(base)
+        assert cat.get(lib / "a.md") is None
+        assert cat.library_stats()["lib"]["files"] == 1
+
+    def test_compressed_docs_cataloged_as_md(self, base):
+        lib = base / "rust"
+        lib.mkdir()
+        (lib / "fs.md.zst").write_bytes(b"\x28\xb5\x2f\xfd frame")
+        cat = get_catalog(base)
+        assert cat.paths("rust") == [lib / "fs.md"]
+
+    def test_existing_catalog_not_rescanned(self, base):
+        get_catalog(base)
+        close_catalogs()
+        (base / "late").mkdir()
+        (base / "late" / "x.md").write_text("x")
+        assert get_catalog(base).library_stats() == {}
+
+
+class TestGetCatalog:
+    def test_shared_instance(self, base):
+        assert get_catalog(base) is get_catalog(base)
+
+    def test_reopens_after_delete(self, base):
+        import shutil
+
+        cat = get_catalog(base)
+        cat.put(base / "lib" / "a.md", _meta("https://a"))
+        shutil.rmtree(base)
+
+        fresh = get_catalog(base)
+        assert fresh is not cat
+        assert fresh.library_stats() == {}
+
+    def test_close(self, base):
+        cat = DocCatalog(base)
+        cat.open()
+        cat.close()
+        cat.close()
@@ -0,0 +1,91 @@
+"""Tests for SimHash signatures and the per-store near-duplicate index."""
+
+from __future__ import annotations
+
+import pytest
+
+from mcp_server.dedup import (
+    NEAR_DUP_DISTANCE,
+    close_near_dup_indexes,
+    get_near_dup_index,
+    hamming,
+    simhash,
+    store_key,
+)
+
+TEXT = " ".join(f"Sessions store data for visitor {i} on the server side." for i in range(10))
+
+
+@pytest.fixture
+def index(tmp_path):
+    yield get_near_dup_index(tmp_path)
+    close_near_dup_indexes()
+
+
+class TestSimhash:
+    def test_short_text_has_no_signature(self):
+        assert simhash("too short to sign") is None
+
+    def test_stable(self):
+        assert simhash(TEXT) == simhash(TEXT)
+
+    def test_small_edit_is_close(self):
+        edited = TEXT.replace("visitor 3", "user 3")
+        assert hamming(simhash(TEXT), simhash(edited)) <= NEAR_DUP_DISTANCE
+
+    def test_different_text_is_far(self):
+        other = " ".join(f"Migrations change table {i} schemas over time safely." for i in range(10))
+        assert hamming(simhash(TEXT), simhash(other)) > NEAR_DUP_DISTANCE
+
+    def test_case_and_punctuation_ignored(self):
+        assert simhash(TEXT.upper().replace(".", ";")) == simhash(TEXT)
+
+
+class TestNearDupIndex:
+    def test_links_copy_to_canonical(self, index):
+        assert index.check_page("s", "https://x.com/v1/a", [TEXT]) == [None]
+        match = index.check_page("s", "https://x.com/v2/a", ["# Title\n", TEXT])
+        assert match[0] is None
+        assert match[1][:2] == ("https://x.com/v1/a", 0)
+        assert index.canonical("s", "https://x.com/v2/a", 1) == ("https://x.com/v1/a", 0)
+        assert index.counts("s") == {"signatures": 1, "links": 1}
+
+    def test_reingest_never_matches_itself(self, index):
+        index.check_page("s", "https://x.com/a", [TEXT])
+        assert index.check_page("s", "https://x.com/a", [TEXT]) == [None]
+        assert index.counts("s")["signatures"] == 1
+
+    def test_stores_are_separate(self, index):
+        index.check_page("s1", "https://x.com/a", [TEXT])
+        assert index.check_page("s2", "https://x.com/b", [TEXT]) == [None]
+
+    def test_forget(self, index):
+        index.check_page("s", "https://x.com/a", [TEXT])
+        index.forget("s", ["https://x.com/a"])
+        assert index.check_page("s", "https://x.com/b", [TEXT]) == [None]
+
+    def test_clear(self, index):
+        index.check_page("s", "https://x.com/v1/a", [TEXT])
+        index.check_page("s", "https://x.com/v2/a", [TEXT])
+        index.check_page("other", "https://x.com/a", [TEXT])
+        assert index.clear("s") == 2
+        assert index.counts("s") == {"signatures": 0, "links": 0}
+        assert index.check_page("s", "https://x.com/v2/a", [TEXT]) == [None]
+        assert index.counts("other")["signatures"] == 1
+
+    def test_reopens_after_delete(self, index, tmp_path):
+        index.check_page("s", "https://x.com/a", [TEXT])
+        index.db_path.unlink()
+        fresh = get_near_dup_index(tmp_path)
+        assert fresh is not index
+        assert fresh.counts("s") == {"signatures": 0, "links": 0}
+
+
+class TestStoreKey:
+    def test_uses_store_path(self):
+        class Store:
+            path = "/k/abc.mv2"
+        assert store_key(Store()) == "/k/abc.mv2"
+
+    def test_default(self):
+        assert store_key(None) == "default"
@@ -0,0 +1,141 @@
+"""Tests for zstd-compressed raw doc storage.
+
+Skipped when the optional zstandard package isn't installed.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from mcp_server import doc_compression, fetcher
+from mcp_server.catalog import close_catalogs
+from mcp_server.doc_compression import (
+    DICT_MIN_SAMPLES,
+    compress,
+    compressed_path,
+    decompress,
+    train_dict,
+)
+from mcp_server.fetcher import (
+    _store_raw,
+    doc_exists,
+    is_fresh,
+    migrate_storage,
+    read_doc,
+)
+
+
+def _page(i: int) -> str:
+    return (f"# HashMap::method_{i}\n\n"
+            f"Returns the value for key {i}. Available since 1.{i}.0.\n\n"
+            "```rust\nlet mut map = HashMap::new();\nmap.insert(1, \"a\");\n```\n\n"
+            "Panics if the map is poisoned. See also `BTreeMap` and `HashSet`.\n")
+
+
+@pytest.fixture()
+def docs_base(tmp_path, monkeypatch):
+    base = tmp_path / "docs"
+    monkeypatch.setattr(fetcher, "DOCS_BASE", base)
+    monkeypatch.setattr(fetcher, "_dict_attempted", set())
+    doc_compression.reset_cache()
+    yield base
+    doc_compression.reset_cache()
+    close_catalogs()
+
+
+class TestCodec:
+    def test_roundtrip_without_dict(self, tmp_path):
+        text = "# Title\n\nSome text, ünïcode included.\n" * 20
+        data = compress(None, None, text)
+        assert len(data) < len(text.encode())
+        assert decompress(None, None, data) == text
+
+    def test_dict_roundtrip_and_smaller(self, tmp_path):
+        samples = [_page(i) for i in range(64)]
+        dict_id = train_dict(tmp_path, "rust", samples)
+        assert dict_id
+        assert (tmp_path / ".zdicts" / "rust" / f"{dict_id}.zdict").exists()
+
+        page = _page(999)
+        with_dict = compress(tmp_path, "rust", page)
+        plain = compress(None, None, page)
+        assert len(with_dict) < len(plain)
+
+        # A fresh process reloads the dictionary from disk
+        doc_compression.reset_cache()
+        assert decompress(tmp_path, "rust", with_dict) == page
+
+    def test_too_few_samples(self, tmp_path):
+        assert train_dict(tmp_path, "rust", [_page(1)] * (DICT_MIN_SAMPLES - 1)) is None
+
+    def test_missing_dict_raises(self, tmp_path):
+        train_dict(tmp_path, "rust", [_page(i) for i in range(64)])
+        data = compress(tmp_path, "rust", _page(1))
+        with pytest.raises(ValueError, match="dictionary"):
+            decompress(tmp_path, "other", data)
+
+    def test_corrupt_frame_raises(self):
+        with pytest.raises(ValueError):
+            decompress(None, None, b"not zstd at all")
+
+
+class TestFetcherStorage:
+    def test_compressed_store_reads_through(self, docs_base, monkeypatch):
+        monkeypatch.setattr(fetcher, "COMPRESS_DOCS", True)
+        doc = docs_base / "rust" / "std" / "fs.md"
+        meta = _store_raw(doc, _page(1), "https://doc.rust-lang.org/std/fs")
+
+        assert not doc.exists()
+        assert compressed_path(doc).exists()
+        assert doc_exists(doc)
+        assert read_doc(doc) == _page(1)
+        assert is_fresh(doc)
+        assert meta["size_bytes"] == len(_page(1).encode())
+
+    def test_plain_write_replaces_compressed(self, docs_base, monkeypatch):
+        doc = docs_base / "rust" / "a.md"
+        monkeypatch.setattr(fetcher, "COMPRESS_DOCS", True)
+        _store_raw(doc, "old", "https://x/a")
+        monkeypatch.setattr(fetcher, "COMPRESS_DOCS", False)
+        _store_raw(doc, "new", "https://x/a")
+        assert doc.read_text() == "new"
+        assert not compressed_path(doc).exists()
+
+    def test_dict_trained_once_library_is_big_enough(self, docs_base, monkeypatch):
+        monkeypatch.setattr(fetcher, "COMPRESS_DOCS", True)
+        for i in range(DICT_MIN_SAMPLES + 1):
+            _store_raw(docs_base / "rust" / f"p{i}.md", _page(i), f"https://x/p{i}")
+        assert list((docs_base / ".zdicts" / "rust").glob("*.zdict"))
+        for i in range(DICT_MIN_SAMPLES + 1):
+            assert read_doc(docs_base / "rust" / f"p{i}.md") == _page(i)
+
+
+class TestMigrateStorage:
+    def test_compress_then_decompress(self, docs_base):
+        for i in range(40):
+            _store_raw(docs_base / "rust" / f"p{i}.md", _page(i), f"https://x/p{i}")
+
+        result = migrate_storage()
+        assert result["files"] == 40
+        assert result["dicts_trained"] == 1
+        assert result["bytes_after"] < result["bytes_before"]
+        assert result["saved_pct"] > 50
+        assert not list((docs_base / "rust").glob("*.md"))
+        assert read_doc(docs_base / "rust" / "p7.md") == _page(7)
+
+        back = migrate_storage(compress=False)
+        assert back["files"] == 40
+        assert (docs_base / "rust" / "p7.md").read_text() == _page(7)
+        assert not list((docs_base / "rust").glob("*.zst"))
+
+    def test_single_library(self, docs_base):
+        _store_raw(docs_base / "a" / "x.md", _page(1), "https://a/x")
+        _store_raw(docs_base / "b" / "y.md", _page(2), "https://b/y")
+        result = migrate_storage(library="a")
+        assert result["files"] == 1
+        assert compressed_path(docs_base / "a" / "x.md").exists()
+        assert (docs_base / "b" / "y.md").exists()
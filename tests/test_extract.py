@@ -0,0 +1,173 @@
+"""Tests for main-content extraction and repeated-block stripping.
+
+Uses the real documentation pages in tests/fixtures/docs_html.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from mcp_server.extract import (
+    BoilerplateTracker,
+    REPEAT_MIN_PAGES,
+    extract_main_html,
+)
+from mcp_server.fetcher import _markdown_from_body, html_to_markdown
+
+FIXTURES = Path(__file__).parent / "fixtures" / "docs_html"
+
+
+def _fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+# ---------------------------------------------------------------------------
+# DOM extraction
+# ---------------------------------------------------------------------------
+
+
+class TestExtractMainHtml:
+    def test_drops_nav_and_footer(self):
+        page = ("<html><head><title>Guide</title></head><body>"
+                "<nav><a href='/'>Home</a></nav>"
+                "<main><h1>Guide</h1><p>Real content, with detail.</p></main>"
+                "<footer>Copyright Example</footer></body></html>")
+        html, removed = extract_main_html(page)
+        assert "Real content" in html
+        assert "Home" not in html
+        assert "Copyright" not in html
+        assert "<title>Guide</title>" in html
+        assert removed > 0
+
+    def test_chrome_classes_and_roles(self):
+        page = ("<body><div class='cookie-banner'>We use cookies</div>"
+                "<div role='navigation'>Menu</div>"
+                "<div id='content'><p>Body text, long enough, to win.</p></div></body>")
+        html, _ = extract_main_html(page)
+        assert "cookies" not in html
+        assert "Menu" not in html
+        assert "Body text" in html
+
+    def test_header_inside_article_kept(self):
+        page = ("<body><header>Site banner</header><article><header><h1>Title</h1>"
+                "</header><p>Article text, here.</p></article></body>")
+        html, _ = extract_main_html(page)
+        assert "Title" in html
+        assert "Site banner" not in html
+
+    def test_link_list_in_content_pruned(self):
+        links = "".join(f"<li><a href='/p{i}'>Related page {i}</a></li>" for i in range(10))
+        page = (f"<body><main><p>Main paragraph, with commas, and words.</p>"
+                f"<ul>{links}</ul></main></body>")
+        html, _ = extract_main_html(page)
+        assert "Main paragraph" in html
+        assert "Related page" not in html
+
+    def test_code_list_not_pruned(self):
+        page = ("<body><main><p>Intro.</p><ul><li><a href='#x'><code>fn x()</code></a></li>"
+                "</ul></main></body>")
+        html, _ = extract_main_html(page)
+        assert "fn x()" in html
+
+    def test_plain_page_unchanged_content(self):
+        page = "<html><body><h1>Title</h1><p>Body text</p></body></html>"
+        html, removed = extract_main_html(page)
+        assert "Title" in html and "Body text" in html
+        assert removed == 0
+
+    def test_empty_body_returned_as_is(self):
+        page = "<html><body><nav>only nav</nav></body></html>"
+        assert extract_main_html(page) == (page, 0)
+
+    def test_deeply_nested_page_returned_as_is(self):
+        page = ("<html><body>" + "<div>" * 3000 + "<p>Deep text</p>" + "</div>" * 3000
+                + "</body></html>")
+        assert extract_main_html(page) == (page, 0)
+        markdown, removed = _markdown_from_body(page, True)
+        assert "Deep text" in markdown and removed == 0
+
+    @pytest.mark.parametrize("name,heading", [
+        ("cargo-manifest.html", "# The Manifest Format"),
+        ("rust-book-ownership.html", "## What Is Ownership?"),
+        ("rust-std-fs.html", "# Module fs"),
+        ("rust-std-hashmap.html", "# Struct HashMap"),
+        ("rustc-platform-support.html", "# Platform Support"),
+        ("rustdoc-how-to-write-documentation.html", "# How to write documentation"),
+    ])
+    def test_fixtures_shrink_and_keep_title(self, name, heading):
+        page = _fixture(name)
+        full = html_to_markdown(page)
+        html, removed = extract_main_html(page)
+        main = html_to_markdown(html)
+        assert 0 < len(main) < len(full)
+        assert removed > 0
+        assert heading in main.splitlines()
+        # mdBook/rustdoc chrome
+        assert "Keyboard shortcuts" not in main
+
+    def test_rustdoc_sidebar_dropped(self):
+        full = html_to_markdown(_fixture("rust-std-hashmap.html"))
+        main = html_to_markdown(extract_main_html(_fixture("rust-std-hashmap.html"))[0])
+        assert "Trait Implementations" in main
+        assert main.count("](") < full.count("](")
+
+
+# ---------------------------------------------------------------------------
+# Repeated blocks
+# ---------------------------------------------------------------------------
+
+
+class TestBoilerplateTracker:
+    def _page(self, i: int) -> str:
+        return f"# Page {i}\n\nBody {i}.\n\nEdit this page\n\n© 2026 Example\n"
+
+    def test_strips_after_min_pages(self):
+        tracker = BoilerplateTracker()
+        for i in range(REPEAT_MIN_PAGES - 1):
+            md, removed = tracker.strip("docs.example.com", f"/p{i}", self._page(i))
+            assert removed == 0
+        md, removed = tracker.strip("docs.example.com", "/p99", self._page(99))
+        assert "Edit this page" not in md
+        assert "© 2026" not in md
+        assert "Body 99." in md
+        assert removed == len("Edit this page".encode()) + len("© 2026 Example".encode())
+
+    def test_hosts_tracked_separately(self):
+        tracker = BoilerplateTracker(min_pages=2)
+        tracker.strip("a.example.com", "/p1", self._page(1))
+        md, removed = tracker.strip("b.example.com", "/p2", self._page(2))
+        assert removed == 0
+
+    def test_headings_and_code_never_stripped(self):
+        tracker = BoilerplateTracker(min_pages=2)
+        page = "# Overview\n\n```\npip install x\n```\n\nText {}.\n"
+        for i in range(3):
+            md, _ = tracker.strip("h", f"/p{i}", page.format(i))
+        assert "# Overview" in md
+        assert "pip install x" in md
+
+    def test_duplicate_page_left_intact(self):
+        tracker = BoilerplateTracker(min_pages=2)
+        page = "Short line one.\n\nShort line two.\n"
+        tracker.strip("h", "/a", page)
+        assert tracker.strip("h", "/b", page) == (page, 0)
+
+    def test_block_counted_once_per_page(self):
+        tracker = BoilerplateTracker(min_pages=2)
+        md, removed = tracker.strip("h", "/p", "Back to top\n\nBody.\n\nBack to top\n")
+        assert removed == 0
+
+    def test_refetched_page_not_counted_again(self):
+        tracker = BoilerplateTracker()
+        page = "# Guide\n\nShort intro.\n\n```\ncode()\n```\n\nShort outro.\n"
+        for _ in range(REPEAT_MIN_PAGES + 1):
+            md, removed = tracker.strip("h", "/guide", page)
+        assert (md, removed) == (page, 0)
+
+    def test_reset(self):
+        tracker = BoilerplateTracker(min_pages=1)
+        tracker.strip("h", "/p", "x\n\ny\n\nz\n\nw\n\nv\n")
+        tracker.reset()
+        assert tracker._hosts == {}
@@ -19,13 +19,16 @@ from mcp_server.fetcher import (
     BLOCKED_DOMAINS,
     DOCS_BASE,
     FRESHNESS_TTL,
+    convert_body,
     extract_library_name,
+    fetch_many,
     fetch_url,
     html_to_markdown,
     is_fresh,
     parse_sitemap_xml,
     read_meta,
     register_fetcher_tools,
+    shutdown_convert_pool,
     url_to_filepath,
     write_meta,
     _content_hash,
@@ -50,6 +53,7 @@ def _mock_response(text: str = "", status_code: int = 200, headers: dict | None
     resp.status_code = status_code
     resp.text = text
     resp.headers = headers or {}
+    resp.history = []
     resp.raise_for_status = MagicMock()
     if status_code >= 400:
         import httpx
@@ -169,6 +173,57 @@ class TestHtmlToMarkdown:
             assert "text" in text
 
 
+class TestConvertBody:
+    def test_small_page_converts_inline(self):
+        html = "<html><body><h1>Small</h1><p>Tiny page.</p></body></html>"
+        with patch("mcp_server.fetcher._get_convert_pool") as get_pool:
+            md, _ = _run(convert_body(html))
+        get_pool.assert_not_called()
+        assert "Small" in md
+
+    def test_large_page_goes_to_pool(self, monkeypatch):
+        monkeypatch.setattr("mcp_server.fetcher.CONVERT_INLINE_MAX", 10)
+        html = "<html><body><h1>Large</h1><p>" + "word " * 500 + "</p></body></html>"
+        try:
+            md, removed = _run(convert_body(html))
+        finally:
+            shutdown_convert_pool()
+        assert md == html_to_markdown(html)
+        assert removed == 0
+
+    def test_large_markdown_passes_through(self, monkeypatch):
+        monkeypatch.setattr("mcp_server.fetcher.CONVERT_INLINE_MAX", 10)
+        text = "# Heading\n\n" + "Plain markdown line.\n" * 200
+        try:
+            assert _run(convert_body(text, main_only=True)) == (text, 0)
+        finally:
+            shutdown_convert_pool()
+
+    def test_broken_pool_falls_back_inline(self, monkeypatch):
+        from concurrent.futures.process import BrokenProcessPool
+
+        monkeypatch.setattr("mcp_server.fetcher.CONVERT_INLINE_MAX", 10)
+        pool = MagicMock()
+        pool.submit.side_effect = BrokenProcessPool("worker died")
+        with patch("mcp_server.fetcher._get_convert_pool", return_value=pool):
+            md, _ = _run(convert_body("<h1>Fallback</h1><p>still converted</p>"))
+        assert "Fallback" in md
+
+    def test_main_only_strips_chrome(self):
+        html = ("<html><body><nav><a href='/a'>Home</a> <a href='/b'>Guides</a></nav>"
+                "<main><h1>Install</h1><p>Run the installer.</p></main>"
+                "<footer>Copyright 2026 Example Corp</footer></body></html>")
+        md, removed = _run(convert_body(html, main_only=True))
+        assert "Install" in md
+        assert "Guides" not in md
+        assert "Copyright" not in md
+        assert removed > 0
+
+    def test_looks_like_markdown_ignores_tail(self):
+        text = "# Title\n\n" + "text line\n" * 100 + "<div>x</div>\n" * 10_000
+        assert _looks_like_markdown(text) is True
+
+
 # ---------------------------------------------------------------------------
 # Freshness tracking
 # ---------------------------------------------------------------------------
@@ -280,7 +335,30 @@ class TestSitemapParsing:
 # ---------------------------------------------------------------------------
 
 
+@pytest.fixture(autouse=True)
+def _fresh_limiters():
+    from mcp_server.ratelimit import reset_limiters
+    reset_limiters()
+    yield
+    reset_limiters()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_aliases():
+    from mcp_server.canonical import reset_aliases
+    reset_aliases()
+    yield
+    reset_aliases()
+
+
 class TestFetchUrl:
+    @pytest.fixture(autouse=True)
+    def _fresh_boilerplate(self):
+        from mcp_server.fetcher import _boilerplate
+        _boilerplate.reset()
+        yield
+        _boilerplate.reset()
+
     def test_blocked_domain(self):
         client = AsyncMock()
         result = _run(fetch_url(client, "https://medium.com/some-article"))
@@ -400,6 +478,23 @@ class TestFetchUrl:
         assert meta["content_hash"].startswith("sha256:")
         assert meta["size_bytes"] > 0
 
+    def test_metadata_goes_to_catalog(self):
+        """Docs under DOCS_BASE get a catalog row (with validators), no sidecar."""
+        url = "https://docs.testlib.com/validators"
+        resp = _mock_response("# Validators\n\nBody.", 200,
+                              headers={"etag": '"abc"', "last-modified": "Wed, 01 Jan 2026 00:00:00 GMT"})
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=resp)
+
+        result = _run(fetch_url(client, url, force=True))
+        doc_path = result["doc_path"]
+        assert not doc_path.with_suffix(".meta.json").exists()
+
+        meta = read_meta(doc_path)
+        assert meta["etag"] == '"abc"'
+        assert meta["last_modified"].startswith("Wed")
+        assert is_fresh(doc_path) is True
+
     def test_accept_markdown_negotiation(self):
         """Tier 1: Accept: text/markdown header gets native markdown response."""
         url = "https://docs.example.com/guide"
@@ -464,6 +559,74 @@ class TestFetchUrl:
         assert "Old Site" in result["content"]
         assert result["meta"]["markdown_source"] == "html2text"
 
+    def test_repeated_blocks_stripped_across_pages(self):
+        """A footer served on every page of a host is dropped from the third on."""
+        client = AsyncMock()
+        footer = "Edit this page on GitHub"
+        results = []
+        for i in range(3):
+            body = f"# Page {i}\n\nUnique body {i}.\n\n{footer}\n"
+            client.get = AsyncMock(return_value=_mock_response(body, 200))
+            results.append(_run(fetch_url(client, f"https://docs.repeat.com/p{i}", force=True)))
+
+        assert footer in results[0]["content"]
+        assert "boilerplate_bytes" not in results[0]["meta"]
+        assert footer not in results[2]["content"]
+        assert "Unique body 2." in results[2]["content"]
+        assert results[2]["meta"]["boilerplate_bytes"] == len(footer)
+
+    def test_throttle_stops_cascade(self):
+        """A 429 from the origin returns retry info without trying other tiers."""
+        url = "https://docs.busy.com/page"
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response(
+            "slow down", 429, headers={"retry-after": "7"}))
+
+        result = _run(fetch_url(client, url, force=True))
+
+        assert client.get.call_count == 1
+        assert result["retryable"] is True
+        assert result["retry_after"] == 7.0
+        assert "429" in result["error"]
+
+        from mcp_server.ratelimit import get_limiter
+        assert get_limiter("docs.busy.com").paused_for() > 6
+
+    def test_not_found_is_not_retryable(self):
+        url = "https://docs.example.com/missing"
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response("", 404))
+        result = _run(fetch_url(client, url, force=True))
+        assert "HTTP 404" in result["error"]
+        assert result["retryable"] is False
+
+    def test_paused_host_not_contacted(self):
+        from mcp_server.ratelimit import get_limiter
+
+        get_limiter("docs.paused.com").record_throttle(300)
+        client = AsyncMock()
+        result = _run(fetch_url(client, "https://docs.paused.com/x", force=True))
+        client.get.assert_not_called()
+        assert result["retryable"] is True
+        assert result["retry_after"] > 290
+
+    def test_markdown_new_skipped_while_paused(self):
+        from mcp_server.fetcher import MARKDOWN_NEW_HOST
+        from mcp_server.ratelimit import get_limiter
+
+        get_limiter(MARKDOWN_NEW_HOST).record_throttle(300)
+        seen = []
+
+        async def fake_get(u, **kwargs):
+            seen.append(u)
+            return _mock_response("<html><body><p>Page text.</p></body></html>", 200)
+
+        client = AsyncMock()
+        client.get = fake_get
+        result = _run(fetch_url(client, "https://site.example.com/p", force=True))
+        assert result["error"] is None
+        assert not any(MARKDOWN_NEW_HOST in u for u in seen)
+
     def test_markdown_new_skipped_for_blocked_domains(self):
         """Don't send blocked-domain URLs to markdown.new either."""
         url = "https://medium.com/some-article"
@@ -473,6 +636,187 @@ class TestFetchUrl:
         assert "Blocked" in result["error"]
 
 
+# ---------------------------------------------------------------------------
+# Crawling with retries
+# ---------------------------------------------------------------------------
+
+
+class TestCanonicalFetch:
+    def test_variants_share_one_doc(self):
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response("# Guide\n\nBody.", 200))
+
+        first = _run(fetch_url(client, "https://docs.canon.com/guide/?utm_source=x", force=True))
+        calls = client.get.call_count
+        second = _run(fetch_url(client, "http://docs.canon.com/guide#install"))
+
+        assert first["canonical_url"] == "https://docs.canon.com/guide"
+        assert second["from_cache"] is True
+        assert second["doc_path"] == first["doc_path"]
+        assert client.get.call_count == calls
+
+    def test_plain_http_fetched_over_http(self):
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response("# Local\n\nBody.", 200))
+
+        result = _run(fetch_url(client, "http://localhost:8000/docs/", force=True))
+        assert result["error"] is None
+        assert client.get.call_args_list[0].args[0] == "http://localhost:8000/docs"
+        assert result["canonical_url"] == "https://localhost:8000/docs"
+
+    def test_concurrent_requests_share_fetch(self):
+        requested = []
+
+        async def fake_get(u, **kwargs):
+            requested.append(u)
+            await asyncio.sleep(0.01)
+            return _mock_response("# Shared\n\nBody.", 200)
+
+        client = AsyncMock()
+        client.get = fake_get
+
+        async def go():
+            return await asyncio.gather(
+                fetch_url(client, "https://docs.canon.com/shared", force=True),
+                fetch_url(client, "https://docs.canon.com/shared/", force=True),
+                fetch_url(client, "https://docs.canon.com/shared#x", force=True),
+            )
+
+        results = _run(go())
+        assert requested == ["https://docs.canon.com/shared"]
+        assert all(r["content"] == results[0]["content"] for r in results)
+
+    def test_redirect_recorded_as_alias(self):
+        import httpx as _httpx
+
+        resp = _mock_response("# Moved\n\nBody.", 200)
+        resp.history = [MagicMock()]
+        resp.url = _httpx.URL("https://docs.canon.com/v2/moved/")
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=resp)
+
+        result = _run(fetch_url(client, "https://docs.canon.com/moved", force=True))
+        assert result["canonical_url"] == "https://docs.canon.com/v2/moved"
+        assert result["doc_path"] == url_to_filepath("https://docs.canon.com/v2/moved")
+
+        calls = client.get.call_count
+        again = _run(fetch_url(client, "https://docs.canon.com/moved"))
+        assert again["from_cache"] is True
+        assert client.get.call_count == calls
+
+    def test_rel_canonical_recorded_as_alias(self):
+        html = ('<html><head><link rel="canonical" href="/stable/api"></head>'
+                "<body><h1>API</h1><p>Reference.</p></body></html>")
+
+        async def fake_get(u, **kwargs):
+            if "markdown.new" in u:
+                raise __import__("httpx").ConnectError("unreachable")
+            return _mock_response(html, 200)
+
+        client = AsyncMock()
+        client.get = fake_get
+
+        result = _run(fetch_url(client, "https://docs.canon.com/latest/api", force=True))
+        assert result["canonical_url"] == "https://docs.canon.com/stable/api"
+        assert read_meta(result["doc_path"])["url"] == "https://docs.canon.com/stable/api"
+
+
+class TestFetchMany:
+    @pytest.fixture(autouse=True)
+    def _fast_retries(self, monkeypatch):
+        monkeypatch.setattr("mcp_server.fetcher.CRAWL_RETRY_BASE", 0.01)
+
+    def test_throttled_url_requeued_until_success(self):
+        calls: dict[str, int] = {}
+
+        async def fake_get(u, **kwargs):
+            calls[u] = calls.get(u, 0) + 1
+            if u.endswith("/flaky") and calls[u] == 1:
+                return _mock_response("", 503, headers={"retry-after": "0"})
+            return _mock_response(f"# {u}\n\nBody.", 200)
+
+        client = AsyncMock()
+        client.get = fake_get
+        seen = []
+
+        stats = _run(fetch_many(client, ["https://docs.crawl.com/ok", "https://docs.crawl.com/flaky"],
+                                force=True, on_result=lambda u, r: seen.append((u, r["error"]))))
+
+        assert stats["fetched"] == 2
+        assert stats["failed"] == 0
+        assert stats["retried"] == 1
+        assert sorted(seen) == [("https://docs.crawl.com/flaky", None),
+                                ("https://docs.crawl.com/ok", None)]
+
+    def test_gives_up_after_max_attempts(self):
+        import httpx as _httpx
+
+        client = AsyncMock()
+        client.get = AsyncMock(side_effect=_httpx.ConnectError("refused"))
+
+        stats = _run(fetch_many(client, ["https://docs.down.com/a"], force=True, max_attempts=3))
+
+        assert stats["fetched"] == 0
+        assert stats["failed"] == 1
+        assert stats["retried"] == 2
+        assert stats["errors"][0].startswith("https://docs.down.com/a: ")
+
+    def test_permanent_errors_not_retried(self):
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response("", 404))
+        stats = _run(fetch_many(client, ["https://docs.example.com/gone"], force=True))
+        assert stats["retried"] == 0
+        assert stats["failed"] == 1
+
+    def test_async_result_handler(self):
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response("# A\n\nBody.", 200))
+        handled = []
+
+        async def on_result(u, r):
+            handled.append(u)
+
+        _run(fetch_many(client, ["https://docs.example.com/a"], force=True, on_result=on_result))
+        assert handled == ["https://docs.example.com/a"]
+
+    def test_empty(self):
+        assert _run(fetch_many(AsyncMock(), []))["fetched"] == 0
+
+    def test_url_variants_fetched_once(self):
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response("# A\n\nBody.", 200))
+        handled = []
+
+        stats = _run(fetch_many(
+            client,
+            ["https://docs.example.com/a", "https://docs.example.com/a/", "http://docs.example.com/a#x"],
+            force=True, on_result=lambda u, r: handled.append(u),
+        ))
+        assert stats["fetched"] == 1
+        assert stats["duplicates"] == 2
+        assert handled == ["https://docs.example.com/a"]
+
+    def test_canonical_duplicate_flagged(self):
+        html = '<html><head><link rel="canonical" href="/a"></head><body><p>A</p></body></html>'
+
+        async def fake_get(u, **kwargs):
+            if "markdown.new" in u:
+                raise __import__("httpx").ConnectError("unreachable")
+            return _mock_response(html, 200)
+
+        client = AsyncMock()
+        client.get = fake_get
+        results = {}
+
+        stats = _run(fetch_many(
+            client, ["https://docs.example.com/a", "https://docs.example.com/a-copy"],
+            force=True, workers=1, on_result=lambda u, r: results.setdefault(u, r),
+        ))
+        assert stats["fetched"] == 1
+        assert stats["duplicates"] == 1
+        assert results["https://docs.example.com/a-copy"]["duplicate"] is True
+
+
 # ---------------------------------------------------------------------------
 # Bulk local file loading
 # ---------------------------------------------------------------------------
@@ -515,6 +859,7 @@ class TestToolRegistration:
 
         assert "rlm_fetch" in registered
         assert "rlm_load_dir" in registered
+        assert "rlm_fetch_repo" in registered
         assert "rlm_fetch_sitemap" in registered
 
     def test_rlm_fetch_tool_returns_error_for_blocked(self):
@@ -593,6 +938,34 @@ class TestToolRegistration:
         result = _run(tools["rlm_fetch_sitemap"]("https://example.com/sitemap.xml", mock_ctx))
         assert "No URLs found" in result
 
+    def test_rlm_fetch_sitemap_scoped_out(self):
+        """A scope that leaves nothing says what it dropped."""
+        mcp = MagicMock()
+        tools = {}
+
+        def fake_tool():
+            def decorator(fn):
+                tools[fn.__name__] = fn
+                return fn
+            return decorator
+
+        mcp.tool = fake_tool
+        register_fetcher_tools(mcp)
+
+        mock_ctx = MagicMock()
+        mock_app = MagicMock()
+        mock_client = AsyncMock()
+        sitemap = ('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                   "<url><loc>https://example.com/blog/a</loc></url></urlset>")
+        mock_client.get = AsyncMock(return_value=_mock_response(sitemap, 200))
+        mock_app.http = mock_client
+        mock_ctx.request_context.lifespan_context = mock_app
+
+        result = _run(tools["rlm_fetch_sitemap"](
+            "https://example.com/sitemap.xml", mock_ctx, exclude=["/blog"]))
+        assert "No URLs left" in result
+        assert "1 excluded by path" in result
+
     def test_rlm_fetch_with_knowledge_store(self):
         """rlm_fetch should call knowledge_store.ingest when store is available."""
         mcp = MagicMock()
@@ -0,0 +1,68 @@
+"""Tests for the snapshot blob framing (sandbox/frames.py)."""
+
+import os
+
+import pytest
+
+from sandbox import frames
+
+
+def _stream(blobs: dict[str, bytes], codec: str) -> bytes:
+    return b"".join(part for key, data in blobs.items()
+                    for part in frames.encode(key, data, codec))
+
+
+def _decode(data: bytes, step: int | None = None) -> dict[str, bytes]:
+    reader = frames.FrameReader()
+    out = {}
+    step = step or len(data) or 1
+    for start in range(0, len(data), step):
+        for key, codec, parts in reader.frames(data[start:start + step]):
+            out[key] = frames.decompress(codec, parts)
+    reader.close()
+    return out
+
+
+class TestRoundTrip:
+    @pytest.mark.parametrize("codec", frames.available())
+    def test_codecs(self, codec):
+        blobs = {"a": b"hello" * 1000, "b": os.urandom(3 * frames.CHUNK + 17), "empty": b""}
+        assert _decode(_stream(blobs, codec)) == blobs
+
+    @pytest.mark.parametrize("codec", frames.available())
+    def test_split_feeds(self, codec):
+        blobs = {"x": b"abc" * 5000, "y": b"\n" * 100}
+        assert _decode(_stream(blobs, codec), step=7) == blobs
+
+    def test_compresses(self):
+        data = b"0" * frames.CHUNK
+        assert len(_stream({"k": data}, frames.available()[0])) < len(data) // 10
+
+
+class TestCodecs:
+    def test_pick_shared(self):
+        assert frames.pick_codec(["none", "zlib"]) == "zlib"
+        assert frames.pick_codec(["lz4"]) == "none"
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            list(frames.encode("k", b"data", "lz4"))
+
+
+class TestCorrupt:
+    @pytest.mark.parametrize("codec", [c for c in frames.available() if c != "none"])
+    def test_truncated_blob(self, codec):
+        (key, codec, parts), = frames.FrameReader().frames(_stream({"k": b"data" * 1000}, codec))
+        with pytest.raises(ValueError):
+            frames.decompress(codec, [parts[0][:-5]])
+
+    def test_garbage_blob(self):
+        with pytest.raises(ValueError):
+            frames.decompress("zlib", [b"not zlib at all"])
+
+    def test_stream_cut_mid_frame(self):
+        data = _stream({"k": b"data" * 100}, "none")
+        reader = frames.FrameReader()
+        assert reader.frames(data[:-3]) == []
+        with pytest.raises(ValueError):
+            reader.close()
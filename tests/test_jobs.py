@@ -0,0 +1,165 @@
+"""Tests for background research jobs: concurrency cap, cancellation, progress."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from mcp_server import jobs
+from mcp_server.jobs import JobManager
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def _fast_progress(monkeypatch):
+    monkeypatch.setattr(jobs, "PROGRESS_INTERVAL", 0.01)
+
+
+class TestJobManager:
+    def test_result_and_status(self):
+        async def main():
+            manager = JobManager()
+
+            async def run(job):
+                job.set_phase("working")
+                return f"done {job.topic}"
+
+            job = manager.submit("lib", run)
+            assert job.status == "queued"
+            assert await manager.wait(job, 1.0)
+            return job
+
+        job = _run(main())
+        assert job.status == "done"
+        assert job.result == "done lib"
+        assert job.phase == "done"
+        assert job.finished_at is not None
+
+    def test_cap_queues_extra_jobs(self):
+        async def main():
+            manager = JobManager(max_running=1)
+            gate = asyncio.Event()
+
+            async def slow(job):
+                await gate.wait()
+                return "slow"
+
+            first = manager.submit("a", slow)
+            second = manager.submit("b", slow)
+            await asyncio.sleep(0.02)
+            states = (first.status, second.status)
+            gate.set()
+            await manager.wait(second, 1.0)
+            return states, second.status
+
+        states, final = _run(main())
+        assert states == ("running", "queued")
+        assert final == "done"
+
+    def test_cancel(self):
+        async def main():
+            manager = JobManager()
+
+            async def hang(job):
+                await asyncio.sleep(10)
+
+            job = manager.submit("x", hang)
+            await asyncio.sleep(0)
+            assert manager.cancel(job.id)
+            await manager.wait(job, 1.0)
+            return manager, job
+
+        manager, job = _run(main())
+        assert job.status == "cancelled"
+        assert not manager.cancel(job.id)
+        assert not manager.cancel("nope")
+
+    def test_cancel_before_start(self):
+        async def main():
+            manager = JobManager()
+
+            async def hang(job):
+                await asyncio.sleep(10)
+
+            job = manager.submit("x", hang)
+            assert manager.cancel(job.id)
+            await asyncio.sleep(0)
+            return manager, job
+
+        manager, job = _run(main())
+        assert job.status == "cancelled" and job.task.cancelled()
+        assert manager.running() == []
+
+    def test_failure_recorded(self):
+        async def main():
+            manager = JobManager()
+
+            async def boom(job):
+                raise RuntimeError("bad")
+
+            job = manager.submit("x", boom)
+            await manager.wait(job, 1.0)
+            return job
+
+        job = _run(main())
+        assert job.status == "failed"
+        assert "RuntimeError: bad" in job.error
+        assert "failed" in job.describe()
+
+    def test_wait_reports_progress(self):
+        async def main():
+            manager = JobManager()
+            seen = []
+
+            async def crawl(job):
+                counter = iter(range(1000))
+                job.set_phase("fetching", lambda: (next(counter), 1000))
+                await asyncio.sleep(0.1)
+                return "ok"
+
+            async def on_progress(job):
+                seen.append(job.progress())
+
+            job = manager.submit("x", crawl)
+            finished = await manager.wait(job, 0.05, on_progress=on_progress)
+            return finished, seen, job.describe()
+
+        finished, seen, described = _run(main())
+        assert not finished
+        assert seen and all(total == 1000 for _, total in seen)
+        assert "fetching" in described and "/1000 pages" in described
+
+    def test_history_pruned(self):
+        async def main():
+            manager = JobManager(history=2)
+
+            async def quick(job):
+                return "ok"
+
+            for i in range(5):
+                job = manager.submit(str(i), quick)
+                await manager.wait(job, 1.0)
+            manager.submit("last", quick)
+            return manager
+
+        manager = _run(main())
+        # Pruned on submit: the two newest finished jobs plus the new one remain
+        assert [j.topic for j in manager.jobs()] == ["last", "4", "3"]
+
+    def test_close_cancels_running(self):
+        async def main():
+            manager = JobManager()
+
+            async def hang(job):
+                await asyncio.sleep(10)
+
+            job = manager.submit("x", hang)
+            await asyncio.sleep(0)
+            await manager.close()
+            return job
+
+        assert _run(main()).status == "cancelled"
@@ -0,0 +1,95 @@
+"""Tests for the crawl journal.
+
+Each test gets its own docs base under tmp_path. No network required.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from mcp_server.journal import JOURNAL_NAME, close_journals, get_journal
+
+JOB = "sitemap:https://example.com/sitemap.xml"
+URLS = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+
+
+@pytest.fixture()
+def journal(tmp_path):
+    j = get_journal(tmp_path / "docs")
+    j.start(JOB, "sitemap", "https://example.com/sitemap.xml", URLS)
+    yield j
+    close_journals()
+
+
+class TestJobs:
+    def test_start_records_frontier(self, journal):
+        job = journal.get_job(JOB)
+        assert job["status"] == "running"
+        assert job["kind"] == "sitemap"
+        assert journal.urls(JOB) == URLS
+        assert journal.counts(JOB) == {
+            "total": 3, "pending": 3, "done": 0, "failed": 0, "duplicate": 0, "ingested": 0,
+        }
+
+    def test_duplicate_urls_collapse(self, journal):
+        journal.start(JOB, "sitemap", "s", URLS + URLS[:1])
+        assert journal.urls(JOB) == URLS
+
+    def test_restart_resets_progress(self, journal):
+        journal.mark(JOB, URLS[0], "done")
+        journal.finish(JOB)
+        journal.start(JOB, "sitemap", "s", URLS[:2])
+        assert journal.get_job(JOB)["status"] == "running"
+        assert journal.urls(JOB) == URLS[:2]
+
+    def test_jobs_lists_counts(self, journal):
+        journal.mark(JOB, URLS[0], "failed", error="boom")
+        [job] = journal.jobs()
+        assert job["id"] == JOB
+        assert job["failed"] == 1
+        assert job["pending"] == 2
+
+    def test_remove(self, journal):
+        journal.remove(JOB)
+        assert journal.get_job(JOB) is None
+        assert journal.counts(JOB)["total"] == 0
+
+    def test_missing_job(self, journal):
+        assert journal.get_job("sitemap:nope") is None
+
+
+class TestUrls:
+    def test_mark_and_ack(self, journal):
+        journal.mark(JOB, URLS[0], "done")
+        journal.mark(JOB, URLS[1], "done")
+        journal.ack(JOB, URLS[0])
+        assert journal.urls(JOB, "done") == URLS[:2]
+        assert journal.unacked(JOB) == [URLS[1]]
+        assert journal.urls(JOB) == [URLS[2]]
+        assert journal.counts(JOB)["ingested"] == 1
+
+    def test_failed_not_unacked(self, journal):
+        journal.mark(JOB, URLS[0], "failed", error="HTTP 500")
+        assert journal.unacked(JOB) == []
+
+
+class TestGetJournal:
+    def test_persists_across_reopen(self, journal, tmp_path):
+        journal.mark(JOB, URLS[0], "done")
+        close_journals()
+        j = get_journal(tmp_path / "docs")
+        assert j is not journal
+        assert j.urls(JOB, "done") == [URLS[0]]
+
+    def test_reopens_after_delete(self, journal, tmp_path):
+        journal.close()
+        (tmp_path / "docs" / JOURNAL_NAME).unlink()
+        j = get_journal(tmp_path / "docs")
+        assert j.get_job(JOB) is None
+
+    def test_wal_mode(self, journal, tmp_path):
+        conn = sqlite3.connect(tmp_path / "docs" / JOURNAL_NAME)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
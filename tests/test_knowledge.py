@@ -261,6 +261,27 @@ class TestIngest:
         assert call_docs[1]["label"] == "code"
         mock_mem.commit.assert_called_once()
 
+    def test_put_embedded_reuses_vectors(self):
+        from mcp_server.knowledge import KnowledgeStore
+
+        store = KnowledgeStore("test")
+        mock_mem = _make_mock_mem()
+        store.mem = mock_mem
+        embedder = MagicMock()
+        embedder.embed_documents.side_effect = lambda texts: [[9.0] for _ in texts]
+        store._embedder_checked = True
+        store._embedder = embedder
+
+        docs = [{"title": "A", "text": "aaa"}, {"title": "B", "text": "bbb"}]
+        store.put_embedded(docs, [[1.0], [2.0]], commit=False)
+
+        passed = mock_mem.put_many.call_args.kwargs["embedder"]
+        assert passed.embed_documents(["bbb", "aaa", "new"]) == [[2.0], [1.0], [9.0]]
+        embedder.embed_documents.assert_called_once_with(["new"])
+        mock_mem.commit.assert_not_called()
+        store.commit()
+        mock_mem.commit.assert_called_once()
+
     def test_ingest_auto_opens(self, tmp_path):
         """Ingest calls _ensure_open if mem is None."""
         from mcp_server.knowledge import KnowledgeStore
@@ -0,0 +1,142 @@
+"""Tests for llms.txt parsing and llms-full.txt splitting and ingest.
+
+HTTP is mocked; fetched files land in the docs cache, removed after each test.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from mcp_server.llms_txt import (
+    fetch_llms_full,
+    llms_urls,
+    parse_llms_txt,
+    split_llms_full,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _mock_response(text: str = "", status_code: int = 200) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.text = text
+    resp.headers = {"content-type": "text/plain"}
+    resp.history = []
+    resp.raise_for_status = MagicMock()
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    from mcp_server.canonical import reset_aliases
+    from mcp_server.ratelimit import reset_limiters
+    reset_aliases()
+    reset_limiters()
+    yield
+    reset_aliases()
+    reset_limiters()
+    import shutil
+    from mcp_server.fetcher import DOCS_BASE
+    shutil.rmtree(Path(DOCS_BASE), ignore_errors=True)
+
+
+class TestLlmsUrls:
+    def test_full_first(self):
+        assert llms_urls("https://docs.x.com/") == [
+            "https://docs.x.com/llms-full.txt", "https://docs.x.com/llms.txt"]
+
+
+class TestParseLlmsTxt:
+    TEXT = """# Lib
+
+> Lib does things. See [the blog](https://blog.lib.com).
+
+## Docs
+
+- [Quickstart](https://docs.lib.com/quickstart.md): start here
+- [API](/api/reference.md "API reference")
+* [Again](https://docs.lib.com/quickstart.md#top)
+- [Mail](mailto:team@lib.com)
+
+## Optional
+
+- [Changelog](changelog.md)
+"""
+
+    def test_list_links_only(self):
+        urls = parse_llms_txt(self.TEXT, "https://docs.lib.com/llms.txt")
+        assert urls == [
+            "https://docs.lib.com/quickstart.md",
+            "https://docs.lib.com/api/reference.md",
+            "https://docs.lib.com/changelog.md",
+        ]
+
+    def test_empty(self):
+        assert parse_llms_txt("# Nothing here\n", "https://x.com/llms.txt") == []
+
+
+class TestSplitLlmsFull:
+    SOURCE = "https://docs.lib.com/llms-full.txt"
+
+    def test_pages_with_sources(self):
+        text = (
+            "# Install\nSource: https://docs.lib.com/install\n\npip install lib\n\n"
+            "## Extras\nmore\n"
+            "# Usage\nURL: <https://docs.lib.com/usage>\n\ncall it\n"
+        )
+        pages = split_llms_full(text, self.SOURCE)
+        assert [p["title"] for p in pages] == ["Install", "Usage"]
+        assert [p["url"] for p in pages] == [
+            "https://docs.lib.com/install", "https://docs.lib.com/usage"]
+        assert "## Extras" in pages[0]["text"]
+
+    def test_fenced_headings_dont_split(self):
+        text = "# Shell\n\n```bash\n# not a title\necho hi\n```\nafter\n"
+        pages = split_llms_full(text, self.SOURCE)
+        assert len(pages) == 1
+        assert "echo hi" in pages[0]["text"]
+
+    def test_preamble_and_slug_urls(self):
+        text = "intro text\n# Page\nbody\n# Page\nother body\n"
+        pages = split_llms_full(text, self.SOURCE)
+        assert [p["url"] for p in pages] == [
+            f"{self.SOURCE}#llms-full-txt", f"{self.SOURCE}#page", f"{self.SOURCE}#page-1"]
+        assert pages[0]["title"] == "llms-full.txt"
+
+
+class TestFetchLlmsFull:
+    def test_ingests_pages_with_provenance(self):
+        client = AsyncMock()
+        client.get = AsyncMock(return_value=_mock_response(
+            "# A\nSource: https://docs.lib.com/a\n\naaa\n# B\n\nbbb\n"))
+        store = MagicMock()
+
+        stats = _run(fetch_llms_full(client, "https://docs.lib.com/llms-full.txt",
+                                     store=store, force=True))
+
+        assert stats["pages"] == 2
+        assert stats["error"] is None
+        assert stats["pipeline"]["stages"]["write"]["processed"] == 2
+        docs = [d for c in store.put_embedded.call_args_list for d in c.args[0]]
+        assert [d["title"] for d in docs] == [
+            "https://docs.lib.com/a", "https://docs.lib.com/llms-full.txt#b"]
+        assert {d["metadata"]["source"] for d in docs} == {"https://docs.lib.com/llms-full.txt"}
+        assert [d["metadata"]["page"] for d in docs] == [0, 1]
+        # One request for the whole site
+        assert client.get.call_count == 1
+
+    def test_fetch_error(self):
+        client = AsyncMock()
+        client.get = AsyncMock(side_effect=httpx.ConnectError("down"))
+        stats = _run(fetch_llms_full(client, "https://docs.down.com/llms-full.txt",
+                                     force=True))
+        assert stats["pages"] == 0
+        assert stats["error"]
@@ -0,0 +1,182 @@
+"""Tests for incremental local file loading (rlm_load_dir).
+
+Files and the docs cache live under tmp_path; the store is a MagicMock.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from mcp_server.loader import IgnoreRules, load_dir
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture()
+def tree(tmp_path, monkeypatch):
+    from mcp_server.catalog import close_catalogs
+
+    monkeypatch.setattr("mcp_server.fetcher.DOCS_BASE", tmp_path / "cache")
+    root = tmp_path / "repo"
+    (root / "docs" / "guide").mkdir(parents=True)
+    for i in range(5):
+        (root / "docs" / "guide" / f"p{i}.md").write_text(f"# Page {i}\n\nBody {i}.\n")
+    (root / "docs" / "README.md").write_text("# Readme\n")
+    yield root
+    close_catalogs()
+
+
+def _titles(store: MagicMock) -> list[str]:
+    return sorted(d["title"] for c in store.ingest_many.call_args_list for d in c.args[0])
+
+
+class TestIgnoreRules:
+    def _rules(self, tmp_path, *patterns, gitignore=None):
+        if gitignore is not None:
+            (tmp_path / ".gitignore").write_text(gitignore)
+        return IgnoreRules(tmp_path, patterns)
+
+    @pytest.mark.parametrize("pattern,path,expected", [
+        ("*.log", "a/b/x.log", True),
+        ("*.log", "a/b/x.md", False),
+        ("/build", "build/x.md", True),
+        ("/build", "src/build/x.md", False),
+        ("build/", "src/build/x.md", True),
+        ("build/", "src/build", False),
+        ("docs/*.md", "docs/a.md", True),
+        ("docs/*.md", "docs/sub/a.md", False),
+        ("docs/**/*.md", "docs/sub/deep/a.md", True),
+        ("**/drafts", "x/drafts/a.md", True),
+        ("p[0-2].md", "p1.md", True),
+        ("p[!0-2].md", "p1.md", False),
+        ("# comment", "# comment", False),
+    ])
+    def test_patterns(self, tmp_path, pattern, path, expected):
+        assert self._rules(tmp_path, pattern).ignored(tmp_path / path) is expected
+
+    def test_negation_last_match_wins(self, tmp_path):
+        rules = self._rules(tmp_path, "*.md", "!keep.md")
+        assert rules.ignored(tmp_path / "drop.md")
+        assert not rules.ignored(tmp_path / "keep.md")
+
+    def test_ignored_dir_cannot_be_reincluded(self, tmp_path):
+        rules = self._rules(tmp_path, "out/", "!out/keep.md")
+        assert rules.ignored(tmp_path / "out" / "keep.md")
+
+    def test_gitignore_files(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / ".gitignore").write_text("local.md\n")
+        rules = self._rules(tmp_path, gitignore="# generated\n/gen/\n")
+        assert rules.ignored(tmp_path / "gen" / "a.md")
+        assert rules.ignored(tmp_path / "sub" / "local.md")
+        assert not rules.ignored(tmp_path / "local.md")
+
+    def test_git_dir_always_ignored(self, tmp_path):
+        assert self._rules(tmp_path).ignored(tmp_path / ".git" / "HEAD")
+
+
+class TestLoadDir:
+    def test_loads_and_batches(self, tree, monkeypatch):
+        monkeypatch.setattr("mcp_server.loader.LOAD_BATCH", 2)
+        store = MagicMock()
+
+        stats = _run(load_dir(tree, "docs/**/*.md", store))
+
+        assert stats["loaded"] == 6
+        assert stats["chunks"] == 6
+        assert 1 < stats["batches"] < 6
+        assert _titles(store) == sorted(["README.md"] + [f"p{i}.md" for i in range(5)])
+        from mcp_server import fetcher
+        copy = fetcher.DOCS_BASE / "local" / "docs" / "guide" / "p0.md"
+        assert copy.read_text() == "# Page 0\n\nBody 0.\n"
+        assert fetcher.read_meta(copy)["source_mtime"] > 0
+
+    def test_unchanged_files_skipped_without_reading(self, tree, monkeypatch):
+        store = MagicMock()
+        _run(load_dir(tree, "docs/**/*.md", store))
+        store.reset_mock()
+
+        reads = []
+        from mcp_server import fetcher
+        real = fetcher.read_doc
+        monkeypatch.setattr(fetcher, "read_doc", lambda p: reads.append(p) or real(p))
+
+        stats = _run(load_dir(tree, "docs/**/*.md", store))
+
+        assert stats["unchanged"] == 6
+        assert stats["loaded"] == 0
+        assert reads == []
+        store.ingest_many.assert_not_called()
+
+    def test_touched_and_changed_files(self, tree):
+        store = MagicMock()
+        _run(load_dir(tree, "docs/**/*.md", store))
+        store.reset_mock()
+
+        touched = tree / "docs" / "guide" / "p1.md"
+        st = touched.stat()
+        os.utime(touched, (st.st_atime, st.st_mtime + 10))
+        changed = tree / "docs" / "guide" / "p2.md"
+        changed.write_text("# Page 2\n\nRewritten.\n")
+        os.utime(changed, (st.st_atime, st.st_mtime + 20))
+
+        stats = _run(load_dir(tree, "docs/**/*.md", store))
+
+        assert stats["loaded"] == 1
+        assert stats["unchanged"] == 5
+        assert _titles(store) == ["p2.md"]
+        # The touched file's new mtime was recorded: next run doesn't hash it
+        assert _run(load_dir(tree, "docs/**/*.md", store))["unchanged"] == 6
+
+    def test_force_reloads(self, tree):
+        store = MagicMock()
+        _run(load_dir(tree, "docs/**/*.md", store))
+        assert _run(load_dir(tree, "docs/**/*.md", store, force=True))["loaded"] == 6
+
+    def test_ignore_patterns_and_gitignore(self, tree):
+        (tree / ".gitignore").write_text("README.md\n")
+        store = MagicMock()
+
+        stats = _run(load_dir(tree, "docs/**/*.md", store, ignore=["p[0-2].md"]))
+
+        assert stats["matched"] == 6
+        assert stats["ignored"] == 4
+        assert _titles(store) == ["p3.md", "p4.md"]
+
+    def test_failed_ingest_retried_next_load(self, tree):
+        store = MagicMock()
+        store.ingest_many.side_effect = RuntimeError("store down")
+
+        stats = _run(load_dir(tree, "docs/**/*.md", store))
+        assert stats["loaded"] == 0
+        assert len(stats["errors"]) == 6
+
+        store.ingest_many.side_effect = None
+        assert _run(load_dir(tree, "docs/**/*.md", store))["loaded"] == 6
+
+    def test_long_file_chunked(self, tree):
+        big = tree / "docs" / "big.md"
+        big.write_text("".join(f"## Section {i}\n\n{'word ' * 400}\n\n" for i in range(10)))
+        store = MagicMock()
+
+        _run(load_dir(tree, "docs/big.md", store))
+
+        docs = store.ingest_many.call_args.args[0]
+        assert len(docs) > 1
+        assert [d["metadata"]["chunk"] for d in docs] == list(range(len(docs)))
+
+    def test_cache_dir_not_reloaded(self, tree, monkeypatch):
+        monkeypatch.setattr("mcp_server.fetcher.DOCS_BASE", tree / ".claude" / "docs")
+        store = MagicMock()
+        _run(load_dir(tree, "**/*.md", store))
+        stats = _run(load_dir(tree, "**/*.md", store))
+        assert stats["matched"] == 6 + 6
+        assert stats["ignored"] == 6
+        assert stats["unchanged"] == 6
@@ -0,0 +1,273 @@
+"""Tests for the staged ingest pipeline.
+
+HTTP and the knowledge store are mocked; raw docs land in a tmp docs base.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from mcp_server.pipeline import IngestPipeline, chunk_markdown, format_stats
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _mock_response(text: str, status_code: int = 200) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.text = text
+    resp.headers = {}
+    resp.history = []
+    resp.raise_for_status = MagicMock()
+    if status_code >= 400:
+        resp.raise_for_status.side_effect = httpx.HTTPStatusError(
+            f"HTTP {status_code}", request=MagicMock(), response=resp
+        )
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path, monkeypatch):
+    from mcp_server.canonical import reset_aliases
+    from mcp_server.catalog import close_catalogs
+    from mcp_server.dedup import close_near_dup_indexes
+    from mcp_server.ratelimit import reset_limiters
+
+    monkeypatch.setattr("mcp_server.fetcher.DOCS_BASE", tmp_path / "docs")
+    reset_limiters()
+    reset_aliases()
+    yield
+    close_catalogs()
+    close_near_dup_indexes()
+    reset_limiters()
+    reset_aliases()
+
+
+def _client(pages: dict[str, str] | None = None, missing: tuple[str, ...] = ()) -> AsyncMock:
+    async def fake_get(url, **kwargs):
+        if "markdown.new" in url:
+            raise httpx.ConnectError("unreachable")
+        if any(url.endswith(m) for m in missing):
+            return _mock_response("", 404)
+        body = (pages or {}).get(url, f"# {url}\n\nBody of {url}.")
+        return _mock_response(body)
+
+    client = AsyncMock()
+    client.get = fake_get
+    return client
+
+
+def _store() -> MagicMock:
+    store = MagicMock()
+    store.embed_texts.side_effect = lambda texts: [[float(len(t))] for t in texts]
+    return store
+
+
+URLS = [f"https://docs.pipe.com/p{i}" for i in range(10)]
+
+
+class TestChunkMarkdown:
+    def test_short_page_single_chunk(self):
+        assert chunk_markdown("# A\n\nbody") == ["# A\n\nbody"]
+
+    def test_splits_at_headings_and_merges_small_sections(self):
+        text = "".join(f"## S{i}\n\n{'x' * 30}\n\n" for i in range(10))
+        chunks = chunk_markdown(text, max_chars=100)
+        assert all(len(c) <= 100 for c in chunks)
+        assert all(c.startswith("## S") for c in chunks)
+        assert "".join(chunks) == text
+
+    def test_long_section_split_by_paragraph(self):
+        text = "# Big\n\n" + "\n\n".join("p" * 40 for _ in range(10))
+        chunks = chunk_markdown(text, max_chars=100)
+        assert len(chunks) > 1
+        assert all(len(c) <= 100 for c in chunks)
+
+    def test_comment_in_fence_is_not_a_heading(self):
+        code = "```python\n" + "".join(f"# step {i}\nx{i} = {i}\n" for i in range(8)) + "```\n"
+        text = "# Intro\n\n" + "y" * 60 + "\n\n" + code
+        chunks = chunk_markdown(text, max_chars=len(code) + 10)
+        (fenced,) = [c for c in chunks if "```python" in c]
+        assert fenced.count("```") == 2 and "# step 7" in fenced
+
+    def test_blank_lines_in_fence_are_not_paragraph_breaks(self):
+        code = "```\n" + "\n\n".join(f"line{i}" for i in range(5)) + "\n```"
+        text = "# Big\n\n" + "p" * 40 + "\n\n" + code + "\n\n" + "q" * 40
+        chunks = chunk_markdown(text, max_chars=len(code) + 30)
+        assert any(code in c for c in chunks)
+
+    def test_merged_pieces_keep_a_line_break(self):
+        text = "# Big\n\n" + "p" * 40 + "\n\n" + "q" * 60
+        chunks = chunk_markdown(text, max_chars=46)
+        assert chunks[0] == "# Big\n" + "p" * 40
+
+
+class TestIngestPipeline:
+    def test_ingests_every_page(self):
+        store = _store()
+        written = []
+        pipeline = IngestPipeline(_client(), store, force=True)
+
+        result = _run(pipeline.run(URLS, on_written=written.append))
+
+        assert result["fetched"] == 10
+        assert result["written"] == 10
+        assert sorted(written) == sorted(URLS)
+        titles = [d["title"] for c in store.put_embedded.call_args_list for d in c.args[0]]
+        assert sorted(titles) == sorted(URLS)
+        assert all(c.kwargs["commit"] is False for c in store.put_embedded.call_args_list)
+
+    def test_embeds_in_batches_and_groups_commits(self):
+        store = _store()
+        pipeline = IngestPipeline(_client(), store, force=True,
+                                  embed_batch=4, commit_every=8, commit_interval=60)
+
+        _run(pipeline.run(URLS))
+
+        sizes = [len(c.args[0]) for c in store.embed_texts.call_args_list]
+        assert sum(sizes) == 10
+        assert max(sizes) > 1
+        assert store.commit.call_count < 10
+        stats = pipeline.stats()
+        assert stats["commits"] == store.commit.call_count
+        assert stats["batches"] == len(sizes)
+
+    def test_vectors_handed_to_write(self):
+        store = _store()
+        _run(IngestPipeline(_client(), store, force=True).run(URLS[:1]))
+        docs, vectors = store.put_embedded.call_args.args
+        assert vectors == [[float(len(docs[0]["text"]))]]
+
+    def test_failed_pages_reported_not_written(self):
+        store = _store()
+        fetched = {}
+        written = []
+        pipeline = IngestPipeline(_client(missing=("/p3",)), store, force=True)
+
+        result = _run(pipeline.run(URLS[:5], on_fetched=fetched.__setitem__,
+                                   on_written=written.append))
+
+        assert result["failed"] == 1
+        assert fetched["https://docs.pipe.com/p3"]["error"].startswith("HTTP 404")
+        assert "https://docs.pipe.com/p3" not in written
+        assert len(written) == 4
+
+    def test_write_failure_not_acked(self):
+        store = _store()
+        store.put_embedded.side_effect = RuntimeError("disk full")
+        written = []
+
+        result = _run(IngestPipeline(_client(), store, force=True)
+                      .run(URLS[:3], on_written=written.append))
+
+        assert result["fetched"] == 3
+        assert written == []
+        assert result["pipeline"]["stages"]["write"]["failed"] == 3
+
+    def test_embed_failure_falls_back_to_write(self):
+        store = _store()
+        store.embed_texts.side_effect = RuntimeError("model missing")
+
+        result = _run(IngestPipeline(_client(), store, force=True).run(URLS[:2]))
+
+        assert result["written"] == 2
+        assert all(c.args[1] is None for c in store.put_embedded.call_args_list)
+
+    def test_replay_skips_fetch(self):
+        store = _store()
+        client = _client()
+        client.get = AsyncMock(side_effect=AssertionError("should not fetch"))
+        written = []
+        replay = [("https://docs.pipe.com/cached",
+                   {"content": "# Cached", "meta": {}, "error": None})]
+
+        _run(IngestPipeline(client, store).run([], replay=replay, on_written=written.append))
+
+        assert written == ["https://docs.pipe.com/cached"]
+
+    def test_bounded_queues(self):
+        """A slow writer backs up the queues only up to their bound."""
+        store = _store()
+        gate = threading.Event()
+
+        def slow_put(*args, **kwargs):
+            gate.wait(0.02)
+
+        store.put_embedded.side_effect = slow_put
+        pipeline = IngestPipeline(_client(), store, force=True, queue_size=2, embed_batch=1)
+
+        result = _run(pipeline.run(URLS))
+
+        assert result["written"] == 10
+        for name, st in result["pipeline"]["stages"].items():
+            assert st["max_queue_depth"] <= 2, name
+
+    def test_stats_shape(self):
+        pipeline = IngestPipeline(_client(), _store(), force=True, convert_workers=3)
+        result = _run(pipeline.run(URLS[:2]))
+        stages = result["pipeline"]["stages"]
+        assert list(stages) == ["fetch", "convert", "chunk", "embed", "write"]
+        assert stages["convert"]["workers"] == 3
+        assert stages["fetch"]["processed"] == 2
+        assert stages["write"]["processed"] == 2
+        assert all(st["queue_depth"] == 0 for st in stages.values())
+        assert len(format_stats(result["pipeline"])) == 6
+
+
+GUIDE = ("# Guide\n\n" + " ".join(
+    f"The router matches request {i} against each registered path pattern in order."
+    for i in range(12)))
+
+
+class TestNearDuplicates:
+    def _pages(self) -> dict[str, str]:
+        return {
+            "https://docs.pipe.com/v1/guide": GUIDE,
+            "https://docs.pipe.com/v2/guide": GUIDE.replace("order.", "order!", 1),
+            "https://docs.pipe.com/other": "# Other\n\n" + " ".join(
+                f"Unrelated text about caching entry {i} and eviction." for i in range(12)),
+        }
+
+    def test_copies_skipped_and_counted(self):
+        store = _store()
+        pages = self._pages()
+        written = []
+        pipeline = IngestPipeline(_client(pages), store, force=True)
+
+        urls = list(pages)
+        result = _run(pipeline.run(urls[:1], on_written=written.append))
+        result = _run(pipeline.run(urls[1:], on_written=written.append))
+
+        titles = [d["title"] for c in store.put_embedded.call_args_list for d in c.args[0]]
+        assert sorted(titles) == ["https://docs.pipe.com/other", "https://docs.pipe.com/v1/guide"]
+        # The skipped page still counts as written, so its crawl is acked
+        assert sorted(written) == sorted(urls)
+        dups = result["pipeline"]["near_duplicates"]
+        assert dups["chunks"] == 1 and dups["pages"] == 1 and dups["bytes"] > 0
+        assert any("near-duplicates skipped: 1 chunks" in line
+                   for line in format_stats(result["pipeline"]))
+
+    def test_disabled(self):
+        store = _store()
+        pages = self._pages()
+        _run(IngestPipeline(_client(pages), store, force=True, near_dup=False).run(list(pages)))
+        assert sum(len(c.args[0]) for c in store.put_embedded.call_args_list) == 3
+
+    def test_failed_write_does_not_become_canonical(self):
+        from mcp_server import fetcher
+        from mcp_server.dedup import get_near_dup_index, store_key
+
+        store = _store()
+        store.put_embedded.side_effect = RuntimeError("disk full")
+        pages = self._pages()
+        _run(IngestPipeline(_client(pages), store, force=True).run(list(pages)[:1]))
+
+        counts = get_near_dup_index(fetcher.DOCS_BASE).counts(store_key(store))
+        assert counts == {"signatures": 0, "links": 0}
@@ -0,0 +1,154 @@
+"""Tests for per-host adaptive rate limiting."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from mcp_server import ratelimit
+from mcp_server.ratelimit import (
+    BREAKER_THRESHOLD,
+    INITIAL_CONCURRENCY,
+    MAX_CONCURRENCY,
+    HostLimiter,
+    HostPaused,
+    get_limiter,
+    parse_retry_after,
+    reset_limiters,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_limiters():
+    reset_limiters()
+    yield
+    reset_limiters()
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("120") == 120.0
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=60)
+        assert 55 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 60
+
+    def test_past_date_is_zero(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_clamped(self):
+        assert parse_retry_after("999999") == ratelimit.MAX_RETRY_AFTER
+
+    @pytest.mark.parametrize("value", [None, "", "soon"])
+    def test_invalid(self, value):
+        assert parse_retry_after(value) is None
+
+
+class TestAimd:
+    def test_additive_increase_capped(self):
+        lim = HostLimiter("h")
+        lim.record_success()
+        assert lim.limit == pytest.approx(INITIAL_CONCURRENCY + 1 / INITIAL_CONCURRENCY)
+        for _ in range(500):
+            lim.record_success()
+        assert lim.limit == MAX_CONCURRENCY
+
+    def test_throttle_halves_and_pauses(self):
+        lim = HostLimiter("h")
+        lim.limit = 8.0
+        lim.record_response(429, "3")
+        assert lim.limit == 4.0
+        assert 2.5 < lim.paused_for() <= 3.0
+
+    def test_throttle_without_retry_after_backs_off(self):
+        lim = HostLimiter("h")
+        lim.record_throttle()
+        first = lim.paused_for()
+        lim.paused_until = 0.0
+        lim.record_throttle()
+        assert lim.paused_for() > first
+
+    def test_client_errors_count_as_success(self):
+        lim = HostLimiter("h")
+        lim.failures = 3
+        lim.record_response(404)
+        assert lim.failures == 0
+
+
+class TestBreaker:
+    def test_opens_after_threshold(self):
+        lim = HostLimiter("h")
+        for _ in range(BREAKER_THRESHOLD - 1):
+            lim.record_response(500)
+        assert not lim.breaker_open
+        lim.record_failure()
+        assert lim.breaker_open
+        assert lim.paused_for() > 0
+        assert lim.capacity == 1
+
+    def test_half_open_failure_doubles_cooldown(self):
+        lim = HostLimiter("h")
+        for _ in range(BREAKER_THRESHOLD):
+            lim.record_failure()
+        lim.paused_until = 0.0
+        lim.record_failure()
+        assert lim.cooldown == ratelimit.BREAKER_COOLDOWN * 2
+
+    def test_success_closes(self):
+        lim = HostLimiter("h")
+        for _ in range(BREAKER_THRESHOLD):
+            lim.record_failure()
+        lim.paused_until = 0.0
+        lim.record_success()
+        assert not lim.breaker_open
+        assert lim.capacity >= 1
+
+
+class TestAcquire:
+    def test_caps_concurrency(self):
+        lim = HostLimiter("h")
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            async with lim.slot():
+                peak = max(peak, lim.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(*(job() for _ in range(10)))
+
+        _run(main())
+        assert peak == int(INITIAL_CONCURRENCY)
+        assert lim.in_flight == 0
+
+    def test_short_pause_waited_out(self):
+        lim = HostLimiter("h")
+        lim.record_throttle(0.05)
+        _run(lim.acquire())
+        assert lim.in_flight == 1
+
+    def test_long_pause_raises(self):
+        lim = HostLimiter("h")
+        lim.record_throttle(100)
+        with pytest.raises(HostPaused) as exc:
+            _run(lim.acquire(max_wait=1))
+        assert exc.value.retry_after > 99
+
+    def test_open_breaker_raises_immediately(self):
+        lim = HostLimiter("h")
+        for _ in range(BREAKER_THRESHOLD):
+            lim.record_failure()
+        with pytest.raises(HostPaused):
+            _run(lim.acquire(max_wait=10_000))
+
+    def test_registry_shared(self):
+        assert get_limiter("a.example.com") is get_limiter("a.example.com")
+        assert get_limiter("a.example.com") is not get_limiter("b.example.com")
@@ -0,0 +1,616 @@
+"""Tests for the sandbox kernel supervisor (sandbox/repl.py).
+
+These start real worker processes, so they need IPython and dill (the
+sandbox requirements) but not Docker.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("IPython")
+pytest.importorskip("dill")
+
+from sandbox import repl  # noqa: E402
+from sandbox.repl import Kernel, KernelRestarted  # noqa: E402
+
+# Ignores KeyboardInterrupt, so only a kill stops it
+STUBBORN = """
+import time
+while True:
+    try:
+        time.sleep(10)
+    except KeyboardInterrupt:
+        pass
+"""
+
+
+@pytest.fixture
+def kernel(monkeypatch):
+    monkeypatch.setattr(repl, "INTERRUPT_GRACE", 0.5)
+    k = Kernel()
+    yield k
+    k.close()
+
+
+class TestExecute:
+    def test_state_persists(self, kernel):
+        assert kernel.execute("y = 99")["stderr"] == ""
+        result = kernel.execute("z = y + 1\nz")
+        assert result["output"].endswith("100")
+        assert {"y", "z"} <= set(result["vars"])
+        assert kernel.get_var("z") == {"value": 100}
+
+    def test_error_reported(self, kernel):
+        assert "ZeroDivisionError" in kernel.execute("1 / 0")["stderr"]
+
+    def test_timeout_interrupts_cell(self, kernel):
+        kernel.execute("x = 1")
+        result = kernel.execute("import time; time.sleep(30)", timeout=1)
+        assert "timed out after 1s (interrupted)" in result["stderr"]
+        assert kernel.restarts == 0
+        assert kernel.get_var("x") == {"value": 1}
+
+    def test_stubborn_cell_killed_and_restored(self, kernel):
+        kernel.execute("data = [1, 2]\ndata.append(3)")
+        result = kernel.execute(STUBBORN, timeout=1)
+        assert "kernel restarted from the last checkpoint" in result["stderr"]
+        assert kernel.restarts == 1
+        # In-place mutations made before the checkpoint survive
+        assert kernel.get_var("data") == {"value": [1, 2, 3]}
+        assert kernel.execute("len(data)")["output"].endswith("3")
+
+    def test_checkpoint_not_timed_with_cell(self, kernel):
+        kernel.execute("import time\n"
+                       "class Slow:\n"
+                       "    def __reduce__(self):\n"
+                       "        time.sleep(1.5)\n"
+                       "        return (Slow, ())\n"
+                       "slow = Slow()")
+        began = time.monotonic()
+        result = kernel.execute("y = 2", timeout=1)
+        assert "timed out" not in result["stderr"]
+        assert kernel.restarts == 0
+        assert time.monotonic() - began < 2.5
+        assert "slow" in kernel.manifest()["vars"]
+
+    def test_death_while_checkpointing_reported(self, kernel):
+        kernel.execute("a = 1")
+        kernel.execute("import os\n"
+                       "class Fatal:\n"
+                       "    def __reduce__(self):\n"
+                       "        os._exit(1)\n"
+                       "b = Fatal()")
+        result = kernel.execute("c = 3")
+        assert "Kernel died while checkpointing" in result["stderr"]
+        assert kernel.get_var("a") == {"value": 1}
+        assert kernel.get_var("b") == {"error": "not found"}
+
+    def test_worker_crash_restarts(self, kernel):
+        kernel.execute("keep = 'yes'")
+        result = kernel.execute("import os; os._exit(1)")
+        assert "Kernel died" in result["stderr"]
+        assert kernel.get_var("keep") == {"value": "yes"}
+
+    def test_deleted_and_unpicklable_not_restored(self, kernel):
+        kernel.execute("gone = 1\ndel gone\ngen = (i for i in range(3))")
+        kernel.execute("import os; os._exit(1)")
+        assert kernel.get_var("gone") == {"error": "not found"}
+        assert kernel.get_var("gen") == {"error": "not found"}
+
+    def test_reset_clears_checkpoint(self, kernel):
+        kernel.execute("a = 1")
+        kernel.reset()
+        kernel.execute("import os; os._exit(1)")
+        assert kernel.get_var("a") == {"error": "not found"}
+
+
+class TestCheckpoint:
+    @staticmethod
+    def _digests(kernel):
+        return kernel.manifest()["vars"]
+
+    def test_unchanged_blobs_not_sent_again(self, kernel):
+        kernel.execute("big = list(range(100_000))")
+        self._digests(kernel)
+        blob = kernel._checkpoint["big"]
+        kernel.execute("x = 1")
+        self._digests(kernel)
+        assert kernel._checkpoint["big"] is blob
+
+    def test_mutation_tracked(self, kernel):
+        kernel.execute("data = [1]\nalias = data\ndef grow(): data.append(2)")
+        before = self._digests(kernel)["data"]
+        kernel.execute("grow()")
+        after_call = self._digests(kernel)["data"]
+        kernel.execute("alias.append(3)")
+        digests = self._digests(kernel)
+        assert len({before, after_call, digests["data"]}) == 3
+        assert digests["alias"] == digests["data"]
+        kernel._restart("test")
+        assert kernel.get_var("data") == {"value": [1, 2, 3]}
+
+    def test_unchanged_checkpoint_keeps_generation(self, kernel):
+        kernel.execute("data = {'k': 1}")
+        generation = kernel.manifest()["generation"]
+        kernel.execute("print(data)")
+        kernel.checkpoint()
+        assert kernel.manifest()["generation"] == generation
+
+    def test_change_through_another_name(self, kernel):
+        kernel.execute("a = [1]\nb = {'k': a}")
+        self._digests(kernel)
+        kernel.execute("b['k'].append(2)")
+        self._digests(kernel)
+        kernel._restart("test")
+        assert kernel.get_var("a") == {"value": [1, 2]}
+        assert kernel.get_var("b") == {"value": {"k": [1, 2]}}
+
+    def test_recreated_after_reset_checkpointed(self, kernel):
+        kernel.execute("a = [1]")
+        kernel.reset()
+        kernel.execute("a = [1]")
+        assert "a" in self._digests(kernel)
+
+    def test_class_and_function_attributes_checkpointed(self, kernel):
+        kernel.execute("class C:\n    items = []\n    x = None\n"
+                       "def f(): pass\nf.cache = {}")
+        kernel.manifest()
+        kernel.execute("C.items.append(5); C.x = 9; f.cache['z'] = 1")
+        kernel.manifest()
+        kernel._restart("test")
+        result = kernel.execute("print(C.items, C.x, f.cache)")
+        assert result["output"] == "[5] 9 {'z': 1}\n"
+
+    def test_oversized_value_spilled_to_disk(self, kernel):
+        kernel.execute("import sandbox.repl as r\nr.CHECKPOINT_MAX_VAR_BYTES = 1000")
+        kernel.execute("blob = bytes(range(256)) * 40")
+        manifest = kernel.manifest()
+        assert "blob" in manifest["vars"] and "blob" not in manifest["skipped"]
+        spilled = kernel._checkpoint["blob"]
+        assert isinstance(spilled, repl._Spilled) and spilled.size > 1000
+        data = kernel.blobs([manifest["vars"]["blob"]])[manifest["vars"]["blob"]]
+        assert bytes(data) == open(spilled.path, "rb").read()
+        kernel._restart("test")
+        assert kernel.execute("blob == bytes(range(256)) * 40")["output"].endswith("True")
+        kernel.reset()
+        assert not os.path.exists(spilled.path)
+
+
+class TestStreaming:
+    def test_output_streams_before_cell_ends(self, kernel):
+        chunks = []
+        seen_at = []
+
+        def on_output(stream, text):
+            chunks.append((stream, text))
+            seen_at.append(time.monotonic())
+
+        start = time.monotonic()
+        result = kernel.execute("import time\nprint('first')\ntime.sleep(1)\nprint('second')",
+                                on_output=on_output)
+        assert result["output"] == "first\nsecond\n"
+        assert "".join(t for s, t in chunks if s == "stdout") == "first\nsecond\n"
+        # The first line arrived well before the cell finished
+        assert seen_at[0] - start < 0.8
+
+    def test_stderr_streamed(self, kernel):
+        chunks = []
+        kernel.execute("import sys; sys.stderr.write('warn')",
+                       on_output=lambda s, t: chunks.append((s, t)))
+        assert ("stderr", "warn") in chunks
+
+    def test_output_kept_when_worker_killed(self, kernel):
+        result = kernel.execute("print('before', flush=True)\n" + STUBBORN, timeout=1)
+        assert result["output"] == "before\n"
+        assert "kernel restarted" in result["stderr"]
+
+    def test_long_output_capped_and_spilled(self, kernel, monkeypatch):
+        monkeypatch.setattr(repl, "OUTPUT_CAP", 100)
+        result = kernel.execute("for i in range(50): print(f'line {i:03d}')")
+        assert result["truncated"]
+        assert len(result["output"]) == 100
+        page = repl.read_output(result["output_id"], "stdout", offset=90, limit=20)
+        full = "".join(f"line {i:03d}\n" for i in range(50))
+        assert page["text"] == full[90:110]
+        assert page["total"] == len(full) and page["more"]
+        assert repl.read_output(result["output_id"], "stderr")["text"] == ""
+
+    def test_short_output_not_spilled(self, kernel):
+        result = kernel.execute("print('hi')")
+        assert not result["truncated"] and result["output_id"] is None
+
+    def test_old_spills_removed(self, kernel, monkeypatch):
+        monkeypatch.setattr(repl, "OUTPUT_CAP", 10)
+        monkeypatch.setattr(repl, "SPILL_KEEP", 2)
+        ids = [kernel.execute("print('x' * 50)")["output_id"] for _ in range(3)]
+        with pytest.raises(KeyError):
+            repl.read_output(ids[0])
+        assert repl.read_output(ids[2])["total"] == 51
+        kernel.discard_output()
+        with pytest.raises(KeyError):
+            repl.read_output(ids[2])
+
+    def test_bad_output_id(self):
+        with pytest.raises(ValueError):
+            repl.read_output("../etc/passwd")
+
+
+class TestBindFile:
+    def test_modes(self, kernel, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("héllo\n" * 1000)
+        text = kernel.bind_file("t", str(path))
+        assert text["type"] == "str" and text["length"] == 6000
+        assert text["size"] == path.stat().st_size
+        assert kernel.bind_file("b", str(path), "bytes")["type"] == "bytes"
+        assert kernel.bind_file("m", str(path), "mmap")["type"] == "mmap"
+        assert kernel.execute("print(t[:5], b[:2], m[:2])")["output"] == "héllo b'h\\xc3' b'h\\xc3'\n"
+
+    def test_errors(self, kernel, tmp_path):
+        path = tmp_path / "bin"
+        path.write_bytes(b"\xff\xfe")
+        assert "UnicodeDecodeError" in kernel.bind_file("x", str(path))["error"]
+        assert "FileNotFoundError" in kernel.bind_file("x", str(tmp_path / "nope"))["error"]
+        assert "mode" in kernel.bind_file("x", str(path), "json")["error"]
+        assert "invalid variable" in kernel.bind_file("1x", str(path))["error"]
+
+    def test_rebound_after_restart(self, kernel, tmp_path):
+        path = tmp_path / "data.bin"
+        path.write_bytes(b"abc" * 100)
+        kernel.bind_file("m", str(path), "mmap")
+        kernel.execute("import os; os._exit(1)")
+        assert kernel.execute("print(type(m).__name__, m[:3])")["output"] == "mmap b'abc'\n"
+
+    def test_rebinding_name_drops_file(self, kernel, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("old")
+        kernel.bind_file("t", str(path))
+        kernel.execute("t = 'new'")
+        path.write_text("changed")
+        kernel.execute("import os; os._exit(1)")
+        assert kernel.get_var("t") == {"value": "new"}
+
+
+class TestVars:
+    def test_get_vars(self, kernel):
+        kernel.execute("x = 42")
+        entry = next(v for v in kernel.get_vars() if v["name"] == "x")
+        assert entry == {"name": "x", "type": "int", "summary": "42"}
+
+    def test_summaries_bounded(self, kernel):
+        kernel.execute("s = 'x' * 10_000_000\nbig = list(range(100_000))")
+        summaries = {v["name"]: v["summary"] for v in kernel.get_vars()}
+        assert len(summaries["s"]) < 120 and summaries["s"].endswith("(len=10000000)")
+        assert summaries["big"] == "[0, 1, 2, 3, 4, 5, ...] (len=100000)"
+
+    def test_summaries_cached_until_code_runs(self, kernel):
+        kernel.execute(
+            "class Counted:\n"
+            "    calls = 0\n"
+            "    def __repr__(self):\n"
+            "        Counted.calls += 1\n"
+            "        return f'Counted({Counted.calls})'\n"
+            "c = Counted()")
+        summary = lambda: next(v["summary"] for v in kernel.get_vars() if v["name"] == "c")
+        assert summary() == "Counted(1)"
+        assert summary() == "Counted(1)"
+        kernel.execute("pass")
+        assert summary() == "Counted(2)"
+
+    def test_request_to_dead_worker_raises_then_recovers(self, kernel):
+        kernel.execute("v = 5")
+        kernel.manifest()
+        kernel._proc.kill()
+        kernel._proc.join()
+        with pytest.raises(KernelRestarted):
+            kernel.get_vars()
+        assert kernel.get_var("v") == {"value": 5}
+
+
+class _Key:
+    """Sortable, but counts comparisons and reprs."""
+
+    compared = shown = 0
+
+    def __lt__(self, other):
+        _Key.compared += 1
+        return id(self) < id(other)
+
+    def __repr__(self):
+        _Key.shown += 1
+        return "K"
+
+
+class _CountingSet(set):
+    yielded = 0
+
+    def __iter__(self):
+        for item in super().__iter__():
+            _CountingSet.yielded += 1
+            yield item
+
+
+class TestSummarize:
+    def test_sets_and_dicts_not_sorted_or_walked(self, monkeypatch):
+        monkeypatch.setattr(_Key, "compared", 0)
+        keys = [_Key() for _ in range(10_000)]
+        for value in (set(keys), frozenset(keys), dict.fromkeys(keys)):
+            assert repl.summarize(value).endswith("(len=10000)")
+        assert _Key.compared == 0
+
+        monkeypatch.setattr(_CountingSet, "yielded", 0)
+        assert repl.summarize(_CountingSet(range(10_000))).endswith("(len=10000)")
+        assert _CountingSet.yielded <= repl._summary_repr.maxset + 1
+
+    def test_library_reprs_not_called(self, monkeypatch):
+        monkeypatch.setattr(_Key, "shown", 0)
+        assert repl.summarize(_Key()) == f"<{__name__}._Key object>"
+        assert _Key.shown == 0
+
+    def test_known_types(self):
+        import collections
+        import dataclasses
+        import decimal
+
+        @dataclasses.dataclass
+        class Row:
+            items: list
+
+        assert repl.summarize(Row(list(range(1000)))) == "Row(items=[0, 1, 2, 3, 4, 5, ...])"
+        assert repl.summarize(collections.Counter("aab")) == "Counter({'a': 2, 'b': 1})"
+        assert repl.summarize(decimal.Decimal("1.5")) == "Decimal('1.5')"
+
+
+class TestGetVarPaging:
+    def test_small_values_unchanged(self, kernel):
+        kernel.execute("d = {'a': [1, 2]}; n = float('nan')")
+        assert kernel.get_var("d") == {"value": {"a": [1, 2]}}
+        assert kernel.get_var("n") == {"value": None}
+
+    def test_list_pages(self, kernel):
+        kernel.execute("big = list(range(2500))")
+        first = kernel.get_var("big")
+        assert first["value"] == list(range(repl.VAR_PAGE_SIZE))
+        assert first["next_offset"] == repl.VAR_PAGE_SIZE and first["length"] == 2500
+        last = kernel.get_var("big", offset=2400)
+        assert last["value"] == list(range(2400, 2500)) and last["next_offset"] is None
+
+    def test_page_shrinks_to_max_bytes(self, kernel):
+        kernel.execute("rows = ['x' * 98] * 50")
+        result = kernel.get_var("rows", max_bytes=1000)
+        assert 0 < len(result["value"]) < 10
+        assert result["next_offset"] == len(result["value"])
+
+    def test_string_by_characters(self, kernel):
+        kernel.execute("s = 'abcdefghij'")
+        assert kernel.get_var("s", offset=2, limit=3) == {
+            "value": "cde", "length": 10, "offset": 2, "next_offset": 5}
+
+    def test_oversized_item_truncated(self, kernel):
+        kernel.execute("one = ['y' * 5000]")
+        result = kernel.get_var("one", max_bytes=100)
+        assert result["truncated"] and len(result["value"]) == 100
+
+    def test_dict_columns(self, kernel):
+        kernel.execute("cfg = {'a': 1, 'b': 2, 'c': 3}")
+        assert kernel.get_var("cfg", columns=["c", "a"]) == {"value": {"c": 3, "a": 1}}
+        kernel.execute("items = [1, 2]")
+        assert "columns apply" in kernel.get_var("items", columns=["a"])["error"]
+        assert "npy encoding" in kernel.get_var("cfg", encoding="npy")["error"]
+
+    def test_raw_encoding(self, kernel):
+        kernel.execute("blob = bytes(range(10))")
+        assert kernel.get_var("blob", offset=2, limit=3, encoding="raw")["data"] == bytes([2, 3, 4])
+        assert kernel.get_var("blob")["value"] == repr(bytes(range(10)))
+
+    def test_bad_encoding(self, kernel):
+        kernel.execute("x = [1]")
+        assert "encoding must be" in kernel.get_var("x", encoding="xml")["error"]
+
+    def test_numpy(self, kernel):
+        pytest.importorskip("numpy")
+        kernel.execute("import numpy as np; arr = np.arange(12).reshape(6, 2)")
+        result = kernel.get_var("arr", offset=4)
+        assert result["preview"] == {"kind": "ndarray", "shape": [6, 2], "dtype": "int64"}
+        assert result["value"] == [[8, 9], [10, 11]]
+        assert kernel.get_var("arr", encoding="npy")["media_type"] == "application/x-npy"
+
+    def test_pandas(self, kernel):
+        pytest.importorskip("pandas")
+        kernel.execute("import pandas as pd; df = pd.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})")
+        result = kernel.get_var("df", offset=1, limit=1, columns=["b"])
+        assert result["value"] == [{"b": "y"}]
+        assert result["preview"]["shape"] == [3, 1]
+
+
+class TestSnapshots:
+    def test_round_trip(self, kernel):
+        kernel.execute("s = {'k': [1, 2]}")
+        snap = kernel.snapshot_save()
+        assert snap["saved"] == ["s"]
+        kernel.reset()
+        assert kernel.snapshot_restore(snap["data"]) == {"restored": ["s"]}
+        assert kernel.get_var("s") == {"value": {"k": [1, 2]}}
+
+    def test_corrupt(self, kernel):
+        result = kernel.snapshot_restore(b"not a pickle")
+        assert result["error"].startswith("corrupt snapshot")
+
+
+class TestLazyLoad:
+    @staticmethod
+    def _blobs(kernel, code):
+        kernel.execute(code)
+        kernel.manifest()  # waits for the checkpoint taken after the cell
+        blobs = dict(kernel._checkpoint)
+        kernel.reset()
+        return blobs
+
+    def test_loaded_on_first_use(self, kernel):
+        blobs = self._blobs(kernel, "a = [1, 2]\nb = 'x'")
+        assert kernel.load_vars(blobs, lazy=True) == {"restored": ["a", "b"], "failed": []}
+        types = {v["name"]: v["type"] for v in kernel.get_vars()}
+        assert types == {"a": "not loaded", "b": "not loaded"}
+        assert kernel.execute("a.append(3)\nlen(a)")["output"].endswith("3")
+        types = {v["name"]: v["type"] for v in kernel.get_vars()}
+        assert types == {"a": "list", "b": "not loaded"}
+
+    def test_get_var_loads(self, kernel):
+        kernel.load_vars(self._blobs(kernel, "d = {'k': 1}"), lazy=True)
+        assert kernel.get_var("d") == {"value": {"k": 1}}
+
+    def test_dynamic_access_loads_all(self, kernel):
+        kernel.load_vars(self._blobs(kernel, "a = 1\nb = 2"), lazy=True)
+        assert kernel.execute("globals()['a'] + globals()['b']")["output"].endswith("3")
+
+    def test_globals_of_named_function_load(self, kernel):
+        blobs = self._blobs(kernel, "data = {'a': [1, 2]}\ndef f(): return len(data['a'])")
+        kernel.load_vars(blobs, lazy=True)
+        result = kernel.execute("f()")
+        assert result["output"].endswith("2") and not result["stderr"]
+
+    def test_globals_reached_through_functions_and_classes(self, kernel):
+        blobs = self._blobs(kernel, (
+            "data = [1, 2, 3]\n"
+            "def total(): return sum(data)\n"
+            "def report(): return total() * 2\n"
+            "class Box:\n"
+            "    def size(self): return len(data)\n"
+            "box = Box()"
+        ))
+        kernel.load_vars(blobs, lazy=True)
+        assert kernel.execute("report()")["output"].endswith("12")
+        kernel.load_vars(blobs, lazy=True)
+        assert kernel.execute("box.size()")["output"].endswith("3")
+
+    def test_unused_vars_survive_checkpoint(self, kernel):
+        blobs = self._blobs(kernel, "keep = list(range(5))")
+        kernel.load_vars(blobs, lazy=True)
+        kernel.execute("other = 1")
+        kernel.manifest()
+        assert kernel._checkpoint["keep"] == blobs["keep"]
+        kernel._restart("test")
+        assert kernel.get_var("keep") == {"value": [0, 1, 2, 3, 4]}
+
+    def test_broken_blob_fails_on_use(self, kernel):
+        kernel.load_vars({"bad": b"not a pickle", "good": self._blobs(kernel, "good = 1")["good"]},
+                         lazy=True)
+        result = kernel.execute("bad")
+        assert "NameError" in result["stderr"]
+        assert "bad" not in kernel.manifest()["vars"]
+        assert kernel.get_var("good") == {"value": 1}
+
+
+class TestKernelPool:
+    @pytest.fixture
+    def pool(self):
+        p = repl.KernelPool(max_kernels=2, idle_timeout=60)
+        yield p
+        p.close()
+
+    def test_sessions_are_isolated(self, pool):
+        pool.get("a").execute("v = 'a'")
+        pool.get("b").execute("v = 'b'")
+        assert pool.get("a").get_var("v") == {"value": "a"}
+        assert pool.get("b").get_var("v") == {"value": "b"}
+        assert pool.get("a")._proc.pid != pool.get("b")._proc.pid
+
+    def test_full_pool_stops_least_recently_used(self, pool):
+        pool.get("a").execute("v = 1")
+        pool.get("b").execute("v = 2")
+        pool.get("c").execute("v = 3")
+        alive = {s["session"]: s["alive"] for s in pool.sessions()}
+        assert alive == {"a": False, "b": True, "c": True}
+        # A stopped session comes back from its checkpoint
+        assert pool.get("a").get_var("v") == {"value": 1}
+
+    def test_busy_pool_exhausted(self, pool):
+        started = threading.Event()
+
+        def run(session):
+            started.set()
+            pool.get(session).execute("import time; time.sleep(1.5)", timeout=5)
+
+        pool.get("a")
+        pool.get("b")
+        threads = [threading.Thread(target=run, args=(s,)) for s in ("a", "b")]
+        for t in threads:
+            t.start()
+        started.wait()
+        time.sleep(0.3)
+        with pytest.raises(repl.PoolExhausted):
+            pool.get("c")
+        for t in threads:
+            t.join()
+        assert pool.get("c").execute("1 + 1")["output"].endswith("2")
+
+    def test_slow_start_does_not_block_pool(self, pool, monkeypatch):
+        pool.get("b")
+        start = repl.Kernel._start
+
+        def slow_start(kernel):
+            if kernel.session == "a":
+                time.sleep(1.0)
+            return start(kernel)
+
+        monkeypatch.setattr(repl.Kernel, "_start", slow_start)
+        t = threading.Thread(target=pool.get, args=("a",))
+        t.start()
+        time.sleep(0.2)
+        began = time.monotonic()
+        pool.evict_idle()
+        pool.get("b")
+        assert time.monotonic() - began < 0.5
+        # The starting session holds its slot
+        assert pool.get("c").alive
+        assert {s["session"]: s["alive"] for s in pool.sessions()}["b"] is False
+        t.join()
+        assert pool.get("a").alive
+
+    def test_get_during_eviction_restarts_worker(self, pool, monkeypatch):
+        pool.max_kernels = 1
+        pool.get("a").execute("v = 1")
+        stop = repl.Kernel.stop
+
+        def slow_stop(kernel):
+            time.sleep(0.5)
+            stop(kernel)
+
+        monkeypatch.setattr(repl.Kernel, "stop", slow_stop)
+        pool.idle_timeout = 0
+        t = threading.Thread(target=pool.evict_idle)
+        t.start()
+        time.sleep(0.2)
+        pool.idle_timeout = 60
+        # Not handed the worker being stopped: its own comes back in its slot
+        kernel = pool.get("a")
+        t.join()
+        assert kernel.alive and kernel.get_var("v") == {"value": 1}
+        pool.get("b")
+        assert [s["session"] for s in pool.sessions() if s["alive"]] == ["b"]
+
+    def test_setup_runs_once_in_new_sessions(self, pool):
+        pool.get("a").execute("v = 1")
+        pool.setup = "runs = globals().get('runs', 0) + 1"
+        kernel = pool.get("b")
+        assert kernel.execute("print(runs)")["output"].strip() == "1"
+        assert pool.get("a").get_var("runs") == {"error": "not found"}
+        # A restarted worker gets it from the checkpoint, not by running it again
+        kernel.stop()
+        assert kernel.execute("print(runs)")["output"].strip() == "1"
+
+    def test_evict_idle(self, pool):
+        pool.get("a").execute("v = 1")
+        pool.idle_timeout = 0
+        assert pool.evict_idle() == ["a"]
+        assert pool.sessions()[0]["alive"] is False
+        assert pool.get("a").get_var("v") == {"value": 1}
+
+    def test_remove(self, pool):
+        pool.get("a").execute("v = 1")
+        assert pool.remove("a")
+        assert not pool.remove("a")
+        assert pool.get("a").get_var("v") == {"error": "not found"}
@@ -0,0 +1,205 @@
+"""Tests for repository archive ingestion (rlm_fetch_repo).
+
+Archives are built in tmp_path as stand-ins for GitHub tarballs; the download
+path uses a mocked streaming client. Raw docs go to a tmp DOCS_BASE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import tarfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from mcp_server import fetcher
+from mcp_server.repo import (
+    extract_docstrings,
+    fetch_repo,
+    iter_archive,
+    parse_repo,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+FILES = {
+    "README.md": "# Lib\n\nIntro.\n",
+    "docs/guide.rst": "Guide\n=====\n\nUse it.\n",
+    "src/lib/core.py": (
+        '"""Core module."""\n\n\ndef run(x, y=1):\n    """Run things."""\n\n\n'
+        'def _hidden():\n    """Private."""\n'
+    ),
+    "src/lib/nodoc.py": "x = 1\n",
+    "node_modules/dep/README.md": "# Dep\n",
+    "setup.cfg": "[metadata]\n",
+}
+
+
+def _archive_bytes(files: dict[str, str] = FILES, top: str = "lib-abc123") -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(f"{top}/{name}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@pytest.fixture()
+def archive(tmp_path) -> Path:
+    path = tmp_path / "lib.tar.gz"
+    path.write_bytes(_archive_bytes())
+    return path
+
+
+@pytest.fixture(autouse=True)
+def _docs_base(tmp_path, monkeypatch):
+    from mcp_server.catalog import close_catalogs
+    from mcp_server.ratelimit import reset_limiters
+    monkeypatch.setattr(fetcher, "DOCS_BASE", tmp_path / "docs")
+    reset_limiters()
+    yield
+    close_catalogs()
+    reset_limiters()
+
+
+class TestParseRepo:
+    def test_forms(self):
+        assert parse_repo("org/lib") == ("org", "lib", None)
+        assert parse_repo("org/lib@v2") == ("org", "lib", "v2")
+        assert parse_repo("https://github.com/org/lib.git") == ("org", "lib", None)
+        assert parse_repo("https://github.com/org/lib/tree/release/1.x") == (
+            "org", "lib", "release/1.x")
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_repo("lib")
+        with pytest.raises(ValueError):
+            parse_repo("https://gitlab.com/org/lib")
+
+
+class TestExtractDocstrings:
+    def test_public_docstrings(self):
+        md = extract_docstrings(FILES["src/lib/core.py"], "src/lib/core.py")
+        assert md.startswith("# src/lib/core.py")
+        assert "Core module." in md
+        assert "## def run(x, y=1)" in md
+        assert "Private" not in md
+
+    def test_methods_and_none(self):
+        src = 'class A:\n    """A doc."""\n    def go(self):\n        """Go."""\n'
+        md = extract_docstrings(src, "a.py")
+        assert "## class A" in md and "## def A.go(self)" in md
+        assert extract_docstrings("x = 1\n", "x.py") is None
+        assert extract_docstrings("def (:\n", "bad.py") is None
+
+
+class TestIterArchive:
+    def test_selection(self, archive):
+        stats: dict = {}
+        with open(archive, "rb") as f:
+            got = dict(iter_archive(f, stats=stats))
+        assert sorted(got) == ["README.md", "docs/guide.rst", "src/lib/core.py"]
+        assert stats["no_docs"] == 1
+        assert "Run things." in got["src/lib/core.py"]
+
+    def test_unsafe_members_skipped(self, tmp_path):
+        files = {"../../../escape.md": "# Out\n", "/abs.md": "# Abs\n", "ok.md": "# Ok\n"}
+        with io.BytesIO(_archive_bytes(files)) as f:
+            got = [p for p, _ in iter_archive(f)]
+        assert got == ["ok.md"]
+
+    def test_links_skipped(self):
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+            info = tarfile.TarInfo("lib-abc123/link.md")
+            info.type, info.linkname = tarfile.SYMTYPE, "/etc/passwd"
+            tar.addfile(info)
+        buf.seek(0)
+        assert list(iter_archive(buf)) == []
+
+    def test_traversal_not_written(self, tmp_path):
+        path = tmp_path / "evil.tar.gz"
+        path.write_bytes(_archive_bytes({"docs/../../../../escape.md": "# Out\n\nText.\n"}))
+        stats = _run(fetch_repo(None, "org/lib", MagicMock(), archive=path))
+        assert stats["loaded"] == 0
+        assert not list(tmp_path.rglob("escape.md*"))
+
+    def test_custom_patterns(self, archive):
+        with open(archive, "rb") as f:
+            got = [p for p, _ in iter_archive(f, patterns=["docs/**"], ignore=())]
+        assert got == ["docs/guide.rst"]
+
+
+class TestFetchRepo:
+    def test_local_archive_ingest(self, archive):
+        store = MagicMock()
+        stats = _run(fetch_repo(None, "org/lib", store, archive=archive))
+
+        assert stats["error"] is None
+        assert stats["loaded"] == 3
+        assert stats["batches"] == 1
+        docs = store.ingest_many.call_args.args[0]
+        assert {d["label"] for d in docs} == {"org-lib"}
+        assert docs[0]["metadata"]["url"] == "https://github.com/org/lib/blob/HEAD/README.md"
+        assert (fetcher.DOCS_BASE / "org-lib" / "docs" / "guide.rst.md").exists()
+
+    def test_second_run_skips_unchanged(self, archive):
+        store = MagicMock()
+        _run(fetch_repo(None, "org/lib", store, archive=archive))
+        store.reset_mock()
+
+        stats = _run(fetch_repo(None, "org/lib", store, archive=archive))
+        assert stats["unchanged"] == 3
+        assert stats["loaded"] == 0
+        store.ingest_many.assert_not_called()
+
+    def test_failed_ingest_not_stored(self, archive):
+        store = MagicMock()
+        store.ingest_many.side_effect = RuntimeError("boom")
+        stats = _run(fetch_repo(None, "org/lib", store, archive=archive))
+        assert stats["loaded"] == 0
+        assert len(stats["errors"]) == 3
+        assert not (fetcher.DOCS_BASE / "org-lib" / "README.md").exists()
+
+    def test_download(self):
+        data = _archive_bytes()
+        requested = []
+
+        class Resp:
+            status_code = 200
+            headers: dict = {}
+
+            def raise_for_status(self):
+                pass
+
+            async def aiter_bytes(self):
+                for i in range(0, len(data), 100):
+                    yield data[i:i + 100]
+
+        @asynccontextmanager
+        async def stream(method, url, **kwargs):
+            requested.append(url)
+            yield Resp()
+
+        client = MagicMock()
+        client.stream = stream
+        stats = _run(fetch_repo(client, "org/lib@v2", None))
+
+        assert requested == ["https://api.github.com/repos/org/lib/tarball/v2"]
+        assert stats["archive_bytes"] == len(data)
+        assert stats["loaded"] == 3
+        assert stats["ref"] == "v2"
+
+    def test_bad_archive(self, tmp_path):
+        bad = tmp_path / "bad.tar.gz"
+        bad.write_bytes(b"not a tarball")
+        stats = _run(fetch_repo(None, "org/lib", None, archive=bad))
+        assert stats["error"].startswith("Unreadable archive")
@@ -33,11 +33,18 @@ def _run(coro):
     return asyncio.run(coro)
 
 
+def _ingested_titles(store: MagicMock) -> list[str]:
+    """Titles of every doc a mock store received through the ingest pipeline."""
+    return [d["title"] for c in store.put_embedded.call_args_list for d in c.args[0]]
+
+
 def _mock_response(text: str = "", status_code: int = 200) -> MagicMock:
     """Create a mock httpx response."""
     resp = MagicMock()
     resp.status_code = status_code
     resp.text = text
+    resp.headers = {}
+    resp.history = []
     resp.raise_for_status = MagicMock()
     if status_code >= 400:
         import httpx
@@ -79,16 +86,18 @@ def mock_mcp():
 
 
 class TestResolveDocUrls:
-    def test_known_topic_returns_sitemap_and_base(self):
+    def test_known_topic_returns_llms_sitemap_and_base(self):
         urls = _resolve_doc_urls("fastapi")
         assert urls == [
+            "https://fastapi.tiangolo.com/llms-full.txt",
+            "https://fastapi.tiangolo.com/llms.txt",
             "https://fastapi.tiangolo.com/sitemap.xml",
             "https://fastapi.tiangolo.com",
         ]
 
     def test_known_topic_case_insensitive(self):
         urls = _resolve_doc_urls("  FastAPI  ")
-        assert urls[0] == "https://fastapi.tiangolo.com/sitemap.xml"
+        assert urls[0] == "https://fastapi.tiangolo.com/llms-full.txt"
 
     def test_known_topic_memvid(self):
         urls = _resolve_doc_urls("memvid")
@@ -96,11 +105,14 @@ class TestResolveDocUrls:
 
     def test_known_topic_dspy(self):
         urls = _resolve_doc_urls("dspy")
-        assert urls[0] == "https://dspy.ai/sitemap.xml"
+        assert urls[:3] == ["https://dspy.ai/llms-full.txt", "https://dspy.ai/llms.txt",
+                            "https://dspy.ai/sitemap.xml"]
 
     def test_unknown_topic_returns_fallback_patterns(self):
         urls = _resolve_doc_urls("somelib")
-        assert len(urls) == 4
+        assert len(urls) == 12
+        assert urls[0] == "https://docs.somelib.com/llms-full.txt"
+        assert "https://somelib.dev/llms.txt" in urls
         assert "https://docs.somelib.com/sitemap.xml" in urls
         assert "https://somelib.dev/sitemap.xml" in urls
         assert "https://somelib.readthedocs.io/sitemap.xml" in urls
@@ -112,7 +124,28 @@ class TestResolveDocUrls:
 
     def test_sklearn_alias(self):
         urls = _resolve_doc_urls("sklearn")
-        assert urls[0] == "https://scikit-learn.org/sitemap.xml"
+        assert "https://scikit-learn.org/sitemap.xml" in urls
+
+
+@pytest.fixture(autouse=True)
+def _fresh_limiters():
+    from mcp_server.ratelimit import reset_limiters
+    reset_limiters()
+    yield
+    reset_limiters()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_jobs(monkeypatch):
+    monkeypatch.setattr("mcp_server.jobs._manager", None)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_aliases():
+    from mcp_server.canonical import reset_aliases
+    reset_aliases()
+    yield
+    reset_aliases()
 
 
 # ---------------------------------------------------------------------------
@@ -153,8 +186,10 @@ class TestFetchSitemap:
 
         assert result["fetched"] == 2
         assert result["failed"] == 0
-        # Two pages ingested
-        assert mock_store.ingest.call_count == 2
+        # Two pages ingested and committed
+        assert sorted(_ingested_titles(mock_store)) == [
+            "https://example.com/page1", "https://example.com/page2"]
+        mock_store.commit.assert_called()
 
     def test_sitemap_fetch_failure(self):
         """When the sitemap itself can't be fetched, return 0 fetched, 1 failed."""
@@ -203,7 +238,7 @@ class TestFetchSitemap:
         assert result["fetched"] == 1
 
     def test_ingest_failure_does_not_block_fetching(self):
-        """If store.ingest raises, the page is still counted as fetched."""
+        """If the store write raises, the page is still counted as fetched."""
         sitemap_xml = """<urlset>
             <url><loc>https://example.com/ok</loc></url>
         </urlset>"""
@@ -218,7 +253,7 @@ class TestFetchSitemap:
         client.get = fake_get
 
         mock_store = MagicMock()
-        mock_store.ingest.side_effect = RuntimeError("store broken")
+        mock_store.put_embedded.side_effect = RuntimeError("store broken")
 
         result = _run(_fetch_sitemap(
             client, "https://example.com/sitemap.xml", mock_store
@@ -227,6 +262,82 @@ class TestFetchSitemap:
         # Page fetched successfully even though ingest failed
         assert result["fetched"] == 1
 
+    def test_resumes_interrupted_crawl(self):
+        """A crawl left running skips the sitemap, replays unacked pages, fetches the rest."""
+        from mcp_server.fetcher import DOCS_BASE, url_to_filepath, write_meta
+        from mcp_server.journal import get_journal
+
+        sitemap = "https://example.com/sitemap.xml"
+        job = f"sitemap:{sitemap}"
+        urls = [f"https://example.com/p{i}" for i in range(3)]
+        journal = get_journal(DOCS_BASE)
+        journal.start(job, "sitemap", sitemap, urls)
+        # p0 fetched and ingested; p1 fetched but the run died before ingest
+        for url in urls[:2]:
+            journal.mark(job, url, "done")
+            doc = url_to_filepath(url)
+            doc.parent.mkdir(parents=True, exist_ok=True)
+            doc.write_text(f"# {url}")
+            write_meta(doc, url, f"# {url}")
+        journal.ack(job, urls[0])
+
+        requested = []
+
+        async def fake_get(url, **kwargs):
+            requested.append(url)
+            return _mock_response("# Fresh")
+
+        client = AsyncMock()
+        client.get = fake_get
+        store = MagicMock()
+
+        result = _run(_fetch_sitemap(client, sitemap, store))
+
+        assert requested == [urls[2]]
+        assert sorted(_ingested_titles(store)) == urls[1:]
+        assert result == {"fetched": 3, "failed": 0}
+        assert journal.get_job(job)["status"] == "done"
+        assert journal.counts(job)["ingested"] == 3
+
+    def test_finished_crawl_starts_over(self):
+        sitemap_xml = "<urlset><url><loc>https://example.com/p</loc></url></urlset>"
+        requested = []
+
+        async def fake_get(url, **kwargs):
+            requested.append(url)
+            if "sitemap" in url:
+                return _mock_response(sitemap_xml)
+            return _mock_response("# Content")
+
+        client = AsyncMock()
+        client.get = fake_get
+
+        _run(_fetch_sitemap(client, "https://example.com/sitemap.xml", None))
+        _run(_fetch_sitemap(client, "https://example.com/sitemap.xml", None, force=True))
+
+        assert requested.count("https://example.com/sitemap.xml") == 2
+
+    def test_sitemap_variants_ingested_once(self):
+        sitemap_xml = """<urlset>
+            <url><loc>https://example.com/guide</loc></url>
+            <url><loc>https://example.com/guide/</loc></url>
+            <url><loc>http://example.com/guide/index.html</loc></url>
+        </urlset>"""
+
+        async def fake_get(url, **kwargs):
+            if "sitemap" in url:
+                return _mock_response(sitemap_xml)
+            return _mock_response("# Guide")
+
+        client = AsyncMock()
+        client.get = fake_get
+        store = MagicMock()
+
+        result = _run(_fetch_sitemap(client, "https://example.com/sitemap.xml", store))
+
+        assert result["fetched"] == 1
+        assert _ingested_titles(store) == ["https://example.com/guide"]
+
 
 # ---------------------------------------------------------------------------
 # _fetch_single tests
@@ -326,7 +437,15 @@ class TestCountDocSources:
 class TestRegistration:
     def test_registers_all_tools(self, mock_mcp):
         register_research_tools(mock_mcp)
-        expected = {"rlm_research", "rlm_knowledge_status", "rlm_knowledge_clear"}
+        expected = {
+            "rlm_research",
+            "rlm_knowledge_status",
+            "rlm_knowledge_clear",
+            "rlm_knowledge_audit",
+            "rlm_crawl_status",
+            "rlm_research_status",
+            "rlm_research_cancel",
+        }
         assert set(mock_mcp._registered.keys()) == expected
 
     def test_tools_have_docstrings(self, mock_mcp):
@@ -346,10 +465,20 @@ class TestRlmResearch:
         register_research_tools(mock_mcp)
         return mock_mcp._registered
 
-    def _make_ctx(self, http_client=None, store=None):
+    def _make_ctx(self, http_client=None, store=None, llms=False):
         ctx = MagicMock()
         app = MagicMock()
         app.http = http_client or AsyncMock()
+        get = app.http.get
+
+        # Doc-root probes use HEAD; answer them like the GET would. Unless
+        # llms is set, the site has no llms.txt files.
+        async def head(url, **kwargs):
+            if not llms and url.endswith(".txt"):
+                return _mock_response("", 404)
+            return await get(url, **kwargs)
+
+        app.http.head = head
         app.knowledge_store = store
         ctx.request_context.lifespan_context = app
         return ctx
@@ -435,6 +564,103 @@ class TestRlmResearch:
 
         assert "Indexed 1 pages" in result
 
+    def test_second_run_skips_discovery(self, tools):
+        """The discovered doc root is cached; the next run goes straight to it."""
+        sitemap_xml = "<urlset><url><loc>https://docs.cachedlib.com/a</loc></url></urlset>"
+        requested = []
+
+        async def fake_get(url, **kwargs):
+            requested.append(url)
+            if url == "https://docs.cachedlib.com/sitemap.xml":
+                return _mock_response(sitemap_xml)
+            if "sitemap" in url:
+                return _mock_response("", 404)
+            return _mock_response("# A")
+
+        client = AsyncMock()
+        client.get = fake_get
+        ctx = self._make_ctx(http_client=client)
+
+        _run(tools["rlm_research"]("cachedlib", ctx))
+        requested.clear()
+        result = _run(tools["rlm_research"]("cachedlib", ctx))
+
+        assert "Indexed 1 pages" in result
+        assert not any(u.endswith("sitemap.xml") and "docs.cachedlib.com" not in u
+                       for u in requested)
+
+    def test_cached_miss_reported(self, tools):
+        import httpx
+
+        client = AsyncMock()
+        client.get = AsyncMock(side_effect=httpx.ConnectError("all down"))
+        ctx = self._make_ctx(http_client=client)
+
+        _run(tools["rlm_research"]("ghostlib", ctx))
+        calls = client.get.call_count
+        result = _run(tools["rlm_research"]("ghostlib", ctx))
+
+        assert "cached result" in result
+        assert client.get.call_count == calls
+
+    def test_llms_full_preferred(self, tools):
+        """An llms-full.txt beats the sitemap: one request, split into pages."""
+        full = (
+            "# Intro\nSource: https://fastapi.tiangolo.com/intro\n\nWelcome.\n"
+            "# Tutorial\nSource: https://fastapi.tiangolo.com/tutorial\n\nSteps.\n"
+        )
+        requested = []
+
+        async def fake_get(url, **kwargs):
+            requested.append(url)
+            if url.endswith("llms-full.txt"):
+                return _mock_response(full)
+            if url.endswith("llms.txt"):
+                return _mock_response("- [A](https://fastapi.tiangolo.com/a)")
+            return _mock_response("<urlset></urlset>")
+
+        client = AsyncMock()
+        client.get = fake_get
+        mock_store = MagicMock()
+        ctx = self._make_ctx(http_client=client, store=mock_store, llms=True)
+
+        result = _run(tools["rlm_research"]("fastapi", ctx))
+
+        assert "Indexed 2 pages" in result
+        assert "llms-full.txt" in result
+        # The sitemap was probed alongside, but never crawled
+        assert requested.count("https://fastapi.tiangolo.com/sitemap.xml") == 1
+        assert _ingested_titles(mock_store) == [
+            "https://fastapi.tiangolo.com/intro", "https://fastapi.tiangolo.com/tutorial"]
+        meta = mock_store.put_embedded.call_args_list[0].args[0][0]["metadata"]
+        assert meta["source"] == "https://fastapi.tiangolo.com/llms-full.txt"
+        assert meta["source_kind"] == "llms-full"
+
+    def test_llms_txt_links_crawled(self, tools):
+        index = (
+            "# Lib\n> Summary with [a link](https://elsewhere.com)\n\n## Docs\n"
+            "- [Guide](https://docs.llmslib.com/guide.md): the guide\n"
+            "- [API](/api.md)\n"
+        )
+
+        async def fake_get(url, **kwargs):
+            if url == "https://docs.llmslib.com/llms.txt":
+                return _mock_response(index)
+            if url.endswith(".txt") or url.endswith(".xml"):
+                return _mock_response("", 404)
+            return _mock_response(f"# {url}")
+
+        client = AsyncMock()
+        client.get = fake_get
+        mock_store = MagicMock()
+        ctx = self._make_ctx(http_client=client, store=mock_store, llms=True)
+
+        result = _run(tools["rlm_research"]("llmslib", ctx))
+
+        assert "Indexed 2 pages" in result
+        assert sorted(_ingested_titles(mock_store)) == [
+            "https://docs.llmslib.com/api.md", "https://docs.llmslib.com/guide.md"]
+
     def test_research_with_knowledge_store(self, tools):
         """rlm_research uses the knowledge store from the app context."""
         sitemap_xml = """<urlset>
@@ -456,7 +682,104 @@ class TestRlmResearch:
         result = _run(tools["rlm_research"]("dspy", ctx))
 
         assert "Indexed 1 pages" in result
-        mock_store.ingest.assert_called_once()
+        assert _ingested_titles(mock_store) == ["https://dspy.ai/getting-started"]
+
+
+class TestResearchJobs:
+    @pytest.fixture()
+    def tools(self, mock_mcp):
+        register_research_tools(mock_mcp)
+        return mock_mcp._registered
+
+    @pytest.fixture(autouse=True)
+    def _fast_progress(self, monkeypatch):
+        monkeypatch.setattr("mcp_server.jobs.PROGRESS_INTERVAL", 0.01)
+
+    def _slow_site(self, gate: asyncio.Event):
+        sitemap_xml = "<urlset>" + "".join(
+            f"<url><loc>https://docs.slowlib.com/p{i}</loc></url>" for i in range(3)
+        ) + "</urlset>"
+
+        async def fake_get(url, **kwargs):
+            if url == "https://docs.slowlib.com/sitemap.xml":
+                return _mock_response(sitemap_xml)
+            if url.endswith(".xml") or url.endswith(".txt"):
+                return _mock_response("", 404)
+            await gate.wait()
+            return _mock_response("# page")
+
+        client = AsyncMock()
+        client.get = fake_get
+        ctx = TestRlmResearch._make_ctx(None, http_client=client)
+        ctx.report_progress = AsyncMock()
+        return ctx
+
+    def test_returns_job_id_then_result(self, tools):
+        async def main():
+            gate = asyncio.Event()
+            ctx = self._slow_site(gate)
+            started = await tools["rlm_research"]("slowlib", ctx, wait=0.05)
+            status = await tools["rlm_research_status"](ctx)
+            gate.set()
+            final = await tools["rlm_research_status"](ctx, job="r1", wait=5)
+            return started, status, final, ctx
+
+        started, status, final, ctx = _run(main())
+        assert "background" in started and "r1" in started
+        assert "r1 'slowlib' [running]" in status
+        assert "Indexed 3 pages" in final
+        ctx.report_progress.assert_awaited()
+        done, total, _ = ctx.report_progress.await_args.args
+        assert total == 3
+
+    def test_same_topic_joins_running_job(self, tools):
+        async def main():
+            gate = asyncio.Event()
+            ctx = self._slow_site(gate)
+            await tools["rlm_research"]("slowlib", ctx, wait=0)
+            again = await tools["rlm_research"]("SlowLib", ctx, wait=0)
+            gate.set()
+            await tools["rlm_research_status"](ctx, job="r1", wait=5)
+            return again, await tools["rlm_research_status"](ctx)
+
+        again, listing = _run(main())
+        assert "r1" in again
+        assert "Research jobs (1, 0 active)" in listing
+
+    def test_refresh_restarts_running_job(self, tools):
+        async def main():
+            gate = asyncio.Event()
+            ctx = self._slow_site(gate)
+            await tools["rlm_research"]("slowlib", ctx, wait=0)
+            again = await tools["rlm_research"]("slowlib", ctx, refresh=True, wait=0)
+            gate.set()
+            final = await tools["rlm_research_status"](ctx, job="r2", wait=5)
+            return again, final, await tools["rlm_research_status"](ctx, job="r1")
+
+        again, final, first = _run(main())
+        assert "r2" in again
+        assert "Indexed 3 pages" in final
+        assert "was cancelled" in first
+
+    def test_cancel(self, tools):
+        async def main():
+            ctx = self._slow_site(asyncio.Event())
+            await tools["rlm_research"]("slowlib", ctx, wait=0.05)
+            cancelled = await tools["rlm_research_cancel"]("r1", ctx)
+            again = await tools["rlm_research_cancel"]("r1", ctx)
+            status = await tools["rlm_research_status"](ctx, job="r1")
+            return cancelled, again, status
+
+        cancelled, again, status = _run(main())
+        assert "Cancelled job r1" in cancelled
+        assert "already cancelled" in again
+        assert "was cancelled" in status
+
+    def test_unknown_job(self, tools):
+        ctx = MagicMock()
+        assert "No research job" in _run(tools["rlm_research_status"](ctx, job="r9"))
+        assert "No research job" in _run(tools["rlm_research_cancel"]("r9", ctx))
+        assert _run(tools["rlm_research_status"](ctx)) == "No research jobs."
 
 
 # ---------------------------------------------------------------------------
@@ -540,6 +863,86 @@ class TestRlmKnowledgeStatus:
         assert str(mv2) in result or "override" in result.lower()
 
 
+# ---------------------------------------------------------------------------
+# rlm_knowledge_audit tool
+# ---------------------------------------------------------------------------
+
+
+class TestRlmKnowledgeAudit:
+    @pytest.fixture()
+    def tools(self, mock_mcp):
+        register_research_tools(mock_mcp)
+        return mock_mcp._registered
+
+    @pytest.fixture()
+    def docs(self, tmp_path, monkeypatch):
+        from mcp_server.catalog import close_catalogs
+
+        monkeypatch.setattr("mcp_server.research.DOCS_BASE", tmp_path)
+        (tmp_path / "fastapi").mkdir()
+        (tmp_path / "fastapi" / "index.md").write_text("# Index")
+        (tmp_path / "fastapi" / "tutorial.md").write_text("# Tutorial")
+        (tmp_path / "plans").mkdir()
+        (tmp_path / "plans" / "todo.md").write_text("skip me")
+        yield tmp_path
+        close_catalogs()
+
+    def test_lists_topics_from_catalog(self, tools, docs):
+        result = _run(tools["rlm_knowledge_audit"](MagicMock()))
+        assert "fastapi: 2 files" in result
+        assert "plans" not in result
+
+    def test_reindex_reads_catalog_paths(self, tools, docs):
+        store = MagicMock()
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context.knowledge_store = store
+
+        result = _run(tools["rlm_knowledge_audit"](ctx, reindex=True))
+
+        assert "Re-indexed 2 files" in result
+        docs_arg = store.ingest_many.call_args[0][0]
+        assert sorted(d["title"] for d in docs_arg) == ["index", "tutorial"]
+
+
+# ---------------------------------------------------------------------------
+# rlm_crawl_status tool
+# ---------------------------------------------------------------------------
+
+
+class TestRlmCrawlStatus:
+    @pytest.fixture()
+    def tools(self, mock_mcp):
+        register_research_tools(mock_mcp)
+        return mock_mcp._registered
+
+    @pytest.fixture()
+    def journal(self, tmp_path, monkeypatch):
+        from mcp_server.journal import close_journals, get_journal
+
+        monkeypatch.setattr("mcp_server.research.DOCS_BASE", tmp_path)
+        j = get_journal(tmp_path)
+        j.start("sitemap:https://a.dev/sitemap.xml", "sitemap",
+                "https://a.dev/sitemap.xml", ["https://a.dev/1", "https://a.dev/2"])
+        j.mark("sitemap:https://a.dev/sitemap.xml", "https://a.dev/1", "done")
+        yield j
+        close_journals()
+
+    def test_lists_jobs(self, tools, journal):
+        result = _run(tools["rlm_crawl_status"](MagicMock()))
+        assert "sitemap:https://a.dev/sitemap.xml [running]" in result
+        assert "1/2 fetched, 0 failed, 1 pending, 0 ingested" in result
+
+    def test_filter_by_source(self, tools, journal):
+        result = _run(tools["rlm_crawl_status"](MagicMock(), job="https://a.dev/sitemap.xml"))
+        assert "Crawl jobs (1)" in result
+        result = _run(tools["rlm_crawl_status"](MagicMock(), job="https://b.dev/sitemap.xml"))
+        assert "No crawl job" in result
+
+    def test_no_docs_dir(self, tools, tmp_path, monkeypatch):
+        monkeypatch.setattr("mcp_server.research.DOCS_BASE", tmp_path / "nope")
+        assert _run(tools["rlm_crawl_status"](MagicMock())) == "No crawls recorded."
+
+
 # ---------------------------------------------------------------------------
 # rlm_knowledge_clear tool
 # ---------------------------------------------------------------------------
@@ -570,6 +973,25 @@ class TestRlmKnowledgeClear:
         assert not mv2.exists()
         assert "clear-test" not in _stores
 
+    def test_clear_drops_near_dup_signatures(self, tools, tmp_path, monkeypatch):
+        """Pages re-crawled after a clear aren't skipped as copies of gone chunks."""
+        from mcp_server.dedup import get_near_dup_index
+        from mcp_server.knowledge import get_store
+
+        monkeypatch.setattr("mcp_server.research.DOCS_BASE", tmp_path)
+        store = get_store("dedup-clear")
+        mv2 = tmp_path / "dedup.mv2"
+        mv2.write_bytes(b"data")
+        store.path = str(mv2)
+        store.mem = MagicMock()
+        text = " ".join(f"word{i}" for i in range(40))
+        index = get_near_dup_index(tmp_path)
+        index.check_page(str(mv2), "https://x.com/v1/a", [text])
+
+        _run(tools["rlm_knowledge_clear"](MagicMock(), project="dedup-clear"))
+        assert index.counts(str(mv2)) == {"signatures": 0, "links": 0}
+        assert index.check_page(str(mv2), "https://x.com/v2/a", [text]) == [None]
+
     def test_clear_nonexistent_store(self, tools, tmp_path):
         """Clearing when no .mv2 file exists still works (no error)."""
         from mcp_server.knowledge import get_store
@@ -0,0 +1,199 @@
+"""Tests for doc-root discovery: concurrent probing and the resolution cache.
+
+HTTP is mocked; the cache lives under tmp_path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from mcp_server.resolver import (
+    NEGATIVE_TTL,
+    candidate_kind,
+    close_resolution_caches,
+    discover_doc_root,
+    first_success,
+    get_resolution_cache,
+    probe,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _resp(status: int = 200, content_type: str = "application/xml") -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status
+    resp.headers = {"content-type": content_type}
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def _fresh(tmp_path):
+    from mcp_server.ratelimit import reset_limiters
+    reset_limiters()
+    yield
+    reset_limiters()
+    close_resolution_caches()
+
+
+class TestProbe:
+    def test_head_success(self):
+        client = AsyncMock()
+        client.head = AsyncMock(return_value=_resp(200))
+        assert _run(probe(client, "https://a.dev/sitemap.xml"))
+        client.get.assert_not_called()
+
+    def test_head_not_allowed_falls_back_to_range_get(self):
+        client = AsyncMock()
+        client.head = AsyncMock(return_value=_resp(405))
+        client.get = AsyncMock(return_value=_resp(206))
+        assert _run(probe(client, "https://a.dev/sitemap.xml"))
+        assert client.get.call_args.kwargs["headers"] == {"Range": "bytes=0-0"}
+
+    def test_html_sitemap_is_soft_404(self):
+        client = AsyncMock()
+        client.head = AsyncMock(return_value=_resp(200, "text/html; charset=utf-8"))
+        assert not _run(probe(client, "https://a.dev/sitemap.xml"))
+        assert _run(probe(client, "https://a.dev/"))
+
+    def test_errors_are_misses(self):
+        client = AsyncMock()
+        client.head = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        assert not _run(probe(client, "https://a.dev/sitemap.xml"))
+        client.head = AsyncMock(return_value=_resp(404))
+        assert not _run(probe(client, "https://a.dev/sitemap.xml"))
+
+
+class TestFirstSuccess:
+    def test_fastest_success_wins_and_losers_cancelled(self):
+        cancelled = []
+
+        async def head(url, **kwargs):
+            delay = {"https://slow.dev/s.xml": 5.0, "https://fast.dev/s.xml": 0.01}.get(url, 0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return _resp(404 if "miss" in url else 200)
+
+        client = AsyncMock()
+        client.head = head
+        urls = ["https://miss.dev/s.xml", "https://slow.dev/s.xml", "https://fast.dev/s.xml"]
+
+        t0 = time.monotonic()
+        winner = _run(first_success(client, urls))
+
+        assert winner == "https://fast.dev/s.xml"
+        assert cancelled == ["https://slow.dev/s.xml"]
+        assert time.monotonic() - t0 < 1.0
+
+    def test_timeout_bounds_the_race(self):
+        async def head(url, **kwargs):
+            await asyncio.sleep(5)
+
+        client = AsyncMock()
+        client.head = head
+        t0 = time.monotonic()
+        assert _run(first_success(client, ["https://hang.dev/s.xml"], timeout=0.05)) is None
+        assert time.monotonic() - t0 < 1.0
+
+    def test_all_fail(self):
+        client = AsyncMock()
+        client.head = AsyncMock(return_value=_resp(404))
+        assert _run(first_success(client, ["https://a.dev/s.xml", "https://b.dev/s.xml"])) is None
+
+
+class TestDiscover:
+    CANDIDATES = ["https://docs.lib.com/sitemap.xml", "https://lib.dev/sitemap.xml",
+                  "https://docs.lib.com"]
+
+    def test_sitemap_preferred_then_cached(self, tmp_path):
+        client = AsyncMock()
+        client.head = AsyncMock(side_effect=lambda u, **kw: _resp(
+            200 if u.startswith("https://lib.dev") or not u.endswith(".xml") else 404))
+
+        first = _run(discover_doc_root(client, "Lib", self.CANDIDATES, base=tmp_path))
+        assert first == {"url": "https://lib.dev/sitemap.xml", "kind": "sitemap", "cached": False}
+
+        client.head.reset_mock()
+        again = _run(discover_doc_root(client, "lib", self.CANDIDATES, base=tmp_path))
+        assert again == {"url": "https://lib.dev/sitemap.xml", "kind": "sitemap", "cached": True}
+        client.head.assert_not_called()
+
+    def test_page_when_no_sitemap(self, tmp_path):
+        client = AsyncMock()
+        client.head = AsyncMock(
+            side_effect=lambda u, **kw: _resp(404 if u.endswith(".xml") else 200))
+        root = _run(discover_doc_root(client, "lib", self.CANDIDATES, base=tmp_path))
+        assert root["kind"] == "page"
+        assert root["url"] == "https://docs.lib.com"
+
+    def test_negative_result_cached_with_short_ttl(self, tmp_path):
+        client = AsyncMock()
+        client.head = AsyncMock(return_value=_resp(404))
+
+        miss = _run(discover_doc_root(client, "nolib", self.CANDIDATES, base=tmp_path))
+        assert miss["url"] is None
+
+        client.head.reset_mock()
+        cached = _run(discover_doc_root(client, "nolib", self.CANDIDATES, base=tmp_path))
+        assert cached == {"url": None, "kind": None, "cached": True}
+        client.head.assert_not_called()
+
+        # refresh=True probes again
+        _run(discover_doc_root(client, "nolib", self.CANDIDATES, base=tmp_path, refresh=True))
+        assert client.head.call_count == len(self.CANDIDATES)
+
+    def test_llms_full_beats_faster_sitemap(self, tmp_path):
+        async def head(url, **kwargs):
+            await asyncio.sleep(0.05 if url.endswith("llms-full.txt") else 0)
+            return _resp(200, "text/plain")
+
+        client = AsyncMock()
+        client.head = head
+        urls = ["https://lib.dev/llms-full.txt", "https://lib.dev/llms.txt",
+                "https://lib.dev/sitemap.xml", "https://lib.dev"]
+        root = _run(discover_doc_root(client, "lib", urls, base=tmp_path))
+        assert root == {"url": "https://lib.dev/llms-full.txt", "kind": "llms-full",
+                        "cached": False}
+
+    def test_hung_preferred_kind_bounded_by_one_timeout(self, tmp_path):
+        async def head(url, **kwargs):
+            if url.endswith(".txt"):
+                await asyncio.sleep(5)
+            return _resp(200)
+
+        client = AsyncMock()
+        client.head = head
+        urls = ["https://docs.lib.com/llms-full.txt", "https://lib.dev/llms.txt",
+                "https://lib.readthedocs.io/sitemap.xml"]
+        t0 = time.monotonic()
+        root = _run(discover_doc_root(client, "lib", urls, base=tmp_path, timeout=0.1))
+        assert root["kind"] == "sitemap"
+        assert time.monotonic() - t0 < 1.0
+
+    def test_candidate_kinds(self):
+        assert [candidate_kind(u) for u in (
+            "https://a.dev/llms-full.txt", "https://a.dev/llms.txt",
+            "https://a.dev/sitemap.xml", "https://a.dev/docs")] == [
+            "llms-full", "llms", "sitemap", "page"]
+
+    def test_expired_entries_ignored(self, tmp_path, monkeypatch):
+        cache = get_resolution_cache(tmp_path)
+        cache.put("old", None, None, NEGATIVE_TTL)
+        later = time.time() + NEGATIVE_TTL + 1
+        monkeypatch.setattr("mcp_server.resolver.time.time", lambda: later)
+        assert cache.get("old") is None
+
+    def test_cache_persists(self, tmp_path):
+        get_resolution_cache(tmp_path).put("lib", "https://lib.dev/sitemap.xml", "sitemap", 60)
+        close_resolution_caches()
+        assert get_resolution_cache(tmp_path).get("lib")["url"] == "https://lib.dev/sitemap.xml"
@@ -0,0 +1,209 @@
+"""Tests for crawl scoping: path filters, variant dedup, ranking and budgets.
+
+HTTP is mocked; crawled pages land in the docs cache, removed after each test.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from mcp_server.scope import (
+    DEFAULT_EXCLUDE,
+    CrawlScope,
+    apply_scope,
+    describe_skipped,
+    relevance,
+    research_scope,
+    split_variant,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _mock_response(text: str = "", status_code: int = 200) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.text = text
+    resp.headers = {"content-type": "text/markdown"}
+    resp.history = []
+    resp.raise_for_status = MagicMock()
+    return resp
+
+
+def _sitemap(urls: list[str]) -> str:
+    locs = "".join(f"<url><loc>{u}</loc></url>" for u in urls)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    from mcp_server.canonical import reset_aliases
+    from mcp_server.ratelimit import reset_limiters
+    reset_aliases()
+    reset_limiters()
+    yield
+    reset_aliases()
+    reset_limiters()
+    import shutil
+    from mcp_server.fetcher import DOCS_BASE
+    shutil.rmtree(Path(DOCS_BASE), ignore_errors=True)
+
+
+class TestSplitVariant:
+    def test_language_and_version(self):
+        assert split_variant("https://docs.x.com/en/5.0/topics/db/") == ("/topics/db", "en", "5.0")
+
+    def test_region_language(self):
+        assert split_variant("https://x.com/pt_BR/stable/intro") == ("/intro", "pt-br", "stable")
+
+    def test_plain_path(self):
+        assert split_variant("https://x.com/docs/api/models") == ("/docs/api/models", None, None)
+
+    def test_version_prefix(self):
+        assert split_variant("https://x.com/v2/guide") == ("/guide", None, "v2")
+
+    def test_deep_segments_untouched(self):
+        # "en" deep in a path is a page name, not a language
+        assert split_variant("https://x.com/docs/api/en") == ("/docs/api/en", None, None)
+
+
+class TestApplyScope:
+    def test_default_keeps_everything(self):
+        urls = ["https://x.com/b", "https://x.com/a"]
+        assert apply_scope(urls, CrawlScope()) == (urls, {"excluded": 0, "variants": 0,
+                                                          "over_budget": 0})
+
+    def test_exclude_ignores_variant_segments(self):
+        urls = ["https://docs.x.com/en/5.0/releases/5.0.1/", "https://docs.x.com/en/5.0/intro/"]
+        kept, skipped = apply_scope(urls, CrawlScope(exclude=("/releases",)))
+        assert kept == ["https://docs.x.com/en/5.0/intro/"]
+        assert skipped["excluded"] == 1
+
+    def test_include(self):
+        urls = ["https://x.com/docs/a", "https://x.com/blog/b", "https://x.com/docsish"]
+        kept, skipped = apply_scope(urls, CrawlScope(include=("docs/",)))
+        assert kept == ["https://x.com/docs/a"]
+        assert skipped["excluded"] == 2
+
+    def test_dedup_prefers_language_then_stable(self):
+        urls = [
+            "https://docs.x.com/fr/stable/intro/",
+            "https://docs.x.com/en/4.2/intro/",
+            "https://docs.x.com/en/stable/intro/",
+            "https://docs.x.com/en/dev/intro/",
+            "https://docs.x.com/ja/5.0/other/",
+        ]
+        kept, skipped = apply_scope(urls, CrawlScope(dedup_variants=True))
+        assert kept == ["https://docs.x.com/en/stable/intro/", "https://docs.x.com/ja/5.0/other/"]
+        assert skipped["variants"] == 3
+
+    def test_dedup_prefers_newest_numbered_version(self):
+        urls = ["https://x.com/v1.9/guide", "https://x.com/v1.10/guide", "https://x.com/dev/guide"]
+        kept, _ = apply_scope(urls, CrawlScope(dedup_variants=True))
+        assert kept == ["https://x.com/v1.10/guide"]
+
+    def test_dedup_is_per_host(self):
+        urls = ["https://a.com/en/intro", "https://b.com/de/intro"]
+        assert apply_scope(urls, CrawlScope(dedup_variants=True))[0] == urls
+
+    def test_ranking_by_topic(self):
+        urls = [
+            "https://x.com/about/team",
+            "https://x.com/docs/misc/page",
+            "https://x.com/docs/topics/models",
+            "https://x.com/blog/models-are-fun",
+        ]
+        kept, _ = apply_scope(urls, CrawlScope(topic="models"))
+        assert kept[0] == "https://x.com/docs/topics/models"
+        assert kept[-1] == "https://x.com/about/team"
+
+    def test_titles_count_towards_relevance(self):
+        a, b = "https://x.com/p/1", "https://x.com/p/2"
+        kept, _ = apply_scope([a, b], CrawlScope(topic="routing"),
+                              titles={b: "Routing and URLs"})
+        assert kept == [b, a]
+
+    def test_max_pages_after_ranking(self):
+        urls = [f"https://x.com/misc/{i}" for i in range(5)] + ["https://x.com/docs/orm"]
+        kept, skipped = apply_scope(urls, CrawlScope(topic="orm", max_pages=2))
+        assert kept == ["https://x.com/docs/orm", "https://x.com/misc/0"]
+        assert skipped["over_budget"] == 4
+
+    def test_research_scope(self):
+        scope = research_scope("django")
+        assert scope.dedup_variants and scope.topic == "django"
+        assert scope.exclude == DEFAULT_EXCLUDE
+        assert scope.max_pages and scope.max_bytes
+
+
+class TestRelevance:
+    def test_low_value_penalised(self):
+        assert relevance("https://x.com/docs/intro", "x") > relevance("https://x.com/blog/intro", "x")
+
+    def test_shallow_beats_deep(self):
+        assert relevance("https://x.com/a", None) > relevance("https://x.com/a/b/c", None)
+
+
+class TestDescribeSkipped:
+    def test_nonzero_only(self):
+        assert describe_skipped({"excluded": 2, "variants": 0, "over_bytes": 1}) == (
+            "2 excluded by path, 1 over the byte budget")
+
+    def test_empty(self):
+        assert describe_skipped({}) == ""
+
+
+class TestScopedCrawl:
+    def _client(self, sitemap_urls: list[str], page: str = "# Page\n\nbody"):
+        client = AsyncMock()
+        requested: list[str] = []
+
+        async def fake_get(url, **kwargs):
+            if url.endswith("sitemap.xml"):
+                return _mock_response(_sitemap(sitemap_urls), 200)
+            requested.append(url)
+            return _mock_response(page + f"\n\n{url}")
+
+        client.get = fake_get
+        return client, requested
+
+    def test_frontier_is_scoped_and_ranked(self):
+        from mcp_server.fetcher import DOCS_BASE, crawl_sitemap
+        from mcp_server.journal import get_journal
+
+        sitemap = "https://docs.x.com/sitemap.xml"
+        urls = [
+            "https://docs.x.com/en/stable/misc/",
+            "https://docs.x.com/fr/stable/orm/",
+            "https://docs.x.com/en/stable/orm/",
+            "https://docs.x.com/en/stable/blog/post/",
+        ]
+        client, requested = self._client(urls)
+        scope = CrawlScope(exclude=("/blog",), dedup_variants=True, topic="orm")
+        crawl = _run(crawl_sitemap(client, sitemap, scope=scope))
+
+        assert crawl["total"] == 2
+        assert crawl["skipped"] == {"excluded": 1, "variants": 1, "over_budget": 0}
+        assert sorted(requested) == ["https://docs.x.com/en/stable/misc",
+                                     "https://docs.x.com/en/stable/orm"]
+        journal = get_journal(Path(DOCS_BASE))
+        assert journal.urls(f"sitemap:{sitemap}", "done") == [
+            "https://docs.x.com/en/stable/orm", "https://docs.x.com/en/stable/misc"]
+
+    def test_byte_budget_stops_fetching(self):
+        from mcp_server.fetcher import crawl_sitemap
+
+        urls = [f"https://docs.x.com/p{i}" for i in range(20)]
+        client, requested = self._client(urls, page="# Page\n\n" + "x" * 500)
+        crawl = _run(crawl_sitemap(client, "https://docs.x.com/sitemap.xml",
+                                   scope=CrawlScope(max_bytes=1000)))
+
+        assert 0 < len(requested) < 20
+        assert crawl["skipped"]["over_bytes"] == 20 - len(requested)
+        assert crawl["fetched"] == len(requested)
@@ -0,0 +1,253 @@
+"""Tests for incremental session snapshots (mcp_server/session.py).
+
+The sandbox app runs in-process behind httpx's ASGI transport, with real
+kernel workers, so these need the sandbox requirements but not Docker.
+"""
+
+import asyncio
+import os
+import time
+
+import httpx
+import pytest
+
+pytest.importorskip("IPython")
+pytest.importorskip("dill")
+
+from mcp_server import session as session_mod  # noqa: E402
+from mcp_server.session import SessionManager  # noqa: E402
+from sandbox import server  # noqa: E402
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_mod, "SESSIONS_DIR", tmp_path)
+    monkeypatch.setattr(session_mod, "BLOBS_DIR", tmp_path / "blobs")
+    # Collect unreferenced blobs right away unless a test says otherwise
+    monkeypatch.setattr(session_mod, "BLOB_GC_GRACE", -1)
+    transport = httpx.ASGITransport(app=server.app)
+    client_cls = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kw: client_cls(transport=transport, **kw))
+    yield SessionManager("/some/project")
+    server.pool.close()
+
+
+def _exec(code: str) -> dict:
+    return server.pool.get().execute(code)
+
+
+def _blobs(tmp_path) -> set[str]:
+    return {p.name for p in (tmp_path / "blobs").glob("*/*")}
+
+
+class TestIncrementalSave:
+    def test_only_changed_vars_written(self, manager, tmp_path):
+        _exec("a = list(range(1000))\nb = 'text'")
+        assert _run(manager.save())
+        assert manager.stats.blobs_written == 2
+        _exec("b = 'changed'")
+        assert _run(manager.save())
+        assert manager.stats.blobs_written == 3
+        assert manager.stats.saves == 2
+
+    def test_skipped_when_nothing_ran(self, manager):
+        _exec("a = 1")
+        _run(manager.save())
+        _exec("print('no new state')")
+        assert _run(manager.save())
+        assert manager.stats.saves == 1 and manager.stats.skipped == 1
+
+    def test_change_through_another_name_saved(self, manager):
+        _exec("data = [1]\nholder = [data]")
+        _run(manager.save())
+        _exec("data.append(2)")
+        assert _run(manager.save())
+        assert manager.stats.blobs_written == 4
+
+    def test_spilled_value_saved(self, manager):
+        # Workers read the limit from their own copy of the module
+        _exec("import sandbox.repl as r\nr.CHECKPOINT_MAX_VAR_BYTES = 1000\n"
+              "big = bytes(range(256)) * 40")
+        assert _run(manager.save())
+        assert type(server.pool.get()._checkpoint["big"]).__name__ == "_Spilled"
+        server.pool.remove("default")
+
+        assert _run(SessionManager("/some/project").restore())
+        _exec("ok = big == bytes(range(256)) * 40")
+        assert server.pool.get().get_var("ok") == {"value": True}
+
+    def test_unreferenced_blobs_collected(self, manager, tmp_path, monkeypatch):
+        # Once no kept generation refers to them
+        monkeypatch.setattr(session_mod, "GENERATIONS_KEEP", 1)
+        _exec("a = 'one'\nb = 'two'")
+        _run(manager.save())
+        assert len(_blobs(tmp_path)) == 2
+        _exec("del a")
+        _run(manager.save())
+        assert len(_blobs(tmp_path)) == 1
+
+    def test_recent_and_partial_blobs_not_collected(self, manager, tmp_path, monkeypatch):
+        # Another process may have written them and not its manifest yet
+        monkeypatch.setattr(session_mod, "BLOB_GC_GRACE", 3600)
+        shard = tmp_path / "blobs" / "ab"
+        shard.mkdir(parents=True)
+        fresh, partial, old = shard / ("ab" * 32 + ".zz"), shard / "ab.zz.tmp", shard / "abc.zz"
+        for path in (fresh, partial, old):
+            path.write_bytes(b"x")
+        os.utime(old, (time.time() - 7200,) * 2)
+        assert session_mod.gc_blobs() == 1
+        assert fresh.exists() and partial.exists() and not old.exists()
+
+    def test_present_blob_claimed_before_reuse(self, manager, tmp_path, monkeypatch):
+        monkeypatch.setattr(session_mod, "BLOB_GC_GRACE", 3600)
+        _exec("a = 'one'")
+        _run(manager.save())
+        (blob,) = (tmp_path / "blobs").glob("*/*")
+        os.utime(blob, (time.time() - 7200,) * 2)
+        _exec("b = 'two'")
+        _run(manager.save())
+        assert blob.stat().st_mtime > time.time() - 60
+
+    def test_cost_reported(self, manager):
+        _exec("a = list(range(10000))")
+        _run(manager.save())
+        status = manager.status()
+        assert status["checkpoint_bytes"] > 0 and status["snapshot_bytes"] > 0
+        assert status["vars"] == 1
+
+    def test_blobs_stored_compressed(self, manager, tmp_path):
+        _exec("a = 'x' * 100000")
+        _run(manager.save())
+        (blob,) = (tmp_path / "blobs").glob("*/*")
+        assert blob.suffix in (".zst", ".zz")
+        assert blob.stat().st_size < 10000
+
+    def test_unpicklable_listed(self, manager, tmp_path):
+        _exec("gen = (i for i in range(3))\nok = 1")
+        _run(manager.save())
+        record = (tmp_path / f"{manager.session_id}.json").read_text()
+        assert '"skipped": ["gen"]' in record
+
+
+class TestRestore:
+    def test_round_trip(self, manager):
+        _exec("data = {'k': [1, 2, 3]}\nname = 'x'")
+        _run(manager.save())
+        server.pool.remove("default")
+
+        fresh = SessionManager("/some/project")
+        assert _run(fresh.restore())
+        assert server.pool.get().get_var("data") == {"value": {"k": [1, 2, 3]}}
+        # What was restored is already on disk
+        assert _run(fresh.save()) and fresh.stats.skipped == 1
+
+    def test_missing_blob_skips_only_that_var(self, manager, tmp_path):
+        _exec("keep = 1\nlose = 2")
+        _run(manager.save())
+        digest = server.pool.get().manifest()["vars"]["lose"]
+        session_mod._find_blob(digest)[0].unlink()
+        server.pool.remove("default")
+
+        assert _run(SessionManager("/some/project").restore())
+        kernel = server.pool.get()
+        assert kernel.get_var("keep") == {"value": 1}
+        assert kernel.get_var("lose") == {"error": "not found"}
+
+    def test_corrupt_blob_fails_only_that_var(self, manager):
+        _exec("keep = 1\nbad = list(range(1000))")
+        _run(manager.save())
+        digest = server.pool.get().manifest()["vars"]["bad"]
+        path, _ = session_mod._find_blob(digest)
+        path.write_bytes(path.read_bytes()[:20])
+        server.pool.remove("default")
+
+        assert _run(SessionManager("/some/project").restore())
+        kernel = server.pool.get()
+        assert kernel.get_var("keep") == {"value": 1}
+        assert kernel.get_var("bad") == {"error": "not found"}
+
+    def test_large_value_streamed(self, manager):
+        _exec("big = bytes(range(256)) * 20000")  # several transport chunks
+        _run(manager.save())
+        server.pool.remove("default")
+
+        assert _run(SessionManager("/some/project").restore())
+        _exec("ok = big == bytes(range(256)) * 20000")
+        assert server.pool.get().get_var("ok") == {"value": True}
+
+    @pytest.mark.parametrize("eager", [False, True])
+    def test_lazy_or_eager(self, manager, eager):
+        _exec("big = list(range(1000))")
+        _run(manager.save())
+        server.pool.remove("default")
+
+        assert _run(SessionManager("/some/project").restore(eager=eager))
+        (var,) = server.pool.get().get_vars()
+        assert var["type"] == ("list" if eager else "not loaded")
+        assert server.pool.get().get_var("big")["value"][-1] == 999
+
+    def test_no_snapshot(self, manager):
+        assert not _run(manager.restore())
+
+
+class TestGenerations:
+    def test_ring_bounded_and_shares_blobs(self, manager, tmp_path, monkeypatch):
+        monkeypatch.setattr(session_mod, "GENERATIONS_KEEP", 3)
+        _exec("big = 'x' * 100000")
+        for i in range(5):
+            _exec(f"step = {i}")
+            _run(manager.save())
+        gens = manager.generations()
+        assert [g["generation"] for g in gens] == [5, 4, 3]
+        # Only the changed variable costs anything in later generations
+        assert gens[0]["new_bytes"] < gens[0]["bytes"]
+        assert len(_blobs(tmp_path)) == 4  # big + steps 2..4
+
+    def test_skipped_save_adds_no_generation(self, manager):
+        _exec("a = 1")
+        _run(manager.save())
+        _run(manager.save())
+        assert len(manager.generations()) == 1
+
+    def test_rollback(self, manager):
+        _exec("data = [1, 2, 3]")
+        _run(manager.save())
+        _exec("data.clear()\nscratch = 'new'")
+        _run(manager.save())
+
+        result = _run(manager.rollback(1))
+        assert result["deleted"] == ["scratch"] and not result["failed"]
+        kernel = server.pool.get()
+        assert kernel.get_var("data") == {"value": [1, 2, 3]}
+        assert kernel.get_var("scratch") == {"error": "not found"}
+        gens = manager.generations()
+        assert gens[0]["rollback_of"] == 1
+        # The rolled-back state is what a restart restores
+        server.pool.remove("default")
+        _run(SessionManager("/some/project").restore())
+        assert server.pool.get().get_var("data") == {"value": [1, 2, 3]}
+
+    def test_rollback_is_undoable(self, manager):
+        _exec("x = 1")
+        _run(manager.save())
+        _exec("x = 2")
+        _run(manager.rollback(1))  # saves x = 2 as generation 2 first
+        _run(manager.rollback(2))
+        assert server.pool.get().get_var("x") == {"value": 2}
+
+    def test_rollback_to_oldest_of_full_ring(self, manager, monkeypatch):
+        monkeypatch.setattr(session_mod, "GENERATIONS_KEEP", 2)
+        _exec("v = 'first'")
+        _run(manager.save())
+        _exec("v = 'second'")
+        _run(manager.save())
+        _exec("v = 'third'")
+        assert not _run(manager.rollback(1)).get("error")
+        assert server.pool.get().get_var("v") == {"value": "first"}
+
+    def test_unknown_generation(self, manager):
+        assert "no generation" in _run(manager.rollback(7))["error"]
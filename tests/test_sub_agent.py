@@ -26,6 +26,7 @@ from mcp_server.sub_agent import (
     inject_llm_stub,
     inject_tool_stubs,
     run_sub_agent,
+    set_session_setup,
 )
 
 
@@ -84,6 +85,15 @@ class TestSandboxInterpreter:
             "/exec", json={"code": "print(42)"}
         )
 
+    def test_session_sent_as_query_param(self):
+        async def check():
+            async with SandboxInterpreter(session="sub-1") as interp:
+                assert interp._client.params["session"] == "sub-1"
+            async with SandboxInterpreter() as interp:
+                assert "session" not in interp._client.params
+
+        _run(check())
+
     def test_execute_includes_stderr_when_present(self):
         interp = SandboxInterpreter()
         mock_client = AsyncMock()
@@ -746,6 +756,24 @@ class TestToolStubInjection:
         # _tool_call dispatcher should still be there, just no per-tool stubs
         assert "_tool_call" in injected_code
 
+    def test_session_setup_holds_both_stubs(self):
+        """set_session_setup hands the sandbox llm_query() and the tool stubs in one PUT."""
+        from mcp_server.llm_callback import SANDBOX_TOOLS
+
+        mock_client = AsyncMock()
+        mock_client.put.return_value = _mock_httpx_response({"bytes": 1})
+
+        _run(set_session_setup(mock_client, "http://host:9999/llm_query", "http://host:8081",
+                               SANDBOX_TOOLS))
+        mock_client.put.assert_called_once()
+        call_args = mock_client.put.call_args
+        assert call_args[0][0] == "/session/setup"
+        code = call_args.kwargs["json"]["code"]
+        assert "def llm_query(" in code and "http://host:9999/llm_query" in code
+        for func_name in SANDBOX_TOOLS:
+            assert f"def {func_name}" in code
+        compile(code, "<setup>", "exec")
+
     def test_search_knowledge_stub_has_top_k_param(self):
         """search_knowledge stub signature includes top_k parameter."""
         mock_client = AsyncMock()